@@ -0,0 +1,202 @@
+"""Monthly range partitioning for balance_transactions, bets and audit_log
+
+Revision ID: 20261019_000001
+Revises: 20251216_000001
+Create Date: 2026-10-19
+
+Каждая таблица пересоздаётся как PARTITION BY RANGE по месяцам:
+- balance_transactions, audit_log - по created_at
+- bets - по placed_at
+
+PostgreSQL требует, чтобы ключ партиционирования входил в PRIMARY KEY и
+UNIQUE, поэтому они становятся составными (id, created_at). Внешние ключи
+других таблиц на партиционируемые таблицы (bets.stake_transaction_id,
+bets.win_transaction_id) удаляются - сослаться на одну колонку составного
+ключа нельзя.
+
+Создаются партиции от месяца самой старой строки до текущего месяца +
+PREMAKE_MONTHS и DEFAULT-партиция. Дальше партиции создаёт и отсоединяет
+scripts/manage_partitions.py (services/partition_service.py).
+
+Данные копируются INSERT ... SELECT - на больших таблицах миграцию нужно
+выполнять в окно обслуживания.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000001'
+down_revision = '20251216_000001'
+branch_labels = None
+depends_on = None
+
+
+PARTITIONED_TABLES = (
+    ('balance_transactions', 'created_at'),
+    ('bets', 'placed_at'),
+    ('audit_log', 'created_at'),
+)
+
+PREMAKE_MONTHS = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def _describe(bind, table):
+    """Снимок структуры таблицы, которую нужно перенести на новую таблицу."""
+    inspector = sa.inspect(bind)
+    referencing = [
+        (other, fk)
+        for other in inspector.get_table_names()
+        if other != table
+        for fk in inspector.get_foreign_keys(other)
+        if fk['referred_table'] == table
+    ]
+    pk = inspector.get_pk_constraint(table)
+    has_trigger = bind.execute(
+        sa.text("SELECT 1 FROM pg_trigger WHERE tgname = :name"),
+        {'name': f'update_{table}_updated_at'}
+    ).first() is not None
+    return {
+        'columns': [column['name'] for column in inspector.get_columns(table)],
+        'pk_name': pk['name'],
+        'pk_columns': pk['constrained_columns'],
+        'uniques': inspector.get_unique_constraints(table),
+        # Индексы UNIQUE-ограничений переносятся вместе с ограничениями
+        'indexes': [
+            index for index in inspector.get_indexes(table)
+            if not index.get('duplicates_constraint')
+        ],
+        'foreign_keys': inspector.get_foreign_keys(table),
+        'referencing': referencing,
+        'has_trigger': has_trigger,
+    }
+
+
+def _rename_old_table(bind, table, old_name, info):
+    """Переименовывает таблицу и освобождает имена её индексов и ограничений."""
+    for index in info['indexes']:
+        op.drop_index(index['name'], table_name=table)
+    op.execute(f'ALTER TABLE {table} RENAME TO {old_name}')
+    for name in [info['pk_name']] + [unique['name'] for unique in info['uniques']]:
+        op.execute(f'ALTER TABLE {old_name} RENAME CONSTRAINT {name} TO {name}_old')
+
+    sequence = bind.execute(
+        sa.text("SELECT pg_get_serial_sequence(:table, :column)"),
+        {'table': old_name, 'column': info['pk_columns'][0]}
+    ).scalar()
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+    return sequence
+
+
+def _restore_dependents(table, info, key_column, sequence):
+    """Ключи, индексы, триггер и владение sequence на новой таблице."""
+    pk_columns = [c for c in info['pk_columns'] if c != key_column]
+    if key_column:
+        pk_columns.append(key_column)
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {info['pk_name']} PRIMARY KEY ({', '.join(pk_columns)})")
+
+    for unique in info['uniques']:
+        columns = [c for c in unique['column_names'] if c != key_column]
+        if key_column:
+            columns.append(key_column)
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {unique['name']} UNIQUE ({', '.join(columns)})")
+
+    for fk in info['foreign_keys']:
+        op.create_foreign_key(
+            fk['name'], table, fk['referred_table'],
+            fk['constrained_columns'], fk['referred_columns'],
+            ondelete=fk['options'].get('ondelete')
+        )
+
+    for index in info['indexes']:
+        columns = list(index['column_names'])
+        if index['unique'] and key_column and key_column not in columns:
+            columns.append(key_column)
+        op.create_index(index['name'], table, columns, unique=index['unique'])
+
+    if info['has_trigger']:
+        op.execute(f"""
+            CREATE TRIGGER update_{table}_updated_at
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column();
+        """)
+
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{info['pk_columns'][0]}")
+
+
+def _partition(bind, table, column):
+    info = _describe(bind, table)
+    old_name = f'{table}_unpartitioned'
+
+    for other, fk in info['referencing']:
+        op.drop_constraint(fk['name'], other, type_='foreignkey')
+
+    # Ключ партиционирования входит в PRIMARY KEY - NULL недопустим
+    fallback = 'CURRENT_TIMESTAMP'
+    if column != 'created_at' and 'created_at' in info['columns']:
+        fallback = 'COALESCE(created_at, CURRENT_TIMESTAMP)'
+    op.execute(f'UPDATE {table} SET {column} = {fallback} WHERE {column} IS NULL')
+
+    sequence = _rename_old_table(bind, table, old_name, info)
+
+    op.execute(f"""
+        CREATE TABLE {table} (LIKE {old_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING COMMENTS)
+        PARTITION BY RANGE ({column})
+    """)
+    op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL')
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    oldest = bind.execute(sa.text(f'SELECT MIN({column}) FROM {old_name}')).scalar()
+    current = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else current
+    last = _add_months(current, PREMAKE_MONTHS)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old_name}')
+    op.execute(f'DROP TABLE {old_name}')
+
+    _restore_dependents(table, info, column, sequence)
+
+
+def _unpartition(bind, table, column):
+    info = _describe(bind, table)
+    old_name = f'{table}_partitioned'
+
+    sequence = _rename_old_table(bind, table, old_name, info)
+
+    op.execute(f'CREATE TABLE {table} (LIKE {old_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING COMMENTS)')
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old_name}')
+    op.execute(f'DROP TABLE {old_name} CASCADE')
+
+    info['pk_columns'] = [c for c in info['pk_columns'] if c != column]
+    for unique in info['uniques']:
+        unique['column_names'] = [c for c in unique['column_names'] if c != column]
+    _restore_dependents(table, info, None, sequence)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table, column in PARTITIONED_TABLES:
+        _partition(bind, table, column)
+
+
+def downgrade() -> None:
+    # Удалённые внешние ключи bets -> balance_transactions не восстанавливаются
+    bind = op.get_bind()
+    for table, column in reversed(PARTITIONED_TABLES):
+        _unpartition(bind, table, column)
@@ -0,0 +1,95 @@
+"""Covering and partial indexes for WalletService queries
+
+Revision ID: 20261019_000002
+Revises: 20261019_000001
+Create Date: 2026-10-19
+
+Индексы подобраны по предикатам WalletService (scripts/index_advisor.py):
+- get_balance: COUNT по (user_id, result), SUM(bet_amount) открытых
+  ставок, SUM(amount) pending-операций по (user_id, operation_type)
+- get_bet_history / export_report: статистика по resolved-ставкам
+  пользователя, транзакции по (user_id, transaction_type, created_at)
+- withdraw_funds: дневной лимит по (user_id, operation_type, created_at)
+
+INCLUDE-колонки позволяют отвечать на агрегаты index-only scan'ом.
+
+Удаляются одиночные индексы по колонкам с несколькими значениями (status,
+result, type): планировщик их не выбирает для запросов пользователя, а
+каждая вставка их обновляет. Имена удаляемых индексов различаются в
+models/tables.sql и начальной миграции - удаляются оба варианта.
+
+Индекс создаётся только если в таблице есть все его колонки (схема
+начальной миграции отличается от models/tables.sql).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000002'
+down_revision = '20261019_000001'
+branch_labels = None
+depends_on = None
+
+
+# (имя, таблица, колонки, INCLUDE, WHERE)
+NEW_INDEXES = (
+    ('idx_bets_user_result', 'bets', ['user_id', 'result'], [], None),
+    ('idx_bets_user_open', 'bets', ['user_id'], ['bet_amount'], "status = 'open'"),
+    ('idx_bets_user_resolved', 'bets', ['user_id', 'placed_at'],
+     ['result', 'bet_amount', 'actual_win'], "status = 'resolved'"),
+    ('idx_operations_user_pending', 'wallet_operations', ['user_id', 'operation_type'],
+     ['amount'], "status = 'pending'"),
+    ('idx_operations_user_type_created', 'wallet_operations',
+     ['user_id', 'operation_type', 'created_at'], ['amount', 'status'], None),
+    ('idx_transactions_user_type_created', 'balance_transactions',
+     ['user_id', 'transaction_type', 'created_at'], [], None),
+)
+
+# Одиночные индексы с низкой селективностью: (имя, таблица, колонка)
+DROPPED_INDEXES = (
+    ('idx_bet_status', 'bets', 'status'),
+    ('idx_bet_result', 'bets', 'result'),
+    ('idx_bets_status', 'bets', 'status'),
+    ('idx_operation_status', 'wallet_operations', 'status'),
+    ('idx_operation_type', 'wallet_operations', 'operation_type'),
+    ('idx_wallet_operations_status', 'wallet_operations', 'status'),
+    ('idx_wallet_operations_type', 'wallet_operations', 'operation_type'),
+    ('idx_transaction_type', 'balance_transactions', 'transaction_type'),
+    ('idx_transaction_status', 'balance_transactions', 'status'),
+    ('idx_balance_transactions_type', 'balance_transactions', 'transaction_type'),
+    ('idx_balance_transactions_status', 'balance_transactions', 'status'),
+)
+
+
+def _columns(bind, table):
+    return {column['name'] for column in sa.inspect(bind).get_columns(table)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for name, table, columns, include, where in NEW_INDEXES:
+        if not set(columns + include) <= _columns(bind, table):
+            continue
+        sql = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+        if include:
+            sql += f" INCLUDE ({', '.join(include)})"
+        if where:
+            sql += f" WHERE {where}"
+        op.execute(sql)
+
+    for name, table, _ in DROPPED_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for name, table, _, _, _ in NEW_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    # Восстанавливается по одному индексу на колонку с именем из models/tables.sql
+    restored = set()
+    for name, table, column in DROPPED_INDEXES:
+        if (table, column) in restored or column not in _columns(bind, table):
+            continue
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})')
+        restored.add((table, column))
@@ -0,0 +1,29 @@
+"""Partial index for settling open bets of an event
+
+Revision ID: 20261019_000003
+Revises: 20261019_000002
+Create Date: 2026-10-19
+
+SettlementService выбирает пачки открытых ставок события:
+    WHERE event_id = :event_id AND status = 'open' ORDER BY bet_id LIMIT :n
+Без индекса каждая пачка - полный просмотр bets. Частичный индекс
+содержит только открытые ставки и уменьшается по мере расчёта.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000003'
+down_revision = '20261019_000002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_bets_event_open ON bets (event_id, bet_id) "
+        "WHERE status = 'open'"
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS idx_bets_event_open')
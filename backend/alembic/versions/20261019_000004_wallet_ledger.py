@@ -0,0 +1,93 @@
+"""Append-only wallet ledger with per-user sequence numbers and snapshots
+
+Revision ID: 20261019_000004
+Revises: 20261019_000003
+Create Date: 2026-10-19
+
+- ledger_entries: проводки (кошелёк пользователя <-> contra_account),
+  UNIQUE (user_id, seq); UPDATE и DELETE запрещены триггером
+  (DELETE разрешается только при SET LOCAL ledger.allow_purge = 'on')
+- balance_snapshots: снимки итога по seq для services/ledger_service.py
+- users_balance.ledger_seq: номер последней проводки (кэш вместе с balance)
+
+Входящие остатки: каждому ненулевому балансу пишется проводка
+opening_balance с seq = 1. Миграцию выполнять при остановленных
+записях в кошельки, иначе остаток разойдётся с журналом.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000004'
+down_revision = '20261019_000003'
+branch_labels = None
+depends_on = None
+
+
+APPEND_ONLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION ledger_entries_append_only()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' AND current_setting('ledger.allow_purge', true) = 'on' THEN
+        RETURN OLD;
+    END IF;
+    RAISE EXCEPTION 'ledger_entries is append-only (% is not allowed)', TG_OP;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('users_balance')}
+    if 'ledger_seq' not in columns:
+        op.add_column(
+            'users_balance',
+            sa.Column('ledger_seq', sa.BigInteger(), nullable=False, server_default='0')
+        )
+
+    op.create_table(
+        'ledger_entries',
+        sa.Column('entry_id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.String(20), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('seq', sa.BigInteger(), nullable=False),
+        sa.Column('entry_type', sa.String(30), nullable=False),
+        sa.Column('amount', sa.DECIMAL(15, 2), nullable=False),
+        sa.Column('balance_after', sa.DECIMAL(15, 2), nullable=False),
+        sa.Column('contra_account', sa.String(30), nullable=False),
+        sa.Column('reference_type', sa.String(20)),
+        sa.Column('reference_id', sa.BigInteger()),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False, server_default=sa.text('NOW()')),
+        sa.UniqueConstraint('user_id', 'seq', name='uq_ledger_user_seq'),
+        sa.CheckConstraint('amount <> 0', name='ck_ledger_amount_nonzero'),
+    )
+    op.create_table(
+        'balance_snapshots',
+        sa.Column('user_id', sa.String(20), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('seq', sa.BigInteger(), primary_key=True),
+        sa.Column('balance', sa.DECIMAL(15, 2), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False, server_default=sa.text('NOW()')),
+    )
+
+    op.execute(
+        "INSERT INTO ledger_entries "
+        "(user_id, seq, entry_type, amount, balance_after, contra_account, created_at) "
+        "SELECT user_id, 1, 'opening_balance', balance, balance, 'opening', NOW() "
+        "FROM users_balance WHERE balance <> 0"
+    )
+    op.execute("UPDATE users_balance SET ledger_seq = 1 WHERE balance <> 0")
+
+    op.execute(APPEND_ONLY_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER ledger_entries_append_only "
+        "BEFORE UPDATE OR DELETE ON ledger_entries "
+        "FOR EACH ROW EXECUTE FUNCTION ledger_entries_append_only()"
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS ledger_entries_append_only ON ledger_entries')
+    op.execute('DROP FUNCTION IF EXISTS ledger_entries_append_only()')
+    op.drop_table('balance_snapshots')
+    op.drop_table('ledger_entries')
+    op.drop_column('users_balance', 'ledger_seq')
@@ -0,0 +1,31 @@
+"""Indexes for point-in-time balance queries
+
+Revision ID: 20261019_000005
+Revises: 20261019_000004
+Create Date: 2026-10-19
+
+- idx_balance_snapshots_user_created: ближайший снимок пользователя до и
+  после момента времени (LedgerService.balance_at)
+- idx_ledger_created: проводки месяца при снимках на границе периода
+  (LedgerService.take_period_snapshots, scripts/generate_statements.py)
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000005'
+down_revision = '20261019_000004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_balance_snapshots_user_created "
+        "ON balance_snapshots (user_id, created_at)"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_ledger_created ON ledger_entries (created_at)")
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS idx_ledger_created')
+    op.execute('DROP INDEX IF EXISTS idx_balance_snapshots_user_created')
@@ -0,0 +1,44 @@
+"""Pending operation scan index and 'expired' operation status
+
+Revision ID: 20261019_000006
+Revises: 20261019_000005
+Create Date: 2026-10-19
+
+- idx_operations_pending_scan: keyset-проход pending-операций по
+  operation_id при сверке со Stripe (services/reconciliation_service.py);
+  частичный индекс содержит только pending-строки и остаётся маленьким
+- check_operation_status (начальная миграция) допускает статус expired
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000006'
+down_revision = '20261019_000005'
+branch_labels = None
+depends_on = None
+
+
+OLD_STATUSES = "'pending', 'processing', 'completed', 'failed', 'cancelled'"
+NEW_STATUSES = OLD_STATUSES + ", 'expired'"
+
+
+def _replace_status_check(statuses: str) -> None:
+    checks = {check['name'] for check in sa.inspect(op.get_bind()).get_check_constraints('wallet_operations')}
+    if 'check_operation_status' in checks:
+        op.drop_constraint('check_operation_status', 'wallet_operations', type_='check')
+        op.create_check_constraint('check_operation_status', 'wallet_operations', f"status IN ({statuses})")
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_operations_pending_scan "
+        "ON wallet_operations (operation_id) WHERE status = 'pending'"
+    )
+    _replace_status_check(NEW_STATUSES)
+
+
+def downgrade() -> None:
+    op.execute("UPDATE wallet_operations SET status = 'cancelled' WHERE status = 'expired'")
+    _replace_status_check(OLD_STATUSES)
+    op.execute('DROP INDEX IF EXISTS idx_operations_pending_scan')
@@ -0,0 +1,29 @@
+"""Index for expiring overdue pending wallet operations
+
+Revision ID: 20261019_000007
+Revises: 20261019_000006
+Create Date: 2026-10-19
+
+- idx_operations_pending_expires: просроченные pending-операции по
+  expires_at для services/expiry_service.py. Частичный индекс вместо
+  составного (status, expires_at): завершённые операции в него не
+  попадают, и он не растёт вместе с историей
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000007'
+down_revision = '20261019_000006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_operations_pending_expires "
+        "ON wallet_operations (expires_at) WHERE status = 'pending'"
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS idx_operations_pending_expires')
@@ -0,0 +1,28 @@
+"""Index for background Stripe customer provisioning
+
+Revision ID: 20261019_000008
+Revises: 20261019_000007
+Create Date: 2026-10-19
+
+- idx_users_without_customer: keyset-проход пользователей без
+  stripe_customer_id (services/customer_provisioning_service.py).
+  Частичный индекс пустеет по мере создания Customer
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000008'
+down_revision = '20261019_000007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_without_customer "
+        "ON users (id) WHERE stripe_customer_id IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS idx_users_without_customer')
@@ -0,0 +1,39 @@
+"""Stored responses for requests with an Idempotency-Key header
+
+Revision ID: 20261019_000009
+Revises: 20261019_000008
+Create Date: 2026-10-19
+
+- idempotency_keys: ответ на POST /api/wallet/deposit и /withdraw по
+  (user_id, idempotency_key), хранится до expires_at
+  (services/idempotency_service.py)
+- idx_idempotency_keys_expires: удаление истёкших ключей
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000009'
+down_revision = '20261019_000008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('user_id', sa.String(20), primary_key=True),
+        sa.Column('idempotency_key', sa.String(255), primary_key=True),
+        sa.Column('endpoint', sa.String(50), nullable=False),
+        sa.Column('request_hash', sa.CHAR(64), nullable=False),
+        sa.Column('status_code', sa.Integer()),
+        sa.Column('response_body', sa.Text()),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False, server_default=sa.text('NOW()')),
+        sa.Column('expires_at', sa.TIMESTAMP(), nullable=False),
+    )
+    op.create_index('idx_idempotency_keys_expires', 'idempotency_keys', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_idempotency_keys_expires', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
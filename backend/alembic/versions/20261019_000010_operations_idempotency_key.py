@@ -0,0 +1,35 @@
+"""Idempotency-Key on wallet operations
+
+Revision ID: 20261019_000010
+Revises: 20261019_000009
+Create Date: 2026-10-19
+
+- wallet_operations.idempotency_key: ключ запроса вывода. Повтор после
+  перехвата резерва idempotency_keys или несохранённого ответа находит
+  записанную операцию и не списывает сумму второй раз
+  (services/wallet_service.py). Пополнения различаются по уникальному
+  stripe_payment_intent_id - Stripe возвращает тот же PaymentIntent
+- uq_operations_idempotency_key: уникальность (user_id, idempotency_key),
+  частичный - операции без ключа в индекс не попадают
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000010'
+down_revision = '20261019_000009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('wallet_operations', sa.Column('idempotency_key', sa.String(255)))
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_operations_idempotency_key "
+        "ON wallet_operations (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS uq_operations_idempotency_key')
+    op.drop_column('wallet_operations', 'idempotency_key')
@@ -0,0 +1,31 @@
+"""Complete bet_placed transactions
+
+Revision ID: 20261019_000011
+Revises: 20261019_000010
+Create Date: 2026-10-19
+
+- balance_transactions: записи bet_placed создавались со status='pending',
+  и ничто не переводило их дальше - в истории они висели незавершёнными и
+  не попадали в архив. Резерв ставки держит открытая ставка, а не статус
+  транзакции, поэтому такие записи сразу completed
+  (services/wallet_service.py)
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261019_000011'
+down_revision = '20261019_000010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE balance_transactions SET status = 'completed' "
+        "WHERE transaction_type = 'bet_placed' AND status = 'pending'"
+    )
+
+
+def downgrade() -> None:
+    # Какие записи были pending, не сохранилось - откатывать нечего
+    pass
@@ -0,0 +1,233 @@
+"""
+Настройка логирования LOOSELINE (loguru).
+
+- Запись в stdout/файл выполняет фоновый поток (BackgroundSink): обработчик
+  запроса только форматирует запись и кладёт строку в очередь. При
+  переполнении очереди записи отбрасываются (метрика log_records_dropped_total),
+  а не блокируют запрос
+- LOG_FORMAT=json - одна JSON-строка на запись (для сборщиков логов),
+  LOG_FORMAT=text - человекочитаемый формат для разработки
+- request_id из RequestContextMiddleware попадает в каждую запись запроса
+- sampled_logger - для частых info-сообщений (например, "Received Stripe
+  webhook"): пишется только доля LOG_SAMPLE_RATE записей уровня INFO и ниже
+
+Сообщения форматируются лениво: logger.info("User {} deposited ${}", user_id, amount)
+не собирает строку, если уровень отключён во всех sink'ах.
+
+enqueue=True из loguru не используется: он сериализует каждую запись через
+multiprocessing-pipe и на запрос обходится дороже синхронной записи
+(см. scripts/bench_logging.py).
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import traceback
+from logging.handlers import RotatingFileHandler
+from typing import Callable, List
+
+from loguru import logger
+
+from config.settings import settings
+
+
+TEXT_FORMAT = (
+    "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+)
+COLOR_TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+
+# Служебные ключи extra, которые не попадают в JSON
+_INTERNAL_EXTRA = ("sampled", "_json", "_sampled_out")
+
+_INFO_LEVEL_NO = 20
+
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+
+
+# ============================================================================
+# BACKGROUND SINK
+# ============================================================================
+
+class BackgroundSink:
+    """
+    Sink loguru с записью в фоновом потоке.
+
+    Attributes:
+        dropped: Количество записей, отброшенных из-за переполнения очереди
+    """
+
+    _STOP = object()
+
+    def __init__(self, write: Callable[[str], None], max_queue: int = 10000):
+        self._write = write
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        """Текущая длина очереди."""
+        return self._queue.qsize()
+
+    def write(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            message = self._queue.get()
+            try:
+                if message is self._STOP:
+                    return
+                self._write(message)
+            except Exception:
+                # Сломанный sink не должен останавливать поток записи
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """Блокирует до записи всех поставленных в очередь сообщений."""
+        self._queue.join()
+
+    async def complete(self) -> None:
+        """Вызывается из await logger.complete()."""
+        await asyncio.get_running_loop().run_in_executor(None, self._queue.join)
+
+    def stop(self) -> None:
+        """Вызывается loguru при logger.remove(): дописывает очередь и завершает поток."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+
+_background_sinks: List[BackgroundSink] = []
+
+
+def get_log_queue_stats() -> dict:
+    """Суммарная длина очередей и число отброшенных записей (для /metrics)."""
+    return {
+        "depth": sum(sink.depth for sink in _background_sinks),
+        "dropped": sum(sink.dropped for sink in _background_sinks)
+    }
+
+
+def _stream_writer(stream) -> Callable[[str], None]:
+    def write(message: str) -> None:
+        stream.write(message)
+        stream.flush()
+    return write
+
+
+def _rotating_file_writer(path: str, backups: int) -> Callable[[str], None]:
+    handler = RotatingFileHandler(
+        path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=backups, encoding="utf-8", delay=True
+    )
+    handler.terminator = ""
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def write(message: str) -> None:
+        handler.emit(logging.makeLogRecord({"msg": str(message)}))
+    return write
+
+
+# ============================================================================
+# FORMATTING & SAMPLING
+# ============================================================================
+
+def _sample(record) -> None:
+    """Patcher sampled_logger: решает один раз на запись, отбросить ли её."""
+    if record["level"].no > _INFO_LEVEL_NO:
+        return
+    rate = settings.log_sample_rate
+    if random.random() >= rate:
+        record["extra"]["_sampled_out"] = True
+    else:
+        record["extra"]["sample_rate"] = rate
+
+
+def _sampling_filter(record) -> bool:
+    return not record["extra"].get("_sampled_out", False)
+
+
+def json_format(record) -> str:
+    """
+    Формат loguru для JSON-вывода.
+
+    Returns:
+        str: Шаблон loguru, подставляющий сериализованную запись
+    """
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+    }
+    for key, value in record["extra"].items():
+        if key not in _INTERNAL_EXTRA:
+            payload[key] = value
+
+    exception = record["exception"]
+    if exception is not None:
+        payload["exception"] = "".join(
+            traceback.format_exception(exception.type, exception.value, exception.traceback)
+        )
+
+    record["extra"]["_json"] = json.dumps(payload, default=str, ensure_ascii=False)
+    return "{extra[_json]}\n"
+
+
+# ============================================================================
+# SETUP
+# ============================================================================
+
+def setup_logging() -> None:
+    """
+    Переконфигурирует loguru по настройкам приложения.
+
+    Вызывается один раз при импорте main. Перед остановкой процесса очередь
+    дописывается через await logger.complete() (см. lifespan в main.py).
+    """
+    logger.remove()
+    _background_sinks.clear()
+
+    use_json = settings.log_format.lower() == "json"
+    console_level = settings.log_level or ("DEBUG" if settings.app_debug else "INFO")
+
+    console_sink = BackgroundSink(_stream_writer(sys.stdout), settings.log_queue_size)
+    _background_sinks.append(console_sink)
+    logger.add(
+        console_sink,
+        format=json_format if use_json else COLOR_TEXT_FORMAT,
+        level=console_level,
+        filter=_sampling_filter,
+        colorize=not use_json and sys.stdout.isatty()
+    )
+
+    if settings.log_file:
+        file_sink = BackgroundSink(
+            _rotating_file_writer(settings.log_file, settings.log_file_backups),
+            settings.log_queue_size
+        )
+        _background_sinks.append(file_sink)
+        logger.add(
+            file_sink,
+            format=json_format if use_json else TEXT_FORMAT,
+            level=settings.log_file_level,
+            filter=_sampling_filter
+        )
+
+
+# Логгер для частых info-сообщений, пишется доля LOG_SAMPLE_RATE
+sampled_logger = logger.bind(sampled=True).patch(_sample)
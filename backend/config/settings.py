@@ -20,16 +20,109 @@ class Settings(BaseSettings):
     db_password: str = ""
     database_url: str = ""
     
+    # Database pool (на один воркер)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # секунды, -1 - не пересоздавать
+    db_pool_pre_ping: str = "idle"  # always | idle | none
+    db_pool_pre_ping_idle_seconds: float = 30.0
+    # Авторазмер: db_max_connections делится между web_concurrency воркерами
+    db_pool_auto_size: bool = False
+    db_max_connections: int = 100
+    web_concurrency: int = 1
+    
+    # Read replicas (через запятую; пусто - все чтения на primary)
+    db_replica_urls: str = ""
+    db_replica_max_lag_seconds: float = 5.0
+    db_replica_lag_check_seconds: float = 2.0
+    db_read_your_writes_seconds: float = 10.0
+    
+    # Partitions (balance_transactions, bets, audit_log)
+    partition_premake_months: int = 3
+    audit_log_retention_months: int = 12  # 0 - хранить бессрочно
+    history_retention_months: int = 0  # balance_transactions, bets
+    
+    # Cold-storage archive (scripts/archive_history.py)
+    archive_dir: str = "archive"
+    archive_format: str = "csv.gz"  # csv.gz или parquet (нужен pyarrow)
+    archive_after_months: int = 12
+    
+    # Bet settlement (services/settlement_service.py)
+    settlement_chunk_size: int = 5000  # ставок на транзакцию
+    
+    # Wallet ledger (services/ledger_service.py)
+    ledger_snapshot_interval: int = 1000  # проводок между снимками баланса
+    
+    # Stripe reconciliation (services/reconciliation_service.py)
+    reconcile_batch_size: int = 500  # операций на транзакцию
+    reconcile_concurrency: int = 8  # одновременных запросов к Stripe
+    reconcile_grace_minutes: int = 30  # свежие операции оставляем webhook'у
+    reconcile_max_report_rows: int = 1000  # расхождений в отчёте одного запуска
+    
+    # Pending operation expiry (services/expiry_service.py)
+    expiry_sweep_chunk_size: int = 1000  # операций на транзакцию
+    
+    # Stripe customer pre-provisioning (services/customer_provisioning_service.py)
+    customer_provisioning_batch_size: int = 200
+    customer_provisioning_concurrency: int = 4
+    customer_provisioning_rate_per_second: float = 20.0  # на все потоки
+    customer_provisioning_active_days: int = 30  # регистрация или активность в audit_log
+    
+    # Idempotency-Key for /deposit and /withdraw (services/idempotency_service.py)
+    idempotency_ttl_hours: int = 24
+    idempotency_cache_size: int = 10000  # LRU сохранённых ответов на процесс
+    idempotency_lock_seconds: int = 60  # после этого незавершённый запрос можно повторить
+    
+    # Server-Sent Events /api/wallet/events (services/wallet_events.py)
+    sse_heartbeat_seconds: float = 20.0  # комментарий-ping, чтобы прокси не закрывали соединение
+    sse_queue_size: int = 64  # непрочитанных событий на подключение, дальше - resync
+    sse_max_connections: int = 20000  # на процесс, дальше 503
+    
+    # Response compression and static assets (routes/compression.py, routes/static_files.py)
+    compression_minimum_size: int = 1024  # байт; меньше - без сжатия
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4  # br - если установлен пакет brotli
+    static_max_age_seconds: int = 31536000  # для /static/...?v=<хэш> (immutable)
+    
+    # Coalescing of concurrent identical WalletService reads (services/single_flight.py)
+    wallet_read_coalescing: bool = True
+    
+    # Database monitoring
+    db_slow_query_ms: float = 500.0
+    
+    # Metrics with several workers (monitoring/metrics.py): shared directory, cleared before start
+    prometheus_multiproc_dir: str = ""  # пусто - /metrics отдаёт только ответивший воркер
+    metrics_flush_seconds: float = 5.0
+    # Scheduled jobs (scripts/*) publish their metrics for node-exporter's textfile collector
+    metrics_textfile_dir: str = ""  # пусто - метрики задач не сохраняются
+    
     # Stripe
     stripe_secret_key: str = ""
     stripe_publishable_key: str = ""
     stripe_webhook_secret: str = ""
+    stripe_breaker_failure_threshold: int = 5
+    stripe_breaker_reset_seconds: float = 30.0
+    
+    # Health checks
+    health_cache_ttl_seconds: float = 2.0
+    health_pool_saturation_threshold: float = 0.9
+    health_db_timeout_seconds: float = 2.0  # SELECT 1 дольше - not_ready
     
     # Application
     app_env: str = "development"
     app_debug: bool = True
     app_secret_key: str = "change-me-in-production"
     
+    # Logging
+    log_level: str = ""  # пусто: DEBUG при app_debug, иначе INFO
+    log_format: str = "text"  # text | json
+    log_file: str = "logs/app.log"
+    log_file_level: str = "INFO"
+    log_file_backups: int = 7
+    log_queue_size: int = 10000
+    log_sample_rate: float = 0.1
+    
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
@@ -60,6 +153,11 @@ class Settings(BaseSettings):
         # SQL Server через pyodbc не поддерживает async, возвращаем синхронный
         return self.database_connection_string
     
+    @property
+    def db_replica_url_list(self) -> List[str]:
+        """Строки подключения к репликам."""
+        return [url.strip() for url in self.db_replica_urls.split(",") if url.strip()]
+    
     @property
     def cors_origins_list(self) -> List[str]:
         """Список разрешённых CORS origins."""
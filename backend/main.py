@@ -14,33 +14,33 @@ API Documentation: http://localhost:8000/docs
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from loguru import logger
-import sys
 from pathlib import Path
 
 from config.settings import settings
-from models.database import init_db
+from config.logging_config import setup_logging
+from models.database import init_db, engine, replica_router
+from monitoring.query_stats import install_query_stats, QueryStatsMiddleware
+from monitoring.metrics import (
+    MetricsMiddleware,
+    enable_multiprocess,
+    instrument_engine_pool,
+    instrument_replica_router
+)
+from monitoring.request_context import RequestContextMiddleware
 from routes.wallet import router as wallet_router
 from routes.webhooks import router as webhook_router
+from routes.metrics import router as metrics_router
+from routes.health import router as health_router
+from routes.responses import FastJSONResponse
+from routes.compression import CompressionMiddleware
+from routes.static_files import PrecompressedStaticFiles, precompress_static, static_url
 
 
-# Настройка логирования
-logger.remove()
-logger.add(
-    sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    level="DEBUG" if settings.app_debug else "INFO"
-)
-logger.add(
-    "logs/app.log",
-    rotation="10 MB",
-    retention="7 days",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    level="DEBUG"
-)
+# Настройка логирования (фоновая запись, JSON/text по LOG_FORMAT)
+setup_logging()
 
 
 @asynccontextmanager
@@ -49,12 +49,16 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting LOOSELINE Wallet Service...")
     
+    # Несколько воркеров: /metrics складывает значения всех воркеров
+    if settings.prometheus_multiproc_dir:
+        enable_multiprocess(settings.prometheus_multiproc_dir, settings.metrics_flush_seconds)
+    
     # Инициализация БД (создание таблиц если не существуют)
     try:
         init_db()
         logger.info("Database initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error("Failed to initialize database: {}", e)
     
     # Проверка Stripe конфигурации
     if not settings.stripe_secret_key:
@@ -65,12 +69,22 @@ async def lifespan(app: FastAPI):
     if not settings.stripe_webhook_secret:
         logger.warning("STRIPE_WEBHOOK_SECRET not configured!")
     
-    logger.info(f"Server starting on {settings.api_host}:{settings.api_port}")
+    # .br/.gz рядом со статикой (read-only FS - статика сжимается на лету)
+    try:
+        written = precompress_static(static_dir)
+        if written:
+            logger.info("Precompressed {} static files", written)
+    except OSError as e:
+        logger.warning("Static assets were not precompressed: {}", e)
+    
+    logger.info("Server starting on {}:{}", settings.api_host, settings.api_port)
     
     yield
     
     # Shutdown
     logger.info("Shutting down LOOSELINE Wallet Service...")
+    # Дожидаемся, пока фоновый поток допишет очередь логов
+    await logger.complete()
 
 
 # Создание приложения
@@ -103,9 +117,33 @@ app = FastAPI(
     license_info={
         "name": "MIT License"
     },
+    # orjson вместо stdlib json для всех ответов (routes/responses.py)
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
+# Учёт SQL-запросов на каждый HTTP-запрос (заголовки X-DB-* только в debug)
+install_query_stats(engine)
+for replica in replica_router.replicas:
+    install_query_stats(replica)
+app.add_middleware(QueryStatsMiddleware, expose_headers=settings.app_debug)
+
+# br/gzip для больших ответов (history, export); SSE не сжимается
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality
+)
+
+# Метрики Prometheus: латентность по роутам и пул соединений
+instrument_engine_pool(engine)
+instrument_replica_router(replica_router)
+app.add_middleware(MetricsMiddleware)
+
+# X-Request-ID: корреляция записей лога в рамках запроса (внешний middleware)
+app.add_middleware(RequestContextMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -126,15 +164,18 @@ templates_dir.mkdir(exist_ok=True)
 (static_dir / "js").mkdir(exist_ok=True)
 (static_dir / "images").mkdir(exist_ok=True)
 
-# Подключаем статические файлы
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+# Подключаем статические файлы (.br/.gz, immutable для ссылок с ?v=)
+app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
 
 # Настройка шаблонов
 templates = Jinja2Templates(directory=str(templates_dir))
+templates.env.globals["static_url"] = static_url
 
 # Подключение роутеров
 app.include_router(wallet_router)
 app.include_router(webhook_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
 
 
 # Главная страница - веб-интерфейс кошелька
@@ -150,29 +191,6 @@ async def index(request: Request):
     )
 
 
-# Health check endpoint (API)
-@app.get("/health", tags=["health"])
-async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "service": "wallet",
-        "stripe_configured": bool(settings.stripe_secret_key),
-        "webhook_configured": bool(settings.stripe_webhook_secret)
-    }
-
-
-@app.get("/health", tags=["health"])
-async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "service": "wallet",
-        "stripe_configured": bool(settings.stripe_secret_key),
-        "webhook_configured": bool(settings.stripe_webhook_secret)
-    }
-
-
 # Запуск для разработки
 if __name__ == "__main__":
     import uvicorn
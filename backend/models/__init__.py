@@ -1,5 +1,5 @@
 """Database models module."""
-from .database import Base, get_db, engine, async_engine
+from .database import Base, get_db, get_read_db, engine, async_engine, replica_router
 from .orm_models import (
     User,
     UserBalance,
@@ -9,14 +9,19 @@ from .orm_models import (
     WithdrawalMethod,
     MonthlyStatement,
     AuditLog,
-    Bet
+    Bet,
+    LedgerEntry,
+    BalanceSnapshot,
+    IdempotencyKey
 )
 
 __all__ = [
     "Base",
     "get_db",
+    "get_read_db",
     "engine",
     "async_engine",
+    "replica_router",
     "User",
     "UserBalance",
     "BalanceTransaction",
@@ -25,7 +30,10 @@ __all__ = [
     "WithdrawalMethod",
     "MonthlyStatement",
     "AuditLog",
-    "Bet"
+    "Bet",
+    "LedgerEntry",
+    "BalanceSnapshot",
+    "IdempotencyKey"
 ]
 
 
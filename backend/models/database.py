@@ -2,25 +2,136 @@
 Database connection and session management.
 """
 
-from sqlalchemy import create_engine
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import StaticPool
 import os
 
-from config.settings import settings
+from config.settings import Settings, settings
+from models.routing import ReplicaRouter, RoutingSession
+
+
+PRE_PING_STRATEGIES = ("always", "idle", "none")
+
+_CHECKED_IN_AT_KEY = "checked_in_at"
+
+
+def resolve_pool_size(config: Settings = settings) -> Tuple[int, int]:
+    """
+    Размер пула одного воркера.
+
+    При db_pool_auto_size бюджет db_max_connections делится между
+    web_concurrency воркерами: половина - постоянные соединения,
+    остальное - overflow, который закрывается при возврате в пул.
+    Так сумма по всем воркерам не превышает бюджет сервиса.
+
+    Args:
+        config (Settings): Настройки приложения
+
+    Returns:
+        tuple: (pool_size, max_overflow)
+
+    Examples:
+        >>> # DB_MAX_CONNECTIONS=90, WEB_CONCURRENCY=4
+        >>> resolve_pool_size()
+        (11, 11)
+    """
+    if not config.db_pool_auto_size:
+        return config.db_pool_size, config.db_max_overflow
+
+    per_worker = max(config.db_max_connections // max(config.web_concurrency, 1), 1)
+    pool_size = max(per_worker // 2, 1)
+    return pool_size, per_worker - pool_size
+
+
+def install_idle_pre_ping(engine: Engine, idle_seconds: float) -> None:
+    """
+    Проверяет соединение при checkout, только если оно простаивало в пуле
+    дольше idle_seconds.
+
+    pool_pre_ping=True добавляет round trip к каждому checkout; соединения,
+    которые только что вернулись в пул, почти никогда не бывают мёртвыми.
+    Неудачный ping инвалидирует соединение, и пул открывает новое.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        idle_seconds (float): Порог простоя (секунды)
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _mark_checkin(dbapi_connection, connection_record):
+        connection_record.info[_CHECKED_IN_AT_KEY] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.pop(_CHECKED_IN_AT_KEY, None)
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception as e:
+            raise DisconnectionError("Idle connection failed pre-ping") from e
+        finally:
+            cursor.close()
+
+
+def create_db_engine(url: str, config: Settings = settings) -> Engine:
+    """
+    Создаёт engine с пулом по настройкам (DB_POOL_*).
+
+    Args:
+        url (str): Строка подключения
+        config (Settings): Настройки приложения
+
+    Returns:
+        Engine: SQLAlchemy engine
+
+    Raises:
+        ValueError: Неизвестная стратегия db_pool_pre_ping
+    """
+    strategy = config.db_pool_pre_ping.lower()
+    if strategy not in PRE_PING_STRATEGIES:
+        raise ValueError(
+            f"Unknown DB_POOL_PRE_PING '{config.db_pool_pre_ping}', expected one of {PRE_PING_STRATEGIES}"
+        )
+
+    pool_size, max_overflow = resolve_pool_size(config)
+    engine = create_engine(
+        url,
+        pool_pre_ping=strategy == "always",
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle
+    )
+    if strategy == "idle":
+        install_idle_pre_ping(engine, config.db_pool_pre_ping_idle_seconds)
+    return engine
+
 
 # Синхронный engine
 # Используем SQLite только если явно указано в переменных окружения (для тестов)
 if os.getenv("USE_SQLITE", "").lower() == "true":
     engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
 else:
-    engine = create_engine(
-        settings.database_connection_string,
-        pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20
-    )
+    engine = create_db_engine(settings.database_connection_string)
+
+# Реплики для read-only запросов (история, экспорт, списки методов)
+replica_engines = [create_db_engine(url) for url in settings.db_replica_url_list]
+replica_router = ReplicaRouter(
+    engine,
+    replica_engines,
+    max_lag_seconds=settings.db_replica_max_lag_seconds,
+    lag_check_interval=settings.db_replica_lag_check_seconds,
+    sticky_seconds=settings.db_read_your_writes_seconds
+)
 
 # Асинхронный engine (SQL Server через pyodbc не поддерживает async)
 async_engine = None
@@ -28,6 +139,7 @@ async_engine = None
 
 # Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 AsyncSessionLocal = sessionmaker(
     async_engine,
     class_=AsyncSession,
@@ -59,6 +171,26 @@ def get_db():
         db.close()
 
 
+def get_read_db(user_id: Optional[str] = None):
+    """
+    Сессия для read-only работы: SELECT'ы на реплику, запись на primary.
+
+    Пользователь, недавно пополнявший или выводивший средства, читает
+    с primary (read-your-writes).
+    
+    Args:
+        user_id (str): ID пользователя
+    
+    Yields:
+        Session: RoutingSession
+    """
+    db = ReadSessionLocal(read_engine=replica_router.engine_for_read(user_id))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 async def get_async_db():
     """
     Dependency для получения асинхронной сессии БД.
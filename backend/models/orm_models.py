@@ -9,7 +9,8 @@ from typing import Optional, List
 
 from sqlalchemy import (
     Column, String, Integer, BigInteger, Boolean, 
-    DECIMAL, TIMESTAMP, Text, ForeignKey, Index
+    DECIMAL, TIMESTAMP, Text, ForeignKey, Index, text,
+    UniqueConstraint, CheckConstraint
 )
 from sqlalchemy.dialects.postgresql import INET, JSONB
 from sqlalchemy.orm import relationship
@@ -49,6 +50,10 @@ class User(Base):
     monthly_statements = relationship("MonthlyStatement", back_populates="user", cascade="all, delete-orphan")
     audit_logs = relationship("AuditLog", back_populates="user", cascade="all, delete-orphan")
     bets = relationship("Bet", back_populates="user", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("idx_users_without_customer", "id", postgresql_where=text("stripe_customer_id IS NULL")),
+    )
 
 
 class UserBalance(Base):
@@ -64,6 +69,7 @@ class UserBalance(Base):
         total_won: Сумма всех выигрышей
         total_lost: Сумма всех проигрышей
         currency: Валюта (по умолчанию USD)
+        ledger_seq: Номер последней проводки в ledger_entries
     """
     __tablename__ = "users_balance"
     
@@ -75,6 +81,7 @@ class UserBalance(Base):
     total_won = Column(DECIMAL(15, 2), default=0.00)
     total_lost = Column(DECIMAL(15, 2), default=0.00)
     currency = Column(String(3), default="USD")
+    ledger_seq = Column(BigInteger, nullable=False, default=0)
     last_transaction = Column(TIMESTAMP)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -141,7 +148,7 @@ class BalanceTransaction(Base):
     
     __table_args__ = (
         Index("idx_user_transactions", "user_id", "created_at"),
-        Index("idx_transaction_type", "transaction_type"),
+        Index("idx_transactions_user_type_created", "user_id", "transaction_type", "created_at"),
         Index("idx_stripe_intent_transactions", "stripe_payment_intent_id"),
     )
 
@@ -151,7 +158,7 @@ class WalletOperation(Base):
     Операции пополнения/вывода через Stripe.
     
     operation_type: deposit, withdrawal
-    status: pending, completed, failed, cancelled
+    status: pending, completed, failed, cancelled, expired
     """
     __tablename__ = "wallet_operations"
     
@@ -168,6 +175,7 @@ class WalletOperation(Base):
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     completed_at = Column(TIMESTAMP)
     expires_at = Column(TIMESTAMP)
+    idempotency_key = Column(String(255))  # Idempotency-Key запроса вывода
     
     # Relationships
     user = relationship("User", back_populates="wallet_operations")
@@ -175,6 +183,26 @@ class WalletOperation(Base):
     __table_args__ = (
         Index("idx_user_operations", "user_id", "created_at"),
         Index("idx_stripe_intent_operations", "stripe_payment_intent_id"),
+        Index(
+            "idx_operations_user_pending", "user_id", "operation_type",
+            postgresql_include=["amount"], postgresql_where=text("status = 'pending'")
+        ),
+        Index(
+            "idx_operations_user_type_created", "user_id", "operation_type", "created_at",
+            postgresql_include=["amount", "status"]
+        ),
+        Index(
+            "idx_operations_pending_scan", "operation_id",
+            postgresql_where=text("status = 'pending'")
+        ),
+        Index(
+            "idx_operations_pending_expires", "expires_at",
+            postgresql_where=text("status = 'pending'")
+        ),
+        Index(
+            "uq_operations_idempotency_key", "user_id", "idempotency_key", unique=True,
+            postgresql_where=text("idempotency_key IS NOT NULL")
+        ),
     )
 
 
@@ -335,8 +363,91 @@ class Bet(Base):
     
     __table_args__ = (
         Index("idx_user_bets", "user_id", "placed_at"),
-        Index("idx_bet_status", "status"),
-        Index("idx_bet_result", "result"),
+        Index("idx_bets_user_result", "user_id", "result"),
+        Index(
+            "idx_bets_user_open", "user_id",
+            postgresql_include=["bet_amount"], postgresql_where=text("status = 'open'")
+        ),
+        Index(
+            "idx_bets_user_resolved", "user_id", "placed_at",
+            postgresql_include=["result", "bet_amount", "actual_win"],
+            postgresql_where=text("status = 'resolved'")
+        ),
+        Index("idx_bets_event_open", "event_id", "bet_id", postgresql_where=text("status = 'open'")),
+    )
+
+class LedgerEntry(Base):
+    """
+    Проводка журнала (append-only, двойная запись).
+    
+    Каждая строка - перевод между кошельком пользователя и счётом
+    contra_account (stripe, withdrawals, bets, opening): amount меняет
+    кошелёк, counter-счёт получает -amount. Строки никогда не изменяются
+    и не удаляются (в PostgreSQL это запрещает триггер).
+    
+    seq - номер проводки пользователя (1, 2, 3, ... без пропусков),
+    balance_after - нарастающий итог кошелька после проводки.
+    """
+    __tablename__ = "ledger_entries"
+    
+    entry_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(String(20), ForeignKey("users.id"), nullable=False)
+    seq = Column(BigInteger, nullable=False)
+    entry_type = Column(String(30), nullable=False)
+    amount = Column(DECIMAL(15, 2), nullable=False)
+    balance_after = Column(DECIMAL(15, 2), nullable=False)
+    contra_account = Column(String(30), nullable=False)
+    reference_type = Column(String(20))
+    reference_id = Column(BigInteger)
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "seq", name="uq_ledger_user_seq"),
+        CheckConstraint("amount <> 0", name="ck_ledger_amount_nonzero"),
+        Index("idx_ledger_created", "created_at"),
+    )
+
+
+class BalanceSnapshot(Base):
+    """
+    Снимок баланса: balance_after проводки seq пользователя.
+    
+    created_at - время этой проводки (итог на момент created_at).
+    Проверка журнала и баланс на дату начинаются с ближайшего снимка,
+    поэтому стоят O(проводок между снимками), а не O(всей истории).
+    """
+    __tablename__ = "balance_snapshots"
+    
+    user_id = Column(String(20), ForeignKey("users.id"), primary_key=True)
+    seq = Column(BigInteger, primary_key=True)
+    balance = Column(DECIMAL(15, 2), nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("idx_balance_snapshots_user_created", "user_id", "created_at"),
     )
 
 
+class IdempotencyKey(Base):
+    """
+    Сохранённый ответ на запрос с заголовком Idempotency-Key.
+    
+    Ключ уникален в пределах пользователя. status_code IS NULL - запрос
+    ещё выполняется. Запись живёт до expires_at (services/idempotency_service.py),
+    поэтому без внешнего ключа на users: ключ можно зарезервировать до
+    проверки пользователя, а удаляются записи по сроку.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(String(20), primary_key=True)
+    idempotency_key = Column(String(255), primary_key=True)
+    endpoint = Column(String(50), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(Text)
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    expires_at = Column(TIMESTAMP, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_idempotency_keys_expires", "expires_at"),
+    )
@@ -0,0 +1,193 @@
+"""
+Маршрутизация read-only запросов на реплики БД.
+
+- ReplicaRouter выбирает реплику round-robin среди тех, чьё отставание
+  не превышает max_lag_seconds; если подходящих нет - читаем с primary
+- read-your-writes: после записи (пополнение, вывод, webhook) чтения
+  пользователя sticky_seconds идут на primary, чтобы он сразу увидел
+  свой новый баланс и операцию
+- RoutingSession: SELECT'ы идут на выбранную реплику, flush и DML - на
+  primary, поэтому read-only сервисы, пишущие audit_log, работают без
+  изменений
+
+Отметки записей хранятся в памяти процесса: при нескольких воркерах
+запрос, попавший на другой воркер, может прочитать реплику. Отставание
+ограничено max_lag_seconds.
+"""
+
+import itertools
+import time
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from loguru import logger
+
+
+def measure_replica_lag(engine: Engine) -> Optional[float]:
+    """
+    Отставание реплики в секундах.
+
+    Для PostgreSQL - время с последней применённой транзакции; для
+    остальных диалектов отставание неизвестно и считается нулевым.
+
+    Returns:
+        float: Отставание (секунды) или None, если реплика недоступна
+    """
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    try:
+        with engine.connect() as conn:
+            lag = conn.execute(text(
+                "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+            )).scalar()
+        return max(float(lag), 0.0)
+    except Exception as e:
+        logger.warning("Replica lag check failed for {}: {}", engine.url.host, e)
+        return None
+
+
+class ReplicaState:
+    """Последнее измеренное отставание реплики."""
+    __slots__ = ("engine", "lag", "checked_at")
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+
+
+class ReplicaRouter:
+    """
+    Выбор engine для чтения.
+
+    Attributes:
+        primary: Engine основной БД
+        max_lag_seconds: Реплики с большим отставанием не используются
+        lag_check_interval: Как часто перепроверять отставание (секунды)
+        sticky_seconds: Окно read-your-writes после записи пользователя
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: List[Engine],
+        max_lag_seconds: float = 5.0,
+        lag_check_interval: float = 2.0,
+        sticky_seconds: float = 10.0,
+        lag_probe: Callable[[Engine], Optional[float]] = measure_replica_lag
+    ):
+        self.primary = primary
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self.sticky_seconds = sticky_seconds
+        self.lag_probe = lag_probe
+        self._replicas = [ReplicaState(replica) for replica in replicas]
+        self._round_robin = itertools.cycle(range(len(self._replicas))) if replicas else None
+        self._lag_lock = Lock()
+        self._recent_writes: Dict[str, float] = {}
+        self._writes_lock = Lock()
+
+    @property
+    def replicas(self) -> List[Engine]:
+        return [state.engine for state in self._replicas]
+
+    # ------------------------------------------------------------------
+    # read-your-writes
+    # ------------------------------------------------------------------
+
+    def mark_write(self, user_id: str) -> None:
+        """Отмечает запись пользователя: его чтения временно идут на primary."""
+        if not self._replicas:
+            return
+        now = time.monotonic()
+        with self._writes_lock:
+            self._recent_writes[user_id] = now + self.sticky_seconds
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {
+                    uid: until for uid, until in self._recent_writes.items() if until > now
+                }
+
+    def is_sticky(self, user_id: Optional[str]) -> bool:
+        """True если пользователь писал в последние sticky_seconds."""
+        if user_id is None:
+            return False
+        until = self._recent_writes.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    # ------------------------------------------------------------------
+    # выбор реплики
+    # ------------------------------------------------------------------
+
+    def _refresh_lag(self, state: ReplicaState) -> None:
+        if time.monotonic() - state.checked_at < self.lag_check_interval:
+            return
+        # Проверяет один поток, остальные используют предыдущее значение
+        if not self._lag_lock.acquire(blocking=False):
+            return
+        try:
+            state.lag = self.lag_probe(state.engine)
+            state.checked_at = time.monotonic()
+        finally:
+            self._lag_lock.release()
+
+    def _usable(self, state: ReplicaState) -> bool:
+        self._refresh_lag(state)
+        return state.lag is not None and state.lag <= self.max_lag_seconds
+
+    def engine_for_read(self, user_id: Optional[str] = None) -> Engine:
+        """
+        Engine для read-only работы пользователя.
+
+        Args:
+            user_id (str): ID пользователя (для read-your-writes)
+
+        Returns:
+            Engine: Реплика или primary
+        """
+        if not self._replicas or self.is_sticky(user_id):
+            return self.primary
+        for _ in range(len(self._replicas)):
+            state = self._replicas[next(self._round_robin)]
+            if self._usable(state):
+                return state.engine
+        return self.primary
+
+    def snapshot(self) -> List[Dict]:
+        """Состояние реплик: [{"replica": str, "lag": float, "usable": bool}]."""
+        return [
+            {
+                "replica": f"replica_{index}",
+                "lag": state.lag,
+                "usable": state.lag is not None and state.lag <= self.max_lag_seconds
+            }
+            for index, state in enumerate(self._replicas)
+        ]
+
+
+class RoutingSession(Session):
+    """
+    Сессия, читающая с read_engine и пишущая в primary (bind).
+
+    Examples:
+        >>> db = RoutingSession(bind=engine, read_engine=replica)
+        >>> db.query(Bet).all()        # реплика
+        >>> db.add(audit_log)
+        >>> db.commit()                # primary
+    """
+
+    def __init__(self, *args, read_engine: Optional[Engine] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_engine = read_engine
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.read_engine is not None
+            and not self._flushing
+            and clause is not None
+            and getattr(clause, "is_select", False)
+        ):
+            return self.read_engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
@@ -24,6 +24,8 @@ CREATE TABLE IF NOT EXISTS users (
 -- Индексы для быстрого поиска
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_stripe_customer ON users(stripe_customer_id);
+-- Пользователи без Stripe Customer (services/customer_provisioning_service.py)
+CREATE INDEX IF NOT EXISTS idx_users_without_customer ON users(id) WHERE stripe_customer_id IS NULL;
 
 COMMENT ON TABLE users IS 'Основная таблица пользователей с интеграцией Stripe';
 COMMENT ON COLUMN users.stripe_customer_id IS 'ID клиента в Stripe для сохранения способов оплаты';
@@ -48,6 +50,7 @@ CREATE TABLE IF NOT EXISTS users_balance (
     total_won DECIMAL(15,2) DEFAULT 0.00,
     total_lost DECIMAL(15,2) DEFAULT 0.00,
     currency VARCHAR(3) DEFAULT 'USD',
+    ledger_seq BIGINT NOT NULL DEFAULT 0,
     last_transaction TIMESTAMP,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW(),
@@ -73,7 +76,7 @@ COMMENT ON COLUMN users_balance.total_lost IS 'Сумма всех проигр
 -- stripe_payment_intent_id для связи со Stripe
 
 CREATE TABLE IF NOT EXISTS balance_transactions (
-    transaction_id BIGSERIAL PRIMARY KEY,
+    transaction_id BIGSERIAL,
     user_id VARCHAR(20) NOT NULL,
     transaction_type VARCHAR(30) NOT NULL,
     amount DECIMAL(15,2) NOT NULL,
@@ -86,15 +89,18 @@ CREATE TABLE IF NOT EXISTS balance_transactions (
     stripe_payment_intent_id VARCHAR(100),
     stripe_charge_id VARCHAR(100),
     metadata JSONB,
-    created_at TIMESTAMP DEFAULT NOW(),
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
     processed_at TIMESTAMP,
+    PRIMARY KEY (transaction_id, created_at),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (created_at);
+
+-- Месячные партиции создаёт scripts/manage_partitions.py create
+CREATE TABLE IF NOT EXISTS balance_transactions_default PARTITION OF balance_transactions DEFAULT;
 
 CREATE INDEX IF NOT EXISTS idx_user_transactions ON balance_transactions(user_id, created_at DESC);
-CREATE INDEX IF NOT EXISTS idx_transaction_type ON balance_transactions(transaction_type);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_type_created ON balance_transactions(user_id, transaction_type, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_stripe_intent_transactions ON balance_transactions(stripe_payment_intent_id);
-CREATE INDEX IF NOT EXISTS idx_transaction_status ON balance_transactions(status);
 
 COMMENT ON TABLE balance_transactions IS 'История всех финансовых транзакций пользователя';
 COMMENT ON COLUMN balance_transactions.transaction_type IS 'Тип: deposit, withdrawal, bet_placed, bet_won, bet_lost, bet_cancelled, coupon_won, coupon_lost, bonus_added, fee_charged, refund';
@@ -121,18 +127,26 @@ CREATE TABLE IF NOT EXISTS wallet_operations (
     created_at TIMESTAMP DEFAULT NOW(),
     completed_at TIMESTAMP,
     expires_at TIMESTAMP DEFAULT (NOW() + INTERVAL '24 hours'),
+    idempotency_key VARCHAR(255),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE(stripe_payment_intent_id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_user_operations ON wallet_operations(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_stripe_intent_operations ON wallet_operations(stripe_payment_intent_id);
-CREATE INDEX IF NOT EXISTS idx_operation_status ON wallet_operations(status);
-CREATE INDEX IF NOT EXISTS idx_operation_type ON wallet_operations(operation_type);
+-- Pending-суммы в get_balance и дневной лимит вывода (index-only scan)
+CREATE INDEX IF NOT EXISTS idx_operations_user_pending ON wallet_operations(user_id, operation_type) INCLUDE (amount) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_operations_user_type_created ON wallet_operations(user_id, operation_type, created_at) INCLUDE (amount, status);
+-- Keyset-проход сверки со Stripe (services/reconciliation_service.py)
+CREATE INDEX IF NOT EXISTS idx_operations_pending_scan ON wallet_operations(operation_id) WHERE status = 'pending';
+-- Истечение просроченных pending-операций (services/expiry_service.py)
+CREATE INDEX IF NOT EXISTS idx_operations_pending_expires ON wallet_operations(expires_at) WHERE status = 'pending';
+-- Повтор вывода с тем же Idempotency-Key не списывает второй раз (services/wallet_service.py)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_operations_idempotency_key ON wallet_operations(user_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
 
 COMMENT ON TABLE wallet_operations IS 'Операции пополнения и вывода средств через Stripe';
 COMMENT ON COLUMN wallet_operations.operation_type IS 'Тип: deposit, withdrawal';
-COMMENT ON COLUMN wallet_operations.status IS 'Статус: pending, completed, failed, cancelled';
+COMMENT ON COLUMN wallet_operations.status IS 'Статус: pending, completed, failed, cancelled, expired';
 
 
 -- ============================================================================
@@ -239,7 +253,7 @@ COMMENT ON TABLE monthly_statements IS 'Месячные финансовые о
 -- Отслеживание кто, когда и откуда сделал операцию
 
 CREATE TABLE IF NOT EXISTS audit_log (
-    log_id BIGSERIAL PRIMARY KEY,
+    log_id BIGSERIAL,
     user_id VARCHAR(20) NOT NULL,
     action VARCHAR(50) NOT NULL,
     amount DECIMAL(15,2),
@@ -247,9 +261,12 @@ CREATE TABLE IF NOT EXISTS audit_log (
     user_agent TEXT,
     status VARCHAR(20),
     details JSONB,
-    created_at TIMESTAMP DEFAULT NOW(),
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (log_id, created_at),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT;
 
 CREATE INDEX IF NOT EXISTS idx_user_audit ON audit_log(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_action ON audit_log(action);
@@ -265,7 +282,7 @@ COMMENT ON COLUMN audit_log.action IS 'Действие: deposit_initiated, depo
 -- Таблица ставок для связи с методом getBetHistory
 
 CREATE TABLE IF NOT EXISTS bets (
-    bet_id BIGSERIAL PRIMARY KEY,
+    bet_id BIGSERIAL,
     user_id VARCHAR(20) NOT NULL,
     event_id INTEGER NOT NULL,
     odds_id INTEGER,
@@ -276,21 +293,100 @@ CREATE TABLE IF NOT EXISTS bets (
     status VARCHAR(20) DEFAULT 'open',
     result VARCHAR(20),
     actual_win DECIMAL(15,2),
-    placed_at TIMESTAMP DEFAULT NOW(),
+    placed_at TIMESTAMP NOT NULL DEFAULT NOW(),
     resolved_at TIMESTAMP,
     metadata JSONB,
+    PRIMARY KEY (bet_id, placed_at),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (placed_at);
+
+CREATE TABLE IF NOT EXISTS bets_default PARTITION OF bets DEFAULT;
 
 CREATE INDEX IF NOT EXISTS idx_user_bets ON bets(user_id, placed_at DESC);
-CREATE INDEX IF NOT EXISTS idx_bet_status ON bets(status);
-CREATE INDEX IF NOT EXISTS idx_bet_result ON bets(result);
+-- Счётчики выигрышей, сумма открытых ставок и статистика resolved-ставок
+CREATE INDEX IF NOT EXISTS idx_bets_user_result ON bets(user_id, result);
+CREATE INDEX IF NOT EXISTS idx_bets_user_open ON bets(user_id) INCLUDE (bet_amount) WHERE status = 'open';
+CREATE INDEX IF NOT EXISTS idx_bets_user_resolved ON bets(user_id, placed_at) INCLUDE (result, bet_amount, actual_win) WHERE status = 'resolved';
+-- Пачки открытых ставок события при расчёте (services/settlement_service.py)
+CREATE INDEX IF NOT EXISTS idx_bets_event_open ON bets(event_id, bet_id) WHERE status = 'open';
 
 COMMENT ON TABLE bets IS 'Таблица ставок пользователей';
 COMMENT ON COLUMN bets.status IS 'Статус: open, resolved, cancelled';
 COMMENT ON COLUMN bets.result IS 'Результат: win, loss, refund';
 
 
+-- ============================================================================
+-- ТАБЛИЦА 10: ledger_entries (Журнал проводок кошелька)
+-- ============================================================================
+-- Append-only журнал с двойной записью: каждая проводка переводит amount
+-- между кошельком пользователя и contra_account (stripe, withdrawals,
+-- bets, opening). seq - номер проводки пользователя без пропусков,
+-- balance_after - нарастающий итог. users_balance.balance/ledger_seq -
+-- кэш последней проводки (services/ledger_service.py)
+
+CREATE TABLE IF NOT EXISTS ledger_entries (
+    entry_id BIGSERIAL PRIMARY KEY,
+    user_id VARCHAR(20) NOT NULL,
+    seq BIGINT NOT NULL,
+    entry_type VARCHAR(30) NOT NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    balance_after DECIMAL(15,2) NOT NULL,
+    contra_account VARCHAR(30) NOT NULL,
+    reference_type VARCHAR(20),
+    reference_id BIGINT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    CONSTRAINT uq_ledger_user_seq UNIQUE (user_id, seq),
+    CONSTRAINT ck_ledger_amount_nonzero CHECK (amount <> 0)
+);
+
+-- Проводки месяца для снимков на границе периода
+CREATE INDEX IF NOT EXISTS idx_ledger_created ON ledger_entries(created_at);
+
+COMMENT ON TABLE ledger_entries IS 'Append-only журнал проводок кошелька (источник истины для балансов)';
+COMMENT ON COLUMN ledger_entries.contra_account IS 'Счёт на другой стороне: stripe, withdrawals, bets, opening';
+
+
+-- ============================================================================
+-- ТАБЛИЦА 11: balance_snapshots (Снимки итога журнала)
+-- ============================================================================
+-- Проверка журнала и баланс на дату начинаются с ближайшего снимка
+-- пользователя; created_at - время проводки seq
+
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+    user_id VARCHAR(20) NOT NULL,
+    seq BIGINT NOT NULL,
+    balance DECIMAL(15,2) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, seq),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_balance_snapshots_user_created ON balance_snapshots(user_id, created_at);
+
+
+-- ============================================================================
+-- ТАБЛИЦА 12: idempotency_keys (Ответы на повторы запросов)
+-- ============================================================================
+-- Повтор POST /deposit, /withdraw с тем же Idempotency-Key получает
+-- сохранённый ответ; status_code IS NULL - запрос ещё выполняется
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id VARCHAR(20) NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    endpoint VARCHAR(50) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status_code INTEGER,
+    response_body TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key)
+);
+
+-- Удаление истёкших ключей (scripts/expire_operations.py)
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
+
+
 -- ============================================================================
 -- ТРИГГЕР: Автообновление updated_at
 -- ============================================================================
@@ -339,6 +435,28 @@ CREATE TRIGGER create_balance_on_user_insert
     EXECUTE FUNCTION create_user_balance();
 
 
+-- ============================================================================
+-- ТРИГГЕР: ledger_entries только на добавление
+-- ============================================================================
+-- DELETE разрешён только при SET LOCAL ledger.allow_purge = 'on'
+
+CREATE OR REPLACE FUNCTION ledger_entries_append_only()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' AND current_setting('ledger.allow_purge', true) = 'on' THEN
+        RETURN OLD;
+    END IF;
+    RAISE EXCEPTION 'ledger_entries is append-only (% is not allowed)', TG_OP;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS ledger_entries_append_only ON ledger_entries;
+CREATE TRIGGER ledger_entries_append_only
+    BEFORE UPDATE OR DELETE ON ledger_entries
+    FOR EACH ROW
+    EXECUTE FUNCTION ledger_entries_append_only();
+
+
 -- ============================================================================
 -- GRANT права (для production)
 -- ============================================================================
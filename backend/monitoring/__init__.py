@@ -0,0 +1,37 @@
+"""Monitoring module: SQL query stats, Prometheus metrics, health checks, request ids."""
+from .query_stats import (
+    QueryStats,
+    QueryStatsMiddleware,
+    install_query_stats,
+    track_queries,
+    assert_max_queries,
+    get_route_query_totals
+)
+from .metrics import (
+    REGISTRY,
+    MetricsMiddleware,
+    instrument_engine_pool,
+    track_stripe_call
+)
+from .circuit_breaker import CircuitBreaker, STRIPE_BREAKER
+from .health import check_readiness, readiness_cache
+from .request_context import RequestContextMiddleware, get_request_id
+
+__all__ = [
+    "QueryStats",
+    "QueryStatsMiddleware",
+    "install_query_stats",
+    "track_queries",
+    "assert_max_queries",
+    "get_route_query_totals",
+    "REGISTRY",
+    "MetricsMiddleware",
+    "instrument_engine_pool",
+    "track_stripe_call",
+    "CircuitBreaker",
+    "STRIPE_BREAKER",
+    "check_readiness",
+    "readiness_cache",
+    "RequestContextMiddleware",
+    "get_request_id"
+]
@@ -0,0 +1,82 @@
+"""
+Circuit breaker для внешних зависимостей (Stripe).
+
+Состояния:
+- closed: вызовы проходят, считаем подряд идущие ошибки
+- open: после failure_threshold ошибок подряд, держится reset_timeout секунд
+- half_open: таймаут истёк, следующий вызов пробный - успех закрывает breaker
+
+StripeService сам вызовы не блокирует: состояние используется readiness-проверкой
+и доступно коду, которому нужно решить, стоит ли сейчас ходить в Stripe
+(allow_request()).
+"""
+
+import time
+from threading import Lock
+from typing import Dict, Optional
+
+from config.settings import settings
+
+
+class CircuitBreaker:
+    """
+    Счётчик последовательных ошибок с состояниями closed/open/half_open.
+
+    Attributes:
+        name: Имя зависимости (для логов и health)
+        failure_threshold: Ошибок подряд до перехода в open
+        reset_timeout: Секунд в состоянии open до half_open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = Lock()
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние breaker'а."""
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """True если вызов зависимости сейчас имеет смысл (closed или half_open)."""
+        return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._opened_at is not None:
+                # Пробный вызов в half_open не удался - снова open
+                self._opened_at = time.monotonic()
+            elif self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        """Состояние для health-проверок."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures
+        }
+
+
+STRIPE_BREAKER = CircuitBreaker(
+    "stripe",
+    failure_threshold=settings.stripe_breaker_failure_threshold,
+    reset_timeout=settings.stripe_breaker_reset_seconds
+)
@@ -0,0 +1,182 @@
+"""
+Проверки живости и готовности воркера.
+
+- liveness: процесс жив и обслуживает event loop (без I/O)
+- readiness: соединение с БД, насыщение пула, состояние breaker'а Stripe
+
+Результат readiness кэшируется на settings.health_cache_ttl_seconds: частые
+проверки балансировщика в пределах TTL не трогают БД, а при одновременных
+запросах probe выполняется одним потоком. Пока он выполняется, остальные
+запросы получают прошлый результат и не занимают потоки пула ожиданием.
+
+SELECT 1 выполняется в отдельном потоке и ждётся не дольше
+settings.health_db_timeout_seconds: зависшая БД даёт not_ready за секунды,
+а не через pool_timeout. Новая проверка не запускается, пока зависшая не
+завершилась.
+"""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from threading import Event, Lock
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from loguru import logger
+
+from config.settings import settings
+from monitoring.circuit_breaker import STRIPE_BREAKER
+from monitoring.metrics import get_pool_utilization
+
+
+class ProbeCache:
+    """
+    Кэш результата probe с TTL.
+
+    Attributes:
+        ttl: Время жизни результата (секунды)
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = Lock()
+        self._result: Optional[Dict] = None
+        self._expires_at = 0.0
+        # Выполняющийся probe: событие срабатывает, когда он завершится
+        self._refreshing: Optional[Event] = None
+
+    def get_or_compute(self, probe: Callable[[], Dict]) -> Dict:
+        """
+        Возвращает кэшированный результат или выполняет probe.
+
+        probe выполняет один поток и не под lock: пока он идёт, остальные
+        запросы сразу получают прошлый результат ("stale": True). Ждут
+        только запросы, пришедшие до первого результата.
+
+        Returns:
+            dict: Результат probe с ключом "cached"
+        """
+        result = self._result
+        if result is not None and time.monotonic() < self._expires_at:
+            return {**result, "cached": True}
+
+        with self._lock:
+            # Пока ждали lock, результат мог обновить другой поток
+            if self._result is not None and time.monotonic() < self._expires_at:
+                return {**self._result, "cached": True}
+            refreshing = self._refreshing
+            if refreshing is not None and self._result is not None:
+                return {**self._result, "cached": True, "stale": True}
+            if refreshing is None:
+                self._refreshing = Event()
+
+        if refreshing is not None:
+            refreshing.wait()
+            return self.get_or_compute(probe)
+
+        try:
+            result = probe()
+            with self._lock:
+                self._result = result
+                self._expires_at = time.monotonic() + self.ttl
+        finally:
+            with self._lock:
+                refreshing, self._refreshing = self._refreshing, None
+            refreshing.set()
+        return {**result, "cached": False}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._result = None
+            self._expires_at = 0.0
+
+
+# Один поток на проверки БД: зависшая проверка не размножается
+_db_check_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readiness-db")
+_db_checks_lock = Lock()
+_db_checks: Dict[Engine, Future] = {}
+
+
+def _select_one(engine: Engine) -> float:
+    """SELECT 1, возвращает латентность в мс."""
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def check_database(engine: Engine) -> Dict:
+    """
+    Проверяет БД: насыщение пула, затем SELECT 1 с таймаутом.
+
+    При насыщенном пуле SELECT не выполняется - checkout ждал бы pool_timeout.
+    Если прошлая проверка ещё не завершилась, новая не запускается - ждём
+    ту же.
+
+    Returns:
+        dict: {"ok": bool, "latency_ms": float, "pool_utilization": float, "error": str}
+    """
+    utilization = get_pool_utilization(engine)
+    result: Dict = {"ok": True, "pool_utilization": utilization}
+
+    if utilization is not None and utilization >= settings.health_pool_saturation_threshold:
+        result["ok"] = False
+        result["error"] = "Connection pool saturated"
+        return result
+
+    with _db_checks_lock:
+        check = _db_checks.get(engine)
+        if check is None or check.done():
+            check = _db_checks[engine] = _db_check_executor.submit(_select_one, engine)
+    try:
+        result["latency_ms"] = check.result(timeout=settings.health_db_timeout_seconds)
+    except FutureTimeout:
+        logger.error("Readiness DB check timed out after {}s", settings.health_db_timeout_seconds)
+        result["ok"] = False
+        result["error"] = "Database check timed out"
+    except Exception as e:
+        logger.error("Readiness DB check failed: {}", e)
+        result["ok"] = False
+        result["error"] = "Database unavailable"
+    return result
+
+
+def check_readiness(engine: Engine) -> Dict:
+    """
+    Полная проверка готовности воркера принимать трафик.
+
+    Stripe не влияет на ready: при его недоступности страдают все воркеры
+    одинаково, и вывод их из балансировки не поможет. Открытый breaker
+    даёт статус "degraded".
+
+    Returns:
+        dict: {
+            "status": "ready" | "degraded" | "not_ready",
+            "ready": bool,
+            "checks": {"database": {...}, "stripe": {...}},
+            "checked_at": str
+        }
+    """
+    database = check_database(engine)
+    stripe = STRIPE_BREAKER.snapshot()
+
+    if not database["ok"]:
+        status = "not_ready"
+    elif stripe["state"] == STRIPE_BREAKER.OPEN:
+        status = "degraded"
+    else:
+        status = "ready"
+
+    return {
+        "status": status,
+        "ready": database["ok"],
+        "checks": {
+            "database": database,
+            "stripe": stripe
+        },
+        "checked_at": datetime.utcnow().isoformat()
+    }
+
+
+readiness_cache = ProbeCache(ttl=settings.health_cache_ttl_seconds)
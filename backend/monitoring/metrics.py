@@ -0,0 +1,764 @@
+"""
+Метрики сервиса в формате Prometheus (text exposition 0.0.4).
+
+Лёгкий in-process реестр без внешних зависимостей: запись метрики - это
+один lock и пара арифметических операций, рендер /metrics - проход по
+небольшим словарям. Значения пула и агрегаты SQL-запросов считаются
+в момент scrape через CallbackMetric, поэтому ничего не стоят между scrape'ами.
+
+Несколько воркеров uvicorn (WEB_CONCURRENCY > 1) - multiprocess-режим
+(PROMETHEUS_MULTIPROC_DIR, enable_multiprocess()): каждый воркер раз в
+METRICS_FLUSH_SECONDS пишет свои значения в общий каталог, а ответивший
+на scrape воркер складывает counter'ы и гистограммы всех воркеров; gauge
+- состояние процесса, поэтому он отдаётся по воркерам с меткой worker (pid).
+Каталог очищается перед запуском сервера.
+
+Задачи по расписанию (scripts/expire_operations.py, reconcile_operations.py,
+settle_event.py) завершаются раньше любого scrape, поэтому их метрики
+публикуются через textfile collector node-exporter (METRICS_TEXTFILE_DIR,
+write_job_metrics()).
+
+Экспортируемые метрики:
+- http_request_duration_seconds - латентность запросов по роутам
+- db_pool_* - ожидание checkout, загрузка пула и его события (checkout,
+  overflow, новые соединения, инвалидации)
+- db_queries_total / db_query_seconds_total - SQL-запросы по роутам
+- stripe_call_duration_seconds / stripe_call_errors_total - вызовы StripeService
+- stripe_webhook_lag_seconds - задержка доставки webhook'ов
+- export_report_duration_seconds - длительность генерации отчётов
+- wallet_reconciled_operations_total / reconciliation_duration_seconds -
+  сверка pending-операций со Stripe
+- expiry_sweep_rows / expiry_sweep_duration_seconds - истечение просроченных
+  pending-операций (строк и время на запуск)
+- job_last_run_timestamp_seconds / job_last_run_success - последний запуск
+  задачи по расписанию (только в textfile задачи)
+- stripe_customers_provisioned_total - фоновое создание Stripe Customer
+- idempotent_requests_total - запросы с Idempotency-Key по исходу
+  (new, replay_cache, replay_db, in_progress, mismatch)
+- wallet_event_streams / wallet_events_published_total - открытые потоки
+  SSE /api/wallet/events и опубликованные события
+- conditional_requests_total - GET с If-None-Match по эндпоинту и исходу
+  (not_modified - ответ 304, modified - полный ответ)
+- wallet_read_executions_total / wallet_reads_coalesced_total - чтения
+  WalletService, выполненные в БД и объединённые с уже выполняющимися
+- db_replica_lag_seconds - отставание реплик для чтения
+- log_queue_depth / log_records_dropped_total - очередь фоновой записи логов
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from loguru import logger
+
+from config.logging_config import get_log_queue_stats
+from config.settings import settings
+from monitoring.circuit_breaker import STRIPE_BREAKER
+from monitoring.query_stats import get_route_query_totals
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Базовый класс метрики с метками."""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+
+    def values(self) -> Dict[Tuple, Any]:
+        """Текущие значения по кортежам меток."""
+        raise NotImplementedError
+
+    def format_samples(self, values: Dict[Tuple, Any], labelnames: Tuple) -> List[str]:
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        return self.format_samples(self.values(), self.labelnames)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def values(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def format_samples(self, values: Dict[Tuple, float], labelnames: Tuple) -> List[str]:
+        return [f"{self.name}{_format_labels(labelnames, k)} {_format_value(v)}" for k, v in values.items()]
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и убывать."""
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными бакетами (хранятся некумулятивно)."""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [counts по бакетам..., sum, count]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Измеряет длительность блока."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels) -> int:
+        data = self._values.get(self._key(labels))
+        return data[-1] if data else 0
+
+    def values(self) -> Dict[Tuple, List[float]]:
+        with self._lock:
+            return {k: list(v) for k, v in self._values.items()}
+
+    def format_samples(self, values: Dict[Tuple, List[float]], labelnames: Tuple) -> List[str]:
+        lines = []
+        bucket_labelnames = labelnames + ("le",)
+        for key, data in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_labelnames, key + (_format_value(bound),))} {cumulative}"
+                )
+            label_str = _format_labels(labelnames, key)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{label_str} {data[-1]}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Метрика, значения которой вычисляются в момент scrape.
+
+    callback() возвращает {tuple значений меток: значение}.
+    """
+
+    def __init__(self, name, documentation, type_name: str, labelnames=(),
+                 callback: Callable[[], Dict[Tuple, float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.type_name = type_name
+        self.callback = callback
+
+    def values(self) -> Dict[Tuple, float]:
+        return self.callback()
+
+    def format_samples(self, values: Dict[Tuple, float], labelnames: Tuple) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    """Запись через временный файл: читатель видит старое или новое содержимое целиком."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _merge(current: Any, value: Any) -> Any:
+    """Сумма значений воркеров: число для counter'а, поэлементно для гистограммы."""
+    if current is None:
+        return value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(current, value)]
+    return current + value
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса.
+
+    С multiproc_dir рендер объединяет значения всех воркеров из файлов
+    metrics_<pid>.json; snapshot старше stale_seconds считается значением
+    остановленного воркера - его counter'ы учитываются, gauge'и нет.
+    """
+
+    def __init__(self, multiproc_dir: Optional[str] = None, stale_seconds: float = 15.0):
+        self._metrics: Dict[str, _Metric] = {}
+        self.multiproc_dir = Path(multiproc_dir) if multiproc_dir else None
+        self.stale_seconds = stale_seconds
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def snapshot(self) -> Dict[str, List]:
+        """Значения процесса: {метрика: [[значения меток, значение], ...]}."""
+        return {
+            name: [[list(key), value] for key, value in metric.values().items()]
+            for name, metric in list(self._metrics.items())
+        }
+
+    def write_snapshot(self) -> None:
+        """Записывает значения процесса в каталог multiprocess-режима (атомарно)."""
+        _write_atomic(self.multiproc_dir / f"metrics_{os.getpid()}.json", json.dumps(self.snapshot()))
+
+    def _worker_snapshots(self) -> List[Tuple[str, bool, Dict[str, List]]]:
+        """(pid, воркер жив, snapshot) по файлам каталога; свой - свежий."""
+        self.write_snapshot()
+        now = time.time()
+        snapshots = []
+        for path in self.multiproc_dir.glob("metrics_*.json"):
+            try:
+                alive = now - path.stat().st_mtime <= self.stale_seconds
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):  # файл удалён при очистке каталога
+                continue
+            snapshots.append((path.stem[len("metrics_"):], alive, data))
+        return snapshots
+
+    def render(self) -> str:
+        """Текст для /metrics."""
+        snapshots = self._worker_snapshots() if self.multiproc_dir else None
+        lines: List[str] = []
+        for name, metric in list(self._metrics.items()):
+            lines.extend(metric.header())
+            if snapshots is None:
+                lines.extend(metric.samples())
+            elif metric.type_name == "gauge":
+                values = {
+                    tuple(key) + (pid,): value
+                    for pid, alive, data in snapshots if alive
+                    for key, value in data.get(name, [])
+                }
+                lines.extend(metric.format_samples(values, metric.labelnames + ("worker",)))
+            else:
+                values: Dict[Tuple, Any] = {}
+                for _, _, data in snapshots:
+                    for key, value in data.get(name, []):
+                        values[tuple(key)] = _merge(values.get(tuple(key)), value)
+                lines.extend(metric.format_samples(values, metric.labelnames))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ============================================================================
+# МЕТРИКИ СЕРВИСА
+# ============================================================================
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status")
+))
+
+DB_POOL_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled DB connection",
+    ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+))
+
+DB_POOL_CHECKOUTS = REGISTRY.register(Counter(
+    "db_pool_checkouts_total",
+    "Connections checked out from the pool",
+    ("engine",)
+))
+
+DB_POOL_OVERFLOW_CHECKOUTS = REGISTRY.register(Counter(
+    "db_pool_overflow_checkouts_total",
+    "Checkouts served by an overflow connection (pool_size exceeded)",
+    ("engine",)
+))
+
+DB_POOL_CONNECTS = REGISTRY.register(Counter(
+    "db_pool_connections_opened_total",
+    "New DBAPI connections opened by the pool",
+    ("engine",)
+))
+
+DB_POOL_INVALIDATIONS = REGISTRY.register(Counter(
+    "db_pool_invalidations_total",
+    "Pooled connections invalidated (hard: closed now, soft: on next checkin)",
+    ("engine", "kind")
+))
+
+STRIPE_CALL_DURATION = REGISTRY.register(Histogram(
+    "stripe_call_duration_seconds",
+    "StripeService call latency by method",
+    ("method",)
+))
+
+STRIPE_CALL_ERRORS = REGISTRY.register(Counter(
+    "stripe_call_errors_total",
+    "StripeService calls that returned success=False or raised",
+    ("method",)
+))
+
+STRIPE_WEBHOOK_LAG = REGISTRY.register(Histogram(
+    "stripe_webhook_lag_seconds",
+    "Delay between Stripe event creation and its processing",
+    ("event_type",),
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+))
+
+EXPORT_REPORT_DURATION = REGISTRY.register(Histogram(
+    "export_report_duration_seconds",
+    "Report export generation time by format",
+    ("format",)
+))
+
+BETS_SETTLED = REGISTRY.register(Counter(
+    "bets_settled_total",
+    "Bets resolved by SettlementService by result",
+    ("result",)
+))
+
+SETTLEMENT_DURATION = REGISTRY.register(Histogram(
+    "settlement_duration_seconds",
+    "Time to settle all open bets of an event",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+))
+
+RECONCILED_OPERATIONS = REGISTRY.register(Counter(
+    "wallet_reconciled_operations_total",
+    "Pending wallet operations checked against Stripe by outcome",
+    ("outcome",)
+))
+
+RECONCILIATION_DURATION = REGISTRY.register(Histogram(
+    "reconciliation_duration_seconds",
+    "Time of a full reconciliation run",
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+))
+
+EXPIRY_SWEEP_ROWS = REGISTRY.register(Histogram(
+    "expiry_sweep_rows",
+    "Pending wallet operations expired per sweep run",
+    buckets=(0, 10, 100, 1000, 10000, 100000, 1000000)
+))
+
+EXPIRY_SWEEP_DURATION = REGISTRY.register(Histogram(
+    "expiry_sweep_duration_seconds",
+    "Time of an expiry sweep run",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+))
+
+STRIPE_CUSTOMERS_PROVISIONED = REGISTRY.register(Counter(
+    "stripe_customers_provisioned_total",
+    "Users processed by background Stripe customer provisioning by outcome",
+    ("outcome",)
+))
+
+IDEMPOTENT_REQUESTS = REGISTRY.register(Counter(
+    "idempotent_requests_total",
+    "Requests carrying an Idempotency-Key header by outcome",
+    ("outcome",)
+))
+
+WALLET_EVENT_STREAMS = REGISTRY.register(Gauge(
+    "wallet_event_streams",
+    "Open /api/wallet/events connections in this process"
+))
+
+WALLET_EVENTS_PUBLISHED = REGISTRY.register(Counter(
+    "wallet_events_published_total",
+    "Wallet events published to connected clients by event type",
+    ("event",)
+))
+
+CONDITIONAL_REQUESTS = REGISTRY.register(Counter(
+    "conditional_requests_total",
+    "GET requests carrying If-None-Match by endpoint and outcome",
+    ("endpoint", "outcome")
+))
+
+WALLET_READ_EXECUTIONS = REGISTRY.register(Counter(
+    "wallet_read_executions_total",
+    "Wallet reads executed against the database by operation",
+    ("operation",)
+))
+
+WALLET_READS_COALESCED = REGISTRY.register(Counter(
+    "wallet_reads_coalesced_total",
+    "Wallet reads served by an identical in-flight execution by operation",
+    ("operation",)
+))
+
+# Метрики задач по расписанию: только в их textfile, не в /metrics сервиса
+JOB_LAST_RUN = Gauge(
+    "job_last_run_timestamp_seconds",
+    "Unix time of the last run of a scheduled job",
+    ("job",)
+)
+
+JOB_LAST_RUN_SUCCESS = Gauge(
+    "job_last_run_success",
+    "1 if the last run of a scheduled job succeeded, 0 otherwise",
+    ("job",)
+)
+
+# engine name -> Engine, пул которого экспортируется при scrape
+_pool_engines: Dict[str, Engine] = {}
+
+
+def _pool_values(getter: Callable) -> Dict[Tuple, float]:
+    # StaticPool/NullPool/SingletonThreadPool (SQLite) не ведут учёт размера
+    return {
+        (name,): float(getter(engine.pool))
+        for name, engine in list(_pool_engines.items())
+        if isinstance(engine.pool, QueuePool)
+    }
+
+
+def _pool_utilization(pool) -> float:
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return pool.checkedout() / capacity if capacity else 0.0
+
+
+def get_pool_utilization(engine: Engine) -> Optional[float]:
+    """Доля занятых соединений пула (None для пулов без учёта размера)."""
+    if not isinstance(engine.pool, QueuePool):
+        return None
+    return _pool_utilization(engine.pool)
+
+
+REGISTRY.register(CallbackMetric(
+    "db_pool_size", "Configured pool size", "gauge", ("engine",),
+    lambda: _pool_values(lambda pool: pool.size())
+))
+REGISTRY.register(CallbackMetric(
+    "db_pool_checked_out", "Connections currently checked out", "gauge", ("engine",),
+    lambda: _pool_values(lambda pool: pool.checkedout())
+))
+REGISTRY.register(CallbackMetric(
+    "db_pool_overflow", "Overflow connections in use", "gauge", ("engine",),
+    lambda: _pool_values(lambda pool: pool.overflow())
+))
+REGISTRY.register(CallbackMetric(
+    "db_pool_utilization_ratio", "Checked out / (pool_size + max_overflow)", "gauge", ("engine",),
+    lambda: _pool_values(_pool_utilization)
+))
+REGISTRY.register(CallbackMetric(
+    "db_queries_total", "SQL statements executed by route", "counter", ("route",),
+    lambda: {(route, ): t["queries"] for route, t in get_route_query_totals().items()}
+))
+REGISTRY.register(CallbackMetric(
+    "db_query_seconds_total", "Time spent in SQL by route", "counter", ("route",),
+    lambda: {(route, ): t["db_time"] for route, t in get_route_query_totals().items()}
+))
+_replica_routers: List = []
+
+
+def _replica_lag_values() -> Dict[Tuple, float]:
+    return {
+        (replica["replica"],): replica["lag"]
+        for router in _replica_routers
+        for replica in router.snapshot()
+        if replica["lag"] is not None
+    }
+
+
+REGISTRY.register(CallbackMetric(
+    "db_replica_lag_seconds", "Last measured replication lag", "gauge", ("replica",),
+    _replica_lag_values
+))
+REGISTRY.register(CallbackMetric(
+    "log_queue_depth", "Log records waiting for the background writer", "gauge", (),
+    lambda: {(): get_log_queue_stats()["depth"]}
+))
+REGISTRY.register(CallbackMetric(
+    "log_records_dropped_total", "Log records dropped on queue overflow", "counter", (),
+    lambda: {(): get_log_queue_stats()["dropped"]}
+))
+
+
+# ============================================================================
+# ИНСТРУМЕНТАЦИЯ
+# ============================================================================
+
+def enable_multiprocess(directory: str, flush_seconds: float = 5.0) -> None:
+    """
+    Включает multiprocess-режим REGISTRY для процесса-воркера.
+
+    Фоновый поток раз в flush_seconds записывает значения процесса в
+    directory, при выходе процесса они записываются последний раз.
+
+    Args:
+        directory (str): Общий каталог воркеров (PROMETHEUS_MULTIPROC_DIR)
+        flush_seconds (float): Период записи (METRICS_FLUSH_SECONDS)
+    """
+    REGISTRY.multiproc_dir = Path(directory)
+    REGISTRY.multiproc_dir.mkdir(parents=True, exist_ok=True)
+    # Три пропущенные записи подряд - воркер остановлен
+    REGISTRY.stale_seconds = flush_seconds * 3
+    REGISTRY.write_snapshot()
+
+    def flush() -> None:
+        while True:
+            time.sleep(flush_seconds)
+            try:
+                REGISTRY.write_snapshot()
+            except OSError:
+                pass  # следующая попытка через flush_seconds
+
+    threading.Thread(target=flush, name="metrics-flush", daemon=True).start()
+    atexit.register(REGISTRY.write_snapshot)
+
+
+def write_job_metrics(job: str, metrics: Sequence[_Metric], success: bool) -> Optional[Path]:
+    """
+    Публикует метрики запуска задачи в <METRICS_TEXTFILE_DIR>/<job>.prom
+    для textfile collector node-exporter.
+
+    Counter'ы и гистограммы накапливаются между запусками (состояние -
+    <job>.json рядом), поэтому остаются монотонными; gauge'и описывают
+    последний запуск.
+
+    Args:
+        job (str): Имя задачи (метка job и имя файла)
+        metrics: Метрики, которые задача записала за запуск
+        success (bool): Исход запуска
+
+    Returns:
+        Path: Записанный файл; None - METRICS_TEXTFILE_DIR не задан или запись не удалась
+
+    Examples:
+        >>> write_job_metrics("expire_operations", [EXPIRY_SWEEP_ROWS, EXPIRY_SWEEP_DURATION], True)
+    """
+    if not settings.metrics_textfile_dir:
+        return None
+    root = Path(settings.metrics_textfile_dir)
+    JOB_LAST_RUN.set(time.time(), job=job)
+    JOB_LAST_RUN_SUCCESS.set(1 if success else 0, job=job)
+
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        state_path = root / f"{job}.json"
+        state = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else {}
+        lines: List[str] = []
+        for metric in list(metrics) + [JOB_LAST_RUN, JOB_LAST_RUN_SUCCESS]:
+            values: Dict[Tuple, Any] = {}
+            if metric.type_name != "gauge":
+                values = {tuple(key): value for key, value in state.get(metric.name, [])}
+            for key, value in metric.values().items():
+                values[key] = _merge(values.get(key), value)
+            state[metric.name] = [[list(key), value] for key, value in values.items()]
+            lines.extend(metric.header())
+            lines.extend(metric.format_samples(values, metric.labelnames))
+        _write_atomic(state_path, json.dumps(state))
+        path = root / f"{job}.prom"
+        _write_atomic(path, "\n".join(lines) + "\n")
+    except (OSError, ValueError) as e:
+        logger.warning("Metrics of job {} were not written to {}: {}", job, root, e)
+        return None
+    return path
+
+
+def instrument_engine_pool(engine: Engine, name: str = "primary") -> None:
+    """
+    Подключает метрики пула engine: ожидание checkout, gauges загрузки
+    и счётчики событий пула.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        name (str): Значение метки engine
+    """
+    _pool_engines[name] = engine
+    pool = engine.pool
+    if getattr(pool, "_checkout_wait_instrumented", False):
+        return
+
+    original_do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return original_do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, engine=name)
+
+    pool._do_get = timed_do_get
+    pool._checkout_wait_instrumented = True
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc(engine=name)
+        if isinstance(pool, QueuePool) and pool.checkedout() > pool.size():
+            DB_POOL_OVERFLOW_CHECKOUTS.inc(engine=name)
+
+    def on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTS.inc(engine=name)
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        DB_POOL_INVALIDATIONS.inc(engine=name, kind="hard")
+
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        DB_POOL_INVALIDATIONS.inc(engine=name, kind="soft")
+
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "connect", on_connect)
+    event.listen(pool, "invalidate", on_invalidate)
+    event.listen(pool, "soft_invalidate", on_soft_invalidate)
+
+
+def instrument_replica_router(router) -> None:
+    """
+    Подключает метрики реплик: отставание и пулы соединений.
+
+    Args:
+        router (ReplicaRouter): Маршрутизатор чтения (models/routing.py)
+    """
+    if router not in _replica_routers:
+        _replica_routers.append(router)
+    for index, replica in enumerate(router.replicas):
+        instrument_engine_pool(replica, name=f"replica_{index}")
+
+
+def track_stripe_call(func: Callable) -> Callable:
+    """
+    Декоратор для методов StripeService: латентность и ошибки по имени метода.
+
+    Ошибкой считается результат с success=False или исключение. Исход
+    сетевых вызовов также передаётся в STRIPE_BREAKER.
+    """
+    method = func.__name__
+    # Проверка подписи webhook'а выполняется локально и не говорит о доступности Stripe
+    feeds_breaker = method != "construct_webhook_event"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            STRIPE_CALL_ERRORS.inc(method=method)
+            if feeds_breaker:
+                STRIPE_BREAKER.record_failure()
+            raise
+        finally:
+            STRIPE_CALL_DURATION.observe(time.perf_counter() - start, method=method)
+        failed = isinstance(result, dict) and not result.get("success", True)
+        if failed:
+            STRIPE_CALL_ERRORS.inc(method=method)
+        if feeds_breaker:
+            # Отказ по карте (CardError, есть "code") - ответ Stripe, а не его недоступность
+            if failed and "code" not in result:
+                STRIPE_BREAKER.record_failure()
+            else:
+                STRIPE_BREAKER.record_success()
+        return result
+
+    return wrapper
+
+
+def observe_webhook_lag(event_type: str, created: int) -> None:
+    """Записывает задержку webhook'а по полю event.created (unix timestamp)."""
+    if created:
+        STRIPE_WEBHOOK_LAG.observe(max(time.time() - created, 0.0), event_type=event_type)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: латентность HTTP-запросов по шаблону роута."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched") if route is not None else "unmatched",
+                status=status_holder["status"]
+            )
@@ -0,0 +1,245 @@
+"""
+Учёт SQL-запросов в разрезе HTTP-запроса.
+
+Подключается к engine через события SQLAlchemy (before/after_cursor_execute)
+и накапливает статистику в объекте QueryStats текущего контекста:
+- количество выполненных statement'ов
+- суммарное время в БД
+- самый медленный statement
+
+Используется:
+- QueryStatsMiddleware - заголовки X-DB-* (debug) и агрегаты по роутам (production)
+- assert_max_queries() - защита от N+1 регрессий в тестах
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from loguru import logger
+
+from config.settings import settings
+
+
+class QueryStats:
+    """
+    Статистика SQL-запросов одного HTTP-запроса (или блока кода).
+
+    Attributes:
+        count: Количество выполненных statement'ов
+        total_time: Суммарное время в БД (секунды)
+        slowest_time: Время самого медленного statement'а (секунды)
+        slowest_statement: SQL самого медленного statement'а
+
+    Один объект пишут несколько потоков сразу: контекст запроса копируется
+    в потоки threadpool (run_in_threadpool, параллельные чтения /summary),
+    поэтому обновления и чтения идут под lock.
+    """
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement", "_lock")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self._lock = Lock()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        """Учитывает один выполненный statement."""
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_statement = statement
+
+    def totals(self) -> Tuple[int, float]:
+        """Согласованная пара (количество, суммарное время в секундах)."""
+        with self._lock:
+            return self.count, self.total_time
+
+    def as_dict(self) -> Dict:
+        """Статистика в виде словаря (время в миллисекундах)."""
+        with self._lock:
+            return {
+                "query_count": self.count,
+                "db_time_ms": round(self.total_time * 1000, 2),
+                "slowest_ms": round(self.slowest_time * 1000, 2),
+                "slowest_statement": self.slowest_statement
+            }
+
+
+# Статистика текущего запроса. Объект мутируется, а не переустанавливается,
+# поэтому изменения видны и из threadpool (sync-зависимости FastAPI).
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+_START_TIMES_KEY = "query_stats_start_times"
+
+
+# ============================================================================
+# ENGINE EVENT HOOKS
+# ============================================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get(_START_TIMES_KEY)
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if elapsed * 1000 >= settings.db_slow_query_ms:
+        logger.warning("Slow SQL ({:.1f} ms): {}", elapsed * 1000, statement[:200])
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute не вызывается при ошибке - снимаем метку вручную
+    conn = exception_context.connection
+    if conn is not None:
+        start_times = conn.info.get(_START_TIMES_KEY)
+        if start_times:
+            start_times.pop()
+
+
+def install_query_stats(engine: Engine) -> None:
+    """
+    Подключает учёт запросов к engine. Повторный вызов ничего не делает.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def get_current_stats() -> Optional[QueryStats]:
+    """Статистика текущего запроса (None вне QueryStatsMiddleware/track_queries)."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Считает запросы, выполненные внутри блока.
+
+    Examples:
+        >>> with track_queries() as stats:
+        ...     WalletService.get_balance(db, 'user_123')
+        >>> print(stats.count)
+        8
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Тестовый помощник: падает, если блок выполнил больше max_queries запросов.
+
+    Examples:
+        >>> with assert_max_queries(8):
+        ...     WalletService.get_balance(db, 'user_123')
+
+    Raises:
+        AssertionError: Если количество запросов превысило max_queries
+    """
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= max_queries, (
+        f"Expected at most {max_queries} queries, got {stats.count} "
+        f"(slowest: {stats.slowest_statement})"
+    )
+
+
+# ============================================================================
+# PER-ROUTE TOTALS
+# ============================================================================
+
+_route_totals: Dict[str, Dict] = {}
+_route_totals_lock = Lock()
+
+
+def record_route_stats(route: str, stats: QueryStats) -> None:
+    """Добавляет статистику запроса в агрегаты по роуту."""
+    count, total_time = stats.totals()
+    with _route_totals_lock:
+        totals = _route_totals.get(route)
+        if totals is None:
+            totals = _route_totals[route] = {
+                "requests": 0,
+                "queries": 0,
+                "db_time": 0.0,
+                "max_queries": 0
+            }
+        totals["requests"] += 1
+        totals["queries"] += count
+        totals["db_time"] += total_time
+        if count > totals["max_queries"]:
+            totals["max_queries"] = count
+
+
+def get_route_query_totals() -> Dict[str, Dict]:
+    """Снимок агрегатов по роутам: {route: {requests, queries, db_time, max_queries}}."""
+    with _route_totals_lock:
+        return {route: dict(totals) for route, totals in _route_totals.items()}
+
+
+# ============================================================================
+# ASGI MIDDLEWARE
+# ============================================================================
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware: считает SQL-запросы каждого HTTP-запроса.
+
+    - expose_headers=True (debug): добавляет X-DB-Query-Count, X-DB-Time-Ms,
+      X-DB-Slowest-Ms в ответ
+    - всегда: накапливает агрегаты по шаблону роута (get_route_query_totals)
+    """
+
+    def __init__(self, app, expose_headers: bool = False):
+        self.app = app
+        self.expose_headers = expose_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.expose_headers:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()))
+                headers.append((b"x-db-slowest-ms", f"{stats.slowest_time * 1000:.2f}".encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                record_route_stats(getattr(route, "path", scope["path"]), stats)
@@ -0,0 +1,68 @@
+"""
+Корреляционный идентификатор запроса (X-Request-ID).
+
+RequestContextMiddleware берёт X-Request-ID из входящего запроса (например,
+от балансировщика) или генерирует новый, кладёт его в контекст loguru -
+все записи лога в рамках запроса получают extra["request_id"] - и
+возвращает его клиенту в заголовке ответа.
+"""
+
+import re
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from loguru import logger
+
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Принимаем только короткие безопасные значения, иначе генерируем свой id
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_current_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    """request_id текущего запроса (None вне RequestContextMiddleware)."""
+    return _current_request_id.get()
+
+
+def _extract_request_id(scope) -> str:
+    for name, value in scope.get("headers", []):
+        if name == REQUEST_ID_HEADER:
+            candidate = value.decode("latin-1")
+            if _VALID_REQUEST_ID.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware: request_id для логов и заголовок X-Request-ID в ответе.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _extract_request_id(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        token = _current_request_id.set(request_id)
+        try:
+            with logger.contextualize(request_id=request_id):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request_id.reset(token)
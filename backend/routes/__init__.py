@@ -1,7 +1,9 @@
 """Routes module."""
 from .wallet import router as wallet_router
 from .webhooks import router as webhook_router
+from .metrics import router as metrics_router
+from .health import router as health_router
 
-__all__ = ["wallet_router", "webhook_router"]
+__all__ = ["wallet_router", "webhook_router", "metrics_router", "health_router"]
 
 
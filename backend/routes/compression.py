@@ -0,0 +1,201 @@
+"""
+Сжатие ответов по Accept-Encoding (br, gzip).
+
+Страница /api/wallet/history и CSV отчёта внутри ответа /export - десятки
+килобайт JSON, которые хорошо сжимаются (в 5-10 раз). CompressionMiddleware:
+
+- выбирает кодировку по Accept-Encoding с учётом q: br, если установлен
+  пакет brotli, иначе gzip
+- сжимает только текстовые типы (JSON, CSV, HTML, CSS, JS) и ответы от
+  settings.compression_minimum_size байт - мелкие ответы дороже сжимать,
+  чем передавать
+- потоковые ответы (StreamingResponse) сжимает по частям: каждая часть
+  отправляется сразу (sync flush), ответ не копится в памяти
+- не трогает text/event-stream (события SSE должны уходить немедленно),
+  ответы с Content-Encoding (предварительно сжатая статика,
+  routes/static_files.py), 204/304 и HEAD
+- добавляет Vary: Accept-Encoding, сильный ETag сжатого ответа делает
+  слабым (W/) - байты ответа другие
+"""
+
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # pragma: no cover - зависит от окружения
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+EXCLUDED_TYPES = {"text/event-stream"}
+
+
+def available_encodings() -> tuple:
+    """Поддерживаемые кодировки в порядке предпочтения."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str, encodings: Optional[tuple] = None) -> Optional[str]:
+    """
+    Кодировка ответа по заголовку Accept-Encoding.
+
+    Args:
+        accept_encoding: Значение заголовка ("gzip, deflate, br;q=0.9")
+        encodings: Допустимые кодировки по предпочтению (по умолчанию available_encodings())
+
+    Returns:
+        str: "br", "gzip" или None - без сжатия
+
+    Examples:
+        >>> choose_encoding("gzip, br;q=0", ("br", "gzip"))
+        'gzip'
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    best = None
+    for encoding in encodings or available_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (encoding, weight)
+    return best[0] if best else None
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in EXCLUDED_TYPES:
+        return False
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: заголовок gzip
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(
+            zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        )
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self.compressor.process(data)
+        return output + (self.compressor.finish() if final else self.compressor.flush())
+
+
+class CompressionMiddleware:
+    """ASGI middleware: сжатие ответов br/gzip, в том числе потоковых."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Состояние одного ответа: решение о сжатии принимается по первой части тела."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.stream = None
+        self.decided = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.decided:
+            self.decided = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not self._should_compress(headers, body, more_body):
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+
+            if self.encoding == "br":
+                self.stream = _BrotliStream(self.middleware.brotli_quality)
+            else:
+                self.stream = _GzipStream(self.middleware.gzip_level)
+            data = self.stream.compress(body, final=not more_body)
+
+            headers["Content-Encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(data))
+            await self.downstream(self.start_message)
+            await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        if self.stream is None:
+            await self.downstream(message)
+            return
+
+        data = self.stream.compress(body, final=not more_body)
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        if self.start_message["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+        if not more_body and len(body) < self.middleware.minimum_size:
+            return False
+        # Ответ мог бы быть сжат - кэши должны различать его по Accept-Encoding
+        if "accept-encoding" not in headers.get("vary", "").lower():
+            headers.add_vary_header("Accept-Encoding")
+        return self.encoding is not None
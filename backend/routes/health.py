@@ -0,0 +1,55 @@
+"""
+Health check endpoints.
+
+Endpoints:
+- GET /health - Статус конфигурации сервиса
+- GET /health/live - Liveness: процесс жив (без I/O)
+- GET /health/ready - Readiness: БД, пул соединений, Stripe breaker (кэшируется)
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from config.settings import settings
+from models.database import engine
+from monitoring.health import check_readiness, readiness_cache
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("")
+async def health_check():
+    """Health check endpoint."""
+    return {
+        "status": "healthy",
+        "service": "wallet",
+        "stripe_configured": bool(settings.stripe_secret_key),
+        "webhook_configured": bool(settings.stripe_webhook_secret)
+    }
+
+
+@router.get("/live")
+async def liveness():
+    """
+    Liveness probe.
+    
+    Отвечает сразу, не трогая БД и Stripe: если event loop обслуживает
+    запросы, воркер жив.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def readiness():
+    """
+    Readiness probe для балансировщика.
+    
+    Проверяет соединение с БД, насыщение пула и состояние breaker'а Stripe.
+    Результат кэшируется на HEALTH_CACHE_TTL_SECONDS.
+    
+    Returns:
+        200: {"status": "ready" | "degraded", ...}
+        503: {"status": "not_ready", ...}
+    """
+    result = readiness_cache.get_or_compute(lambda: check_readiness(engine))
+    return JSONResponse(result, status_code=200 if result["ready"] else 503)
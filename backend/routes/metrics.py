@@ -0,0 +1,27 @@
+"""
+Endpoint метрик для Prometheus.
+
+Endpoints:
+- GET /metrics - Метрики в формате Prometheus text exposition
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from monitoring.metrics import REGISTRY
+
+router = APIRouter(tags=["monitoring"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Метрики процесса (латентность, пул БД, Stripe, webhooks, экспорт).
+
+    В multiprocess-режиме - сумма по всем воркерам; файлы воркеров
+    читаются в пуле потоков.
+    """
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
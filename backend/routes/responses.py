@@ -0,0 +1,115 @@
+"""
+Быстрый путь JSON-ответов API.
+
+По умолчанию FastAPI проверяет dict из сервиса по response_model,
+собирает из модели новый dict и сериализует его stdlib json: для
+страницы истории из 100 ставок и 100 транзакций это ~1.7 мс CPU на
+ответ (scripts/bench_responses.py).
+
+- FastJSONResponse - класс ответа по умолчанию (main.py): проверка по
+  response_model остаётся, сериализация - orjson
+- trusted_response() - для частых GET (/balance, /history), где dict
+  собирает WalletService ровно по полям схемы: без повторной проверки и
+  без dict -> model -> dict, сразу orjson. Поля схемы верхнего уровня
+  со значением по умолчанию, которых нет в dict (error: null),
+  дополняются - ответ совпадает с ответом через response_model
+  (tests/test_responses.py)
+- not_modified() / with_etag() - условный GET по ETag из
+  services/etag_service.py: совпадение с If-None-Match - 304 без тела
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from monitoring.metrics import CONDITIONAL_REQUESTS
+
+
+def _default(value: Any) -> Any:
+    """Типы, которые orjson не сериализует сам."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, сериализованный orjson (Decimal - как число)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _optional_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    return {
+        name: field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+        if not field.is_required()
+    }
+
+
+def trusted_response(model: Type[BaseModel], content: Dict, status_code: int = 200) -> FastJSONResponse:
+    """
+    Ответ из dict, уже собранного сервисом по схеме model, без повторной проверки.
+    
+    Args:
+        model: response_model роута (для значений по умолчанию)
+        content: Результат сервиса с полями model
+        status_code: HTTP код ответа
+    
+    Returns:
+        FastJSONResponse: Тот же JSON, что вернул бы роут через response_model
+    """
+    return FastJSONResponse({**_optional_defaults(model), **content}, status_code=status_code)
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    # Ответ личный и меняется: хранить можно, но перед использованием - перепроверить по ETag
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, etag: Optional[str], endpoint: str) -> Optional[Response]:
+    """
+    Ответ 304, если If-None-Match запроса совпадает с etag (слабое сравнение).
+    
+    Args:
+        request: Запрос
+        etag: Текущий ETag ответа (None - версии нет, проверка не выполняется)
+        endpoint: Имя эндпоинта для метрики conditional_requests_total
+    
+    Returns:
+        Response: 304 с ETag или None - нужно собрать полный ответ
+    """
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return None
+    
+    current = _opaque_tag(etag)
+    if any(tag.strip() == "*" or _opaque_tag(tag) == current for tag in header.split(",")):
+        CONDITIONAL_REQUESTS.inc(endpoint=endpoint, outcome="not_modified")
+        return Response(status_code=304, headers=_cache_headers(etag))
+    
+    CONDITIONAL_REQUESTS.inc(endpoint=endpoint, outcome="modified")
+    return None
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    """Добавляет ETag и Cache-Control к ответу (без etag - ответ без изменений)."""
+    if etag is not None:
+        response.headers.update(_cache_headers(etag))
+    return response
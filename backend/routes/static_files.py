@@ -0,0 +1,141 @@
+"""
+Статика веб-интерфейса (/static): предварительно сжатые файлы и
+долгое кэширование.
+
+- precompress_static() при старте пишет рядом с css/js/svg/html файлы
+  .br (если установлен пакет brotli) и .gz с максимальным сжатием -
+  один раз, а не на каждый запрос; устаревшие (старше исходника)
+  перезаписываются
+- PrecompressedStaticFiles отдаёт .br/.gz по Accept-Encoding с
+  Content-Encoding исходного типа, иначе - исходный файл (его сожмёт
+  CompressionMiddleware, routes/compression.py)
+- static_url() (шаблоны) добавляет к ссылке ?v=<хэш содержимого>: такие
+  запросы кэшируются на settings.static_max_age_seconds с immutable,
+  после изменения файла меняется ссылка. Запросы без v - Cache-Control:
+  no-cache (перепроверка по ETag)
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from config.settings import settings
+from routes.compression import available_encodings, brotli, choose_encoding
+
+STATIC_DIR = Path(__file__).parent.parent / "static"
+PRECOMPRESS_SUFFIXES = {".css", ".js", ".svg", ".html", ".json", ".txt"}
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def precompress_static(root: Path = STATIC_DIR, minimum_size: Optional[int] = None) -> int:
+    """
+    Пишет .br/.gz рядом с текстовыми файлами статики.
+
+    Args:
+        root: Каталог статики
+        minimum_size: Меньшие файлы не сжимаются (по умолчанию settings.compression_minimum_size)
+
+    Returns:
+        int: Количество записанных файлов (актуальные не перезаписываются)
+    """
+    minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+    written = 0
+    for source in root.rglob("*"):
+        if source.suffix not in PRECOMPRESS_SUFFIXES or not source.is_file():
+            continue
+        stat_result = source.stat()
+        if stat_result.st_size < minimum_size:
+            continue
+        data = None
+        for encoding in available_encodings():
+            target = source.with_name(source.name + ENCODING_SUFFIXES[encoding])
+            if target.exists() and target.stat().st_mtime >= stat_result.st_mtime:
+                continue
+            data = data if data is not None else source.read_bytes()
+            if encoding == "br":
+                compressed = brotli.compress(data, quality=11)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            # Запись через временный файл: несколько worker'ов стартуют одновременно
+            tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(compressed)
+            os.replace(tmp, target)
+            written += 1
+    return written
+
+
+@lru_cache(maxsize=256)
+def _content_version(path: str, mtime_ns: int) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:12]
+
+
+def static_url(path: str) -> str:
+    """
+    Ссылка на файл статики с версией по содержимому.
+
+    Examples:
+        >>> static_url("css/style.css")
+        '/static/css/style.css?v=5d41402abc4b'
+    """
+    full_path = STATIC_DIR / path
+    try:
+        version = _content_version(str(full_path), full_path.stat().st_mtime_ns)
+    except OSError:
+        return f"/static/{path}"
+    return f"/static/{path}?v={version}"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles с отдачей .br/.gz и Cache-Control по наличию версии в ссылке."""
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        versioned = "v" in parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        cache_control = (
+            f"public, max-age={settings.static_max_age_seconds}, immutable" if versioned else "no-cache"
+        )
+
+        response = None
+        source = Path(full_path)
+        if source.suffix in PRECOMPRESS_SUFFIXES:
+            encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+            variant = source.with_name(source.name + ENCODING_SUFFIXES[encoding]) if encoding else None
+            if variant is not None:
+                try:
+                    variant_stat = variant.stat()
+                except OSError:
+                    variant_stat = None
+                if variant_stat is not None and variant_stat.st_mtime >= stat_result.st_mtime:
+                    response = FileResponse(
+                        variant,
+                        status_code=status_code,
+                        stat_result=variant_stat,
+                        media_type=mimetypes.guess_type(source.name)[0] or "text/plain",
+                        headers={"Content-Encoding": encoding}
+                    )
+
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = cache_control
+        if source.suffix in PRECOMPRESS_SUFFIXES:
+            response.headers["Vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -3,9 +3,12 @@ API роуты для работы с кошельком.
 
 Endpoints:
 - GET /api/wallet/balance - Получение баланса
+- GET /api/wallet/events - Поток изменений баланса и операций (SSE)
+- GET /api/wallet/summary - Баланс, история, статистика и способы одним запросом
 - POST /api/wallet/deposit - Пополнение (новая карта)
 - POST /api/wallet/deposit-saved - Пополнение (сохранённая карта)
 - POST /api/wallet/withdraw - Вывод средств
+- POST /api/wallet/bets - Размещение ставки
 - GET /api/wallet/history - История операций
 - GET /api/wallet/export - Экспорт отчёта
 - GET /api/wallet/payment-methods - Список способов оплаты
@@ -13,23 +16,47 @@ Endpoints:
 - DELETE /api/wallet/payment-methods/{id} - Удалить способ оплаты
 - GET /api/wallet/withdrawal-methods - Список способов вывода
 - POST /api/wallet/withdrawal-methods - Добавить способ вывода
+
+POST /deposit и /withdraw принимают заголовок Idempotency-Key: повтор
+с тем же ключом возвращает сохранённый ответ (заголовок
+Idempotent-Replayed: true) и не выполняет операцию второй раз
+(services/idempotency_service.py).
+
+GET /balance, /history, /payment-methods и /withdrawal-methods отдают
+ETag; запрос с совпадающим If-None-Match получает 304 без тела - версия
+проверяется одним запросом по индексу (services/etag_service.py).
+Одновременные одинаковые чтения баланса и истории одного пользователя
+выполняются в БД один раз (services/single_flight.py).
 """
 
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Type
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from loguru import logger
 
-from models.database import get_db
+from models.database import get_db, get_read_db, replica_router
 from models.orm_models import User, PaymentMethod, WithdrawalMethod
+from config.settings import settings
 from services.wallet_service import WalletService
 from services.stripe_service import StripeService
+from services.idempotency_service import IdempotencyService
+from services.wallet_events import WALLET_EVENTS, event_stream
+from services.etag_service import ETagService
+from routes.responses import trusted_response, not_modified, with_etag
 from schemas.wallet_schemas import (
     BalanceResponse,
     DepositRequest,
     DepositResponse,
     WithdrawRequest,
     WithdrawResponse,
+    PlaceBetRequest,
+    PlaceBetResponse,
     HistoryFilters,
     HistoryResponse,
     ExportRequest,
@@ -40,6 +67,8 @@ from schemas.wallet_schemas import (
     WithdrawalMethodCreate,
     WithdrawalMethodsListResponse,
     WithdrawalMethodInfo,
+    SummaryResponse,
+    SUMMARY_FIELDS,
     ErrorResponse
 )
 
@@ -68,6 +97,76 @@ def get_current_user_id(request: Request) -> str:
     return user_id
 
 
+def get_user_read_db(request: Request):
+    """
+    Сессия для read-only endpoints: чтения идут на реплику.
+    
+    Пользователь, недавно менявший баланс или способы оплаты, читает с primary.
+    """
+    yield from get_read_db(request.headers.get("X-User-ID"))
+
+
+def run_idempotent(
+    request: Request,
+    db: Session,
+    user_id: str,
+    endpoint: str,
+    payload: Dict[str, Any],
+    response_model: Type[BaseModel],
+    handler: Callable[[Optional[str]], Dict]
+):
+    """
+    Выполняет handler не больше одного раза на заголовок Idempotency-Key.
+    
+    Без заголовка handler выполняется как обычно. С заголовком ответ
+    (успех или ошибка 4xx) сохраняется, повтор получает его же;
+    ошибка 5xx или исключение снимают резерв, и повтор выполнится заново.
+    
+    Args:
+        endpoint: Имя эндпоинта ("deposit", "withdraw")
+        payload: Тело запроса - повтор с другим телом отклоняется (422)
+        response_model: Схема ответа, по которой сохраняется тело
+        handler: Выполняет запрос, получает Idempotency-Key (или None)
+    
+    Raises:
+        HTTPException: 400 - некорректный ключ, 409 - запрос с ключом ещё
+            выполняется, 422 - ключ использован с другим запросом
+    """
+    key = request.headers.get("Idempotency-Key")
+    if key is None:
+        return handler(None)
+    if not key or len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1-255 characters")
+    
+    started = IdempotencyService.begin(db, user_id, key, endpoint, payload)
+    if started["state"] == "replay":
+        return JSONResponse(
+            status_code=started["status_code"],
+            content=started["body"],
+            headers={"Idempotent-Replayed": "true"}
+        )
+    if started["state"] == "in_progress":
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+    if started["state"] == "mismatch":
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    
+    try:
+        result = handler(key)
+    except HTTPException as e:
+        if e.status_code < 500:
+            IdempotencyService.complete(db, user_id, key, e.status_code, jsonable_encoder({"detail": e.detail}))
+        else:
+            IdempotencyService.release(db, user_id, key)
+        raise
+    except Exception:
+        IdempotencyService.release(db, user_id, key)
+        raise
+    
+    body = jsonable_encoder(response_model(**result))
+    IdempotencyService.complete(db, user_id, key, 200, body)
+    return body
+
+
 # ============================================================================
 # BALANCE ENDPOINTS
 # ============================================================================
@@ -95,12 +194,51 @@ async def get_balance(
         }
     """
     user_id = get_current_user_id(request)
-    result = WalletService.get_balance(db, user_id)
+    etag = ETagService.balance(db, user_id)
+    unchanged = not_modified(request, etag, "balance")
+    if unchanged:
+        return unchanged
+    
+    # В пуле потоков: одновременные запросы пользователя объединяются в WalletService
+    result = await run_in_threadpool(WalletService.get_balance, db, user_id)
     
     if not result['success']:
         raise HTTPException(status_code=404, detail=result.get('error', 'User not found'))
     
-    return result
+    return with_etag(trusted_response(BalanceResponse, result), etag)
+
+
+@router.get("/events")
+async def stream_events(request: Request):
+    """
+    Поток Server-Sent Events с изменениями баланса и операций пользователя.
+    
+    Соединение не держит сессию БД: события приходят из WalletService и
+    webhook'ов этого процесса. При подключении и после resync клиент
+    перечитывает /balance.
+    
+    Events:
+        ready - поток открыт
+        balance - {"balance": 5100.0}
+        operation - {"operation_id": 42, "operation_type": "deposit",
+            "status": "completed", "amount": 100.0}
+        resync - события были отброшены, нужно перечитать баланс
+    
+    Raises:
+        HTTPException: 503 - исчерпан лимит подключений процесса
+    """
+    user_id = get_current_user_id(request)
+    subscription = WALLET_EVENTS.subscribe(user_id)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many event stream connections")
+    
+    return StreamingResponse(
+        event_stream(subscription, settings.sse_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Отписка и в случае, когда клиент ушёл до первого сообщения
+        background=BackgroundTask(WALLET_EVENTS.unsubscribe, subscription)
+    )
 
 
 # ============================================================================
@@ -108,7 +246,7 @@ async def get_balance(
 # ============================================================================
 
 @router.post("/deposit", response_model=DepositResponse)
-async def create_deposit(
+def create_deposit(
     request: Request,
     deposit: DepositRequest,
     db: Session = Depends(get_db)
@@ -116,6 +254,9 @@ async def create_deposit(
     """
     Создаёт запрос на пополнение баланса.
     
+    Синхронный обработчик: запросы к Stripe, блокировка строки баланса и
+    работа с Idempotency-Key выполняются в пуле потоков, не в event loop.
+    
     Если stripe_payment_method_id не указан:
     - Возвращает client_secret для формы оплаты Stripe
     
@@ -127,24 +268,33 @@ async def create_deposit(
     
     Returns:
         DepositResponse: client_secret для формы или результат платежа
+    
+    Headers:
+        Idempotency-Key: повтор с тем же ключом вернёт тот же ответ и не
+            создаст второй платёж (ключ передаётся и в Stripe)
     """
     user_id = get_current_user_id(request)
     ip_address = get_client_ip(request)
     
-    result = WalletService.replenish_balance(
-        db=db,
-        user_id=user_id,
-        amount=deposit.amount,
-        stripe_payment_method_id=deposit.stripe_payment_method_id,
-        payment_method=deposit.payment_method,
-        save_method=deposit.save_method,
-        ip_address=ip_address
-    )
-    
-    if not result['success']:
-        raise HTTPException(status_code=400, detail=result.get('error', 'Deposit failed'))
+    def deposit_once(idempotency_key: Optional[str]) -> Dict:
+        result = WalletService.replenish_balance(
+            db=db,
+            user_id=user_id,
+            amount=deposit.amount,
+            stripe_payment_method_id=deposit.stripe_payment_method_id,
+            payment_method=deposit.payment_method,
+            save_method=deposit.save_method,
+            ip_address=ip_address,
+            idempotency_key=idempotency_key
+        )
+        
+        if not result['success']:
+            raise HTTPException(status_code=400, detail=result.get('error', 'Deposit failed'))
+        
+        replica_router.mark_write(user_id)
+        return result
     
-    return result
+    return run_idempotent(request, db, user_id, "deposit", deposit.model_dump(), DepositResponse, deposit_once)
 
 
 # ============================================================================
@@ -152,7 +302,7 @@ async def create_deposit(
 # ============================================================================
 
 @router.post("/withdraw", response_model=WithdrawResponse)
-async def create_withdrawal(
+def create_withdrawal(
     request: Request,
     withdrawal: WithdrawRequest,
     db: Session = Depends(get_db)
@@ -160,6 +310,9 @@ async def create_withdrawal(
     """
     Создаёт запрос на вывод средств.
     
+    Синхронный обработчик: блокировка строки баланса и работа с
+    Idempotency-Key выполняются в пуле потоков, не в event loop.
+    
     Деньги вычитаются из баланса СРАЗУ (статус: pending).
     Фактический вывод обрабатывается позже администратором.
     
@@ -174,34 +327,99 @@ async def create_withdrawal(
         - Максимум: 100000.00 USD за раз
         - Дневной лимит: 50000.00 USD
         - Способ вывода должен быть верифицирован
+    
+    Headers:
+        Idempotency-Key: повтор с тем же ключом вернёт тот же ответ и не
+            спишет сумму второй раз
     """
     user_id = get_current_user_id(request)
     ip_address = get_client_ip(request)
     
-    result = WalletService.withdraw_funds(
+    def withdraw_once(idempotency_key: Optional[str]) -> Dict:
+        result = WalletService.withdraw_funds(
+            db=db,
+            user_id=user_id,
+            amount=withdrawal.amount,
+            withdrawal_method_id=withdrawal.withdrawal_method_id,
+            reason=withdrawal.reason,
+            ip_address=ip_address,
+            idempotency_key=idempotency_key
+        )
+        
+        if not result['success']:
+            error = result.get('error', 'Withdrawal failed')
+            status_code = 400
+            
+            if error == "Insufficient balance":
+                status_code = 400
+            elif error == "Withdrawal method not found":
+                status_code = 404
+            elif error == "Withdrawal method not verified":
+                status_code = 403
+            elif error == "Daily withdrawal limit exceeded":
+                status_code = 429
+            
+            raise HTTPException(status_code=status_code, detail=result)
+        
+        replica_router.mark_write(user_id)
+        return result
+    
+    return run_idempotent(request, db, user_id, "withdraw", withdrawal.model_dump(), WithdrawResponse, withdraw_once)
+
+
+# ============================================================================
+# BET ENDPOINTS
+# ============================================================================
+
+@router.post("/bets", response_model=PlaceBetResponse)
+def place_bet(
+    request: Request,
+    bet: PlaceBetRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Размещает ставку с резервом суммы на балансе.
+    
+    Синхронный обработчик: FastAPI выполняет его в пуле потоков, поэтому
+    ожидание блокировки строки баланса не останавливает event loop.
+    
+    Args:
+        bet: PlaceBetRequest с событием, исходом, суммой и коэффициентом
+    
+    Returns:
+        PlaceBetResponse: Созданная ставка и доступный остаток
+    
+    Business Rules:
+        - Минимум: 1.00 USD, максимум: 100000.00 USD
+        - Сумма ставки не может превышать доступный баланс
+          (баланс минус открытые ставки)
+    """
+    user_id = get_current_user_id(request)
+    ip_address = get_client_ip(request)
+    
+    result = WalletService.place_bet(
         db=db,
         user_id=user_id,
-        amount=withdrawal.amount,
-        withdrawal_method_id=withdrawal.withdrawal_method_id,
-        reason=withdrawal.reason,
+        event_id=bet.event_id,
+        odds_id=bet.odds_id,
+        bet_amount=bet.bet_amount,
+        coefficient=bet.coefficient,
+        bet_type=bet.bet_type,
         ip_address=ip_address
     )
     
     if not result['success']:
-        error = result.get('error', 'Withdrawal failed')
+        error = result.get('error', 'Bet placement failed')
         status_code = 400
         
-        if error == "Insufficient balance":
-            status_code = 400
-        elif error == "Withdrawal method not found":
+        if error == "Balance record not found":
             status_code = 404
-        elif error == "Withdrawal method not verified":
-            status_code = 403
-        elif error == "Daily withdrawal limit exceeded":
-            status_code = 429
+        elif error == "Unexpected error":
+            status_code = 500
         
         raise HTTPException(status_code=status_code, detail=result)
     
+    replica_router.mark_write(user_id)
     return result
 
 
@@ -219,7 +437,7 @@ async def get_history(
     date_from: Optional[str] = Query(None, description="Начальная дата (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Конечная дата (YYYY-MM-DD)"),
     transaction_type: Optional[str] = Query(None, description="Тип транзакции"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
     """
     Получает историю ставок и транзакций с фильтрацией и пагинацией.
@@ -237,6 +455,12 @@ async def get_history(
         HistoryResponse: Ставки, транзакции, статистика, пагинация
     """
     user_id = get_current_user_id(request)
+    etag = ETagService.history(
+        db, user_id, (limit, offset, status, result, date_from, date_to, transaction_type)
+    )
+    unchanged = not_modified(request, etag, "history")
+    if unchanged:
+        return unchanged
     
     filters = {}
     if status:
@@ -250,7 +474,8 @@ async def get_history(
     if transaction_type:
         filters['transaction_type'] = transaction_type
     
-    history_result = WalletService.get_bet_history(
+    history_result = await run_in_threadpool(
+        WalletService.get_bet_history,
         db=db,
         user_id=user_id,
         limit=limit,
@@ -261,7 +486,7 @@ async def get_history(
     if not history_result['success']:
         raise HTTPException(status_code=500, detail=history_result.get('error', 'Failed to get history'))
     
-    return history_result
+    return with_etag(trusted_response(HistoryResponse, history_result), etag)
 
 
 # ============================================================================
@@ -269,14 +494,17 @@ async def get_history(
 # ============================================================================
 
 @router.post("/export", response_model=ExportResponse)
-async def export_report(
+def export_report(
     request: Request,
     export_request: ExportRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
     """
     Экспортирует отчёт в CSV или PDF.
     
+    Синхронный обработчик: выборка за период, чтение архива и сборка
+    файла выполняются в пуле потоков, не в event loop.
+    
     Args:
         export_request: Параметры экспорта
     
@@ -295,7 +523,8 @@ async def export_report(
         include_bets=export_request.include_bets,
         include_transactions=export_request.include_transactions,
         include_statistics=export_request.include_statistics,
-        ip_address=ip_address
+        ip_address=ip_address,
+        include_archived=export_request.include_archived
     )
     
     if not result['success']:
@@ -305,7 +534,7 @@ async def export_report(
 
 
 @router.get("/export", response_model=ExportResponse)
-async def export_report_get(
+def export_report_get(
     request: Request,
     format: str = Query("csv", description="Формат: csv или pdf"),
     date_from: Optional[str] = Query(None, description="Начальная дата"),
@@ -313,10 +542,13 @@ async def export_report_get(
     include_bets: bool = Query(True),
     include_transactions: bool = Query(True),
     include_statistics: bool = Query(True),
-    db: Session = Depends(get_db)
+    include_archived: bool = Query(False, description="Включить месяцы из архива"),
+    db: Session = Depends(get_user_read_db)
 ):
     """
     Экспортирует отчёт (GET версия для простоты).
+    
+    Синхронный обработчик, как и POST /export.
     """
     user_id = get_current_user_id(request)
     ip_address = get_client_ip(request)
@@ -330,7 +562,8 @@ async def export_report_get(
         include_bets=include_bets,
         include_transactions=include_transactions,
         include_statistics=include_statistics,
-        ip_address=ip_address
+        ip_address=ip_address,
+        include_archived=include_archived
     )
     
     if not result['success']:
@@ -346,7 +579,8 @@ async def export_report_get(
 @router.get("/payment-methods", response_model=PaymentMethodsListResponse)
 async def get_payment_methods(
     request: Request,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_user_read_db)
 ):
     """
     Получает список сохранённых способов оплаты.
@@ -355,6 +589,11 @@ async def get_payment_methods(
         PaymentMethodsListResponse: Список способов оплаты
     """
     user_id = get_current_user_id(request)
+    etag = ETagService.payment_methods(db, user_id)
+    unchanged = not_modified(request, etag, "payment_methods")
+    if unchanged:
+        return unchanged  # без запроса к Stripe
+    with_etag(response, etag)
     
     # Получаем пользователя
     user = db.query(User).filter(User.id == user_id).first()
@@ -372,6 +611,14 @@ async def get_payment_methods(
     # Получаем методы из Stripe
     stripe_result = StripeService.get_payment_methods(user.stripe_customer_id)
     
+    return {
+        "success": True,
+        "payment_methods": _payment_method_list(db, user_id, stripe_result)
+    }
+
+
+def _payment_method_list(db: Session, user_id: str, stripe_result: Dict) -> List[PaymentMethodResponse]:
+    """Способы оплаты из ответа Stripe, дополненные записями payment_methods."""
     # Получаем методы из БД для дополнительной информации
     db_methods = db.query(PaymentMethod).filter(
         PaymentMethod.user_id == user_id,
@@ -396,10 +643,7 @@ async def get_payment_methods(
         )
         payment_methods.append(method_response)
     
-    return {
-        "success": True,
-        "payment_methods": payment_methods
-    }
+    return payment_methods
 
 
 @router.post("/payment-methods", response_model=PaymentMethodResponse)
@@ -473,6 +717,7 @@ async def add_payment_method(
     db.add(new_method)
     db.commit()
     db.refresh(new_method)
+    replica_router.mark_write(user_id)
     
     return PaymentMethodResponse(
         method_id=new_method.method_id,
@@ -520,11 +765,12 @@ async def delete_payment_method(
     stripe_result = StripeService.delete_payment_method(method.stripe_payment_method_id)
     
     if not stripe_result['success']:
-        logger.warning(f"Failed to delete payment method from Stripe: {stripe_result.get('error')}")
+        logger.warning("Failed to delete payment method from Stripe: {}", stripe_result.get('error'))
     
     # Помечаем как неактивный в БД
     method.is_active = False
     db.commit()
+    replica_router.mark_write(user_id)
     
     return {"success": True, "message": "Payment method deleted"}
 
@@ -536,7 +782,8 @@ async def delete_payment_method(
 @router.get("/withdrawal-methods", response_model=WithdrawalMethodsListResponse)
 async def get_withdrawal_methods(
     request: Request,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_user_read_db)
 ):
     """
     Получает список способов вывода.
@@ -545,7 +792,20 @@ async def get_withdrawal_methods(
         WithdrawalMethodsListResponse: Список способов вывода
     """
     user_id = get_current_user_id(request)
+    etag = ETagService.withdrawal_methods(db, user_id)
+    unchanged = not_modified(request, etag, "withdrawal_methods")
+    if unchanged:
+        return unchanged
+    with_etag(response, etag)
     
+    return {
+        "success": True,
+        "withdrawal_methods": _withdrawal_method_list(db, user_id)
+    }
+
+
+def _withdrawal_method_list(db: Session, user_id: str) -> List[WithdrawalMethodInfo]:
+    """Способы вывода пользователя (номера счетов замаскированы)."""
     methods = db.query(WithdrawalMethod).filter(
         WithdrawalMethod.user_id == user_id
     ).all()
@@ -567,10 +827,7 @@ async def get_withdrawal_methods(
         )
         withdrawal_methods.append(method_info)
     
-    return {
-        "success": True,
-        "withdrawal_methods": withdrawal_methods
-    }
+    return withdrawal_methods
 
 
 @router.post("/withdrawal-methods", response_model=WithdrawalMethodInfo)
@@ -622,6 +879,7 @@ async def add_withdrawal_method(
     db.add(new_method)
     db.commit()
     db.refresh(new_method)
+    replica_router.mark_write(user_id)
     
     return WithdrawalMethodInfo(
         method_id=new_method.method_id,
@@ -665,7 +923,101 @@ async def delete_withdrawal_method(
     
     db.delete(method)
     db.commit()
+    replica_router.mark_write(user_id)
     
     return {"success": True, "message": "Withdrawal method deleted"}
 
 
+# ============================================================================
+# SUMMARY ENDPOINT
+# ============================================================================
+
+@router.get("/summary", response_model=SummaryResponse, response_model_exclude_unset=True)
+async def get_summary(
+    request: Request,
+    fields: Optional[str] = Query(
+        None, description="Разделы через запятую: " + ",".join(SUMMARY_FIELDS) + " (по умолчанию все)"
+    ),
+    history_limit: int = Query(20, ge=1, le=100, description="Размер первой страницы истории"),
+    db: Session = Depends(get_db)
+):
+    """
+    Данные главной страницы одним запросом вместо /balance, /history,
+    /payment-methods и /withdrawal-methods.
+    
+    Пользователь загружается один раз, все разделы читаются одной сессией
+    (одно соединение из пула). Запрос способов оплаты к Stripe идёт
+    параллельно с запросами к БД - сессия SQLAlchemy не выполняет
+    запросы одновременно, а ожидание сети их не задерживает.
+    
+    Args:
+        fields: Нужные разделы - в ответе только они, остальные не считаются
+        history_limit: Ставок и транзакций на первой странице истории
+    
+    Returns:
+        SummaryResponse: {"success": true, "balance": {...}, "history": {...}, ...}
+    
+    Raises:
+        HTTPException: 400 - неизвестный раздел в fields, 404 - пользователь не найден
+    """
+    user_id = get_current_user_id(request)
+    
+    selected = set(SUMMARY_FIELDS)
+    if fields:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected.difference(SUMMARY_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown summary fields: {', '.join(sorted(unknown))}"
+            )
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # До запуска потоков: дальше сессией пользуется только read_database
+    stripe_customer_id = user.stripe_customer_id
+    
+    def read_database() -> Dict:
+        sections = {}
+        if "balance" in selected:
+            balance = WalletService.get_balance(db, user_id, user=user)
+            if not balance['success']:
+                raise HTTPException(status_code=500, detail=balance.get('error', 'Failed to get balance'))
+            balance.pop('success')
+            sections["balance"] = balance
+        
+        if "history" in selected or "statistics" in selected:
+            history = WalletService.get_bet_history(db, user_id, limit=history_limit)
+            if not history['success']:
+                raise HTTPException(status_code=500, detail=history.get('error', 'Failed to get history'))
+            if "history" in selected:
+                sections["history"] = {
+                    "bets": history['bets'],
+                    "transactions": history['transactions'],
+                    "pagination": history['pagination']
+                }
+            if "statistics" in selected:
+                sections["statistics"] = history['statistics']
+        
+        if "withdrawal_methods" in selected:
+            sections["withdrawal_methods"] = _withdrawal_method_list(db, user_id)
+        return sections
+    
+    async def fetch_stripe_methods() -> Optional[Dict]:
+        if "payment_methods" not in selected or not stripe_customer_id:
+            return None
+        return await run_in_threadpool(StripeService.get_payment_methods, stripe_customer_id)
+    
+    sections, stripe_result = await asyncio.gather(run_in_threadpool(read_database), fetch_stripe_methods())
+    
+    if "payment_methods" in selected:
+        sections["payment_methods"] = (
+            _payment_method_list(db, user_id, stripe_result) if stripe_result is not None else []
+        )
+    
+    return {"success": True, **sections}
+
+
@@ -7,6 +7,13 @@ Webhook обработчик для Stripe.
 - payment_intent.payment_failed - Платёж ошибка
 - payment_intent.requires_action - Требует 3D Secure
 - payment_intent.processing - Платёж обрабатывается
+
+После commit изменения операции и баланса публикуются открытым потокам
+GET /api/wallet/events (services/wallet_events.py).
+
+Обработчики событий синхронные и выполняются в пуле потоков: они работают
+с sync Session и ждут блокировку строки операции (FOR UPDATE), пока её
+держит сверка, - event loop при этом обслуживает остальные запросы.
 """
 
 from datetime import datetime
@@ -14,14 +21,19 @@ from decimal import Decimal
 import json
 
 from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from loguru import logger
 
-from models.database import get_db
+from config.logging_config import sampled_logger
+from models.database import get_db, replica_router
 from models.orm_models import (
     User, UserBalance, BalanceTransaction, WalletOperation, AuditLog
 )
 from services.stripe_service import StripeService
+from services.ledger_service import LedgerService, CONTRA_STRIPE
+from services.wallet_events import operation_event, publish_wallet_update
+from monitoring.metrics import observe_webhook_lag
 
 router = APIRouter(prefix="/api/webhook", tags=["webhooks"])
 
@@ -52,55 +64,56 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
         result = StripeService.construct_webhook_event(body, sig_header)
         
         if not result['success']:
-            logger.error(f"Invalid Stripe signature: {result['error']}")
+            logger.error("Invalid Stripe signature: {}", result['error'])
             raise HTTPException(status_code=400, detail=result['error'])
         
         event = result['event']
         event_type = event['type']
         
         # 3. Логируем получение webhook
-        logger.info(f"Received Stripe webhook: {event_type}")
+        sampled_logger.info("Received Stripe webhook: {}", event_type)
+        observe_webhook_lag(event_type, event.get('created'))
         
         # 4. Обрабатываем разные события
         
         # EVENT 1: Платёж успешен!
         if event_type == 'payment_intent.succeeded':
-            await _handle_payment_succeeded(db, event['data']['object'])
+            await run_in_threadpool(_handle_payment_succeeded, db, event['data']['object'])
             return {"status": "success", "event": event_type}
         
         # EVENT 2: Платёж ошибка
         elif event_type == 'payment_intent.payment_failed':
-            await _handle_payment_failed(db, event['data']['object'])
+            await run_in_threadpool(_handle_payment_failed, db, event['data']['object'])
             return {"status": "success", "event": event_type}
         
         # EVENT 3: Требует 3D Secure подтверждения
         elif event_type == 'payment_intent.requires_action':
-            await _handle_requires_action(db, event['data']['object'])
+            await run_in_threadpool(_handle_requires_action, db, event['data']['object'])
             return {"status": "success", "event": event_type}
         
         # EVENT 4: Платёж обработан
         elif event_type == 'payment_intent.processing':
-            await _handle_processing(db, event['data']['object'])
+            await run_in_threadpool(_handle_processing, db, event['data']['object'])
             return {"status": "success", "event": event_type}
         
         # EVENT 5: Платёж отменён
         elif event_type == 'payment_intent.canceled':
-            await _handle_canceled(db, event['data']['object'])
+            await run_in_threadpool(_handle_canceled, db, event['data']['object'])
             return {"status": "success", "event": event_type}
         
         # Неизвестное событие
         else:
-            logger.warning(f"Unhandled Stripe event type: {event_type}")
+            logger.warning("Unhandled Stripe event type: {}", event_type)
             return {"status": "received", "event": event_type}
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Webhook processing error: {str(e)}")
+        logger.error("Webhook processing error: {}", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _handle_payment_succeeded(db: Session, payment_intent: dict):
+def _handle_payment_succeeded(db: Session, payment_intent: dict):
     """
     Обрабатывает успешный платёж.
     
@@ -111,27 +124,27 @@ async def _handle_payment_succeeded(db: Session, payment_intent: dict):
     """
     intent_id = payment_intent['id']
     user_id = payment_intent.get('metadata', {}).get('user_id')
-    amount = payment_intent['amount'] / 100  # Из центов в доллары
+    amount = Decimal(payment_intent['amount']) / 100  # Из центов в доллары
     charge_id = payment_intent.get('latest_charge')
     
-    logger.info(f"Payment succeeded: {intent_id} for user {user_id}, amount: ${amount}")
+    logger.info("Payment succeeded: {} for user {}, amount: ${}", intent_id, user_id, amount)
     
     if not user_id:
-        logger.warning(f"Payment intent {intent_id} has no user_id in metadata")
+        logger.warning("Payment intent {} has no user_id in metadata", intent_id)
         return
     
-    # Находим операцию
+    # Находим операцию (FOR UPDATE: параллельно её может закрывать сверка)
     operation = db.query(WalletOperation).filter(
         WalletOperation.stripe_payment_intent_id == intent_id
-    ).first()
+    ).with_for_update().first()
     
     if not operation:
-        logger.warning(f"No operation found for payment intent {intent_id}")
+        logger.warning("No operation found for payment intent {}", intent_id)
         return
     
     # Если уже обработано - пропускаем
     if operation.status == 'completed':
-        logger.info(f"Operation {operation.operation_id} already completed")
+        logger.info("Operation {} already completed", operation.operation_id)
         return
     
     # Обновляем операцию
@@ -143,23 +156,24 @@ async def _handle_payment_succeeded(db: Session, payment_intent: dict):
     balance = db.query(UserBalance).filter(
         UserBalance.user_id == user_id
     ).first()
+    balance_after = None
     
     if balance:
-        balance_before = float(balance.balance)
-        balance_after = balance_before + amount
-        
-        # Обновляем баланс
-        balance.balance = Decimal(str(balance_after))
-        balance.total_deposited = Decimal(str(float(balance.total_deposited or 0) + amount))
-        balance.last_transaction = datetime.utcnow()
+        # Обновляем баланс проводкой в журнал: баланс и total_deposited одной командой
+        entry = LedgerService.post(
+            db, user_id, amount, 'deposit', CONTRA_STRIPE,
+            reference_type='operation', reference_id=operation.operation_id,
+            totals={"total_deposited": amount}
+        )
+        balance_after = entry.balance_after
         
         # Записываем транзакцию
         transaction = BalanceTransaction(
             user_id=user_id,
             transaction_type='deposit',
-            amount=Decimal(str(amount)),
-            balance_before=Decimal(str(balance_before)),
-            balance_after=Decimal(str(balance_after)),
+            amount=amount,
+            balance_before=entry.balance_before,
+            balance_after=entry.balance_after,
             status='completed',
             stripe_payment_intent_id=intent_id,
             stripe_charge_id=charge_id,
@@ -177,17 +191,20 @@ async def _handle_payment_succeeded(db: Session, payment_intent: dict):
     audit_log = AuditLog(
         user_id=user_id,
         action="stripe_webhook_received",
-        amount=Decimal(str(amount)),
+        amount=amount,
         status="success",
         details=json.dumps(details_data) if details_data else None
     )
     db.add(audit_log)
     
+    event = operation_event(operation)
     db.commit()
-    logger.info(f"Successfully processed payment {intent_id} for user {user_id}")
+    replica_router.mark_write(user_id)
+    publish_wallet_update(user_id, operation=event, balance=balance_after)
+    logger.info("Successfully processed payment {} for user {}", intent_id, user_id)
 
 
-async def _handle_payment_failed(db: Session, payment_intent: dict):
+def _handle_payment_failed(db: Session, payment_intent: dict):
     """
     Обрабатывает неудачный платёж.
     
@@ -201,10 +218,10 @@ async def _handle_payment_failed(db: Session, payment_intent: dict):
     error = payment_intent.get('last_payment_error', {})
     error_message = error.get('message', 'Payment failed')
     
-    logger.error(f"Payment failed: {intent_id} for user {user_id}, error: {error_message}")
+    logger.error("Payment failed: {} for user {}, error: {}", intent_id, user_id, error_message)
     
     if not user_id:
-        logger.warning(f"Payment intent {intent_id} has no user_id in metadata")
+        logger.warning("Payment intent {} has no user_id in metadata", intent_id)
         return
     
     # Находим операцию
@@ -230,11 +247,14 @@ async def _handle_payment_failed(db: Session, payment_intent: dict):
     )
     db.add(audit_log)
     
+    event = operation_event(operation) if operation else None
     db.commit()
-    logger.info(f"Processed failed payment {intent_id} for user {user_id}")
+    replica_router.mark_write(user_id)
+    publish_wallet_update(user_id, operation=event)
+    logger.info("Processed failed payment {} for user {}", intent_id, user_id)
 
 
-async def _handle_requires_action(db: Session, payment_intent: dict):
+def _handle_requires_action(db: Session, payment_intent: dict):
     """
     Обрабатывает платёж, требующий 3D Secure подтверждения.
     
@@ -243,7 +263,7 @@ async def _handle_requires_action(db: Session, payment_intent: dict):
     intent_id = payment_intent['id']
     user_id = payment_intent.get('metadata', {}).get('user_id')
     
-    logger.info(f"Payment requires action: {intent_id} for user {user_id}")
+    logger.info("Payment requires action: {} for user {}", intent_id, user_id)
     
     if user_id:
         details_data = {
@@ -260,7 +280,7 @@ async def _handle_requires_action(db: Session, payment_intent: dict):
         db.commit()
 
 
-async def _handle_processing(db: Session, payment_intent: dict):
+def _handle_processing(db: Session, payment_intent: dict):
     """
     Обрабатывает платёж в процессе обработки.
     
@@ -269,7 +289,7 @@ async def _handle_processing(db: Session, payment_intent: dict):
     intent_id = payment_intent['id']
     user_id = payment_intent.get('metadata', {}).get('user_id')
     
-    logger.info(f"Payment processing: {intent_id} for user {user_id}")
+    logger.info("Payment processing: {} for user {}", intent_id, user_id)
     
     if user_id:
         details_data = {
@@ -286,14 +306,14 @@ async def _handle_processing(db: Session, payment_intent: dict):
         db.commit()
 
 
-async def _handle_canceled(db: Session, payment_intent: dict):
+def _handle_canceled(db: Session, payment_intent: dict):
     """
     Обрабатывает отменённый платёж.
     """
     intent_id = payment_intent['id']
     user_id = payment_intent.get('metadata', {}).get('user_id')
     
-    logger.info(f"Payment canceled: {intent_id} for user {user_id}")
+    logger.info("Payment canceled: {} for user {}", intent_id, user_id)
     
     if not user_id:
         return
@@ -319,6 +339,8 @@ async def _handle_canceled(db: Session, payment_intent: dict):
     )
     db.add(audit_log)
     
+    event = operation_event(operation) if operation else None
     db.commit()
+    publish_wallet_update(user_id, operation=event)
 
 
@@ -10,7 +10,8 @@ from .wallet_schemas import (
     ExportRequest,
     ExportResponse,
     PaymentMethodResponse,
-    PaymentMethodCreate
+    PaymentMethodCreate,
+    SummaryResponse
 )
 
 __all__ = [
@@ -24,7 +25,8 @@ __all__ = [
     "ExportRequest",
     "ExportResponse",
     "PaymentMethodResponse",
-    "PaymentMethodCreate"
+    "PaymentMethodCreate",
+    "SummaryResponse"
 ]
 
 
@@ -308,6 +308,63 @@ class HistoryResponse(BaseModel):
     error: Optional[str] = None
 
 
+# ============================================================================
+# BET SCHEMAS
+# ============================================================================
+
+class PlaceBetRequest(BaseModel):
+    """Запрос на размещение ставки."""
+    event_id: int = Field(..., description="ID события")
+    odds_id: int = Field(..., description="ID исхода")
+    bet_amount: float = Field(..., gt=0, le=100000, description="Сумма ставки (1.00 - 100000.00 USD)")
+    coefficient: float = Field(..., gt=1, description="Коэффициент исхода")
+    bet_type: str = Field("single", max_length=20, description="Тип ставки")
+
+    @validator('bet_amount')
+    def validate_bet_amount(cls, v):
+        if v < 1.00:
+            raise ValueError('Minimum bet is 1.00 USD')
+        return round(v, 2)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "event_id": 10,
+                "odds_id": 55,
+                "bet_amount": 50.00,
+                "coefficient": 2.5,
+                "bet_type": "single"
+            }
+        }
+
+
+class PlaceBetResponse(BaseModel):
+    """Ответ на размещение ставки."""
+    success: bool
+    bet: Optional[BetInfo] = None
+    available_balance: Optional[float] = None
+    error: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "success": True,
+                "bet": {
+                    "bet_id": 123,
+                    "event_id": 10,
+                    "odds_id": 55,
+                    "bet_type": "single",
+                    "bet_amount": 50.00,
+                    "coefficient": 2.5,
+                    "potential_win": 125.00,
+                    "status": "open",
+                    "placed_at": "2025-12-17T12:00:00"
+                },
+                "available_balance": 950.00
+            }
+        }
+
+
 # ============================================================================
 # EXPORT SCHEMAS
 # ============================================================================
@@ -320,6 +377,7 @@ class ExportRequest(BaseModel):
     include_bets: bool = Field(True, description="Включить ставки")
     include_transactions: bool = Field(True, description="Включить транзакции")
     include_statistics: bool = Field(True, description="Включить статистику")
+    include_archived: bool = Field(False, description="Включить месяцы из архива")
 
     class Config:
         json_schema_extra = {
@@ -344,6 +402,8 @@ class ReportInfo(BaseModel):
     download_url: str
     expires_at: str
     created_at: str
+    opening_balance: Optional[float] = None  # Баланс на начало периода
+    closing_balance: Optional[float] = None  # Баланс на конец периода
     content: Optional[str] = None  # Для CSV
 
 
@@ -439,6 +499,61 @@ class WithdrawalMethodsListResponse(BaseModel):
     error: Optional[str] = None
 
 
+# ============================================================================
+# SUMMARY SCHEMAS
+# ============================================================================
+
+SUMMARY_FIELDS = ("balance", "history", "statistics", "payment_methods", "withdrawal_methods")
+
+
+class SummaryBalance(BaseModel):
+    """Баланс в сводке (поля BalanceResponse без success/error)."""
+    balance: BalanceInfo
+    available_balance: float
+    locked_in_bets: float
+    pending_deposits: float
+    pending_withdrawals: float
+
+
+class HistoryPage(BaseModel):
+    """Первая страница истории в сводке."""
+    bets: List[BetInfo] = []
+    transactions: List[TransactionInfo] = []
+    pagination: Optional[Pagination] = None
+
+
+class SummaryResponse(BaseModel):
+    """
+    Сводка для главной страницы (GET /api/wallet/summary).
+    
+    В ответе только запрошенные в fields разделы.
+    """
+    success: bool
+    balance: Optional[SummaryBalance] = None
+    history: Optional[HistoryPage] = None
+    statistics: Optional[Statistics] = None
+    payment_methods: Optional[List[PaymentMethodResponse]] = None
+    withdrawal_methods: Optional[List[WithdrawalMethodInfo]] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "success": True,
+                "statistics": {
+                    "total_bets": 100,
+                    "total_wins": 60,
+                    "total_losses": 40,
+                    "win_rate": 60.0,
+                    "total_amount_bet": 2500.00,
+                    "total_amount_won": 3840.00,
+                    "net_profit": 1340.00,
+                    "roi_percent": 153.6
+                },
+                "withdrawal_methods": []
+            }
+        }
+
+
 # ============================================================================
 # ERROR RESPONSE
 # ============================================================================
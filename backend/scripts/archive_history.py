@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Архивация закрытых месяцев истории в холодное хранилище.
+
+Запускается по расписанию (например, cron раз в сутки после
+manage_partitions.py):
+    python scripts/archive_history.py run
+
+Использование:
+    cd backend
+    python scripts/archive_history.py plan
+    python scripts/archive_history.py list
+    python scripts/archive_history.py verify
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import SessionLocal
+from services.archive_service import ARCHIVE_ORDER, ArchiveManifest, ArchiveService
+
+
+def show_plan(db) -> None:
+    for table in ARCHIVE_ORDER:
+        months = ArchiveService.candidate_months(db, table)
+        print(f"[*] {table}: {len(months)} месяцев к архивации")
+        for month in months:
+            print(f"    {month:%Y-%m}")
+
+
+def show_archive() -> None:
+    for entry in ArchiveManifest(ArchiveService.archive_root()).entries:
+        print(f"[*] {entry['table']} {entry['month'][:7]}: {entry['rows']} строк -> {entry['file']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архивация старой истории")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("plan", help="Показать месяцы, которые будут заархивированы")
+    subparsers.add_parser("run", help="Заархивировать закрытые месяцы")
+    subparsers.add_parser("list", help="Показать содержимое архива")
+    subparsers.add_parser("verify", help="Проверить файлы архива по sha256")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        show_archive()
+        sys.exit(0)
+
+    if args.command == "verify":
+        result = ArchiveService.verify()
+        for problem in result["problems"]:
+            print(f"[X] {problem}")
+        print(f"[*] Проверено файлов: {result['checked']}")
+        sys.exit(0 if result["success"] else 1)
+
+    db = SessionLocal()
+    try:
+        if args.command == "plan":
+            show_plan(db)
+            ok = True
+        else:
+            result = ArchiveService.archive_closed_months(db)
+            ok = result["success"]
+            for item in result["archived"]:
+                print(f"[OK] {item['table']} {item['month'][:7]}: {item['rows']} строк -> {item['file']}")
+            if not ok:
+                print(f"[X] {result['error']}")
+    finally:
+        db.close()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пополнения сохранённой картой (WalletService.replenish_balance).
+
+Stripe заменяется заглушкой с задержкой --stripe-latency-ms (по
+умолчанию 50 мс), пополнения идут параллельно из --threads потоков,
+у каждого потока своя сессия. Кроме пополнений в секунду замеряется:
+- commit'ов на пополнение
+- время открытой транзакции (от первого запроса до commit/rollback):
+  среднее и максимум - столько держатся блокировки и соединение
+- вызовы Stripe при открытой транзакции (должно быть 0)
+
+Для сравнения до/после запустите бенчмарк на обеих ревизиях.
+
+По умолчанию - временная SQLite БД; для PostgreSQL передайте
+--database-url (таблицы должны существовать, бенчмарк создаёт
+пользователей bench_* и удаляет их после замера).
+
+Использование:
+    cd backend
+    python scripts/bench_deposits.py [--deposits 2000] [--users 200] [--threads 8]
+        [--stripe-latency-ms 50] [--database-url postgresql://...]
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import BigInteger, create_engine, delete, event, insert, text
+from sqlalchemy.dialects.postgresql import INET, JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import (
+    Base, User, UserBalance, BalanceTransaction, WalletOperation, PaymentMethod, AuditLog, LedgerEntry
+)
+from services.stripe_service import StripeService
+from services.wallet_service import WalletService
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_sqlite(element, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(INET, "sqlite")
+def _inet_sqlite(element, compiler, **kw):
+    return "TEXT"
+
+
+# В SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(element, compiler, **kw):
+    return "INTEGER"
+
+
+class TransactionTimer:
+    """Commit'ы и время открытых транзакций по событиям engine."""
+
+    def __init__(self, engine):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.commits = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.stripe_in_transaction = 0
+        event.listen(engine, "begin", self._begin)
+        event.listen(engine, "commit", self._commit)
+        event.listen(engine, "rollback", self._end)
+
+    def _begin(self, conn):
+        self.local.started_at = time.perf_counter()
+
+    def _commit(self, conn):
+        with self.lock:
+            self.commits += 1
+        self._end(conn)
+
+    def _end(self, conn):
+        started_at = getattr(self.local, "started_at", None)
+        if started_at is None:
+            return
+        self.local.started_at = None
+        elapsed = time.perf_counter() - started_at
+        with self.lock:
+            self.total += elapsed
+            self.longest = max(self.longest, elapsed)
+
+    def in_transaction(self) -> bool:
+        return getattr(self.local, "started_at", None) is not None
+
+
+def stub_stripe(timer: TransactionTimer, latency: float) -> None:
+    def call(result):
+        def stub(*args, **kwargs):
+            if timer.in_transaction():
+                with timer.lock:
+                    timer.stripe_in_transaction += 1
+            time.sleep(latency)
+            return result
+        return staticmethod(stub)
+
+    StripeService.charge_customer = call({
+        "success": True, "status": "succeeded", "charge_id": "ch_bench", "intent_id": None, "amount": 10.0
+    })
+    StripeService.create_stripe_customer = call({"success": True, "stripe_customer_id": "cus_bench"})
+    StripeService.get_payment_methods = call({"success": True, "payment_methods": []})
+
+
+def seed(engine, users: int) -> list:
+    user_ids = [f"bench_{n:06d}" for n in range(users)]
+    cleanup(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": uid, "email": f"{uid}@example.com", "name": uid, "password_hash": "x",
+             "stripe_customer_id": f"cus_{uid}"}
+            for uid in user_ids
+        ])
+        conn.execute(insert(UserBalance), [
+            {"user_id": uid, "balance": Decimal("0.00"), "total_deposited": Decimal("0.00")} for uid in user_ids
+        ])
+    return user_ids
+
+
+def cleanup(engine) -> None:
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SET LOCAL ledger.allow_purge = 'on'"))
+        for model in (AuditLog, PaymentMethod, BalanceTransaction, LedgerEntry, WalletOperation, UserBalance):
+            conn.execute(delete(model).where(model.user_id.like("bench_%")))
+        conn.execute(delete(User).where(User.id.like("bench_%")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пополнения сохранённой картой")
+    parser.add_argument("--deposits", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--stripe-latency-ms", type=float, default=50.0)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.database_url:
+        engine = create_engine(args.database_url, pool_size=args.threads)
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        engine = create_engine(
+            f"sqlite:///{tmp_dir.name}/bench.db", connect_args={"timeout": 30, "check_same_thread": False}
+        )
+        Base.metadata.create_all(engine, tables=[
+            User.__table__, UserBalance.__table__, BalanceTransaction.__table__, WalletOperation.__table__,
+            PaymentMethod.__table__, AuditLog.__table__, LedgerEntry.__table__
+        ])
+    user_ids = seed(engine, args.users)
+    logger.disable("services")
+    timer = TransactionTimer(engine)
+    stub_stripe(timer, args.stripe_latency_ms / 1000)
+    print(f"[*] {engine.dialect.name}: {args.deposits} пополнений, {args.users} пользователей, "
+          f"{args.threads} потоков, Stripe {args.stripe_latency_ms:.0f} мс")
+
+    def deposit(n: int) -> bool:
+        with Session(engine) as db:
+            result = WalletService.replenish_balance(
+                db, user_ids[n % len(user_ids)], 10.0, stripe_payment_method_id="pm_bench"
+            )
+        return result["success"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        succeeded = sum(pool.map(deposit, range(args.deposits)))
+    elapsed = time.perf_counter() - start
+
+    print(f"    пополнений:            {succeeded:>7} из {args.deposits} за {elapsed:.2f} с "
+          f"({succeeded / elapsed:.0f} в секунду)")
+    print(f"    commit на пополнение:  {timer.commits / args.deposits:>7.2f}")
+    print(f"    транзакция открыта:    {timer.total / max(timer.commits, 1) * 1000:>7.1f} мс в среднем, "
+          f"{timer.longest * 1000:.1f} мс максимум")
+    print(f"    Stripe в транзакции:   {timer.stripe_in_transaction:>7}")
+
+    cleanup(engine)
+    engine.dispose()
+    if tmp_dir:
+        tmp_dir.cleanup()
+    sys.exit(0 if succeeded == args.deposits else 1)
+
+
+if __name__ == "__main__":
+    main()
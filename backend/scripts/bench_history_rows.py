@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк чтения строк истории для отчёта (WalletService.export_report).
+
+Одному пользователю записывается --rows ставок и столько же транзакций
+за месяц, затем период читается и выводится в CSV двумя способами:
+- ORM: db.query(Bet).all() - полные объекты (identity map, отслеживание
+  изменений, все колонки вместе с metadata JSONB) - как было
+- Core: SELECT колонок BET_ROW_COLUMNS / TRANSACTION_ROW_COLUMNS в
+  кортежи Row (WalletService._row_select) - как сейчас
+
+Для каждого способа - мкс CPU на строку и пик памяти на строку
+(tracemalloc, без учёта итогового CSV). CSV обоих способов сравнивается.
+
+По умолчанию - временная SQLite БД; для PostgreSQL передайте
+--database-url (таблицы должны существовать, бенчмарк создаёт
+пользователя bench_history и удаляет его строки после замера).
+
+Использование:
+    cd backend
+    python scripts/bench_history_rows.py [--rows 100000] [--database-url postgresql://...]
+"""
+
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import BigInteger, create_engine, delete, desc, insert
+from sqlalchemy.dialects.postgresql import INET, JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from models.orm_models import Base, User, BalanceTransaction, Bet
+from services.wallet_service import WalletService, BET_ROW_COLUMNS, TRANSACTION_ROW_COLUMNS
+
+
+USER_ID = "bench_history"
+PERIOD_START = datetime(2026, 9, 1)
+PERIOD_END = datetime(2026, 10, 1)
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_sqlite(element, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(INET, "sqlite")
+def _inet_sqlite(element, compiler, **kw):
+    return "TEXT"
+
+
+# В SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(element, compiler, **kw):
+    return "INTEGER"
+
+
+def seed(engine, rows: int) -> None:
+    cleanup(engine)
+    step = (PERIOD_END - PERIOD_START) / rows
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": USER_ID, "email": f"{USER_ID}@example.com", "name": USER_ID,
+                                     "password_hash": "x"}])
+        conn.execute(insert(Bet), [{
+            "user_id": USER_ID, "event_id": 1000 + n % 500, "odds_id": n % 7, "bet_type": "single",
+            "bet_amount": Decimal("25.00"), "coefficient": Decimal("1.850"), "potential_win": Decimal("46.25"),
+            "status": "resolved", "result": "win" if n % 2 else "loss",
+            "actual_win": Decimal("46.25") if n % 2 else None,
+            "placed_at": PERIOD_START + step * n, "resolved_at": PERIOD_START + step * n + timedelta(hours=2),
+            "bet_metadata": {"source": "web", "odds_snapshot": [1.85, 2.1, 3.4], "promo": None}
+        } for n in range(rows)])
+        conn.execute(insert(BalanceTransaction), [{
+            "user_id": USER_ID, "transaction_type": "bet_placed", "amount": Decimal("25.00"),
+            "balance_before": Decimal("5000.00"), "balance_after": Decimal("4975.00"),
+            "reference_type": "bet", "reference_id": str(n), "description": f"Bet #{n}",
+            "status": "completed", "created_at": PERIOD_START + step * n
+        } for n in range(rows)])
+
+
+def cleanup(engine) -> None:
+    with engine.begin() as conn:
+        for model in (Bet, BalanceTransaction):
+            conn.execute(delete(model).where(model.user_id == USER_ID))
+        conn.execute(delete(User).where(User.id == USER_ID))
+
+
+def read_orm(db: Session):
+    bets = db.query(Bet).filter(
+        Bet.user_id == USER_ID, Bet.placed_at >= PERIOD_START, Bet.placed_at < PERIOD_END
+    ).order_by(desc(Bet.placed_at)).all()
+    transactions = db.query(BalanceTransaction).filter(
+        BalanceTransaction.user_id == USER_ID,
+        BalanceTransaction.created_at >= PERIOD_START,
+        BalanceTransaction.created_at < PERIOD_END
+    ).order_by(desc(BalanceTransaction.created_at)).all()
+    return bets, transactions
+
+
+def read_core(db: Session):
+    bet_columns = Bet.__table__.c
+    trans_columns = BalanceTransaction.__table__.c
+    bets = db.execute(
+        WalletService._row_select(Bet, BET_ROW_COLUMNS)
+        .where(bet_columns.user_id == USER_ID, bet_columns.placed_at >= PERIOD_START,
+               bet_columns.placed_at < PERIOD_END)
+        .order_by(desc(bet_columns.placed_at))
+    ).all()
+    transactions = db.execute(
+        WalletService._row_select(BalanceTransaction, TRANSACTION_ROW_COLUMNS)
+        .where(trans_columns.user_id == USER_ID, trans_columns.created_at >= PERIOD_START,
+               trans_columns.created_at < PERIOD_END)
+        .order_by(desc(trans_columns.created_at))
+    ).all()
+    return bets, transactions
+
+
+def measure(label: str, engine, read, rows: int):
+    def run():
+        with Session(engine) as db:
+            bets, transactions = read(db)
+            report_data = {"bets": bets, "transactions": transactions, "statistics": {}}
+            return WalletService._generate_csv_report(
+                USER_ID, "2026-09-01", "2026-09-30", report_data, True, True, False
+            )
+
+    run()  # прогрев
+    gc.collect()
+    start = time.perf_counter()
+    content = run()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total_rows = rows * 2
+    per_row_us = elapsed / total_rows * 1_000_000
+    per_row_bytes = (peak - len(content)) / total_rows
+    print(f"  {label:<8} {elapsed:7.2f} s  {per_row_us:6.1f} us/row  {per_row_bytes:7.0f} bytes/row peak")
+    # Строка с датой выгрузки отличается между запусками
+    return per_row_us, per_row_bytes, content.split("\n", 3)[3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="Ставок и транзакций за период")
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        engine = create_engine(f"sqlite:///{tmp_dir.name}/bench.db")
+        Base.metadata.create_all(engine, tables=[User.__table__, Bet.__table__, BalanceTransaction.__table__])
+    seed(engine, args.rows)
+    print(f"[*] {engine.dialect.name}: {args.rows} ставок + {args.rows} транзакций за период, CSV отчёта\n")
+
+    orm_us, orm_bytes, orm_csv = measure("ORM", engine, read_orm, args.rows)
+    core_us, core_bytes, core_csv = measure("Core", engine, read_core, args.rows)
+    print(f"\n  CPU x{orm_us / core_us:.1f}, память x{orm_bytes / core_bytes:.1f}")
+
+    same = orm_csv == core_csv
+    print("[OK] CSV совпадает" if same else "[X] CSV отличается")
+
+    cleanup(engine)
+    engine.dispose()
+    if tmp_dir:
+        tmp_dir.cleanup()
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
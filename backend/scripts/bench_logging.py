@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов логирования на один HTTP-запрос.
+
+Имитирует записи лога типичного запроса пополнения (3 info + webhook)
+и сравнивает время в потоке обработчика:
+- старую схему: синхронная запись в файл, текст, f-строки
+- loguru enqueue=True (для сравнения с BackgroundSink)
+- BackgroundSink + JSON (config/logging_config.py), то же + sampling webhook'а
+- медленный sink (заблокированный stdout/сетевой сборщик): синхронно и в фоне
+- отключённый уровень: f-строка против ленивого форматирования
+
+Использование:
+    cd backend
+    python scripts/bench_logging.py [--requests 20000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+
+from config.logging_config import (
+    TEXT_FORMAT, BackgroundSink, json_format, sampled_logger, _rotating_file_writer, _sampling_filter
+)
+
+
+SLOW_SINK_DELAY = 0.0002  # 200 мкс на запись
+
+USER_ID = "user_123"
+AMOUNT = 100.0
+INTENT_ID = "pi_3Nq8x2LkdIwHu7ix0abc"
+
+
+def request_fstring():
+    logger.info(f"Created Payment Intent {INTENT_ID} for user {USER_ID}, amount: ${AMOUNT}")
+    logger.info(f"User {USER_ID} deposited ${AMOUNT} successfully")
+    logger.info(f"Received Stripe webhook: payment_intent.succeeded")
+    logger.info(f"Successfully processed payment {INTENT_ID} for user {USER_ID}")
+
+
+def request_lazy(webhook_logger=logger):
+    logger.info("Created Payment Intent {} for user {}, amount: ${}", INTENT_ID, USER_ID, AMOUNT)
+    logger.info("User {} deposited ${} successfully", USER_ID, AMOUNT)
+    webhook_logger.info("Received Stripe webhook: {}", "payment_intent.succeeded")
+    logger.info("Successfully processed payment {} for user {}", INTENT_ID, USER_ID)
+
+
+def slow_write(message: str) -> None:
+    time.sleep(SLOW_SINK_DELAY)
+
+
+def measure(label: str, func, requests: int, sink: BackgroundSink = None) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    # Время в вызывающем потоке - то, что видит обработчик запроса
+    elapsed = time.perf_counter() - start
+    if sink is not None:
+        sink.join()
+    per_request_us = elapsed / requests * 1_000_000
+    print(f"{label:<45} {per_request_us:8.1f} us/request")
+    return per_request_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = Path(tmp) / "bench.log"
+        print(f"Requests: {args.requests}, 4 log records per request\n")
+
+        logger.remove()
+        logger.add(log_file, format=TEXT_FORMAT, level="DEBUG")
+        measure("sync file, text, f-strings (old)", request_fstring, args.requests)
+
+        logger.remove()
+        logger.add(log_file, format=json_format, level="INFO", enqueue=True)
+        measure("loguru enqueue=True, json, lazy", request_lazy, args.requests)
+        logger.remove()
+
+        sink = BackgroundSink(_rotating_file_writer(str(log_file), backups=1))
+        logger.add(sink, format=json_format, level="INFO", filter=_sampling_filter)
+        measure("background, json, lazy", request_lazy, args.requests, sink)
+        measure(
+            "background, json, lazy, sampled webhook",
+            lambda: request_lazy(sampled_logger),
+            args.requests,
+            sink
+        )
+
+        # Медленный sink: синхронная запись блокирует запрос на каждую запись
+        slow_requests = max(args.requests // 20, 1)
+        logger.remove()
+        logger.add(slow_write, format=json_format, level="INFO")
+        measure("slow sink, sync", request_lazy, slow_requests)
+
+        logger.remove()
+        sink = BackgroundSink(slow_write)
+        logger.add(sink, format=json_format, level="INFO")
+        measure("slow sink, background", request_lazy, slow_requests)
+
+        # Уровень отключён: ленивый вызов не собирает строку
+        logger.remove()
+        logger.add(log_file, format=json_format, level="WARNING")
+        measure("level disabled, f-strings", request_fstring, args.requests)
+        measure("level disabled, lazy", request_lazy, args.requests)
+
+        logger.remove()
+
+
+if __name__ == "__main__":
+    main()
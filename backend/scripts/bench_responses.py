@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации ответов горячих GET-эндпоинтов.
+
+Для каждого эндпоинта берётся dict в том виде, в каком его возвращает
+WalletService, и замеряется CPU на ответ:
+- response_model + JSONResponse (stdlib json) - как было
+- response_model + FastJSONResponse (orjson) - класс ответа по умолчанию
+- trusted_response() - без повторной проверки, сразу orjson (/balance, /history)
+
+Тела ответов всех вариантов сравниваются - быстрый путь должен отдавать
+то же самое.
+
+Использование:
+    cd backend
+    python scripts/bench_responses.py [--requests 2000] [--rows 100]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from routes.responses import FastJSONResponse, trusted_response
+from schemas.wallet_schemas import BalanceResponse, HistoryResponse
+
+
+def balance_result() -> dict:
+    return {
+        "success": True,
+        "balance": {
+            "user_id": "user_123", "current_balance": 5100.0, "currency": "USD",
+            "total_deposited": 10000.0, "total_withdrawn": 2000.0, "total_bet": 7500.0,
+            "total_won": 6840.0, "total_lost": 2240.0, "net_profit": -660.0, "roi_percent": -8.8,
+            "win_count": 42, "lose_count": 58, "win_rate": 42.0,
+            "last_transaction": "2026-10-19T12:00:00", "account_created": "2026-01-05T09:30:00"
+        },
+        "available_balance": 5100.0,
+        "locked_in_bets": 250.0,
+        "pending_deposits": 100.0,
+        "pending_withdrawals": 0.0
+    }
+
+
+def history_result(rows: int) -> dict:
+    return {
+        "success": True,
+        "bets": [{
+            "bet_id": n, "event_id": 1000 + n, "odds_id": 7, "bet_type": "single", "bet_amount": 25.0,
+            "coefficient": 1.85, "potential_win": 46.25, "status": "resolved", "result": "win",
+            "actual_win": 46.25, "placed_at": "2026-10-18T20:00:00", "resolved_at": "2026-10-18T22:00:00"
+        } for n in range(rows)],
+        "transactions": [{
+            "transaction_id": n, "type": "bet_win", "amount": 46.25, "balance_before": 5000.0 + n,
+            "balance_after": 5046.25 + n, "status": "completed", "description": f"Bet #{n} won",
+            "created_at": "2026-10-18T22:00:00"
+        } for n in range(rows)],
+        "statistics": {
+            "total_bets": rows, "total_wins": rows, "total_losses": 0, "win_rate": 100.0,
+            "total_amount_bet": 25.0 * rows, "total_amount_won": 46.25 * rows,
+            "net_profit": 21.25 * rows, "roi_percent": 85.0
+        },
+        "pagination": {"current_page": 1, "total_pages": 1, "total_items": rows, "items_per_page": rows, "offset": 0}
+    }
+
+
+LOOP = asyncio.new_event_loop()
+
+
+def validated(model, response_class):
+    """Путь FastAPI для роута с response_model."""
+    field = create_response_field(name=f"Response_{model.__name__}", type_=model, mode="serialization")
+
+    def render(result):
+        content = LOOP.run_until_complete(
+            serialize_response(field=field, response_content=result, is_coroutine=True)
+        )
+        return response_class(content)
+
+    return render
+
+
+def measure(label: str, render, result, requests: int):
+    render(result)  # прогрев
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = render(result)
+    per_response_us = (time.perf_counter() - start) / requests * 1_000_000
+    print(f"  {label:<44} {per_response_us:8.1f} us/response  {len(response.body):7d} bytes")
+    return per_response_us, json.loads(response.body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=100, help="Ставок и транзакций в ответе /history")
+    args = parser.parse_args()
+
+    endpoints = [
+        ("/api/wallet/balance", BalanceResponse, balance_result()),
+        (f"/api/wallet/history ({args.rows} rows)", HistoryResponse, history_result(args.rows))
+    ]
+    ok = True
+    for endpoint, model, result in endpoints:
+        print(endpoint)
+        baseline, expected = measure("response_model + json (old)", validated(model, JSONResponse), result,
+                                     args.requests)
+        variants = [
+            ("response_model + orjson", validated(model, FastJSONResponse)),
+            ("trusted_response (orjson, no revalidation)", lambda content: trusted_response(model, content))
+        ]
+        for label, render in variants:
+            elapsed, body = measure(label, render, result, args.requests)
+            same = body == expected
+            ok = ok and same
+            print(f"  {'':<44} x{baseline / elapsed:.1f}  {'[OK] same body' if same else '[X] body differs'}")
+        print()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
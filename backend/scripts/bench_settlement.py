@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк расчёта ставок события.
+
+Сравнивает:
+- построчный расчёт через ORM (загрузить ставку и баланс, изменить,
+  добавить транзакцию, commit на ставку) - так выглядел бы наивный путь
+- SettlementService.settle_event (set-based UPDATE, bulk insert, дельты
+  балансов одной командой на пачку)
+
+По умолчанию - временная SQLite БД; для PostgreSQL передайте
+--database-url (таблицы должны существовать, бенчмарк создаёт ставки
+пользователей bench_* и удаляет их после замера).
+
+Использование:
+    cd backend
+    python scripts/bench_settlement.py [--bets 100000] [--users 5000] [--database-url postgresql://...]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import BigInteger, create_engine, delete, insert, text
+from sqlalchemy.dialects.postgresql import INET, JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from models.orm_models import Base, User, UserBalance, BalanceTransaction, Bet, LedgerEntry
+from services.settlement_service import SettlementService
+
+
+EVENT_ID = 900001
+WINNING_ODDS_ID = 1
+NAIVE_SAMPLE = 2000
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_sqlite(element, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(INET, "sqlite")
+def _inet_sqlite(element, compiler, **kw):
+    return "TEXT"
+
+
+# В SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(element, compiler, **kw):
+    return "INTEGER"
+
+
+def seed(engine, bets: int, users: int) -> None:
+    rng = random.Random(7)
+    user_ids = [f"bench_{n:06d}" for n in range(users)]
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SET LOCAL ledger.allow_purge = 'on'"))
+        conn.execute(delete(Bet).where(Bet.event_id == EVENT_ID))
+        conn.execute(delete(BalanceTransaction).where(BalanceTransaction.user_id.like("bench_%")))
+        conn.execute(delete(LedgerEntry).where(LedgerEntry.user_id.like("bench_%")))
+        conn.execute(delete(UserBalance).where(UserBalance.user_id.like("bench_%")))
+        conn.execute(delete(User).where(User.id.like("bench_%")))
+        conn.execute(insert(User), [
+            {"id": uid, "email": f"{uid}@example.com", "name": uid, "password_hash": "x"} for uid in user_ids
+        ])
+        conn.execute(insert(UserBalance), [
+            {"user_id": uid, "balance": Decimal("1000.00"), "total_won": Decimal("0.00"),
+             "total_lost": Decimal("0.00")}
+            for uid in user_ids
+        ])
+        now = datetime.utcnow()
+        for start in range(0, bets, 10000):
+            rows = []
+            for _ in range(min(10000, bets - start)):
+                amount = Decimal(rng.randint(1, 100))
+                rows.append({
+                    "user_id": rng.choice(user_ids), "event_id": EVENT_ID,
+                    "odds_id": rng.choice([1, 2, 3]), "bet_type": "single",
+                    "bet_amount": amount, "coefficient": Decimal("2.000"),
+                    "potential_win": amount * 2, "status": "open", "placed_at": now
+                })
+            conn.execute(insert(Bet), rows)
+
+
+def settle_naive(engine, limit: int) -> float:
+    """Построчный расчёт: одна ставка - одна транзакция."""
+    start = time.perf_counter()
+    with Session(engine) as db:
+        bets = db.query(Bet).filter(Bet.event_id == EVENT_ID, Bet.status == "open").limit(limit).all()
+        for bet in bets:
+            balance = db.query(UserBalance).filter(UserBalance.user_id == bet.user_id).with_for_update().one()
+            won = bet.odds_id == WINNING_ODDS_ID
+            amount = bet.potential_win - bet.bet_amount if won else -bet.bet_amount
+            bet.status = "resolved"
+            bet.result = "win" if won else "loss"
+            bet.actual_win = bet.potential_win if won else Decimal("0.00")
+            bet.resolved_at = datetime.utcnow()
+            db.add(BalanceTransaction(
+                user_id=bet.user_id, transaction_type="bet_won" if won else "bet_lost",
+                amount=amount, balance_before=balance.balance, balance_after=balance.balance + amount,
+                status="completed"
+            ))
+            balance.balance += amount
+            if won:
+                balance.total_won += bet.potential_win
+            else:
+                balance.total_lost += bet.bet_amount
+            db.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк расчёта ставок")
+    parser.add_argument("--bets", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        engine = create_engine(f"sqlite:///{tmp_dir.name}/bench.db")
+        Base.metadata.create_all(engine, tables=[
+            User.__table__, UserBalance.__table__, BalanceTransaction.__table__, Bet.__table__,
+            LedgerEntry.__table__
+        ])
+    print(f"[*] {engine.dialect.name}: {args.bets} ставок, {args.users} пользователей")
+
+    sample = min(NAIVE_SAMPLE, args.bets)
+    seed(engine, sample, args.users)
+    naive = settle_naive(engine, sample)
+    naive_rate = sample / naive
+    print(f"    построчно (ORM):   {sample:>7} ставок за {naive:7.2f} с  "
+          f"{naive_rate:9.0f} ставок/с  (~{args.bets / naive_rate:.1f} с на {args.bets})")
+
+    seed(engine, args.bets, args.users)
+    with Session(engine) as db:
+        start = time.perf_counter()
+        result = SettlementService.settle_event(db, EVENT_ID, [WINNING_ODDS_ID])
+        elapsed = time.perf_counter() - start
+    print(f"    settle_event:      {result['settled']:>7} ставок за {elapsed:7.2f} с  "
+          f"{result['settled'] / elapsed:9.0f} ставок/с  ({result['chunks']} пачек)")
+    print(f"    ускорение: {(args.bets / naive_rate) / elapsed:.0f}x")
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SET LOCAL ledger.allow_purge = 'on'"))
+        conn.execute(delete(Bet).where(Bet.event_id == EVENT_ID))
+        conn.execute(delete(BalanceTransaction).where(BalanceTransaction.user_id.like("bench_%")))
+        conn.execute(delete(LedgerEntry).where(LedgerEntry.user_id.like("bench_%")))
+        conn.execute(delete(UserBalance).where(UserBalance.user_id.like("bench_%")))
+        conn.execute(delete(User).where(User.id.like("bench_%")))
+    engine.dispose()
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Истечение просроченных pending-операций кошелька (expires_at в прошлом)
+и удаление истёкших Idempotency-Key.
+
+Запускается по расписанию (например, cron каждые 5 минут):
+    python scripts/expire_operations.py
+
+Метрики запуска пишутся в METRICS_TEXTFILE_DIR/expire_operations.prom.
+
+Использование:
+    cd backend
+    python scripts/expire_operations.py [--chunk-size 1000] [--max-rows 100000]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import SessionLocal
+from monitoring.metrics import EXPIRY_SWEEP_DURATION, EXPIRY_SWEEP_ROWS, write_job_metrics
+from services.expiry_service import ExpiryService
+from services.idempotency_service import IdempotencyService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Истечение просроченных pending-операций")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Операций на транзакцию")
+    parser.add_argument("--max-rows", type=int, default=None, help="Максимум операций за запуск")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = ExpiryService.sweep(db, chunk_size=args.chunk_size, max_rows=args.max_rows)
+        purged = IdempotencyService.purge_expired(db, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    if result["success"]:
+        print(f"[OK] Истекло операций: {result['expired']} ({result['chunks']} пачек, "
+              f"{result['duration_seconds']:.2f} с)")
+    else:
+        print(f"[X] {result['error']}: {result['details']} (успели: {result['expired']})")
+    if purged["success"]:
+        print(f"[OK] Удалено истёкших Idempotency-Key: {purged['deleted']}")
+    else:
+        print(f"[X] {purged['error']}: {purged['details']} (успели: {purged['deleted']})")
+
+    ok = result["success"] and purged["success"]
+    write_job_metrics("expire_operations", [EXPIRY_SWEEP_ROWS, EXPIRY_SWEEP_DURATION], ok)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Месячные выписки: снимки итогов на границе месяца и monthly_statements.
+
+Запускается по расписанию 1-го числа (по умолчанию - прошедший месяц):
+    python scripts/generate_statements.py
+
+Использование:
+    cd backend
+    python scripts/generate_statements.py [--year 2026 --month 9] [--user user_123]
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import SessionLocal
+from services.partition_service import add_months
+from services.statement_service import StatementService
+
+
+def main():
+    previous = add_months(date.today().replace(day=1), -1)
+    parser = argparse.ArgumentParser(description="Генерация месячных выписок")
+    parser.add_argument("--year", type=int, default=previous.year)
+    parser.add_argument("--month", type=int, default=previous.month)
+    parser.add_argument("--user", default=None, help="Только один пользователь")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.user:
+            result = StatementService.generate_statement(db, args.user, args.year, args.month)
+            if result["success"]:
+                statement = result["statement"]
+                print(f"[OK] {args.user} {args.year}-{args.month:02d}: "
+                      f"{statement['opening_balance']:.2f} -> {statement['closing_balance']:.2f}")
+            else:
+                print(f"[X] {result['error']}: {result.get('details', '')}")
+        else:
+            result = StatementService.generate_month(db, args.year, args.month)
+            print(f"[OK] {args.year}-{args.month:02d}: {result['generated']} выписок, "
+                  f"{result['snapshots']} снимков")
+            for user_id in result["failed"]:
+                print(f"    [X] {user_id}")
+    finally:
+        db.close()
+
+    sys.exit(0 if result["success"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Index advisor: планы выполнения всех запросов WalletService.
+
+Выполняет методы WalletService для пользователя из заполненной БД,
+перехватывает каждый SELECT и снимает для него EXPLAIN (PostgreSQL:
+EXPLAIN ANALYZE с временем выполнения; SQLite: EXPLAIN QUERY PLAN и
+замер времени). Все записи методов откатываются - БД не меняется.
+
+Сравнение индексов до и после миграции 20261019_000002:
+    python scripts/index_advisor.py seed --users 2000 --bets-per-user 200
+    alembic downgrade 20261019_000001
+    python scripts/index_advisor.py capture --output plans_before.json
+    alembic upgrade head
+    python scripts/index_advisor.py capture --output plans_after.json
+    python scripts/index_advisor.py compare plans_before.json plans_after.json
+
+Использование:
+    cd backend
+    python scripts/index_advisor.py capture
+    python scripts/index_advisor.py unused
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import Session
+
+from models.database import engine
+from models.orm_models import (
+    User, UserBalance, BalanceTransaction, WalletOperation, WithdrawalMethod, Bet
+)
+from services.wallet_service import WalletService
+
+
+SEED_PREFIX = "adv_"
+SQLITE_REPEATS = 20
+
+# Таблицы, по которым запросы WalletService не должны делать Seq Scan
+WALLET_TABLES = ("bets", "balance_transactions", "wallet_operations", "audit_log")
+
+
+# ============================================================================
+# ДАННЫЕ
+# ============================================================================
+
+def seed(users: int, bets_per_user: int) -> None:
+    """Заполняет БД синтетическими пользователями adv_* и их историей."""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, users, 100):
+            ids = [f"{SEED_PREFIX}{n:06d}" for n in range(start, min(start + 100, users))]
+            conn.execute(insert(User), [
+                {"id": uid, "email": f"{uid}@example.com", "name": uid, "password_hash": "x"}
+                for uid in ids
+            ])
+            conn.execute(insert(UserBalance), [
+                {"user_id": uid, "balance": Decimal("100000.00"), "currency": "USD"} for uid in ids
+            ])
+            conn.execute(insert(WithdrawalMethod), [
+                {"user_id": uid, "withdrawal_type": "bank_transfer", "is_verified": True} for uid in ids
+            ])
+
+            bets, transactions, operations = [], [], []
+            for uid in ids:
+                for _ in range(bets_per_user):
+                    placed_at = now - timedelta(minutes=rng.randint(0, 525600))
+                    status = rng.choices(["resolved", "open", "cancelled"], [85, 10, 5])[0]
+                    result = rng.choice(["win", "loss"]) if status == "resolved" else None
+                    amount = Decimal(rng.randint(1, 500))
+                    bets.append({
+                        "user_id": uid, "event_id": rng.randint(1, 5000), "bet_type": "single",
+                        "bet_amount": amount, "coefficient": Decimal("1.900"),
+                        "potential_win": amount * Decimal("1.9"), "status": status, "result": result,
+                        "actual_win": amount * Decimal("1.9") if result == "win" else None,
+                        "placed_at": placed_at
+                    })
+                    transactions.append({
+                        "user_id": uid, "transaction_type": rng.choice(["bet_placed", "bet_won", "deposit"]),
+                        "amount": amount, "balance_before": Decimal("0"), "balance_after": amount,
+                        "status": "completed", "created_at": placed_at
+                    })
+                for _ in range(max(bets_per_user // 10, 1)):
+                    operations.append({
+                        "user_id": uid, "operation_type": rng.choice(["deposit", "withdrawal"]),
+                        "amount": Decimal(rng.randint(10, 1000)),
+                        "status": rng.choices(["completed", "pending", "failed"], [90, 5, 5])[0],
+                        "created_at": now - timedelta(minutes=rng.randint(0, 525600))
+                    })
+            conn.execute(insert(Bet), bets)
+            conn.execute(insert(BalanceTransaction), transactions)
+            conn.execute(insert(WalletOperation), operations)
+            print(f"[*] {start + len(ids)}/{users} пользователей")
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+    print("[OK] Данные созданы")
+
+
+# ============================================================================
+# ПЕРЕХВАТ ЗАПРОСОВ
+# ============================================================================
+
+def scenarios(user_id: str):
+    """Вызовы WalletService, покрывающие все его SELECT'ы."""
+    return [
+        ("get_balance", lambda db: WalletService.get_balance(db, user_id)),
+        ("history", lambda db: WalletService.get_bet_history(db, user_id)),
+        ("history_open", lambda db: WalletService.get_bet_history(db, user_id, filters={"status": "open"})),
+        ("history_wins", lambda db: WalletService.get_bet_history(db, user_id, filters={"result": "win"})),
+        ("history_deposits", lambda db: WalletService.get_bet_history(
+            db, user_id, filters={"transaction_type": "deposit"}
+        )),
+        ("export_year", lambda db: WalletService.export_report(
+            db, user_id, date_from=(datetime.utcnow() - timedelta(days=365)).date().isoformat()
+        )),
+        ("withdraw", lambda db: WalletService.withdraw_funds(
+            db, user_id, 10.0, withdrawal_method_id=db.query(WithdrawalMethod.method_id).filter(
+                WithdrawalMethod.user_id == user_id
+            ).scalar()
+        )),
+    ]
+
+
+def capture_statements(user_id: str):
+    """
+    Выполняет сценарии в транзакции, которая затем откатывается.
+
+    Returns:
+        list: [(сценарий, statement, parameters)] без повторов
+    """
+    captured, seen = [], set()
+    current = {"label": None}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        key = (current["label"], statement)
+        if statement.lstrip().upper().startswith("SELECT") and key not in seen:
+            seen.add(key)
+            captured.append((current["label"], statement, parameters))
+
+    with engine.connect() as conn:
+        outer = conn.begin()
+        # commit() внутри сервисов фиксирует только savepoint
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            for label, call in scenarios(user_id):
+                current["label"] = label
+                result = call(db)
+                if not result.get("success"):
+                    print(f"[!] {label}: {result.get('error')}")
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+            db.close()
+            outer.rollback()
+    return captured
+
+
+# ============================================================================
+# EXPLAIN
+# ============================================================================
+
+def _plan_nodes(node, nodes):
+    nodes.append({
+        "node": node["Node Type"],
+        "relation": node.get("Relation Name"),
+        "index": node.get("Index Name"),
+        "rows": node.get("Actual Rows"),
+    })
+    for child in node.get("Plans", []):
+        _plan_nodes(child, nodes)
+    return nodes
+
+
+def explain(conn, statement, parameters):
+    """
+    План и время выполнения запроса.
+
+    Returns:
+        dict: {"ms": float, "nodes": [...], "buffers": int}
+    """
+    if conn.dialect.name == "postgresql":
+        raw = conn.exec_driver_sql(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+        ).scalar()
+        plan = (raw if isinstance(raw, list) else json.loads(raw))[0]
+        return {
+            "ms": round(plan["Execution Time"], 3),
+            "nodes": _plan_nodes(plan["Plan"], []),
+            "buffers": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0)
+        }
+
+    nodes = [
+        {"node": row[-1], "relation": None, "index": None, "rows": None}
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    ]
+    start = time.perf_counter()
+    for _ in range(SQLITE_REPEATS):
+        conn.exec_driver_sql(statement, parameters).fetchall()
+    return {
+        "ms": round((time.perf_counter() - start) / SQLITE_REPEATS * 1000, 3),
+        "nodes": nodes,
+        "buffers": None
+    }
+
+
+def _scan_summary(nodes):
+    scans = []
+    for node in nodes:
+        if node["index"]:
+            scans.append(f"{node['node']} {node['index']}")
+        elif node["relation"]:
+            scans.append(f"{node['node']} {node['relation']}")
+        elif node["node"].startswith(("SCAN", "SEARCH")):
+            scans.append(node["node"])
+    return scans
+
+
+def capture(user_id: str, output: str = None) -> None:
+    if user_id is None:
+        with engine.connect() as conn:
+            user_id = conn.execute(
+                text("SELECT user_id FROM bets GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1")
+            ).scalar()
+        if user_id is None:
+            print("[X] В БД нет ставок - сначала выполните seed")
+            sys.exit(1)
+
+    statements = capture_statements(user_id)
+    report = {"dialect": engine.dialect.name, "user_id": user_id, "queries": []}
+    with engine.connect() as conn:
+        for label, statement, parameters in statements:
+            result = explain(conn, statement, parameters)
+            seq_scans = [
+                node["relation"] for node in result["nodes"]
+                if node["node"] == "Seq Scan" and node["relation"] in WALLET_TABLES
+            ]
+            report["queries"].append({
+                "scenario": label,
+                "sql": " ".join(statement.split()),
+                **result,
+                "seq_scans": seq_scans
+            })
+            flag = "  [!] Seq Scan: " + ", ".join(seq_scans) if seq_scans else ""
+            print(f"{label:18} {result['ms']:9.3f} ms  {'; '.join(_scan_summary(result['nodes']))}{flag}")
+
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"[OK] Планы сохранены в {output}")
+
+
+def compare(before_path: str, after_path: str) -> None:
+    before = json.loads(Path(before_path).read_text(encoding="utf-8"))
+    after = json.loads(Path(after_path).read_text(encoding="utf-8"))
+    after_by_sql = {(q["scenario"], q["sql"]): q for q in after["queries"]}
+
+    print(f"{'scenario':18} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan after")
+    totals = Counter()
+    for query in before["queries"]:
+        other = after_by_sql.get((query["scenario"], query["sql"]))
+        if other is None:
+            continue
+        totals["before"] += query["ms"]
+        totals["after"] += other["ms"]
+        speedup = query["ms"] / other["ms"] if other["ms"] else float("inf")
+        print(
+            f"{query['scenario']:18} {query['ms']:10.3f} {other['ms']:10.3f} {speedup:7.1f}x  "
+            f"{'; '.join(_scan_summary(other['nodes']))}"
+        )
+    print(f"{'total':18} {totals['before']:10.3f} {totals['after']:10.3f}")
+
+
+def show_unused() -> None:
+    """Индексы wallet-таблиц без сканирований с последнего сброса статистики (PostgreSQL)."""
+    if engine.dialect.name != "postgresql":
+        print("[X] Статистика индексов доступна только в PostgreSQL")
+        sys.exit(1)
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT relname, indexrelname, idx_scan, pg_size_pretty(pg_relation_size(indexrelid))
+            FROM pg_stat_user_indexes
+            WHERE relname = ANY(:tables)
+            ORDER BY idx_scan, pg_relation_size(indexrelid) DESC
+        """), {"tables": list(WALLET_TABLES)}).all()
+    for table, index, scans, size in rows:
+        marker = "[!]" if scans == 0 else "   "
+        print(f"{marker} {table:22} {index:40} scans={scans:<10} size={size}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Планы запросов WalletService")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    seed_parser = subparsers.add_parser("seed", help="Заполнить БД синтетическими данными")
+    seed_parser.add_argument("--users", type=int, default=1000)
+    seed_parser.add_argument("--bets-per-user", type=int, default=100)
+    capture_parser = subparsers.add_parser("capture", help="Снять планы запросов")
+    capture_parser.add_argument("--user-id", default=None, help="По умолчанию - пользователь с наибольшим числом ставок")
+    capture_parser.add_argument("--output", default=None, help="Сохранить планы в JSON")
+    compare_parser = subparsers.add_parser("compare", help="Сравнить два снимка планов")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    subparsers.add_parser("unused", help="Индексы без сканирований (PostgreSQL)")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        seed(args.users, args.bets_per_user)
+    elif args.command == "capture":
+        capture(args.user_id, args.output)
+    elif args.command == "compare":
+        compare(args.before, args.after)
+    else:
+        show_unused()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Обслуживание журнала проводок кошелька (ledger_entries).
+
+Запускается по расписанию (например, cron раз в час):
+    python scripts/ledger.py snapshot [--interval 1000]
+
+Использование:
+    cd backend
+    python scripts/ledger.py verify user_123 [user_456 ...] [--full]
+    python scripts/ledger.py verify --all
+    python scripts/ledger.py trial
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+
+from models.database import SessionLocal
+from models.orm_models import UserBalance
+from services.ledger_service import LedgerService
+
+
+def verify(db, user_ids, full: bool) -> bool:
+    ok = True
+    for user_id in user_ids:
+        result = LedgerService.verify(db, user_id, full=full)
+        if result["valid"]:
+            print(f"[OK] {user_id}: seq {result['from_seq']}..{result['to_seq']} "
+                  f"({result['checked_entries']} проводок)")
+        else:
+            ok = False
+            print(f"[X] {user_id}:")
+            for error in result["errors"]:
+                print(f"    {error}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание журнала проводок")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    snapshot = subparsers.add_parser("snapshot", help="Снять итоги пользователей с новыми проводками")
+    snapshot.add_argument("--interval", type=int, default=None)
+    check = subparsers.add_parser("verify", help="Проверить журнал пользователей")
+    check.add_argument("user_ids", nargs="*")
+    check.add_argument("--all", action="store_true", help="Все пользователи с балансом")
+    check.add_argument("--full", action="store_true", help="С первой проводки, а не с последнего снимка")
+    subparsers.add_parser("trial", help="Оборотка по счетам")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "snapshot":
+            taken = LedgerService.take_snapshots(db, interval=args.interval)
+            print(f"[OK] Снимков: {taken}")
+            ok = True
+        elif args.command == "verify":
+            user_ids = args.user_ids
+            if args.all:
+                user_ids = db.execute(select(UserBalance.user_id).order_by(UserBalance.user_id)).scalars().all()
+            ok = verify(db, user_ids, args.full)
+        else:
+            result = LedgerService.trial_balance(db)
+            for account, total in result["accounts"].items():
+                print(f"    {account:<12} {total:>15.2f}")
+            print(f"    {'wallets':<12} {result['wallets']:>15.2f}  (users_balance: {result['cached_wallets']:.2f})")
+            ok = result["balanced"]
+            print("[OK] Сходится" if ok else "[X] Журнал и users_balance расходятся")
+    finally:
+        db.close()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
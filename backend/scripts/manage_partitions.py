@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Обслуживание месячных партиций balance_transactions, bets и audit_log.
+
+Запускается по расписанию (например, cron раз в сутки):
+    python scripts/manage_partitions.py create
+    python scripts/manage_partitions.py detach [--drop]
+
+Использование:
+    cd backend
+    python scripts/manage_partitions.py status
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import SessionLocal
+from services.partition_service import (
+    PARTITIONED_TABLES,
+    PartitionService,
+    expired_months,
+    missing_months,
+    partition_name,
+    retention_for
+)
+from config.settings import settings
+
+
+def show_status(db) -> None:
+    today = date.today()
+    for table in PARTITIONED_TABLES:
+        existing = PartitionService.list_partitions(db, table)
+        missing = missing_months(existing, today, settings.partition_premake_months)
+        expired = expired_months(existing, today, retention_for(table))
+
+        print(f"[*] {table}: {len(existing)} партиций", end="")
+        if existing:
+            print(f" ({partition_name(table, existing[0])} .. {partition_name(table, existing[-1])})")
+        else:
+            print()
+        for month in missing:
+            print(f"    [!] нет партиции {partition_name(table, month)}")
+        for month in expired:
+            print(f"    [!] срок хранения истёк: {partition_name(table, month)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание месячных партиций")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Показать партиции")
+    create = subparsers.add_parser("create", help="Создать партиции на будущие месяцы")
+    create.add_argument("--months-ahead", type=int, default=None)
+    detach = subparsers.add_parser("detach", help="Отсоединить партиции старше срока хранения")
+    detach.add_argument("--drop", action="store_true", help="Удалить отсоединённые таблицы")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "status":
+            show_status(db)
+            ok = True
+        elif args.command == "create":
+            result = PartitionService.ensure_future_partitions(db, months_ahead=args.months_ahead)
+            ok = result["success"]
+            for name in result["created"]:
+                print(f"[OK] Создана {name}")
+        else:
+            result = PartitionService.detach_expired_partitions(db, drop=args.drop)
+            ok = result["success"]
+            for name in result["detached"]:
+                print(f"[OK] Отсоединена {name}" + (" и удалена" if name in result["dropped"] else ""))
+        if not ok:
+            print(f"[X] {result['error']}")
+    finally:
+        db.close()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Заблаговременное создание Stripe Customer новым и активным пользователям.
+
+Запускается по расписанию (например, cron каждые 10 минут):
+    python scripts/provision_customers.py
+
+Использование:
+    cd backend
+    python scripts/provision_customers.py [--rate 20] [--concurrency 4]
+        [--active-days 30] [--limit 10000]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import SessionLocal
+from services.customer_provisioning_service import CustomerProvisioningService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Создание Stripe Customer заранее")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--rate", type=float, default=None, help="Запросов к Stripe в секунду")
+    parser.add_argument("--active-days", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=None, help="Максимум пользователей за запуск")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = CustomerProvisioningService.provision(
+            db,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            rate_per_second=args.rate,
+            active_days=args.active_days,
+            limit=args.limit
+        )
+    finally:
+        db.close()
+
+    print(f"[OK] Пользователей: {result['scanned']} за {result['duration_seconds']:.1f} с "
+          f"(создано {result['created']}, найдено в Stripe {result['existing']})")
+    if result["failed"]:
+        print(f"[X] Ошибок: {result['failed']}")
+    if result["aborted"]:
+        print(f"[X] Остановлено: {result['aborted']}")
+    sys.exit(0 if result["success"] and not result["aborted"] else 1)
+
+
+if __name__ == "__main__":
+    main()
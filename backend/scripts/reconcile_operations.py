@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Сверка pending-пополнений wallet_operations со Stripe.
+
+Запускается по расписанию (например, cron каждые 15 минут):
+    python scripts/reconcile_operations.py
+
+Метрики запуска пишутся в METRICS_TEXTFILE_DIR/reconcile_operations.prom.
+
+Использование:
+    cd backend
+    python scripts/reconcile_operations.py [--batch-size 500] [--concurrency 8]
+        [--grace-minutes 30] [--limit 100000] [--report mismatches.csv]
+"""
+
+import argparse
+import csv
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import SessionLocal
+from monitoring.metrics import RECONCILED_OPERATIONS, RECONCILIATION_DURATION, write_job_metrics
+from services.reconciliation_service import ReconciliationService
+
+
+REPORT_FIELDS = ("operation_id", "user_id", "intent_id", "reason", "local_amount", "stripe_amount", "stripe_user_id")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка операций кошелька со Stripe")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None, help="Одновременных запросов к Stripe")
+    parser.add_argument("--grace-minutes", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=None, help="Максимум операций за запуск")
+    parser.add_argument("--report", default=None, help="CSV с расхождениями")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = ReconciliationService.reconcile(
+            db,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            grace_minutes=args.grace_minutes,
+            limit=args.limit
+        )
+    finally:
+        db.close()
+
+    print(f"[OK] Проверено: {result['scanned']} за {result['duration_seconds']:.1f} с")
+    print(f"    зачислено {result['settled']}, отменено {result['cancelled']}, "
+          f"истекло {result['expired']}, ждут {result['pending']}")
+    if result["errors"]:
+        print(f"[X] Ошибок: {result['errors']}")
+    if result["aborted"]:
+        print(f"[X] Остановлено: {result['aborted']}")
+    if result["mismatch_count"]:
+        print(f"[X] Расхождений: {result['mismatch_count']}")
+        for mismatch in result["mismatches"][:20]:
+            print(f"    #{mismatch['operation_id']} {mismatch['intent_id']}: {mismatch['reason']}")
+    if args.report:
+        with open(args.report, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(result["mismatches"])
+        print(f"[OK] Отчёт: {args.report}")
+
+    ok = result["success"] and not result["aborted"] and not result["mismatch_count"]
+    write_job_metrics("reconcile_operations", [RECONCILED_OPERATIONS, RECONCILIATION_DURATION], ok)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
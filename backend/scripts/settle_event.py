@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Расчёт всех открытых ставок события.
+
+Использование:
+    cd backend
+    python scripts/settle_event.py 123 --winning-odds 456 [457 ...] [--chunk-size 5000]
+
+Метрики запуска пишутся в METRICS_TEXTFILE_DIR/settle_event.prom.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import SessionLocal
+from monitoring.metrics import BETS_SETTLED, SETTLEMENT_DURATION, write_job_metrics
+from services.settlement_service import SettlementService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Расчёт ставок события")
+    parser.add_argument("event_id", type=int)
+    parser.add_argument("--winning-odds", type=int, nargs="*", default=[],
+                        help="Выигравшие odds_id (без них все ставки проигрывают)")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = SettlementService.settle_event(
+            db, args.event_id, args.winning_odds, chunk_size=args.chunk_size
+        )
+    finally:
+        db.close()
+
+    write_job_metrics("settle_event", [BETS_SETTLED, SETTLEMENT_DURATION], result["success"])
+    if not result["success"]:
+        print(f"[X] {result['error']}: {result['details']} (рассчитано {result['settled']})")
+        sys.exit(1)
+
+    print(f"[OK] Событие {args.event_id}: {result['settled']} ставок "
+          f"(выиграло {result['won']}, проиграло {result['lost']}), выплачено {result['payout']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
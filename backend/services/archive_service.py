@@ -0,0 +1,522 @@
+"""
+Архивация старой истории в холодное хранилище.
+
+Закрытые месяцы bets, balance_transactions и audit_log старше
+settings.archive_after_months выгружаются в сжатые файлы в
+settings.archive_dir и удаляются из БД - индексы, по которым работают
+get_bet_history и export_report, перестают расти за счёт истории, которую
+почти никто не смотрит.
+
+Структура архива:
+    archive/
+        manifest.json
+        bets/2025/bets_2025_01.csv.gz
+        bets/2025/bets_2025_01_part2.csv.gz
+        balance_transactions/2025/balance_transactions_2025_01.parquet
+
+Форматы:
+- csv.gz - без дополнительных зависимостей
+- parquet - колоночный формат (zstd), требует pyarrow; при чтении
+  фильтр по user_id применяется на уровне файла
+
+manifest.json - единственный источник правды об архиве: файл, число
+строк, sha256 и типы колонок. Часть месяца попадает в манифест в той же
+операции, что и удаление её строк из БД, поэтому экспорт не покажет строку
+дважды и не потеряет её.
+
+В архив попадают только строки в конечном статусе (FINAL_STATUSES):
+открытые ставки и pending/processing транзакции остаются в БД, где их
+находят расчёт ставок, expiry и вебхуки Stripe, и показываются в экспорте
+из живых таблиц. Когда они завершатся, следующий запуск выгрузит их
+следующей частью того же месяца (_part2, _part3, ...).
+
+Из БД удаляются строки по первичным ключам, записанным в файл: строка,
+ставшая завершённой уже после выборки, остаётся до следующей части.
+
+Если месяц лежит в отдельной партиции (services/partition_service.py),
+партиция читается целиком, а после удаления выгруженных строк
+отсоединяется и удаляется (DETACH + DROP) - если под блокировкой в ней не
+осталось строк.
+
+Запуск по расписанию: scripts/archive_history.py
+"""
+
+import csv
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import MetaData, Table, func, inspect, select, text, tuple_
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from config.settings import settings
+from services.partition_service import (
+    PARTITIONED_TABLES,
+    PartitionService,
+    add_months,
+    month_start,
+    parse_partition_month,
+    partition_name
+)
+
+try:  # pragma: no cover - зависит от окружения
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Порядок архивации: ставки ссылаются на транзакции своего же месяца
+ARCHIVE_ORDER = ("bets", "balance_transactions", "audit_log")
+
+ARCHIVE_FORMATS = ("csv.gz", "parquet")
+
+MANIFEST_NAME = "manifest.json"
+
+# Статусы, после которых строка больше не меняется; у audit_log статуса нет
+FINAL_STATUSES = {
+    "bets": ("resolved", "cancelled"),
+    "balance_transactions": ("completed", "failed", "cancelled", "expired"),
+}
+
+# Строк на один fetch из БД и на одну row group в parquet
+ARCHIVE_BATCH_SIZE = 5000
+
+
+# ============================================================================
+# ТИПЫ КОЛОНОК
+# ============================================================================
+
+def _column_kind(column) -> str:
+    """Тип колонки для манифеста по её SQL-типу."""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:  # INET и другие специфичные типы
+        return "str"
+    if issubclass(python_type, bool):
+        return "bool"
+    if issubclass(python_type, int):
+        return "int"
+    if issubclass(python_type, Decimal):
+        return "decimal"
+    if issubclass(python_type, datetime):
+        return "datetime"
+    if issubclass(python_type, (dict, list)):
+        return "json"
+    return "str"
+
+
+def _encode(value: Any, kind: Optional[str]) -> Any:
+    """Значение для записи в файл архива."""
+    if value is None:
+        return None
+    if kind == "datetime":
+        return value.isoformat()
+    if kind == "decimal":
+        return str(value)
+    if kind == "json":
+        return json.dumps(value)
+    if kind in ("int", "bool"):
+        return value
+    return str(value)
+
+
+def _decode(value: Any, kind: Optional[str]) -> Any:
+    """Значение из файла архива в исходном Python-типе."""
+    if value is None or value == "":
+        return None
+    if kind == "datetime":
+        return datetime.fromisoformat(value)
+    if kind == "decimal":
+        return Decimal(value)
+    if kind == "int":
+        return int(value)
+    if kind == "bool":
+        return value if isinstance(value, bool) else value == "True"
+    if kind == "json":
+        return json.loads(value)
+    return value
+
+
+def _tracking_keys(rows: Iterator[Dict], names: List[str], keys: List[tuple]) -> Iterator[Dict]:
+    """Пропускает строки дальше, запоминая их первичные ключи."""
+    for row in rows:
+        keys.append(tuple(row[name] for name in names))
+        yield row
+
+
+def _key_filter(columns: List, keys: List[tuple]):
+    """Условие WHERE (ключ) IN (...) для пачки первичных ключей."""
+    if len(columns) == 1:
+        return columns[0].in_([key[0] for key in keys])
+    return tuple_(*columns).in_(keys)
+
+
+def _final_rows(source: Table, table: str) -> list:
+    """Условие отбора строк в конечном статусе (пустое для таблиц без статуса)."""
+    statuses = FINAL_STATUSES.get(table)
+    return [source.c.status.in_(statuses)] if statuses else []
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ============================================================================
+# МАНИФЕСТ
+# ============================================================================
+
+class ArchiveManifest:
+    """
+    manifest.json архива.
+
+    Запись - одна часть месяца: {"table", "month", "part", "file", "format",
+    "rows", "sha256", "columns": {колонка: тип}, "archived_at"}
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_NAME
+        self.entries: List[Dict] = []
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)["entries"]
+
+    def parts(self, table: str, month: date) -> List[Dict]:
+        key = month.isoformat()
+        return [
+            entry for entry in self.entries if entry["table"] == table and entry["month"] == key
+        ]
+
+    def add(self, entry: Dict) -> None:
+        self.entries.append(entry)
+        self.save()
+
+    def remove(self, entry: Dict) -> None:
+        self.entries.remove(entry)
+        self.save()
+
+    def save(self) -> None:
+        """Атомарная запись: читатели видят старый или новый манифест целиком."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+# ============================================================================
+# ФАЙЛЫ АРХИВА
+# ============================================================================
+
+def _batches(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_file(path: Path, fmt: str, kinds: Dict[str, str], rows: Iterator[Dict]) -> int:
+    """
+    Пишет строки в файл архива потоково, не держа месяц в памяти.
+
+    Returns:
+        int: Число записанных строк
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    columns = list(kinds)
+    encoded = (
+        {column: _encode(row[column], kinds[column]) for column in columns}
+        for row in rows
+    )
+    count = 0
+
+    if fmt == "parquet":
+        schema = pyarrow.schema([
+            (column, pyarrow.int64() if kind == "int"
+             else pyarrow.bool_() if kind == "bool"
+             else pyarrow.string())
+            for column, kind in kinds.items()
+        ])
+        with pyarrow.parquet.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            for batch in _batches(encoded, ARCHIVE_BATCH_SIZE):
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+    else:
+        with gzip.open(tmp_path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            for row in encoded:
+                writer.writerow(row)
+                count += 1
+
+    os.replace(tmp_path, path)
+    return count
+
+
+def _read_file(path: Path, fmt: str, user_id: Optional[str]) -> Iterator[Dict]:
+    if fmt == "parquet":
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is required to read parquet archives")
+        filters = [("user_id", "=", user_id)] if user_id is not None else None
+        yield from pyarrow.parquet.read_table(path, filters=filters).to_pylist()
+        return
+
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if user_id is None or row["user_id"] == user_id:
+                yield row
+
+
+# ============================================================================
+# СЕРВИС
+# ============================================================================
+
+class ArchiveService:
+    """
+    Выгрузка закрытых месяцев в архив и чтение их обратно.
+
+    Все методы принимают сессию БД и возвращают Dict с результатом.
+    """
+
+    @staticmethod
+    def archive_root() -> Path:
+        return Path(settings.archive_dir)
+
+    @staticmethod
+    def candidate_months(db: Session, table: str, today: Optional[date] = None) -> List[date]:
+        """
+        Месяцы таблицы старше settings.archive_after_months, в которых есть
+        завершённые строки, ещё не выгруженные в архив.
+
+        Учитываются строки родительской таблицы и отдельные партиции
+        (в том числе отсоединённые). Месяц, уже лежащий в архиве, снова
+        становится кандидатом, когда в нём завершаются оставшиеся строки.
+        """
+        today = today or date.today()
+        cutoff = add_months(month_start(today), -settings.archive_after_months)
+        column = PARTITIONED_TABLES[table]
+
+        bind = db.get_bind()
+        months = set()
+        for name in inspect(bind).get_table_names():
+            month = parse_partition_month(table, name)
+            if month is None or month >= cutoff:
+                continue
+            partition = Table(name, MetaData(), autoload_with=bind)
+            final = select(func.count()).select_from(partition).where(*_final_rows(partition, table))
+            if db.execute(final).scalar():
+                months.add(month)
+
+        # Переходим от месяца к месяцу по MIN(): пустые месяцы пропускаются,
+        # каждый запрос - один поиск по индексу
+        source = Table(table, MetaData(), autoload_with=bind)
+        key = source.c[column]
+        cutoff_at = datetime.combine(cutoff, datetime.min.time())
+        final = _final_rows(source, table)
+        oldest = db.execute(select(func.min(key)).where(key < cutoff_at, *final)).scalar()
+        while oldest is not None:
+            month = month_start(oldest.date())
+            months.add(month)
+            next_at = datetime.combine(add_months(month, 1), datetime.min.time())
+            oldest = db.execute(
+                select(func.min(key)).where(key >= next_at, key < cutoff_at, *final)
+            ).scalar()
+
+        return sorted(months)
+
+    @staticmethod
+    def archive_month(db: Session, table: str, month: date, fmt: Optional[str] = None) -> Dict:
+        """
+        Выгружает месяц таблицы в файл и удаляет его строки из БД.
+
+        Берутся только строки в конечном статусе (FINAL_STATUSES), остальные
+        остаются в таблице или партиции. Если месяц уже есть в архиве,
+        пишется его следующая часть.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            table (str): Таблица из PARTITIONED_TABLES
+            month (date): Первое число месяца
+            fmt (str): "csv.gz" или "parquet" (по умолчанию settings.archive_format)
+
+        Returns:
+            dict: {"success": bool, "table": str, "month": str, "part": int, "rows": int,
+                   "file": str, "error": str}; file - None, если выгружать было нечего
+        """
+        fmt = fmt or settings.archive_format
+        if fmt not in ARCHIVE_FORMATS:
+            return {"success": False, "error": f"Unknown archive format: {fmt}"}
+        if fmt == "parquet" and pyarrow is None:
+            return {"success": False, "error": "pyarrow is required for parquet archives"}
+
+        root = ArchiveService.archive_root()
+        manifest = ArchiveManifest(root)
+        part = len(manifest.parts(table, month)) + 1
+
+        column = PARTITIONED_TABLES[table]
+        bind = db.get_bind()
+        partition = partition_name(table, month)
+        own_table = partition in inspect(bind).get_table_names()
+
+        source = Table(partition if own_table else table, MetaData(), autoload_with=bind)
+        conditions = _final_rows(source, table)
+        if not own_table:
+            conditions += [
+                source.c[column] >= datetime.combine(month, datetime.min.time()),
+                source.c[column] < datetime.combine(add_months(month, 1), datetime.min.time())
+            ]
+        query = select(source).where(*conditions)
+
+        name = f"{table}_{month:%Y_%m}" + (f"_part{part}" if part > 1 else "")
+        relative = Path(table) / f"{month:%Y}" / f"{name}.{fmt}"
+        kinds = {column.name: _column_kind(column) for column in source.columns}
+        key_columns = list(source.primary_key.columns)
+        keys: List[tuple] = []
+        entry = None
+        try:
+            rows = db.execute(query.execution_options(yield_per=ARCHIVE_BATCH_SIZE)).mappings()
+            count = _write_file(
+                root / relative, fmt, kinds,
+                _tracking_keys(rows, [column.name for column in key_columns], keys)
+            )
+
+            # Удаляем ровно то, что записано в файл: строка, завершившаяся
+            # после выборки, не попала в файл и остаётся до следующей части
+            for batch in _batches(iter(keys), ARCHIVE_BATCH_SIZE):
+                db.execute(source.delete().where(_key_filter(key_columns, batch)))
+
+            if own_table:
+                # Блокировка не даёт строкам появиться или завершиться между
+                # пересчётом и DROP; партиция с оставшимися строками остаётся
+                db.execute(text(f"LOCK TABLE {partition} IN ACCESS EXCLUSIVE MODE"))
+                if not db.execute(select(func.count()).select_from(source)).scalar():
+                    if month in PartitionService.list_partitions(db, table):
+                        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+                    db.execute(text(f"DROP TABLE {partition}"))
+
+            if count:
+                entry = {
+                    "table": table,
+                    "month": month.isoformat(),
+                    "part": part,
+                    "file": relative.as_posix(),
+                    "format": fmt,
+                    "rows": count,
+                    "sha256": _sha256(root / relative),
+                    "columns": kinds,
+                    "archived_at": datetime.utcnow().isoformat()
+                }
+                # Сначала манифест, потом commit: при сбое commit запись удаляется
+                manifest.add(entry)
+            else:
+                (root / relative).unlink()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if entry is not None:
+                manifest.remove(entry)
+            logger.error("Failed to archive {} {:%Y-%m}: {}", table, month, e)
+            return {"success": False, "error": str(e)}
+
+        logger.info("Archived {} rows of {} {:%Y-%m} to {}", count, table, month, relative)
+        return {
+            "success": True,
+            "table": table,
+            "month": month.isoformat(),
+            "part": part,
+            "rows": count,
+            "file": relative.as_posix() if count else None
+        }
+
+    @staticmethod
+    def archive_closed_months(db: Session, today: Optional[date] = None) -> Dict:
+        """
+        Архивирует все закрытые месяцы старше settings.archive_after_months.
+
+        Returns:
+            dict: {"success": bool, "archived": List[dict], "error": str}
+        """
+        archived = []
+        for table in ARCHIVE_ORDER:
+            for month in ArchiveService.candidate_months(db, table, today=today):
+                result = ArchiveService.archive_month(db, table, month)
+                if not result["success"]:
+                    return {"success": False, "archived": archived, "error": result["error"]}
+                archived.append(result)
+        return {"success": True, "archived": archived}
+
+    @staticmethod
+    def read_archived(
+        table: str,
+        user_id: Optional[str],
+        date_from: datetime,
+        date_to: datetime
+    ) -> List[SimpleNamespace]:
+        """
+        Строки архива за период [date_from, date_to).
+
+        Читаются только месяцы, пересекающиеся с периодом. Строки
+        возвращаются с теми же атрибутами и типами, что и ORM-объекты
+        (bet.bet_amount - Decimal, bet.placed_at - datetime), поэтому их
+        можно смешивать с результатами запросов.
+
+        Args:
+            table (str): Таблица
+            user_id (str): Только строки пользователя (None - все)
+            date_from (datetime): Начало периода (включительно)
+            date_to (datetime): Конец периода (не включительно)
+        """
+        root = ArchiveService.archive_root()
+        manifest = ArchiveManifest(root)
+        column = PARTITIONED_TABLES[table]
+        first_month = month_start(date_from.date())
+
+        rows = []
+        for entry in manifest.entries:
+            month = date.fromisoformat(entry["month"])
+            if entry["table"] != table or month < first_month:
+                continue
+            if datetime.combine(month, datetime.min.time()) >= date_to:
+                continue
+            kinds = entry["columns"]
+            for raw in _read_file(root / entry["file"], entry["format"], user_id):
+                row = {name: _decode(value, kinds.get(name)) for name, value in raw.items()}
+                if row[column] is not None and date_from <= row[column] < date_to:
+                    rows.append(SimpleNamespace(**row))
+        return rows
+
+    @staticmethod
+    def verify() -> Dict:
+        """
+        Проверяет, что файлы архива на месте и не изменились.
+
+        Returns:
+            dict: {"success": bool, "checked": int, "problems": List[str]}
+        """
+        root = ArchiveService.archive_root()
+        problems = []
+        entries = ArchiveManifest(root).entries
+        for entry in entries:
+            path = root / entry["file"]
+            if not path.exists():
+                problems.append(f"{entry['file']}: missing")
+            elif _sha256(path) != entry["sha256"]:
+                problems.append(f"{entry['file']}: checksum mismatch")
+        return {"success": not problems, "checked": len(entries), "problems": problems}
@@ -0,0 +1,196 @@
+"""
+Фоновое создание Stripe Customer для пользователей.
+
+Первое пополнение без stripe_customer_id ждёт лишний запрос к Stripe
+(WalletService.replenish_balance, шаг 3). CustomerProvisioningService.provision()
+заранее создаёт Customer новым и недавно активным пользователям, и
+депозит создаёт его сам только если фоновый проход до пользователя ещё
+не дошёл.
+
+- кандидаты: users без stripe_customer_id, зарегистрированные или
+  с записями audit_log за settings.customer_provisioning_active_days;
+  keyset по users.id (частичный индекс idx_users_without_customer)
+- запросы к Stripe идут из settings.customer_provisioning_concurrency
+  потоков, но не чаще settings.customer_provisioning_rate_per_second
+  в сумме (запас от лимита API для платежей)
+- идемпотентность: сначала поиск Customer по metadata.user_id (прошлое
+  создание могло не сохраниться в users), затем создание с
+  Idempotency-Key "customer-{user_id}" - тем же, что у inline-создания
+- сохранение: UPDATE ... WHERE stripe_customer_id IS NULL одной
+  командой на пачку, ID, сохранённый депозитом, не перезаписывается
+
+При открытом circuit breaker'е Stripe проход останавливается.
+
+Запуск по расписанию: scripts/provision_customers.py
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, exists, or_, select, update
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import User, AuditLog
+from services.stripe_service import StripeService
+from config.settings import settings
+from monitoring.circuit_breaker import STRIPE_BREAKER
+from monitoring.metrics import STRIPE_CUSTOMERS_PROVISIONED
+
+
+class RateLimiter:
+    """Не больше rate вызовов в секунду на все потоки (равномерно, без всплесков)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_at = time.monotonic()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_at, now)
+            self.next_at = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CustomerProvisioningService:
+    """
+    Заблаговременное создание Stripe Customer.
+
+    Все методы принимают сессию БД и возвращают Dict с результатом.
+    """
+
+    @staticmethod
+    def provision(
+        db: Session,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        active_days: Optional[int] = None,
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Создаёт Stripe Customer пользователям, у которых его ещё нет.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            batch_size (int): Пользователей на пачку
+                (по умолчанию settings.customer_provisioning_batch_size)
+            concurrency (int): Потоков с запросами к Stripe
+            rate_per_second (float): Запросов к Stripe в секунду на все потоки
+            active_days (int): Окно регистрации/активности в днях
+            limit (int): Максимум пользователей за запуск (None - все)
+            now (datetime): Текущее время (по умолчанию utcnow)
+
+        Returns:
+            dict: {
+                "success": True,
+                "scanned": 5000,
+                "created": 4990,
+                "existing": 8,
+                "failed": 2,
+                "aborted": None,
+                "duration_seconds": 260.4
+            }
+
+        Examples:
+            >>> CustomerProvisioningService.provision(db, limit=1000)["created"]
+            998
+        """
+        batch_size = batch_size or settings.customer_provisioning_batch_size
+        concurrency = concurrency or settings.customer_provisioning_concurrency
+        if rate_per_second is None:
+            rate_per_second = settings.customer_provisioning_rate_per_second
+        if active_days is None:
+            active_days = settings.customer_provisioning_active_days
+        now = now or datetime.utcnow()
+        since = now - timedelta(days=active_days)
+        limiter = RateLimiter(rate_per_second)
+
+        report = {"success": True, "scanned": 0, "created": 0, "existing": 0, "failed": 0, "aborted": None}
+        started_at = time.perf_counter()
+        last_id = ""
+        recently_active = exists().where(AuditLog.user_id == User.id, AuditLog.created_at >= since)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="provision") as pool:
+            while limit is None or report["scanned"] < limit:
+                if not STRIPE_BREAKER.allow_request():
+                    report["aborted"] = "Stripe circuit breaker is open"
+                    break
+
+                size = batch_size if limit is None else min(batch_size, limit - report["scanned"])
+                batch = db.execute(
+                    select(User.id, User.email, User.name)
+                    .where(
+                        User.stripe_customer_id.is_(None),
+                        User.id > last_id,
+                        or_(User.created_at >= since, recently_active)
+                    )
+                    .order_by(User.id)
+                    .limit(size)
+                ).all()
+                db.rollback()  # не держим транзакцию, пока ждём Stripe
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                report["scanned"] += len(batch)
+
+                results = list(pool.map(lambda user: _ensure_customer(user, limiter), batch))
+                provisioned = [
+                    {"b_user_id": user.id, "b_customer_id": customer_id}
+                    for user, (outcome, customer_id) in zip(batch, results) if customer_id
+                ]
+                if provisioned:
+                    db.execute(
+                        update(User.__table__)
+                        .where(
+                            User.__table__.c.id == bindparam("b_user_id"),
+                            User.__table__.c.stripe_customer_id.is_(None)
+                        )
+                        .values(stripe_customer_id=bindparam("b_customer_id")),
+                        provisioned
+                    )
+                    db.commit()
+
+                for outcome, _ in results:
+                    report[outcome] += 1
+                    STRIPE_CUSTOMERS_PROVISIONED.inc(outcome=outcome)
+
+        report["success"] = not report["failed"]
+        report["duration_seconds"] = round(time.perf_counter() - started_at, 3)
+        logger.info(
+            "Customer provisioning: {} scanned, {} created, {} existing, {} failed in {:.1f}s{}",
+            report["scanned"], report["created"], report["existing"], report["failed"],
+            report["duration_seconds"],
+            " (aborted: {})".format(report["aborted"]) if report["aborted"] else ""
+        )
+        return report
+
+
+def _ensure_customer(user, limiter: RateLimiter):
+    """(outcome, stripe_customer_id): существующий по metadata или новый Customer."""
+    try:
+        limiter.wait()
+        found = StripeService.find_customer_by_user_id(user.id)
+        if not found["success"]:
+            return "failed", None
+        if found["stripe_customer_id"]:
+            return "existing", found["stripe_customer_id"]
+
+        limiter.wait()
+        created = StripeService.create_stripe_customer(user.id, user.email, user.name)
+    except Exception as e:
+        logger.error("Customer provisioning for user {} raised: {}", user.id, e)
+        return "failed", None
+    if not created["success"]:
+        logger.warning("Customer provisioning failed for user {}: {}", user.id, created["error"])
+        return "failed", None
+    return "created", created["stripe_customer_id"]
@@ -0,0 +1,150 @@
+"""
+Версии ответов для ETag / If-None-Match (GET /api/wallet/balance,
+/history, /payment-methods, /withdrawal-methods).
+
+Клиенты опрашивают эти эндпоинты, и чаще всего ничего не изменилось.
+Версия ответа читается одним запросом по индексу, без сборки самого
+ответа; совпала с If-None-Match - ответ 304 без тела и без сериализации.
+
+- balance: users_balance.ledger_seq (растёт с каждой проводкой: пополнение,
+  вывод, ставка, расчёт) и updated_at (любое изменение строки), плюс
+  pending-операции: их количество (idx_operations_user_pending) и время
+  последней операции (idx_user_operations) - создание, зачисление и
+  истечение pending-операции баланс не меняют, но меняют pending_* в ответе
+- history: версия users_balance - новая транзакция или изменение ставки
+  всегда проходят через баланс; в ETag добавляются параметры запроса
+- способы оплаты и вывода: хэш строк пользователя, которые попадают в
+  ответ (их единицы, запрос по idx_user_methods / idx_user_withdrawal_methods).
+  304 для /payment-methods экономит и запрос к Stripe: карты сохраняются
+  и удаляются только через этот API
+
+Версию нужно читать до данных ответа: если данные успеют измениться
+между запросами, клиент получит новые данные со старым ETag и просто
+скачает ответ ещё раз при следующем опросе.
+"""
+
+import hashlib
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from models.orm_models import User, UserBalance, WalletOperation, PaymentMethod, WithdrawalMethod
+
+
+# Меняется вместе с форматом ответов - старые ETag клиентов перестают совпадать
+RESPONSE_FORMAT_VERSION = "1"
+
+
+def make_etag(endpoint: str, user_id: str, parts: Iterable[Any]) -> str:
+    """Слабый ETag (W/"..."): ответ тот же по смыслу при любом сжатии."""
+    raw = "|".join([RESPONSE_FORMAT_VERSION, endpoint, user_id, *map(str, parts)])
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+class ETagService:
+    """ETag ответов по дешёвой версии данных пользователя; None - версии нет (ответ без ETag)."""
+
+    @staticmethod
+    def balance(db: Session, user_id: str) -> Optional[str]:
+        """
+        ETag ответа /balance.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+
+        Returns:
+            str: W/"..." или None, если у пользователя ещё нет users_balance
+
+        Examples:
+            >>> ETagService.balance(db, "user_123")
+            'W/"3f1c9a0e5b7d2c4a8e61"'
+        """
+        pending_count = select(func.count()).where(
+            WalletOperation.user_id == user_id, WalletOperation.status == 'pending'
+        ).scalar_subquery()
+        last_operation = select(func.max(WalletOperation.created_at)).where(
+            WalletOperation.user_id == user_id
+        ).scalar_subquery()
+
+        row = db.execute(
+            select(UserBalance.ledger_seq, UserBalance.updated_at, pending_count, last_operation)
+            .where(UserBalance.user_id == user_id)
+        ).first()
+        if row is None:
+            return None
+        return make_etag("balance", user_id, row)
+
+    @staticmethod
+    def history(db: Session, user_id: str, params: Iterable[Any] = ()) -> Optional[str]:
+        """
+        ETag ответа /history.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            params: Параметры запроса (пагинация, фильтры)
+
+        Returns:
+            str: W/"..." или None, если у пользователя ещё нет users_balance
+        """
+        row = db.execute(
+            select(UserBalance.ledger_seq, UserBalance.updated_at).where(UserBalance.user_id == user_id)
+        ).first()
+        if row is None:
+            return None
+        return make_etag("history", user_id, [*row, *params])
+
+    @staticmethod
+    def payment_methods(db: Session, user_id: str) -> Optional[str]:
+        """
+        ETag ответа /payment-methods: Stripe Customer и активные способы оплаты.
+
+        Returns:
+            str: W/"..." или None, если пользователя нет
+        """
+        rows = db.execute(
+            select(
+                User.stripe_customer_id,
+                PaymentMethod.method_id,
+                PaymentMethod.stripe_payment_method_id,
+                PaymentMethod.is_default,
+                PaymentMethod.created_at,
+                PaymentMethod.last_used
+            )
+            .select_from(User)
+            .outerjoin(PaymentMethod, and_(PaymentMethod.user_id == User.id, PaymentMethod.is_active == True))
+            .where(User.id == user_id)
+            .order_by(PaymentMethod.method_id)
+        ).all()
+        if not rows:
+            return None
+        return make_etag("payment_methods", user_id, rows)
+
+    @staticmethod
+    def withdrawal_methods(db: Session, user_id: str) -> str:
+        """
+        ETag ответа /withdrawal-methods: все поля способов вывода, попадающие в ответ.
+
+        Returns:
+            str: W/"..."
+        """
+        rows = db.execute(
+            select(
+                WithdrawalMethod.method_id,
+                WithdrawalMethod.withdrawal_type,
+                WithdrawalMethod.bank_name,
+                WithdrawalMethod.account_holder_name,
+                WithdrawalMethod.bank_account_number,
+                WithdrawalMethod.iban,
+                WithdrawalMethod.crypto_wallet_address,
+                WithdrawalMethod.is_default,
+                WithdrawalMethod.is_verified,
+                WithdrawalMethod.verification_status,
+                WithdrawalMethod.created_at
+            )
+            .where(WithdrawalMethod.user_id == user_id)
+            .order_by(WithdrawalMethod.method_id)
+        ).all()
+        return make_etag("withdrawal_methods", user_id, rows)
@@ -0,0 +1,128 @@
+"""
+Истечение просроченных pending-операций кошелька.
+
+Пополнение новой картой создаёт операцию с expires_at = now + 24h; если
+оплата так и не завершилась, операция остаётся pending и попадает в
+сумму pending_deposits каждого get_balance. ExpiryService.sweep()
+переводит такие операции в expired без запросов к Stripe.
+
+Операции с stripe_payment_intent_id sweep() не трогает: платёж мог пройти
+в Stripe без доставленного webhook'а, а сверка (services/
+reconciliation_service.py) видит только pending-операции. Их закрывает
+сверка - expired только после ответа Stripe, succeeded зачисляется.
+
+- пачки по settings.expiry_sweep_chunk_size - одна команда
+  UPDATE ... WHERE operation_id IN (SELECT ... LIMIT n FOR UPDATE SKIP LOCKED)
+  и commit на пачку, блокировки держатся миллисекунды, а строки,
+  занятые webhook'ом или сверкой, пропускаются до следующего запуска
+- частичный индекс idx_operations_pending_expires (expires_at WHERE
+  status = 'pending') отдаёт только просроченные строки
+
+Деньги не двигаются: истекают только операции, по которым Stripe
+ничего не списывал.
+
+Запуск по расписанию: scripts/expire_operations.py
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import WalletOperation
+from config.settings import settings
+from monitoring.metrics import EXPIRY_SWEEP_ROWS, EXPIRY_SWEEP_DURATION
+
+
+EXPIRED_MESSAGE = "Payment not completed before expiry"
+
+
+class ExpiryService:
+    """
+    Истечение pending-операций по expires_at.
+
+    Все методы принимают сессию БД и возвращают Dict с результатом.
+    """
+
+    @staticmethod
+    def sweep(
+        db: Session,
+        chunk_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Помечает expired pending-операции без PaymentIntent с expires_at в прошлом.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            chunk_size (int): Операций на транзакцию (по умолчанию settings.expiry_sweep_chunk_size)
+            max_rows (int): Максимум операций за запуск (None - все)
+            now (datetime): Текущее время (по умолчанию utcnow)
+
+        Returns:
+            dict: {"success": True, "expired": 1200, "chunks": 2, "duration_seconds": 0.4}
+
+        Examples:
+            >>> ExpiryService.sweep(db, chunk_size=1000)["expired"]
+            1200
+        """
+        chunk_size = chunk_size or settings.expiry_sweep_chunk_size
+        now = now or datetime.utcnow()
+        started_at = time.perf_counter()
+        expired = 0
+        chunks = 0
+
+        try:
+            while max_rows is None or expired < max_rows:
+                size = chunk_size if max_rows is None else min(chunk_size, max_rows - expired)
+                chunk = (
+                    select(WalletOperation.operation_id)
+                    .where(
+                        WalletOperation.status == 'pending',
+                        WalletOperation.expires_at < now,
+                        WalletOperation.stripe_payment_intent_id.is_(None)
+                    )
+                    .order_by(WalletOperation.expires_at)
+                    .limit(size)
+                    .with_for_update(skip_locked=True)
+                    .scalar_subquery()
+                )
+                count = db.execute(
+                    update(WalletOperation)
+                    .where(WalletOperation.operation_id.in_(chunk), WalletOperation.status == 'pending')
+                    .values(status='expired', error_message=EXPIRED_MESSAGE, completed_at=now)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if not count:
+                    break
+                expired += count
+                chunks += 1
+                if count < size:
+                    break
+        except Exception as e:
+            db.rollback()
+            logger.error("Expiry sweep failed after {} operations: {}", expired, e)
+            return {
+                "success": False,
+                "error": "Expiry sweep error",
+                "details": str(e),
+                "expired": expired,
+                "chunks": chunks
+            }
+        finally:
+            elapsed = time.perf_counter() - started_at
+            EXPIRY_SWEEP_ROWS.observe(expired)
+            EXPIRY_SWEEP_DURATION.observe(elapsed)
+
+        logger.info("Expiry sweep: {} operations expired in {} chunks ({:.2f}s)", expired, chunks, elapsed)
+        return {
+            "success": True,
+            "expired": expired,
+            "chunks": chunks,
+            "duration_seconds": round(elapsed, 3)
+        }
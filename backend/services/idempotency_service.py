@@ -0,0 +1,324 @@
+"""
+Idempotency-Key для POST /api/wallet/deposit и /withdraw.
+
+Клиент, не получивший ответ (таймаут, обрыв соединения), повторяет
+запрос с тем же заголовком Idempotency-Key и получает сохранённый ответ
+вместо второго пополнения или вывода.
+
+- ключ уникален в пределах пользователя: строка idempotency_keys
+  (user_id, idempotency_key) резервируется INSERT'ом до выполнения
+  запроса (status_code IS NULL), после - хранит код и тело ответа
+  settings.idempotency_ttl_hours
+- перед таблицей - LRU в памяти процесса на settings.idempotency_cache_size
+  завершённых ответов: повтор на тот же процесс обходится без запросов
+  к БД, на другой - одним SELECT по первичному ключу. В LRU попадают
+  только завершённые ответы, они не меняются до expires_at, поэтому
+  кэши процессов не нужно согласовывать
+- тот же ключ с другим телом запроса - mismatch (ответ 422), пока
+  первый запрос выполняется - in_progress (409); незавершённая запись
+  старше settings.idempotency_lock_seconds (процесс упал) перехватывается
+- запрос может выполниться второй раз: после перехвата брошенного
+  резерва или если complete() не сохранил ответ. Повтор безопасен за счёт
+  WalletService: ключ передаётся в Stripe, и пополнение с тем же
+  PaymentIntent не записывается второй раз (stripe_payment_intent_id
+  уникален), а вывод хранит ключ в wallet_operations.idempotency_key
+  и отвечает по уже записанной операции
+
+Истёкшие записи удаляет purge_expired() (scripts/expire_operations.py).
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import IdempotencyKey
+from config.settings import settings
+from monitoring.metrics import IDEMPOTENT_REQUESTS
+
+
+class ResponseCache:
+    """LRU завершённых ответов: (user_id, key) -> запись с request_hash, ответом и expires_at."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+
+    def get(self, user_id: str, key: str, now: datetime) -> Optional[Dict]:
+        with self.lock:
+            entry = self.entries.get((user_id, key))
+            if entry is None:
+                return None
+            if entry["expires_at"] <= now:
+                del self.entries[(user_id, key)]
+                return None
+            self.entries.move_to_end((user_id, key))
+            return entry
+
+    def put(self, user_id: str, key: str, entry: Dict) -> None:
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries[(user_id, key)] = entry
+            self.entries.move_to_end((user_id, key))
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+RESPONSE_CACHE = ResponseCache(settings.idempotency_cache_size)
+
+
+def request_hash(endpoint: str, payload: Dict[str, Any]) -> str:
+    """SHA-256 эндпоинта и тела запроса (ключи отсортированы)."""
+    raw = json.dumps({"endpoint": endpoint, "payload": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class IdempotencyService:
+    """
+    Резервирование Idempotency-Key и сохранение ответов.
+
+    begin() -> выполнение запроса -> complete() или release().
+    """
+
+    @staticmethod
+    def begin(
+        db: Session,
+        user_id: str,
+        key: str,
+        endpoint: str,
+        payload: Dict[str, Any],
+        now: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Резервирует ключ или находит сохранённый ответ.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            key (str): Значение заголовка Idempotency-Key
+            endpoint (str): Эндпоинт ("deposit", "withdraw")
+            payload (dict): Тело запроса (для проверки, что повтор тот же)
+            now (datetime): Текущее время (по умолчанию utcnow)
+
+        Returns:
+            dict: {"state": "new"} - ключ зарезервирован, запрос выполняется
+                {"state": "replay", "status_code": 200, "body": {...}}
+                {"state": "in_progress"} - запрос с этим ключом ещё выполняется
+                {"state": "mismatch"} - ключ использован с другим запросом
+
+        Examples:
+            >>> IdempotencyService.begin(db, "user_123", "a1b2", "deposit", {"amount": 100.0})
+            {'state': 'new'}
+        """
+        now = now or datetime.utcnow()
+        hashed = request_hash(endpoint, payload)
+
+        cached = RESPONSE_CACHE.get(user_id, key, now)
+        if cached is not None:
+            return _replay(cached, hashed, "replay_cache")
+
+        row = db.execute(
+            select(
+                IdempotencyKey.request_hash,
+                IdempotencyKey.status_code,
+                IdempotencyKey.response_body,
+                IdempotencyKey.created_at,
+                IdempotencyKey.expires_at
+            ).where(IdempotencyKey.user_id == user_id, IdempotencyKey.idempotency_key == key)
+        ).first()
+
+        reservation = {
+            "endpoint": endpoint,
+            "request_hash": hashed,
+            "status_code": None,
+            "response_body": None,
+            "created_at": now,
+            "expires_at": now + timedelta(hours=settings.idempotency_ttl_hours)
+        }
+
+        if row is None:
+            try:
+                db.execute(insert(IdempotencyKey).values(user_id=user_id, idempotency_key=key, **reservation))
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # параллельный запрос с тем же ключом успел раньше
+                IDEMPOTENT_REQUESTS.inc(outcome="in_progress")
+                return {"state": "in_progress"}
+            IDEMPOTENT_REQUESTS.inc(outcome="new")
+            return {"state": "new"}
+
+        if row.expires_at > now:
+            if row.status_code is not None:
+                entry = {
+                    "request_hash": row.request_hash,
+                    "status_code": row.status_code,
+                    "body": json.loads(row.response_body),
+                    "expires_at": row.expires_at
+                }
+                RESPONSE_CACHE.put(user_id, key, entry)
+                db.rollback()
+                return _replay(entry, hashed, "replay_db")
+            if row.request_hash != hashed:
+                db.rollback()
+                IDEMPOTENT_REQUESTS.inc(outcome="mismatch")
+                return {"state": "mismatch"}
+            if row.created_at > now - timedelta(seconds=settings.idempotency_lock_seconds):
+                db.rollback()
+                IDEMPOTENT_REQUESTS.inc(outcome="in_progress")
+                return {"state": "in_progress"}
+
+        # Истёкшая или брошенная запись: перехватывает тот, чей UPDATE прошёл первым
+        taken = db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.idempotency_key == key,
+                IdempotencyKey.created_at == row.created_at
+            )
+            .values(**reservation)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not taken:
+            IDEMPOTENT_REQUESTS.inc(outcome="in_progress")
+            return {"state": "in_progress"}
+        IDEMPOTENT_REQUESTS.inc(outcome="new")
+        return {"state": "new"}
+
+    @staticmethod
+    def complete(db: Session, user_id: str, key: str, status_code: int, body: Any) -> None:
+        """
+        Сохраняет ответ на зарезервированный ключ (БД и LRU процесса).
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            key (str): Idempotency-Key
+            status_code (int): HTTP код ответа
+            body: JSON-совместимое тело ответа
+        """
+        try:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.user_id == user_id, IdempotencyKey.idempotency_key == key)
+                .values(status_code=status_code, response_body=json.dumps(body))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            row = db.execute(
+                select(IdempotencyKey.request_hash, IdempotencyKey.expires_at)
+                .where(IdempotencyKey.user_id == user_id, IdempotencyKey.idempotency_key == key)
+            ).first()
+            db.rollback()
+        except Exception as e:
+            # Ответ уже получен - клиент его увидит; повтор через lock_seconds выполнится
+            # заново, и WalletService ответит по уже записанной операции (без второй проводки)
+            db.rollback()
+            logger.error("Failed to store idempotent response for user {} key {}: {}", user_id, key, e)
+            return
+        if row is not None:
+            RESPONSE_CACHE.put(user_id, key, {
+                "request_hash": row.request_hash,
+                "status_code": status_code,
+                "body": body,
+                "expires_at": row.expires_at
+            })
+
+    @staticmethod
+    def release(db: Session, user_id: str, key: str) -> None:
+        """
+        Снимает резерв ключа после неожиданной ошибки - повтор выполнится заново.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            key (str): Idempotency-Key
+        """
+        try:
+            db.rollback()
+            db.execute(
+                delete(IdempotencyKey)
+                .where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.idempotency_key == key,
+                    IdempotencyKey.status_code.is_(None)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("Failed to release idempotency key for user {} key {}: {}", user_id, key, e)
+
+    @staticmethod
+    def purge_expired(
+        db: Session,
+        chunk_size: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Удаляет истёкшие ключи пачками (commit на пачку).
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            chunk_size (int): Строк на транзакцию (по умолчанию settings.expiry_sweep_chunk_size)
+            now (datetime): Текущее время (по умолчанию utcnow)
+
+        Returns:
+            dict: {"success": True, "deleted": 52000}
+
+        Examples:
+            >>> IdempotencyService.purge_expired(db)["deleted"]
+            52000
+        """
+        chunk_size = chunk_size or settings.expiry_sweep_chunk_size
+        now = now or datetime.utcnow()
+        deleted = 0
+
+        try:
+            while True:
+                # Граница пачки по индексу idx_idempotency_keys_expires
+                boundary = db.execute(
+                    select(IdempotencyKey.expires_at)
+                    .where(IdempotencyKey.expires_at <= now)
+                    .order_by(IdempotencyKey.expires_at)
+                    .offset(chunk_size - 1)
+                    .limit(1)
+                ).scalar() or now
+                count = db.execute(
+                    delete(IdempotencyKey)
+                    .where(IdempotencyKey.expires_at <= boundary)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                deleted += count
+                if boundary >= now:
+                    break
+        except Exception as e:
+            db.rollback()
+            logger.error("Idempotency key purge failed after {} rows: {}", deleted, e)
+            return {"success": False, "error": "Idempotency key purge error", "details": str(e), "deleted": deleted}
+
+        logger.info("Idempotency key purge: {} expired keys deleted", deleted)
+        return {"success": True, "deleted": deleted}
+
+
+def _replay(entry: Dict, hashed: str, outcome: str) -> Dict:
+    if entry["request_hash"] != hashed:
+        IDEMPOTENT_REQUESTS.inc(outcome="mismatch")
+        return {"state": "mismatch"}
+    IDEMPOTENT_REQUESTS.inc(outcome=outcome)
+    return {"state": "replay", "status_code": entry["status_code"], "body": entry["body"]}
@@ -0,0 +1,387 @@
+"""
+Журнал проводок кошелька (append-only, двойная запись).
+
+ledger_entries - источник истины для балансов:
+- каждая проводка переводит amount между кошельком пользователя и
+  счётом contra_account (CONTRA_* ниже); сумма по всем счетам равна нулю
+- seq - номер проводки пользователя без пропусков (1, 2, 3, ...)
+- balance_after - нарастающий итог кошелька после проводки
+
+users_balance.balance и users_balance.ledger_seq - кэш последней
+проводки: LedgerService.post() меняет их одной командой
+UPDATE ... RETURNING, которая же блокирует строку баланса. Номер и итог
+новой проводки берутся из RETURNING, а не из прочитанного ранее float.
+
+balance_snapshots - снимки итога на момент проводки seq (created_at -
+время этой проводки):
+- take_snapshots() - каждые settings.ledger_snapshot_interval проводок
+- take_period_snapshots() - на границе периода (конец месяца)
+verify() проверяет журнал пользователя от последнего снимка, balance_at()
+ищет итог на момент времени между соседними снимками: обе операции стоят
+O(проводок между снимками), а не O(всей истории).
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, exists, func, insert, select, update
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import LedgerEntry, BalanceSnapshot, UserBalance
+from config.settings import settings
+
+
+# Счета на другой стороне проводки
+CONTRA_STRIPE = "stripe"            # пополнения картой
+CONTRA_WITHDRAWALS = "withdrawals"  # выводы к выплате
+CONTRA_BETS = "bets"                # расчёт ставок
+CONTRA_OPENING = "opening"          # входящие остатки при запуске журнала
+
+ZERO = Decimal("0.00")
+
+
+class LedgerService:
+    """
+    Проводки, снимки и проверка журнала.
+
+    post() не делает commit: проводка входит в транзакцию вызывающего
+    метода вместе с остальными изменениями.
+    """
+
+    @staticmethod
+    def post(
+        db: Session,
+        user_id: str,
+        amount: Decimal,
+        entry_type: str,
+        contra_account: str,
+        reference_type: Optional[str] = None,
+        reference_id: Optional[int] = None,
+        now: Optional[datetime] = None,
+        totals: Optional[Dict[str, Decimal]] = None
+    ) -> SimpleNamespace:
+        """
+        Добавляет проводку и обновляет кэш баланса.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            amount (Decimal): Изменение кошелька (> 0 - зачисление, < 0 - списание)
+            entry_type (str): Тип проводки (deposit, withdrawal, bet_won, ...)
+            contra_account (str): Счёт на другой стороне (CONTRA_*)
+            reference_type (str): Тип связанной сущности (operation, bet, ...)
+            reference_id (int): ID связанной сущности
+            now (datetime): Время проводки (по умолчанию utcnow)
+            totals (dict): Прибавки к счётчикам users_balance в той же
+                команде UPDATE, например {"total_deposited": amount}
+
+        Returns:
+            SimpleNamespace(seq, balance_before, balance_after)
+
+        Raises:
+            ValueError: У пользователя нет записи users_balance
+
+        Examples:
+            >>> entry = LedgerService.post(db, "user_123", Decimal("100.00"), "deposit", CONTRA_STRIPE)
+            >>> entry.balance_after
+            Decimal('1100.00')
+        """
+        amount = Decimal(amount)
+        now = now or datetime.utcnow()
+        counters = {
+            column: func.coalesce(getattr(UserBalance, column), 0) + value
+            for column, value in (totals or {}).items()
+        }
+
+        cached = db.execute(
+            update(UserBalance)
+            .where(UserBalance.user_id == user_id)
+            .values(
+                balance=UserBalance.balance + amount,
+                ledger_seq=UserBalance.ledger_seq + 1,
+                last_transaction=now,
+                **counters
+            )
+            .returning(UserBalance.balance, UserBalance.ledger_seq)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if cached is None:
+            raise ValueError(f"Balance record not found for user {user_id}")
+
+        balance_after = Decimal(cached.balance)
+        db.execute(insert(LedgerEntry.__table__).values(
+            user_id=user_id,
+            seq=cached.ledger_seq,
+            entry_type=entry_type,
+            amount=amount,
+            balance_after=balance_after,
+            contra_account=contra_account,
+            reference_type=reference_type,
+            reference_id=reference_id,
+            created_at=now
+        ))
+        return SimpleNamespace(
+            seq=cached.ledger_seq,
+            balance_before=balance_after - amount,
+            balance_after=balance_after
+        )
+
+    # =========================================================================
+    # СНИМКИ
+    # =========================================================================
+    @staticmethod
+    def take_snapshots(db: Session, interval: Optional[int] = None) -> int:
+        """
+        Снимает итог пользователей, у которых после последнего снимка
+        накопилось не меньше interval проводок.
+
+        Итог берётся из проводки (balance_after), а не из кэша users_balance.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            interval (int): Проводок между снимками (по умолчанию
+                settings.ledger_snapshot_interval)
+
+        Returns:
+            int: Количество новых снимков
+        """
+        interval = interval or settings.ledger_snapshot_interval
+        last_snapshot = (
+            select(BalanceSnapshot.user_id, func.max(BalanceSnapshot.seq).label("seq"))
+            .group_by(BalanceSnapshot.user_id)
+            .subquery()
+        )
+        due = (
+            select(LedgerEntry.user_id, LedgerEntry.seq, LedgerEntry.balance_after, LedgerEntry.created_at)
+            .join(UserBalance, and_(
+                UserBalance.user_id == LedgerEntry.user_id,
+                UserBalance.ledger_seq == LedgerEntry.seq
+            ))
+            .outerjoin(last_snapshot, last_snapshot.c.user_id == LedgerEntry.user_id)
+            .where(LedgerEntry.seq - func.coalesce(last_snapshot.c.seq, 0) >= interval)
+        )
+        result = db.execute(
+            insert(BalanceSnapshot.__table__).from_select(
+                ["user_id", "seq", "balance", "created_at"], due
+            )
+        )
+        db.commit()
+        logger.info("Ledger snapshots taken: {}", result.rowcount)
+        return result.rowcount
+
+    @staticmethod
+    def take_period_snapshots(db: Session, at: datetime, since: datetime) -> int:
+        """
+        Снимает итог на границе периода: последнюю проводку каждого
+        пользователя с since <= created_at < at.
+
+        Пользователи без проводок за период не затрагиваются - их итог на
+        момент at уже даёт предыдущий снимок или проводка. Просматриваются
+        только проводки периода (idx_ledger_created).
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            at (datetime): Граница периода (например, 1-е число следующего месяца)
+            since (datetime): Начало периода
+
+        Returns:
+            int: Количество новых снимков
+        """
+        last_entry = (
+            select(LedgerEntry.user_id, func.max(LedgerEntry.seq).label("seq"))
+            .where(LedgerEntry.created_at >= since, LedgerEntry.created_at < at)
+            .group_by(LedgerEntry.user_id)
+            .subquery()
+        )
+        due = (
+            select(LedgerEntry.user_id, LedgerEntry.seq, LedgerEntry.balance_after, LedgerEntry.created_at)
+            .join(last_entry, and_(
+                last_entry.c.user_id == LedgerEntry.user_id,
+                last_entry.c.seq == LedgerEntry.seq
+            ))
+            .where(~exists().where(
+                BalanceSnapshot.user_id == LedgerEntry.user_id,
+                BalanceSnapshot.seq == LedgerEntry.seq
+            ))
+        )
+        result = db.execute(
+            insert(BalanceSnapshot.__table__).from_select(
+                ["user_id", "seq", "balance", "created_at"], due
+            )
+        )
+        db.commit()
+        logger.info("Ledger period snapshots at {}: {}", at.isoformat(), result.rowcount)
+        return result.rowcount
+
+    @staticmethod
+    def balance_at(db: Session, user_id: str, at: datetime) -> Optional[SimpleNamespace]:
+        """
+        Итог кошелька на момент at (после всех проводок с created_at < at).
+
+        Проводки просматриваются только между ближайшими снимками до и
+        после at (индекс (user_id, seq)).
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            at (datetime): Момент времени
+
+        Returns:
+            SimpleNamespace(balance, seq) или None, если до at у
+            пользователя нет ни проводок, ни снимков
+
+        Examples:
+            >>> LedgerService.balance_at(db, "user_123", datetime(2026, 10, 1)).balance
+            Decimal('1250.00')
+        """
+        before = db.execute(
+            select(BalanceSnapshot.seq, BalanceSnapshot.balance)
+            .where(BalanceSnapshot.user_id == user_id, BalanceSnapshot.created_at < at)
+            .order_by(BalanceSnapshot.created_at.desc(), BalanceSnapshot.seq.desc())
+            .limit(1)
+        ).first()
+        after = db.execute(
+            select(BalanceSnapshot.seq)
+            .where(BalanceSnapshot.user_id == user_id, BalanceSnapshot.created_at >= at)
+            .order_by(BalanceSnapshot.created_at, BalanceSnapshot.seq)
+            .limit(1)
+        ).scalar()
+
+        query = select(LedgerEntry.seq, LedgerEntry.balance_after).where(
+            LedgerEntry.user_id == user_id,
+            LedgerEntry.seq > (before.seq if before else 0),
+            LedgerEntry.created_at < at
+        )
+        if after is not None:
+            query = query.where(LedgerEntry.seq <= after)
+        last = db.execute(query.order_by(LedgerEntry.seq.desc()).limit(1)).first()
+
+        if last is not None:
+            return SimpleNamespace(balance=Decimal(last.balance_after), seq=last.seq)
+        if before is not None:
+            return SimpleNamespace(balance=Decimal(before.balance), seq=before.seq)
+        return None
+
+    # =========================================================================
+    # ПРОВЕРКА
+    # =========================================================================
+    @staticmethod
+    def verify(db: Session, user_id: str, full: bool = False) -> Dict:
+        """
+        Проверяет журнал пользователя.
+
+        - seq идут подряд без пропусков
+        - balance_after каждой проводки = предыдущий итог + amount
+        - снимок, с которого начата проверка, совпадает с balance_after
+          своей проводки
+        - последняя проводка совпадает с кэшем users_balance
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            full (bool): Проверять с первой проводки, а не с последнего снимка
+
+        Returns:
+            dict: {
+                "success": True,
+                "user_id": "user_123",
+                "valid": True,
+                "from_seq": 1000,
+                "to_seq": 1042,
+                "checked_entries": 42,
+                "errors": []
+            }
+        """
+        errors: List[str] = []
+        seq, balance = 0, ZERO
+
+        if not full:
+            snapshot = db.execute(
+                select(BalanceSnapshot.seq, BalanceSnapshot.balance)
+                .where(BalanceSnapshot.user_id == user_id)
+                .order_by(BalanceSnapshot.seq.desc())
+                .limit(1)
+            ).first()
+            if snapshot is not None:
+                seq, balance = snapshot.seq, Decimal(snapshot.balance)
+                entry_balance = db.execute(
+                    select(LedgerEntry.balance_after)
+                    .where(LedgerEntry.user_id == user_id, LedgerEntry.seq == seq)
+                ).scalar()
+                if entry_balance is None or Decimal(entry_balance) != balance:
+                    errors.append(f"snapshot {seq}: balance {balance} != entry {entry_balance}")
+
+        from_seq = seq
+        entries = db.execute(
+            select(LedgerEntry.seq, LedgerEntry.amount, LedgerEntry.balance_after)
+            .where(LedgerEntry.user_id == user_id, LedgerEntry.seq > seq)
+            .order_by(LedgerEntry.seq)
+        )
+        checked = 0
+        for entry in entries:
+            checked += 1
+            if entry.seq != seq + 1:
+                errors.append(f"seq {entry.seq}: expected {seq + 1}")
+            balance += Decimal(entry.amount)
+            if Decimal(entry.balance_after) != balance:
+                errors.append(f"seq {entry.seq}: balance_after {entry.balance_after} != {balance}")
+            seq = entry.seq
+
+        cached = db.execute(
+            select(UserBalance.balance, UserBalance.ledger_seq).where(UserBalance.user_id == user_id)
+        ).first()
+        if cached is not None:
+            if cached.ledger_seq != seq:
+                errors.append(f"users_balance.ledger_seq {cached.ledger_seq} != {seq}")
+            if Decimal(cached.balance) != balance:
+                errors.append(f"users_balance.balance {cached.balance} != {balance}")
+
+        if errors:
+            logger.warning("Ledger of user {} is inconsistent: {}", user_id, errors)
+
+        return {
+            "success": True,
+            "user_id": user_id,
+            "valid": not errors,
+            "from_seq": from_seq,
+            "to_seq": seq,
+            "checked_entries": checked,
+            "errors": errors
+        }
+
+    @staticmethod
+    def trial_balance(db: Session) -> Dict:
+        """
+        Оборотка по счетам: кошельки пользователей против contra-счетов.
+
+        Сумма кошельков по журналу должна совпадать с суммой кэша
+        users_balance; contra-счета в сумме дают её с обратным знаком.
+
+        Returns:
+            dict: {
+                "success": True,
+                "wallets": 12345.67,
+                "cached_wallets": 12345.67,
+                "accounts": {"stripe": -15000.0, "bets": 3154.33, "withdrawals": -500.0},
+                "balanced": True
+            }
+        """
+        accounts = {
+            account: -Decimal(total)
+            for account, total in db.execute(
+                select(LedgerEntry.contra_account, func.sum(LedgerEntry.amount))
+                .group_by(LedgerEntry.contra_account)
+            ).all()
+        }
+        wallets = -sum(accounts.values(), ZERO)
+        cached = Decimal(db.execute(select(func.coalesce(func.sum(UserBalance.balance), 0))).scalar())
+        return {
+            "success": True,
+            "wallets": float(wallets),
+            "cached_wallets": float(cached),
+            "accounts": {account: float(total) for account, total in sorted(accounts.items())},
+            "balanced": wallets == cached
+        }
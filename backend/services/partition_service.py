@@ -0,0 +1,222 @@
+"""
+Обслуживание месячных партиций (PostgreSQL).
+
+balance_transactions, bets и audit_log партиционированы по месяцам
+(миграция 20261019_000001). Сервис:
+- создаёт партиции на settings.partition_premake_months вперёд, чтобы
+  новые строки не попадали в DEFAULT-партицию
+- отсоединяет партиции старше срока хранения: retention - это DETACH
+  (и при необходимости DROP) одной таблицы вместо массового DELETE
+
+Отсоединённая партиция остаётся обычной таблицей с тем же именем
+(например, audit_log_p2025_01) до архивации или удаления.
+
+Запуск по расписанию: scripts/manage_partitions.py
+"""
+
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from config.settings import settings
+
+
+# Таблица -> колонка, по которой она партиционирована
+PARTITIONED_TABLES: Dict[str, str] = {
+    "balance_transactions": "created_at",
+    "bets": "placed_at",
+    "audit_log": "created_at",
+}
+
+
+# ============================================================================
+# МЕСЯЦЫ И ИМЕНА ПАРТИЦИЙ
+# ============================================================================
+
+def month_start(day: date) -> date:
+    """Первое число месяца."""
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Первое число месяца, отстоящего на months (может быть отрицательным)."""
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """
+    Имя месячной партиции.
+
+    Examples:
+        >>> partition_name("audit_log", date(2026, 3, 1))
+        'audit_log_p2026_03'
+    """
+    return f"{table}_p{month:%Y_%m}"
+
+
+def parse_partition_month(table: str, name: str) -> Optional[date]:
+    """Месяц партиции по её имени (None для DEFAULT и чужих таблиц)."""
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})_(\d{{2}})", name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def missing_months(existing: List[date], today: date, months_ahead: int) -> List[date]:
+    """Месяцы от текущего до текущего + months_ahead, для которых нет партиции."""
+    current = month_start(today)
+    wanted = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    return [month for month in wanted if month not in set(existing)]
+
+
+def expired_months(existing: List[date], today: date, retention_months: int) -> List[date]:
+    """
+    Месяцы, целиком вышедшие за срок хранения.
+
+    retention_months=12 в октябре 2026 оставляет партиции с октября 2025.
+    0 - хранить всё.
+    """
+    if retention_months <= 0:
+        return []
+    oldest_kept = add_months(month_start(today), -retention_months)
+    return sorted(month for month in existing if month < oldest_kept)
+
+
+def retention_for(table: str) -> int:
+    """Срок хранения таблицы в месяцах из настроек (0 - бессрочно)."""
+    if table == "audit_log":
+        return settings.audit_log_retention_months
+    return settings.history_retention_months
+
+
+# ============================================================================
+# СЕРВИС
+# ============================================================================
+
+class PartitionService:
+    """
+    Создание и отсоединение месячных партиций.
+
+    Все методы принимают сессию БД и возвращают Dict с результатом.
+    """
+
+    @staticmethod
+    def list_partitions(db: Session, table: str) -> List[date]:
+        """Месяцы существующих партиций таблицы (без DEFAULT)."""
+        rows = db.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+        """), {"table": table}).scalars().all()
+        months = (parse_partition_month(table, name) for name in rows)
+        return sorted(month for month in months if month is not None)
+
+    @staticmethod
+    def create_partition(db: Session, table: str, month: date) -> str:
+        """
+        Создаёт партицию месяца.
+
+        Если в DEFAULT-партиции уже есть строки этого месяца, они
+        переносятся в новую партицию - иначе PostgreSQL не даст её создать.
+
+        Returns:
+            str: Имя созданной партиции
+        """
+        column = PARTITIONED_TABLES[table]
+        name = partition_name(table, month)
+        lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+        bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        in_range = f"{column} >= '{lower}' AND {column} < '{upper}'"
+
+        stray = db.execute(text(f"SELECT COUNT(*) FROM {table}_default WHERE {in_range}")).scalar()
+        if not stray:
+            db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}"))
+            return name
+
+        db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        db.execute(text(f"INSERT INTO {name} SELECT * FROM {table}_default WHERE {in_range}"))
+        db.execute(text(f"DELETE FROM {table}_default WHERE {in_range}"))
+        db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}"))
+        logger.warning("Moved {} rows from {}_default into {}", stray, table, name)
+        return name
+
+    @staticmethod
+    def ensure_future_partitions(
+        db: Session,
+        months_ahead: Optional[int] = None,
+        today: Optional[date] = None
+    ) -> Dict:
+        """
+        Создаёт недостающие партиции от текущего месяца на months_ahead вперёд.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            months_ahead (int): По умолчанию settings.partition_premake_months
+            today (date): Текущая дата (для тестов)
+
+        Returns:
+            dict: {"success": bool, "created": List[str], "error": str}
+        """
+        months_ahead = settings.partition_premake_months if months_ahead is None else months_ahead
+        today = today or date.today()
+        created = []
+        try:
+            for table in PARTITIONED_TABLES:
+                existing = PartitionService.list_partitions(db, table)
+                for month in missing_months(existing, today, months_ahead):
+                    created.append(PartitionService.create_partition(db, table, month))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("Failed to create partitions: {}", e)
+            return {"success": False, "created": [], "error": str(e)}
+
+        if created:
+            logger.info("Created partitions: {}", ", ".join(created))
+        return {"success": True, "created": created}
+
+    @staticmethod
+    def detach_expired_partitions(
+        db: Session,
+        drop: bool = False,
+        today: Optional[date] = None
+    ) -> Dict:
+        """
+        Отсоединяет партиции старше срока хранения таблицы.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            drop (bool): Удалить отсоединённые таблицы (без архивации)
+            today (date): Текущая дата (для тестов)
+
+        Returns:
+            dict: {"success": bool, "detached": List[str], "dropped": List[str], "error": str}
+        """
+        today = today or date.today()
+        detached, dropped = [], []
+        try:
+            for table in PARTITIONED_TABLES:
+                existing = PartitionService.list_partitions(db, table)
+                for month in expired_months(existing, today, retention_for(table)):
+                    name = partition_name(table, month)
+                    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    detached.append(name)
+                    if drop:
+                        db.execute(text(f"DROP TABLE {name}"))
+                        dropped.append(name)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("Failed to detach partitions: {}", e)
+            return {"success": False, "detached": [], "dropped": [], "error": str(e)}
+
+        if detached:
+            logger.info("Detached partitions: {}", ", ".join(detached))
+        return {"success": True, "detached": detached, "dropped": dropped}
@@ -0,0 +1,331 @@
+"""
+Сверка pending-пополнений wallet_operations со Stripe.
+
+Webhook может не дойти (сбой доставки, простой сервиса), и тогда
+пополнение остаётся pending, хотя деньги в Stripe уже списаны.
+ReconciliationService.reconcile() проходит такие операции и доводит
+их до конечного статуса:
+
+1. keyset-пагинация по operation_id (частичный индекс
+   idx_operations_pending_scan) пачками по settings.reconcile_batch_size,
+   только операции старше settings.reconcile_grace_minutes - свежие
+   обычно закрывает webhook
+2. статусы PaymentIntent пачки запрашиваются параллельно, не более
+   settings.reconcile_concurrency запросов одновременно; сессия БД
+   используется только в основном потоке
+3. по ответу Stripe:
+   - succeeded: зачисление проводкой журнала (как в webhook'е), операция
+     блокируется FOR UPDATE, чтобы не зачислить дважды вместе с webhook'ом
+   - canceled: операция cancelled
+   - любой другой статус после expires_at: операция expired
+     (processing не трогается - платёж ещё идёт)
+4. расхождения (intent не найден, другая сумма или user_id в metadata)
+   не исправляются автоматически, а попадают в отчёт
+
+Каждая пачка - отдельная транзакция. При открытом circuit breaker'е
+Stripe проход останавливается, следующий запуск продолжит с начала.
+
+Запуск по расписанию: scripts/reconcile_operations.py
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import WalletOperation, BalanceTransaction, AuditLog
+from services.ledger_service import LedgerService, CONTRA_STRIPE
+from services.stripe_service import StripeService
+from config.settings import settings
+from monitoring.circuit_breaker import STRIPE_BREAKER
+from monitoring.metrics import RECONCILED_OPERATIONS, RECONCILIATION_DURATION
+
+
+# Статусы PaymentIntent, при которых операцию не закрываем даже после expires_at
+IN_FLIGHT_STATUSES = {"processing"}
+
+
+class ReconciliationService:
+    """
+    Сверка операций кошелька со Stripe.
+
+    Все методы принимают сессию БД и возвращают Dict с результатом.
+    """
+
+    @staticmethod
+    def reconcile(
+        db: Session,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        grace_minutes: Optional[int] = None,
+        limit: Optional[int] = None,
+        fetch_intent: Optional[Callable[[str], Dict]] = None,
+        now: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Сверяет pending-пополнения со Stripe.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            batch_size (int): Операций на пачку (по умолчанию settings.reconcile_batch_size)
+            concurrency (int): Одновременных запросов к Stripe
+                (по умолчанию settings.reconcile_concurrency)
+            grace_minutes (int): Не трогать операции моложе этого возраста
+            limit (int): Максимум операций за запуск (None - все)
+            fetch_intent (callable): intent_id -> результат в формате
+                StripeService.confirm_payment (для тестов и локального прогона)
+            now (datetime): Текущее время (по умолчанию utcnow)
+
+        Returns:
+            dict: {
+                "success": True,
+                "scanned": 120000,
+                "settled": 35,
+                "cancelled": 410,
+                "expired": 1200,
+                "pending": 118300,
+                "errors": 0,
+                "mismatch_count": 2,
+                "mismatches": [
+                    {"operation_id": 42, "user_id": "user_123",
+                     "intent_id": "pi_...", "reason": "amount_mismatch",
+                     "local_amount": 100.0, "stripe_amount": 10.0}
+                ],
+                "aborted": None,
+                "duration_seconds": 184.2
+            }
+
+        Examples:
+            >>> ReconciliationService.reconcile(db, batch_size=500)["settled"]
+            35
+        """
+        batch_size = batch_size or settings.reconcile_batch_size
+        concurrency = concurrency or settings.reconcile_concurrency
+        if grace_minutes is None:
+            grace_minutes = settings.reconcile_grace_minutes
+        fetch_intent = fetch_intent or StripeService.confirm_payment
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(minutes=grace_minutes)
+
+        report = {
+            "success": True,
+            "scanned": 0,
+            "settled": 0,
+            "cancelled": 0,
+            "expired": 0,
+            "pending": 0,
+            "errors": 0,
+            "mismatch_count": 0,
+            "mismatches": [],
+            "aborted": None
+        }
+        started_at = time.perf_counter()
+        last_id = 0
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="reconcile") as pool:
+            while limit is None or report["scanned"] < limit:
+                if not STRIPE_BREAKER.allow_request():
+                    report["aborted"] = "Stripe circuit breaker is open"
+                    break
+
+                size = batch_size if limit is None else min(batch_size, limit - report["scanned"])
+                batch = db.execute(
+                    select(
+                        WalletOperation.operation_id,
+                        WalletOperation.user_id,
+                        WalletOperation.amount,
+                        WalletOperation.stripe_payment_intent_id,
+                        WalletOperation.expires_at
+                    )
+                    .where(
+                        WalletOperation.status == 'pending',
+                        WalletOperation.operation_type == 'deposit',
+                        WalletOperation.created_at < cutoff,
+                        WalletOperation.operation_id > last_id
+                    )
+                    .order_by(WalletOperation.operation_id)
+                    .limit(size)
+                ).all()
+                db.rollback()  # не держим снимок/блокировки, пока ждём Stripe
+                if not batch:
+                    break
+                last_id = batch[-1].operation_id
+                report["scanned"] += len(batch)
+
+                intents = list(pool.map(
+                    lambda row: _fetch(fetch_intent, row.stripe_payment_intent_id), batch
+                ))
+                ReconciliationService._apply_batch(db, batch, intents, now, report)
+
+        elapsed = time.perf_counter() - started_at
+        RECONCILIATION_DURATION.observe(elapsed)
+        report["duration_seconds"] = round(elapsed, 3)
+        logger.info(
+            "Reconciliation: {} scanned, {} settled, {} cancelled, {} expired, {} mismatches, {} errors in {:.1f}s{}",
+            report["scanned"], report["settled"], report["cancelled"], report["expired"],
+            report["mismatch_count"], report["errors"], elapsed,
+            " (aborted: {})".format(report["aborted"]) if report["aborted"] else ""
+        )
+        return report
+
+    @staticmethod
+    def _apply_batch(db: Session, batch: List, intents: List[Optional[Dict]], now: datetime, report: Dict) -> None:
+        """Применяет ответы Stripe к пачке операций одной транзакцией."""
+        to_cancel, to_expire = [], []
+        outcomes = []
+
+        try:
+            for row, intent in zip(batch, intents):
+                outcome = ReconciliationService._classify(row, intent, now)
+                if outcome == "settled":
+                    if not ReconciliationService._settle(db, row, intent, now):
+                        outcome = "already_closed"
+                elif outcome == "cancelled":
+                    to_cancel.append(row.operation_id)
+                elif outcome == "expired":
+                    to_expire.append(row.operation_id)
+                elif outcome not in ("pending", "error"):
+                    ReconciliationService._record_mismatch(report, row, intent, outcome)
+                    outcome = "mismatch"
+                outcomes.append(outcome)
+
+            for status, ids, message in (
+                ('cancelled', to_cancel, "Canceled in Stripe (reconciliation)"),
+                ('expired', to_expire, "Payment not completed before expiry (reconciliation)"),
+            ):
+                if ids:
+                    db.execute(
+                        update(WalletOperation)
+                        .where(WalletOperation.operation_id.in_(ids), WalletOperation.status == 'pending')
+                        .values(status=status, error_message=message, completed_at=now)
+                        .execution_options(synchronize_session=False)
+                    )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("Reconciliation batch {}..{} failed: {}", batch[0].operation_id, batch[-1].operation_id, e)
+            report["errors"] += len(batch)
+            report["success"] = False
+            RECONCILED_OPERATIONS.inc(len(batch), outcome="error")
+            return
+
+        for outcome in outcomes:
+            if outcome == "error":
+                report["errors"] += 1
+            elif outcome in ("settled", "cancelled", "expired", "pending"):
+                report[outcome] += 1
+            RECONCILED_OPERATIONS.inc(outcome=outcome)
+
+    @staticmethod
+    def _classify(row, intent: Optional[Dict], now: datetime) -> str:
+        """Итог сверки одной операции по ответу Stripe."""
+        expired = row.expires_at is not None and row.expires_at <= now
+
+        if intent is None:
+            # Операция без PaymentIntent: закрываем только по сроку
+            return "expired" if expired else "pending"
+        if not intent.get("success"):
+            if intent.get("error") == "Payment intent not found":
+                return "intent_not_found"
+            return "error"
+
+        status = intent.get("status")
+        if status == "succeeded":
+            metadata_user = (intent.get("metadata") or {}).get("user_id")
+            if metadata_user and metadata_user != row.user_id:
+                return "user_mismatch"
+            if Decimal(str(intent.get("amount"))) != Decimal(row.amount):
+                return "amount_mismatch"
+            return "settled"
+        if status == "canceled":
+            return "cancelled"
+        if expired and status not in IN_FLIGHT_STATUSES:
+            return "expired"
+        return "pending"
+
+    @staticmethod
+    def _settle(db: Session, row, intent: Dict, now: datetime) -> bool:
+        """
+        Зачисляет успешное пополнение, если операция всё ещё pending.
+
+        Returns:
+            bool: False - операцию уже закрыл webhook
+        """
+        operation = db.execute(
+            select(WalletOperation)
+            .where(WalletOperation.operation_id == row.operation_id, WalletOperation.status == 'pending')
+            .with_for_update()
+        ).scalar_one_or_none()
+        if operation is None:
+            return False
+
+        amount = Decimal(operation.amount)
+        operation.status = 'completed'
+        operation.stripe_charge_id = intent.get("charge_id")
+        operation.completed_at = now
+
+        entry = LedgerService.post(
+            db, operation.user_id, amount, 'deposit', CONTRA_STRIPE,
+            reference_type='operation', reference_id=operation.operation_id, now=now,
+            totals={"total_deposited": amount}
+        )
+        db.add(BalanceTransaction(
+            user_id=operation.user_id,
+            transaction_type='deposit',
+            amount=amount,
+            balance_before=entry.balance_before,
+            balance_after=entry.balance_after,
+            status='completed',
+            stripe_payment_intent_id=operation.stripe_payment_intent_id,
+            stripe_charge_id=operation.stripe_charge_id,
+            description="Deposit via Stripe (reconciled)",
+            processed_at=now
+        ))
+        db.add(AuditLog(
+            user_id=operation.user_id,
+            action="deposit_reconciled",
+            amount=amount,
+            status="success",
+            details=json.dumps({
+                "operation_id": operation.operation_id,
+                "intent_id": operation.stripe_payment_intent_id,
+                "charge_id": operation.stripe_charge_id
+            })
+        ))
+        return True
+
+    @staticmethod
+    def _record_mismatch(report: Dict, row, intent: Optional[Dict], reason: str) -> None:
+        report["mismatch_count"] += 1
+        if len(report["mismatches"]) >= settings.reconcile_max_report_rows:
+            return
+        report["mismatches"].append({
+            "operation_id": row.operation_id,
+            "user_id": row.user_id,
+            "intent_id": row.stripe_payment_intent_id,
+            "reason": reason,
+            "local_amount": float(row.amount),
+            "stripe_amount": intent.get("amount") if intent else None,
+            "stripe_user_id": ((intent or {}).get("metadata") or {}).get("user_id")
+        })
+        logger.warning(
+            "Reconciliation mismatch for operation {} ({}): {}",
+            row.operation_id, row.stripe_payment_intent_id, reason
+        )
+
+
+def _fetch(fetch_intent: Callable[[str], Dict], intent_id: Optional[str]) -> Optional[Dict]:
+    """Статус PaymentIntent; исключение клиента превращается в ответ с ошибкой."""
+    if not intent_id:
+        return None
+    try:
+        return fetch_intent(intent_id)
+    except Exception as e:
+        logger.error("Stripe lookup for {} failed: {}", intent_id, e)
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,278 @@
+"""
+Расчёт ставок по итогам события.
+
+SettlementService.settle_event() закрывает все открытые ставки события
+пачками по settings.settlement_chunk_size:
+
+1. UPDATE bets ... RETURNING - одна команда на пачку: status, result,
+   actual_win и resolved_at считаются в SQL (CASE по odds_id)
+2. SELECT ... FOR UPDATE балансов пользователей пачки (в порядке user_id,
+   чтобы параллельные расчёты не взаимоблокировались)
+3. bulk insert транзакций bet_won / bet_lost и проводок журнала
+   (services/ledger_service.py) с номерами после users_balance.ledger_seq
+4. одна команда UPDATE users_balance (executemany) с дельтами по
+   пользователям: balance, total_won, total_lost, ledger_seq
+
+Каждая пачка - отдельная транзакция: блокировки держатся недолго, а
+повторный запуск после сбоя продолжает с оставшихся открытых ставок.
+
+Пачки выбираются с SKIP LOCKED - ставки, которые держит другая
+транзакция, не тормозят расчёт. Их добирает второй проход, который ждёт
+блокировки; если открытые ставки события всё же остались, расчёт
+возвращает их число в remaining и success=False - запуск нужно повторить.
+
+Ставка остаётся в balance до расчёта (available = balance - открытые
+ставки), поэтому:
+- выигрыш: balance += actual_win - bet_amount, total_won += actual_win
+- проигрыш: balance -= bet_amount, total_lost += bet_amount
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, case, false, func, insert, select, update
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import Bet, BalanceTransaction, LedgerEntry, UserBalance
+from services.ledger_service import CONTRA_BETS
+from config.settings import settings
+from monitoring.metrics import BETS_SETTLED, SETTLEMENT_DURATION
+
+
+ZERO = Decimal("0.00")
+
+
+class SettlementService:
+    """
+    Массовый расчёт ставок.
+
+    Все методы принимают сессию БД и возвращают Dict с результатом.
+    """
+
+    @staticmethod
+    def _settle_chunk(
+        db: Session,
+        event_id: int,
+        winning_odds_ids: list,
+        chunk_size: int,
+        now: datetime,
+        skip_locked: bool = True
+    ) -> Dict:
+        """Рассчитывает одну пачку открытых ставок события."""
+        is_win = Bet.odds_id.in_(winning_odds_ids) if winning_odds_ids else false()
+
+        chunk = (
+            select(Bet.bet_id)
+            .where(Bet.event_id == event_id, Bet.status == 'open')
+            .order_by(Bet.bet_id)
+            .limit(chunk_size)
+            .with_for_update(skip_locked=skip_locked)
+            .scalar_subquery()
+        )
+        settled = db.execute(
+            update(Bet)
+            .where(Bet.bet_id.in_(chunk))
+            .values(
+                status='resolved',
+                result=case((is_win, 'win'), else_='loss'),
+                actual_win=case((is_win, Bet.potential_win), else_=ZERO),
+                resolved_at=now
+            )
+            .returning(Bet.bet_id, Bet.user_id, Bet.result, Bet.bet_amount, Bet.actual_win)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not settled:
+            return {"settled": 0, "won": 0, "payout": ZERO}
+
+        settled.sort(key=lambda row: row.bet_id)
+        user_ids = sorted({row.user_id for row in settled})
+        balances, seqs = {}, {}
+        for row in db.execute(
+            select(UserBalance.user_id, UserBalance.balance, UserBalance.ledger_seq)
+            .where(UserBalance.user_id.in_(user_ids))
+            .order_by(UserBalance.user_id)
+            .with_for_update()
+        ):
+            balances[row.user_id] = row.balance
+            seqs[row.user_id] = row.ledger_seq or 0
+        missing = [user_id for user_id in user_ids if user_id not in balances]
+        if missing:
+            db.execute(insert(UserBalance), [
+                {"user_id": user_id, "balance": ZERO, "total_won": ZERO, "total_lost": ZERO, "ledger_seq": 0}
+                for user_id in missing
+            ])
+            balances.update((user_id, ZERO) for user_id in missing)
+            seqs.update((user_id, 0) for user_id in missing)
+
+        deltas = defaultdict(lambda: {"balance": ZERO, "won": ZERO, "lost": ZERO, "entries": 0})
+        transactions = []
+        entries = []
+        won = 0
+        payout = ZERO
+        for row in settled:
+            if row.result == 'win':
+                amount = row.actual_win - row.bet_amount
+                deltas[row.user_id]["won"] += row.actual_win
+                won += 1
+                payout += row.actual_win
+            else:
+                amount = -row.bet_amount
+                deltas[row.user_id]["lost"] += row.bet_amount
+            deltas[row.user_id]["balance"] += amount
+
+            balance_before = balances.get(row.user_id, ZERO)
+            balances[row.user_id] = balance_before + amount
+            transactions.append({
+                "user_id": row.user_id,
+                "transaction_type": 'bet_won' if row.result == 'win' else 'bet_lost',
+                "amount": amount,
+                "balance_before": balance_before,
+                "balance_after": balance_before + amount,
+                "status": 'completed',
+                "description": f"Bet #{row.bet_id} settled: {row.result}",
+                "related_entity_type": 'bet',
+                "related_entity_id": row.bet_id,
+                "created_at": now,
+                "processed_at": now
+            })
+            if amount:
+                seqs[row.user_id] += 1
+                deltas[row.user_id]["entries"] += 1
+                entries.append({
+                    "user_id": row.user_id,
+                    "seq": seqs[row.user_id],
+                    "entry_type": 'bet_won' if row.result == 'win' else 'bet_lost',
+                    "amount": amount,
+                    "balance_after": balance_before + amount,
+                    "contra_account": CONTRA_BETS,
+                    "reference_type": 'bet',
+                    "reference_id": row.bet_id,
+                    "created_at": now
+                })
+
+        db.execute(insert(BalanceTransaction.__table__), transactions)
+        if entries:
+            db.execute(insert(LedgerEntry.__table__), entries)
+        db.execute(
+            update(UserBalance.__table__)
+            .where(UserBalance.__table__.c.user_id == bindparam('b_user_id'))
+            .values(
+                balance=UserBalance.__table__.c.balance + bindparam('b_balance'),
+                total_won=UserBalance.__table__.c.total_won + bindparam('b_won'),
+                total_lost=UserBalance.__table__.c.total_lost + bindparam('b_lost'),
+                ledger_seq=UserBalance.__table__.c.ledger_seq + bindparam('b_entries'),
+                last_transaction=now,
+                updated_at=now
+            ),
+            [
+                {
+                    "b_user_id": user_id, "b_balance": d["balance"], "b_won": d["won"],
+                    "b_lost": d["lost"], "b_entries": d["entries"]
+                }
+                for user_id, d in sorted(deltas.items())
+            ]
+        )
+        db.commit()
+        return {"settled": len(settled), "won": won, "payout": payout}
+
+    @staticmethod
+    def settle_event(
+        db: Session,
+        event_id: int,
+        winning_odds_ids: Iterable[int],
+        chunk_size: Optional[int] = None
+    ) -> Dict:
+        """
+        Рассчитывает все открытые ставки события.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            event_id (int): ID события
+            winning_odds_ids (Iterable[int]): Выигравшие исходы (odds_id);
+                остальные ставки события проигрывают
+            chunk_size (int): Ставок на транзакцию (по умолчанию settings.settlement_chunk_size)
+
+        Returns:
+            dict: {
+                "success": True,
+                "event_id": 123,
+                "settled": 100000,
+                "won": 41234,
+                "lost": 58766,
+                "payout": 1234567.89,
+                "chunks": 20,
+                "remaining": 0
+            }
+            При remaining > 0 - success=False, error="Open bets remain"
+
+        Examples:
+            >>> SettlementService.settle_event(db, event_id=123, winning_odds_ids=[456])
+        """
+        started_at = time.perf_counter()
+        chunk_size = chunk_size or settings.settlement_chunk_size
+        winning_odds_ids = list(winning_odds_ids)
+        now = datetime.utcnow()
+        totals = {"settled": 0, "won": 0, "payout": ZERO, "chunks": 0}
+
+        try:
+            # Сначала всё, что не заблокировано, затем - с ожиданием блокировок
+            for skip_locked in (True, False):
+                while True:
+                    result = SettlementService._settle_chunk(
+                        db, event_id, winning_odds_ids, chunk_size, now, skip_locked=skip_locked
+                    )
+                    if not result["settled"]:
+                        break
+                    totals["chunks"] += 1
+                    totals["settled"] += result["settled"]
+                    totals["won"] += result["won"]
+                    totals["payout"] += result["payout"]
+            remaining = db.execute(
+                select(func.count()).select_from(Bet).where(Bet.event_id == event_id, Bet.status == 'open')
+            ).scalar()
+        except Exception as e:
+            db.rollback()
+            logger.error("Settlement of event {} failed after {} bets: {}", event_id, totals["settled"], e)
+            return {
+                "success": False,
+                "error": "Settlement error",
+                "details": str(e),
+                "event_id": event_id,
+                "settled": totals["settled"]
+            }
+        finally:
+            BETS_SETTLED.inc(totals["won"], result="win")
+            BETS_SETTLED.inc(totals["settled"] - totals["won"], result="loss")
+
+        elapsed = time.perf_counter() - started_at
+        SETTLEMENT_DURATION.observe(elapsed)
+        if remaining:
+            logger.warning(
+                "Settlement of event {} left {} open bets after {} settled", event_id, remaining, totals["settled"]
+            )
+            return {
+                "success": False,
+                "error": "Open bets remain",
+                "details": f"{remaining} open bets left, run settlement again",
+                "event_id": event_id,
+                "settled": totals["settled"],
+                "remaining": remaining
+            }
+        logger.info(
+            "Settled event {}: {} bets ({} won) in {} chunks, {:.2f}s",
+            event_id, totals["settled"], totals["won"], totals["chunks"], elapsed
+        )
+        return {
+            "success": True,
+            "event_id": event_id,
+            "settled": totals["settled"],
+            "won": totals["won"],
+            "lost": totals["settled"] - totals["won"],
+            "payout": float(totals["payout"]),
+            "chunks": totals["chunks"],
+            "remaining": 0
+        }
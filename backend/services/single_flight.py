@@ -0,0 +1,108 @@
+"""
+Объединение одновременных одинаковых чтений (single-flight).
+
+Несколько вкладок, повторы клиента и GET /api/wallet/summary рядом с
+/balance присылают одни и те же чтения одного пользователя почти
+одновременно. Пока первое вычисление (leader) выполняется, такие же
+запросы не идут в БД, а ждут его и получают копию результата.
+
+- объединяются только выполняющиеся вызовы: результат не кэшируется,
+  следующий запрос после завершения считает заново
+- ключ - операция, пользователь и аргументы чтения (в том числе источник:
+  primary или реплика), разные страницы и фильтры не смешиваются
+- forget(user_id) после commit изменений пользователя: запросы, пришедшие
+  позже, не присоединяются к чтению, начатому до изменения
+- исключение leader'а получают и ожидающие запросы
+
+Объединение работает внутри процесса: WalletService выполняется в пуле
+потоков FastAPI, ожидание - threading.Event.
+"""
+
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from config.settings import settings
+from monitoring.metrics import WALLET_READS_COALESCED, WALLET_READ_EXECUTIONS
+
+
+class _Call:
+    """Выполняющееся вычисление и его результат."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Выполняющиеся вычисления по пользователю и ключу."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.calls: Dict[str, Dict[Hashable, _Call]] = {}
+
+    def do(self, operation: str, user_id: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Выполняет fn() или ждёт такого же выполняющегося вызова.
+
+        Args:
+            operation: Имя чтения (метка метрик): "balance", "history"
+            user_id: Пользователь - по нему forget() сбрасывает вызовы
+            key: Аргументы чтения
+            fn: Вычисление
+
+        Returns:
+            Any: Результат fn(); ожидавшие запросы получают глубокую копию -
+            вызывающий код может менять свой результат
+
+        Examples:
+            >>> WALLET_READS.do("balance", "user_1", (engine_id,), lambda: compute(db))
+        """
+        if not self.enabled:
+            return fn()
+
+        call_key = (operation, key)
+        with self.lock:
+            user_calls = self.calls.setdefault(user_id, {})
+            call = user_calls.get(call_key)
+            leader = call is None
+            if leader:
+                call = user_calls[call_key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            WALLET_READS_COALESCED.inc(operation=operation)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        WALLET_READ_EXECUTIONS.inc(operation=operation)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                user_calls = self.calls.get(user_id)
+                if user_calls is not None and user_calls.get(call_key) is call:
+                    del user_calls[call_key]
+                    if not user_calls:
+                        del self.calls[user_id]
+            call.done.set()
+
+    def forget(self, user_id: str) -> None:
+        """Новые запросы пользователя не присоединяются к уже начатым вычислениям."""
+        with self.lock:
+            self.calls.pop(user_id, None)
+
+
+WALLET_READS = SingleFlight(settings.wallet_read_coalescing)
@@ -0,0 +1,217 @@
+"""
+Месячные выписки (monthly_statements).
+
+Остатки на начало и конец месяца берутся из WalletService.get_balance_at()
+(снимки журнала проводок), обороты - из проводок и ставок месяца.
+generate_month() сначала снимает итоги на границе месяца
+(LedgerService.take_period_snapshots), поэтому остаток на начало
+следующего месяца - одно чтение снимка.
+
+Запуск по расписанию: scripts/generate_statements.py
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from models.orm_models import Bet, LedgerEntry, MonthlyStatement
+from services.ledger_service import LedgerService
+from services.partition_service import add_months
+from services.wallet_service import WalletService
+
+
+ZERO = Decimal("0.00")
+
+
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """
+    Начало месяца и начало следующего месяца.
+
+    Examples:
+        >>> month_bounds(2026, 12)
+        (datetime.datetime(2026, 12, 1, 0, 0), datetime.datetime(2027, 1, 1, 0, 0))
+    """
+    start = date(year, month, 1)
+    end = add_months(start, 1)
+    return datetime(start.year, start.month, 1), datetime(end.year, end.month, 1)
+
+
+class StatementService:
+    """
+    Генерация месячных выписок.
+
+    Все методы принимают сессию БД и возвращают Dict с результатом.
+    """
+
+    @staticmethod
+    def generate_statement(db: Session, user_id: str, year: int, month: int) -> Dict:
+        """
+        Создаёт или пересчитывает выписку пользователя за месяц.
+
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            year (int): Год
+            month (int): Месяц (1-12)
+
+        Returns:
+            dict: {
+                "success": True,
+                "statement": {
+                    "user_id": "user_123",
+                    "year": 2026,
+                    "month": 9,
+                    "opening_balance": 1000.0,
+                    "closing_balance": 1250.0,
+                    "total_deposits": 500.0,
+                    "total_withdrawals": 100.0,
+                    "total_bets": 300.0,
+                    "total_wins": 250.0,
+                    "total_losses": 100.0,
+                    "net_profit": -150.0,
+                    "roi_percent": -50.0,
+                    "transaction_count": 12,
+                    "win_rate_percent": 50.0
+                }
+            }
+        """
+        try:
+            start, end = month_bounds(year, month)
+
+            opening = WalletService.get_balance_at(db, user_id, start)
+            closing = WalletService.get_balance_at(db, user_id, end)
+            if not opening["success"] or not closing["success"]:
+                return {"success": False, "error": "Balance lookup failed"}
+
+            # Обороты по проводкам месяца
+            flows = db.execute(
+                select(
+                    func.coalesce(func.sum(case(
+                        (LedgerEntry.entry_type == 'deposit', LedgerEntry.amount), else_=ZERO
+                    )), ZERO).label("deposits"),
+                    func.coalesce(func.sum(case(
+                        (LedgerEntry.entry_type == 'withdrawal', -LedgerEntry.amount), else_=ZERO
+                    )), ZERO).label("withdrawals"),
+                    func.count(LedgerEntry.entry_id).label("count")
+                ).where(
+                    LedgerEntry.user_id == user_id,
+                    LedgerEntry.created_at >= start,
+                    LedgerEntry.created_at < end
+                )
+            ).one()
+
+            # Ставки, рассчитанные в месяце
+            bets = db.execute(
+                select(
+                    func.coalesce(func.sum(Bet.bet_amount), ZERO).label("total"),
+                    func.coalesce(func.sum(case(
+                        (Bet.result == 'win', Bet.actual_win), else_=ZERO
+                    )), ZERO).label("wins"),
+                    func.coalesce(func.sum(case(
+                        (Bet.result == 'loss', Bet.bet_amount), else_=ZERO
+                    )), ZERO).label("losses"),
+                    func.count(Bet.bet_id).label("count"),
+                    func.coalesce(func.sum(case((Bet.result == 'win', 1), else_=0)), 0).label("won")
+                ).where(
+                    and_(
+                        Bet.user_id == user_id,
+                        Bet.status == 'resolved',
+                        Bet.resolved_at >= start,
+                        Bet.resolved_at < end
+                    )
+                )
+            ).one()
+
+            total_bets = Decimal(bets.total)
+            net_profit = Decimal(bets.wins) - total_bets
+            values = {
+                "opening_balance": Decimal(str(opening["balance"])),
+                "closing_balance": Decimal(str(closing["balance"])),
+                "total_deposits": Decimal(flows.deposits),
+                "total_withdrawals": Decimal(flows.withdrawals),
+                "total_bets": total_bets,
+                "total_wins": Decimal(bets.wins),
+                "total_losses": Decimal(bets.losses),
+                "net_profit": net_profit,
+                "roi_percent": round(net_profit / total_bets * 100, 2) if total_bets else ZERO,
+                "transaction_count": flows.count,
+                "win_rate_percent": round(Decimal(bets.won) / bets.count * 100, 2) if bets.count else ZERO,
+                "generated_at": datetime.utcnow()
+            }
+
+            statement = db.query(MonthlyStatement).filter(
+                and_(
+                    MonthlyStatement.user_id == user_id,
+                    MonthlyStatement.year == year,
+                    MonthlyStatement.month == month
+                )
+            ).first()
+            if statement is None:
+                statement = MonthlyStatement(user_id=user_id, year=year, month=month)
+                db.add(statement)
+            for field, value in values.items():
+                setattr(statement, field, value)
+            db.commit()
+
+            values.pop("generated_at")
+            return {
+                "success": True,
+                "statement": {
+                    "user_id": user_id,
+                    "year": year,
+                    "month": month,
+                    **{
+                        field: value if isinstance(value, int) else float(value)
+                        for field, value in values.items()
+                    }
+                }
+            }
+
+        except Exception as e:
+            db.rollback()
+            logger.error("Error generating statement {}-{:02d} for user {}: {}", year, month, user_id, e)
+            return {
+                "success": False,
+                "error": "Statement error",
+                "details": str(e)
+            }
+
+    @staticmethod
+    def generate_month(db: Session, year: int, month: int) -> Dict:
+        """
+        Выписки за месяц для всех пользователей с проводками в этом месяце.
+
+        Сначала снимает итоги на границе месяца, затем генерирует выписки.
+
+        Returns:
+            dict: {"success": True, "snapshots": 950, "generated": 950, "failed": []}
+        """
+        start, end = month_bounds(year, month)
+        snapshots = LedgerService.take_period_snapshots(db, at=end, since=start)
+
+        user_ids = db.execute(
+            select(LedgerEntry.user_id)
+            .where(LedgerEntry.created_at >= start, LedgerEntry.created_at < end)
+            .distinct()
+            .order_by(LedgerEntry.user_id)
+        ).scalars().all()
+
+        failed = []
+        for user_id in user_ids:
+            if not StatementService.generate_statement(db, user_id, year, month)["success"]:
+                failed.append(user_id)
+
+        logger.info(
+            "Statements {}-{:02d}: {} generated, {} failed, {} snapshots",
+            year, month, len(user_ids) - len(failed), len(failed), snapshots
+        )
+        return {
+            "success": not failed,
+            "snapshots": snapshots,
+            "generated": len(user_ids) - len(failed),
+            "failed": failed
+        }
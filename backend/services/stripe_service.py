@@ -2,14 +2,15 @@
 Сервис для интеграции со Stripe.
 Обрабатывает платежи, сохранение способов оплаты, webhook'и.
 
-Включает 7 функций:
+Включает 8 функций:
 1. create_payment_intent() - Создаёт намерение платежа
 2. confirm_payment() - Проверяет статус платежа
 3. create_stripe_customer() - Создаёт Stripe Customer
-4. save_payment_method() - Сохраняет способ оплаты
-5. charge_customer() - Списывает деньги с сохранённой карты
-6. get_payment_methods() - Получает способы оплаты
-7. construct_webhook_event() - Обрабатывает webhook
+4. find_customer_by_user_id() - Ищет Customer по metadata.user_id
+5. save_payment_method() - Сохраняет способ оплаты
+6. charge_customer() - Списывает деньги с сохранённой карты
+7. get_payment_methods() - Получает способы оплаты
+8. construct_webhook_event() - Обрабатывает webhook
 """
 
 import stripe
@@ -17,6 +18,8 @@ from typing import Dict, Optional, List
 from loguru import logger
 
 from config.settings import settings
+from config.logging_config import sampled_logger
+from monitoring.metrics import track_stripe_call
 
 # Инициализируем Stripe с Secret Key
 stripe.api_key = settings.stripe_secret_key
@@ -33,12 +36,14 @@ class StripeService:
     """
 
     @staticmethod
+    @track_stripe_call
     def create_payment_intent(
         amount: float,
         user_id: str,
         stripe_customer_id: Optional[str] = None,
         description: str = "Deposit to LOOSELINE account",
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict:
         """
         Создаёт Payment Intent (намерение платежа) в Stripe.
@@ -52,6 +57,8 @@ class StripeService:
             stripe_customer_id (str): ID Stripe Customer (опционально)
             description (str): Описание платежа
             metadata (dict): Дополнительные данные
+            idempotency_key (str): Idempotency-Key для Stripe (повтор
+                с тем же ключом вернёт тот же Payment Intent)
         
         Returns:
             Dict: {
@@ -99,10 +106,11 @@ class StripeService:
                 metadata=intent_metadata,
                 automatic_payment_methods={
                     "enabled": True,
-                }
+                },
+                **({"idempotency_key": idempotency_key} if idempotency_key else {})
             )
             
-            logger.info(f"Created Payment Intent {intent.id} for user {user_id}, amount: ${amount}")
+            logger.info("Created Payment Intent {} for user {}, amount: ${}", intent.id, user_id, amount)
             
             return {
                 "success": True,
@@ -113,20 +121,21 @@ class StripeService:
             }
         
         except stripe.error.CardError as e:
-            logger.error(f"Card error creating payment intent: {str(e)}")
+            logger.error("Card error creating payment intent: {}", e)
             return {
                 "success": False,
                 "error": str(e.user_message),
                 "code": e.code
             }
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error creating payment intent: {str(e)}")
+            logger.error("Stripe error creating payment intent: {}", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
     @staticmethod
+    @track_stripe_call
     def confirm_payment(payment_intent_id: str) -> Dict:
         """
         Проверяет статус платежа в Stripe.
@@ -160,7 +169,7 @@ class StripeService:
         try:
             intent = stripe.PaymentIntent.retrieve(payment_intent_id)
             
-            logger.info(f"Retrieved Payment Intent {payment_intent_id}, status: {intent.status}")
+            logger.info("Retrieved Payment Intent {}, status: {}", payment_intent_id, intent.status)
             
             return {
                 "success": True,
@@ -172,19 +181,20 @@ class StripeService:
             }
         
         except stripe.error.InvalidRequestError as e:
-            logger.error(f"Invalid request retrieving payment intent: {str(e)}")
+            logger.error("Invalid request retrieving payment intent: {}", e)
             return {
                 "success": False,
                 "error": "Payment intent not found"
             }
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error confirming payment: {str(e)}")
+            logger.error("Stripe error confirming payment: {}", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
     @staticmethod
+    @track_stripe_call
     def create_stripe_customer(
         user_id: str,
         email: str,
@@ -198,6 +208,10 @@ class StripeService:
         - Повторных платежей без формы ввода данных
         - Отслеживания истории платежей
         
+        Запрос идёт с Idempotency-Key "customer-{user_id}": повтор в течение
+        24 часов (inline-создание при депозите параллельно с фоновым
+        services/customer_provisioning_service.py) вернёт того же Customer.
+        
         Args:
             user_id (str): ID пользователя в нашей системе
             email (str): Email пользователя
@@ -225,10 +239,11 @@ class StripeService:
             customer = stripe.Customer.create(
                 name=name,
                 email=email,
-                metadata={"user_id": user_id}
+                metadata={"user_id": user_id},
+                idempotency_key=f"customer-{user_id}"
             )
             
-            logger.info(f"Created Stripe Customer {customer.id} for user {user_id}")
+            logger.info("Created Stripe Customer {} for user {}", customer.id, user_id)
             
             return {
                 "success": True,
@@ -236,19 +251,58 @@ class StripeService:
             }
         
         except stripe.error.InvalidRequestError as e:
-            logger.error(f"Invalid request creating customer: {str(e)}")
+            logger.error("Invalid request creating customer: {}", e)
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        except stripe.error.StripeError as e:
+            logger.error("Stripe error creating customer: {}", e)
             return {
                 "success": False,
                 "error": str(e)
             }
+
+    @staticmethod
+    @track_stripe_call
+    def find_customer_by_user_id(user_id: str) -> Dict:
+        """
+        Ищет Customer, созданный для пользователя (metadata.user_id).
+        
+        Нужен, чтобы не создать второго Customer, если прошлое создание
+        дошло до Stripe, но ID не сохранился в users. Search API Stripe
+        индексирует новые объекты с задержкой до минуты.
+        
+        Args:
+            user_id (str): ID пользователя в нашей системе
+        
+        Returns:
+            Dict: {
+                "success": True,
+                "stripe_customer_id": "cus_8f7g9h0i1j..."  # или None
+            }
+        
+        Examples:
+            >>> StripeService.find_customer_by_user_id("user_123")["stripe_customer_id"]
+            'cus_8f7g9h0i1j'
+        """
+        try:
+            found = stripe.Customer.search(query=f"metadata['user_id']:'{user_id}'", limit=1)
+            
+            return {
+                "success": True,
+                "stripe_customer_id": found.data[0].id if found.data else None
+            }
+        
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error creating customer: {str(e)}")
+            logger.error("Stripe error searching customer for user {}: {}", user_id, e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
     @staticmethod
+    @track_stripe_call
     def save_payment_method(
         stripe_customer_id: str,
         stripe_payment_method_id: str,
@@ -297,7 +351,7 @@ class StripeService:
                     }
                 )
             
-            logger.info(f"Attached payment method {stripe_payment_method_id} to customer {stripe_customer_id}")
+            logger.info("Attached payment method {} to customer {}", stripe_payment_method_id, stripe_customer_id)
             
             return {
                 "success": True,
@@ -315,25 +369,27 @@ class StripeService:
             }
         
         except stripe.error.InvalidRequestError as e:
-            logger.error(f"Invalid request attaching payment method: {str(e)}")
+            logger.error("Invalid request attaching payment method: {}", e)
             return {
                 "success": False,
                 "error": str(e)
             }
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error attaching payment method: {str(e)}")
+            logger.error("Stripe error attaching payment method: {}", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
     @staticmethod
+    @track_stripe_call
     def charge_customer(
         stripe_customer_id: str,
         amount: float,
         stripe_payment_method_id: str,
         description: str = "Deposit",
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict:
         """
         Списывает деньги с сохранённого способа оплаты.
@@ -349,6 +405,8 @@ class StripeService:
             stripe_payment_method_id (str): ID способа оплаты
             description (str): Описание платежа
             user_id (str): ID пользователя (для metadata)
+            idempotency_key (str): Idempotency-Key для Stripe (повтор
+                с тем же ключом не спишет деньги второй раз)
         
         Returns:
             Dict: {
@@ -383,11 +441,12 @@ class StripeService:
                 metadata={
                     "user_id": user_id,
                     "type": "deposit"
-                } if user_id else {}
+                } if user_id else {},
+                **({"idempotency_key": idempotency_key} if idempotency_key else {})
             )
             
             if intent.status == "succeeded":
-                logger.info(f"Charged customer {stripe_customer_id} ${amount}")
+                logger.info("Charged customer {} ${}", stripe_customer_id, amount)
                 return {
                     "success": True,
                     "status": "succeeded",
@@ -396,7 +455,7 @@ class StripeService:
                     "amount": amount
                 }
             else:
-                logger.warning(f"Payment intent status: {intent.status}")
+                logger.warning("Payment intent status: {}", intent.status)
                 return {
                     "success": False,
                     "status": intent.status,
@@ -405,20 +464,21 @@ class StripeService:
                 }
         
         except stripe.error.CardError as e:
-            logger.error(f"Card error charging customer: {str(e)}")
+            logger.error("Card error charging customer: {}", e)
             return {
                 "success": False,
                 "error": e.user_message,
                 "code": e.code
             }
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error charging customer: {str(e)}")
+            logger.error("Stripe error charging customer: {}", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
     @staticmethod
+    @track_stripe_call
     def get_payment_methods(stripe_customer_id: str) -> Dict:
         """
         Получает все способы оплаты для customer'а.
@@ -466,7 +526,7 @@ class StripeService:
                     }
                 payment_methods.append(method_data)
             
-            logger.info(f"Retrieved {len(payment_methods)} payment methods for customer {stripe_customer_id}")
+            logger.info("Retrieved {} payment methods for customer {}", len(payment_methods), stripe_customer_id)
             
             return {
                 "success": True,
@@ -474,14 +534,14 @@ class StripeService:
             }
         
         except stripe.error.InvalidRequestError as e:
-            logger.error(f"Invalid request getting payment methods: {str(e)}")
+            logger.error("Invalid request getting payment methods: {}", e)
             return {
                 "success": False,
                 "error": str(e),
                 "payment_methods": []
             }
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error getting payment methods: {str(e)}")
+            logger.error("Stripe error getting payment methods: {}", e)
             return {
                 "success": False,
                 "error": str(e),
@@ -489,6 +549,7 @@ class StripeService:
             }
 
     @staticmethod
+    @track_stripe_call
     def construct_webhook_event(request_body: bytes, sig_header: str) -> Dict:
         """
         Проверяет и конструирует event от Stripe webhook.
@@ -536,7 +597,7 @@ class StripeService:
                 webhook_secret
             )
             
-            logger.info(f"Received Stripe webhook event: {event['type']}")
+            sampled_logger.info("Received Stripe webhook event: {}", event['type'])
             
             return {
                 "success": True,
@@ -544,20 +605,21 @@ class StripeService:
             }
         
         except ValueError as e:
-            logger.error(f"Invalid webhook payload: {str(e)}")
+            logger.error("Invalid webhook payload: {}", e)
             return {
                 "success": False,
                 "error": "Invalid payload"
             }
         
         except stripe.error.SignatureVerificationError as e:
-            logger.error(f"Invalid webhook signature: {str(e)}")
+            logger.error("Invalid webhook signature: {}", e)
             return {
                 "success": False,
                 "error": "Invalid signature"
             }
 
     @staticmethod
+    @track_stripe_call
     def delete_payment_method(stripe_payment_method_id: str) -> Dict:
         """
         Удаляет способ оплаты из Stripe.
@@ -574,7 +636,7 @@ class StripeService:
         try:
             stripe.PaymentMethod.detach(stripe_payment_method_id)
             
-            logger.info(f"Deleted payment method {stripe_payment_method_id}")
+            logger.info("Deleted payment method {}", stripe_payment_method_id)
             
             return {
                 "success": True,
@@ -582,13 +644,14 @@ class StripeService:
             }
         
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error deleting payment method: {str(e)}")
+            logger.error("Stripe error deleting payment method: {}", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
     @staticmethod
+    @track_stripe_call
     def create_refund(
         charge_id: str,
         amount: Optional[float] = None,
@@ -621,7 +684,7 @@ class StripeService:
             
             refund = stripe.Refund.create(**refund_params)
             
-            logger.info(f"Created refund {refund.id} for charge {charge_id}")
+            logger.info("Created refund {} for charge {}", refund.id, charge_id)
             
             return {
                 "success": True,
@@ -631,7 +694,7 @@ class StripeService:
             }
         
         except stripe.error.StripeError as e:
-            logger.error(f"Stripe error creating refund: {str(e)}")
+            logger.error("Stripe error creating refund: {}", e)
             return {
                 "success": False,
                 "error": str(e)
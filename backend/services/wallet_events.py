@@ -0,0 +1,176 @@
+"""
+События кошелька для открытых клиентов (GET /api/wallet/events, SSE).
+
+Веб-интерфейс раньше узнавал о зачислении pending-пополнения, повторно
+запрашивая /balance и /history. Теперь WalletService и webhook'и Stripe
+после commit публикуют изменения в in-process шину, а поток SSE отдаёт их
+подписанным клиентам этого пользователя:
+
+- event: balance    data: {"balance": 5100.0}
+- event: operation  data: {"operation_id": 42, "operation_type": "deposit",
+                           "status": "completed", "amount": 100.0}
+- event: ready / resync - клиенту нужно перечитать баланс (после
+  подключения или если он не успевал читать и события были отброшены)
+
+Соединение без событий стоит одну корутину и одну asyncio.Queue - без
+сессии БД и без потока, поэтому один worker держит десятки тысяч
+простаивающих подключений (предел - settings.sse_max_connections,
+дальше 503). publish() безопасен из любого потока (WalletService работает
+в пуле потоков FastAPI): событие сериализуется один раз и передаётся в
+event loop подписчика через call_soon_threadsafe.
+
+Шина живёт в памяти процесса: события из других worker'ов и фоновых
+скриптов (сверка, истечение операций) сюда не попадают - клиент
+перечитывает баланс при каждом (пере)подключении.
+"""
+
+import asyncio
+import json
+import threading
+from decimal import Decimal
+from typing import AsyncIterator, Dict, Optional, Set, Union
+
+from loguru import logger
+
+from config.settings import settings
+from monitoring.metrics import WALLET_EVENT_STREAMS, WALLET_EVENTS_PUBLISHED
+from services.single_flight import WALLET_READS
+
+
+HEARTBEAT_MESSAGE = b": ping\n\n"
+RESYNC_MESSAGE = b"event: resync\ndata: {}\n\n"
+
+
+def format_event(event: str, data: Dict) -> bytes:
+    """Сообщение SSE: строки event и data, пустая строка в конце."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscription:
+    """Подключение клиента: очередь сообщений в event loop, где оно открыто."""
+
+    __slots__ = ("user_id", "loop", "queue")
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, message: bytes) -> None:
+        """Выполняется в event loop подписчика."""
+        if self.queue.full():
+            # Клиент не успевает читать: вместо отброшенных событий - один resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC_MESSAGE
+        self.queue.put_nowait(message)
+
+
+class WalletEventBus:
+    """Подписчики по user_id и рассылка им событий."""
+
+    def __init__(self, queue_size: int, max_connections: int):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self.lock = threading.Lock()
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+        self.connections = 0
+
+    def subscribe(self, user_id: str) -> Optional[Subscription]:
+        """Новое подключение (вызывать из event loop); None - лимит подключений исчерпан."""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self.lock:
+            if self.connections >= self.max_connections:
+                return None
+            self.subscribers.setdefault(user_id, set()).add(subscription)
+            self.connections += 1
+            WALLET_EVENT_STREAMS.set(self.connections)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.user_id)
+            if not subscriptions or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscribers[subscription.user_id]
+            self.connections -= 1
+            WALLET_EVENT_STREAMS.set(self.connections)
+
+    def publish(self, user_id: str, event: str, data: Dict) -> int:
+        """
+        Отправляет событие всем подключениям пользователя.
+
+        Returns:
+            int: Количество подключений, которым передано событие
+        """
+        with self.lock:
+            subscriptions = self.subscribers.get(user_id)
+            if not subscriptions:
+                return 0
+            subscriptions = tuple(subscriptions)
+
+        message = format_event(event, data)
+        delivered = 0
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+                delivered += 1
+            except RuntimeError:
+                # Event loop уже закрыт (остановка worker'а)
+                self.unsubscribe(subscription)
+        WALLET_EVENTS_PUBLISHED.inc(event=event)
+        return delivered
+
+
+WALLET_EVENTS = WalletEventBus(settings.sse_queue_size, settings.sse_max_connections)
+
+
+def operation_event(operation) -> Dict:
+    """Данные события operation из WalletOperation (после flush - нужен operation_id)."""
+    return {
+        "operation_id": operation.operation_id,
+        "operation_type": operation.operation_type,
+        "status": operation.status,
+        "amount": float(operation.amount)
+    }
+
+
+def publish_wallet_update(
+    user_id: str,
+    operation: Optional[Dict] = None,
+    balance: Optional[Union[Decimal, float]] = None
+) -> None:
+    """
+    Публикует изменение операции и/или баланса. Вызывать после commit.
+
+    Начатые до изменения чтения пользователя больше не объединяются с новыми
+    запросами (services/single_flight.py). Ошибка публикации не влияет на
+    уже сохранённое изменение.
+    """
+    WALLET_READS.forget(user_id)
+    try:
+        if operation is not None:
+            WALLET_EVENTS.publish(user_id, "operation", operation)
+        if balance is not None:
+            WALLET_EVENTS.publish(user_id, "balance", {"balance": float(balance)})
+    except Exception as e:
+        logger.warning("Failed to publish wallet event for user {}: {}", user_id, e)
+
+
+async def event_stream(subscription: Subscription, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+    """
+    Тело ответа SSE: ready, затем события подписки и комментарий-heartbeat
+    каждые heartbeat_seconds без событий (не дают прокси закрыть соединение).
+    """
+    try:
+        yield b"retry: 5000\n" + format_event("ready", {})
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                message = HEARTBEAT_MESSAGE
+            yield message
+    finally:
+        WALLET_EVENTS.unsubscribe(subscription)
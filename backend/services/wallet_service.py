@@ -1,33 +1,55 @@
 """
 Сервис управления кошельком пользователя.
 
-Включает 5 ключевых методов:
+Включает 7 ключевых методов:
 1. get_balance() - Получение баланса и статистики
 2. replenish_balance() - Пополнение счёта через Stripe
 3. withdraw_funds() - Вывод средств
 4. get_bet_history() - История ставок и транзакций
 5. export_report() - Экспорт в CSV/PDF
+6. place_bet() - Размещение ставки с резервом суммы
+7. get_balance_at() - Баланс на момент времени
 """
 
 import os
 import csv
 import io
 import json
+import time
 import uuid
 from datetime import datetime, timedelta
 from decimal import Decimal
+from types import SimpleNamespace
 from typing import Dict, Optional, List, Any
 
-from sqlalchemy import func, and_, desc, Integer, case
+from sqlalchemy import func, and_, desc, Integer, case, update, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from loguru import logger
 
 from models.orm_models import (
     User, UserBalance, BalanceTransaction, WalletOperation,
-    PaymentMethod, WithdrawalMethod, Bet, AuditLog
+    PaymentMethod, WithdrawalMethod, Bet, AuditLog, LedgerEntry
 )
 from services.stripe_service import StripeService
+from services.archive_service import ArchiveService
+from services.ledger_service import LedgerService, CONTRA_STRIPE, CONTRA_WITHDRAWALS
+from services.wallet_events import operation_event, publish_wallet_update
+from services.single_flight import WALLET_READS
 from config.settings import settings
+from monitoring.metrics import EXPORT_REPORT_DURATION
+
+
+# Колонки строк истории и отчётов. Читаются запросом Core в кортежи Row:
+# без ORM-объектов (identity map, отслеживание изменений) и без metadata (JSONB)
+BET_ROW_COLUMNS = (
+    "bet_id", "event_id", "odds_id", "bet_type", "bet_amount", "coefficient",
+    "potential_win", "status", "result", "actual_win", "placed_at", "resolved_at"
+)
+TRANSACTION_ROW_COLUMNS = (
+    "transaction_id", "transaction_type", "amount", "balance_before",
+    "balance_after", "status", "description", "created_at"
+)
 
 
 class WalletService:
@@ -41,16 +63,22 @@ class WalletService:
     # МЕТОД 1: get_balance()
     # =========================================================================
     @staticmethod
-    def get_balance(db: Session, user_id: str) -> Dict:
+    def get_balance(db: Session, user_id: str, user: Optional[Any] = None) -> Dict:
         """
         Получает полную информацию о балансе и статистике пользователя.
         
         Функция получает текущий баланс, все статистические метрики,
         информацию о профитах/убытках, win rate и другую информацию.
         
+        Одновременные вызовы для пользователя выполняются в БД один раз
+        (services/single_flight.py): остальные получают копию результата,
+        audit-запись balance_checked - одна на выполнение.
+        
         Args:
             db (Session): SQLAlchemy сессия
             user_id (str): Уникальный ID пользователя из таблицы users
+            user (User): Уже загруженный пользователь - без повторного
+                запроса (GET /api/wallet/summary)
         
         Returns:
             dict: Словарь с ключами:
@@ -103,9 +131,18 @@ class WalletService:
             - win_rate = (wins / (wins + losses)) * 100
             - available = balance - locked_in_bets
         """
+        return WALLET_READS.do(
+            "balance", user_id, WalletService._read_source(db),
+            lambda: WalletService._get_balance(db, user_id, user)
+        )
+
+    @staticmethod
+    def _get_balance(db: Session, user_id: str, user: Optional[Any]) -> Dict:
+        """Вычисление get_balance() без объединения вызовов."""
         try:
             # 1. Проверяем существует ли пользователь
-            user = db.query(User).filter(User.id == user_id).first()
+            if user is None:
+                user = db.query(User).filter(User.id == user_id).first()
             
             if not user:
                 return {
@@ -175,6 +212,13 @@ class WalletService:
             roi_percent = (total_won / total_bet * 100) if total_bet > 0 else 0.0
             available_balance = current_balance - float(locked_in_bets)
             
+            # До commit: после него атрибуты перечитываются отдельными запросами
+            currency = balance.currency
+            total_deposited = float(balance.total_deposited or 0)
+            total_withdrawn = float(balance.total_withdrawn or 0)
+            last_transaction = balance.last_transaction.isoformat() if balance.last_transaction else None
+            account_created = user.created_at.isoformat() if user.created_at else None
+            
             # 8. Логируем запрос баланса
             audit_log = AuditLog(
                 user_id=user_id,
@@ -190,9 +234,9 @@ class WalletService:
                 "balance": {
                     "user_id": user_id,
                     "current_balance": current_balance,
-                    "currency": balance.currency,
-                    "total_deposited": float(balance.total_deposited or 0),
-                    "total_withdrawn": float(balance.total_withdrawn or 0),
+                    "currency": currency,
+                    "total_deposited": total_deposited,
+                    "total_withdrawn": total_withdrawn,
                     "total_bet": total_bet,
                     "total_won": total_won,
                     "total_lost": total_lost,
@@ -201,8 +245,8 @@ class WalletService:
                     "win_count": win_count,
                     "lose_count": lose_count,
                     "win_rate": round(win_rate, 2),
-                    "last_transaction": balance.last_transaction.isoformat() if balance.last_transaction else None,
-                    "account_created": user.created_at.isoformat() if user.created_at else None
+                    "last_transaction": last_transaction,
+                    "account_created": account_created
                 },
                 "available_balance": round(available_balance, 2),
                 "locked_in_bets": float(locked_in_bets),
@@ -211,7 +255,7 @@ class WalletService:
             }
         
         except Exception as e:
-            logger.error(f"Error in get_balance for user {user_id}: {str(e)}")
+            logger.error("Error in get_balance for user {}: {}", user_id, e)
             return {
                 "success": False,
                 "error": "Database error",
@@ -229,7 +273,8 @@ class WalletService:
         stripe_payment_method_id: Optional[str] = None,
         payment_method: str = "card",
         save_method: bool = False,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict:
         """
         Пополняет баланс пользователя через Stripe.
@@ -243,6 +288,10 @@ class WalletService:
         6. Обновляет баланс в БД
         7. Записывает историю транзакции
         
+        Транзакции: одна короткая до Stripe (баланс, customer, audit) и одна
+        после (операция, проводка, история). Запросы к Stripe выполняются
+        без открытой транзакции - блокировки и соединение не ждут сеть.
+        
         Args:
             db (Session): SQLAlchemy сессия
             user_id (str): ID пользователя
@@ -251,6 +300,10 @@ class WalletService:
             payment_method (str): Способ оплаты ("card", "bank_transfer")
             save_method (bool): Сохранить способ оплаты?
             ip_address (str): IP адрес клиента
+            idempotency_key (str): Idempotency-Key запроса клиента; передаётся
+                в Stripe как "deposit-{user_id}-{key}". Повтор получает тот же
+                PaymentIntent, и операция с ним уже записана - второго платежа
+                и второго зачисления нет
         
         Returns:
             dict: 
@@ -288,64 +341,90 @@ class WalletService:
             if amount > 100000.00:
                 return {"success": False, "error": "Maximum deposit is 100000.00 USD"}
             
-            # 2. Получаем пользователя
-            user = db.query(User).filter(User.id == user_id).first()
+            deposit_amount = Decimal(str(amount))
+            stripe_idempotency_key = f"deposit-{user_id}-{idempotency_key}" if idempotency_key else None
+            intent_id = None
+            
+            # 2. Чтение без блокировок: пользователь, баланс, сохранённая карта
+            user = db.query(User.email, User.name, User.stripe_customer_id).filter(
+                User.id == user_id
+            ).first()
             
             if not user:
                 return {"success": False, "error": "User not found"}
             
-            # 3. Получаем или создаём баланс
-            balance = db.query(UserBalance).filter(
+            has_balance = db.query(UserBalance.user_id).filter(
                 UserBalance.user_id == user_id
-            ).first()
+            ).first() is not None
             
-            if not balance:
-                balance = UserBalance(
-                    user_id=user_id,
-                    balance=Decimal("0.00"),
-                    currency="USD"
-                )
-                db.add(balance)
-                db.commit()
-                db.refresh(balance)
+            method_saved = bool(save_method and stripe_payment_method_id) and db.query(
+                PaymentMethod.method_id
+            ).filter(
+                PaymentMethod.stripe_payment_method_id == stripe_payment_method_id
+            ).first() is not None
             
-            balance_before = float(balance.balance)
+            # Читающая транзакция закрывается до запросов к Stripe
+            db.rollback()
             
-            # 4. Если первый раз: создаём Stripe Customer
-            if not user.stripe_customer_id:
+            # 3. Если первый раз: создаём Stripe Customer (вне транзакции).
+            # Обычно его заранее создаёт services/customer_provisioning_service.py,
+            # здесь - запасной путь для ещё не обработанных пользователей
+            customer_id = user.stripe_customer_id
+            if not customer_id:
                 stripe_result = StripeService.create_stripe_customer(
                     user_id, user.email, user.name
                 )
                 
                 if not stripe_result['success']:
-                    logger.error(f"Failed to create Stripe customer: {stripe_result['error']}")
+                    logger.error("Failed to create Stripe customer: {}", stripe_result['error'])
                     return {
                         "success": False,
                         "error": "Failed to create payment account"
                     }
                 
-                user.stripe_customer_id = stripe_result['stripe_customer_id']
-                db.commit()
-                logger.info(f"Created Stripe customer {user.stripe_customer_id} for user {user_id}")
+                customer_id = stripe_result['stripe_customer_id']
             
-            # 5. Логируем инициацию депозита
-            audit_log = AuditLog(
+            # 4. ТРАНЗАКЦИЯ 1: учёт до Stripe (баланс, customer, deposit_initiated)
+            if not has_balance:
+                db.add(UserBalance(
+                    user_id=user_id,
+                    balance=Decimal("0.00"),
+                    currency="USD"
+                ))
+            
+            if not user.stripe_customer_id:
+                saved = db.execute(
+                    update(User)
+                    .where(User.id == user_id, User.stripe_customer_id.is_(None))
+                    .values(stripe_customer_id=customer_id)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                
+                if saved:
+                    logger.info("Created Stripe customer {} for user {}", customer_id, user_id)
+                else:
+                    # Параллельное пополнение успело сохранить своего customer
+                    customer_id = db.query(User.stripe_customer_id).filter(
+                        User.id == user_id
+                    ).scalar()
+            
+            db.add(AuditLog(
                 user_id=user_id,
                 action="deposit_initiated",
-                amount=Decimal(str(amount)),
+                amount=deposit_amount,
                 ip_address=ip_address,
                 status="pending"
-            )
-            db.add(audit_log)
+            ))
             db.commit()
             
-            # 6. ЕСЛИ НОВАЯ КАРТА: создаём Payment Intent
+            # 5. ЕСЛИ НОВАЯ КАРТА: создаём Payment Intent
             if stripe_payment_method_id is None:
                 intent_result = StripeService.create_payment_intent(
                     amount,
                     user_id,
-                    user.stripe_customer_id,
-                    f"Deposit to LOOSELINE account - {user_id}"
+                    customer_id,
+                    f"Deposit to LOOSELINE account - {user_id}",
+                    idempotency_key=stripe_idempotency_key
                 )
                 
                 if not intent_result['success']:
@@ -354,18 +433,26 @@ class WalletService:
                         "error": intent_result.get('error', 'Payment failed')
                     }
                 
-                # Записываем операцию как pending
-                operation = WalletOperation(
-                    user_id=user_id,
-                    operation_type='deposit',
-                    amount=Decimal(str(amount)),
-                    status='pending',
-                    payment_method=payment_method,
-                    stripe_payment_intent_id=intent_result['intent_id'],
-                    expires_at=datetime.utcnow() + timedelta(hours=24)
-                )
-                db.add(operation)
-                db.commit()
+                # ТРАНЗАКЦИЯ 2: операция pending до webhook'а. Повтор с тем же
+                # Idempotency-Key получил тот же PaymentIntent - операция уже есть
+                intent_id = intent_result['intent_id']
+                if WalletService._operation_by_intent(db, intent_id) is None:
+                    operation = WalletOperation(
+                        user_id=user_id,
+                        operation_type='deposit',
+                        amount=deposit_amount,
+                        status='pending',
+                        payment_method=payment_method,
+                        stripe_payment_intent_id=intent_id,
+                        expires_at=datetime.utcnow() + timedelta(hours=24)
+                    )
+                    db.add(operation)
+                    db.flush()
+                    event = operation_event(operation)
+                    db.commit()
+                    publish_wallet_update(user_id, operation=event)
+                else:
+                    db.rollback()
                 
                 return {
                     "success": True,
@@ -375,139 +462,165 @@ class WalletService:
                     "message": "Please complete payment in the form"
                 }
             
-            # 7. ЕСЛИ СОХРАНЁННАЯ КАРТА: списываем сразу
-            else:
-                charge_result = StripeService.charge_customer(
-                    user.stripe_customer_id,
-                    amount,
-                    stripe_payment_method_id,
-                    f"Deposit - {user_id}",
-                    user_id
-                )
-                
-                if not charge_result['success']:
-                    # Записываем failed операцию
-                    operation = WalletOperation(
-                        user_id=user_id,
-                        operation_type='deposit',
-                        amount=Decimal(str(amount)),
-                        status='failed',
-                        payment_method=payment_method,
-                        stripe_payment_method_id=stripe_payment_method_id,
-                        error_message=charge_result.get('error')
-                    )
-                    db.add(operation)
-                    
-                    # Логируем failed
-                    details_data = {"error": charge_result.get('error')}
-                    # Сериализуем в JSON для совместимости
-                    audit_log = AuditLog(
-                        user_id=user_id,
-                        action="deposit_failed",
-                        amount=Decimal(str(amount)),
-                        ip_address=ip_address,
-                        status="failed",
-                        details=json.dumps(details_data) if details_data else None
-                    )
-                    db.add(audit_log)
-                    db.commit()
-                    
-                    return {
-                        "success": False,
-                        "error": charge_result.get('error', 'Payment failed')
-                    }
-                
-                # 8. Платёж успешен → обновляем баланс
-                balance_after = balance_before + amount
-                
-                balance.balance = Decimal(str(balance_after))
-                balance.total_deposited = Decimal(str(float(balance.total_deposited or 0) + amount))
-                balance.last_transaction = datetime.utcnow()
-                
-                # 9. Записываем транзакцию
-                transaction = BalanceTransaction(
-                    user_id=user_id,
-                    transaction_type='deposit',
-                    amount=Decimal(str(amount)),
-                    balance_before=Decimal(str(balance_before)),
-                    balance_after=Decimal(str(balance_after)),
-                    status='completed',
-                    stripe_payment_intent_id=charge_result.get('intent_id'),
-                    stripe_charge_id=charge_result.get('charge_id'),
-                    description=f"Card deposit via Stripe",
-                    processed_at=datetime.utcnow()
-                )
-                db.add(transaction)
-                
-                # 10. Записываем операцию
+            # 6. ЕСЛИ СОХРАНЁННАЯ КАРТА: списываем сразу
+            charge_result = StripeService.charge_customer(
+                customer_id,
+                amount,
+                stripe_payment_method_id,
+                f"Deposit - {user_id}",
+                user_id,
+                idempotency_key=stripe_idempotency_key
+            )
+            
+            if not charge_result['success']:
+                # ТРАНЗАКЦИЯ 2: failed операция и audit
                 operation = WalletOperation(
                     user_id=user_id,
                     operation_type='deposit',
-                    amount=Decimal(str(amount)),
-                    status='completed',
+                    amount=deposit_amount,
+                    status='failed',
                     payment_method=payment_method,
-                    stripe_payment_intent_id=charge_result.get('intent_id'),
-                    stripe_charge_id=charge_result.get('charge_id'),
                     stripe_payment_method_id=stripe_payment_method_id,
-                    completed_at=datetime.utcnow()
+                    error_message=charge_result.get('error')
                 )
                 db.add(operation)
                 
-                # 11. Сохраняем способ оплаты если нужно
-                if save_method:
-                    # Проверяем, не сохранён ли уже
-                    existing_method = db.query(PaymentMethod).filter(
-                        PaymentMethod.stripe_payment_method_id == stripe_payment_method_id
-                    ).first()
-                    
-                    if not existing_method:
-                        # Получаем данные карты из Stripe
-                        stripe_methods = StripeService.get_payment_methods(user.stripe_customer_id)
-                        card_data = None
-                        
-                        if stripe_methods['success']:
-                            for m in stripe_methods['payment_methods']:
-                                if m['id'] == stripe_payment_method_id:
-                                    card_data = m.get('card')
-                                    break
-                        
-                        new_method = PaymentMethod(
-                            user_id=user_id,
-                            stripe_payment_method_id=stripe_payment_method_id,
-                            payment_type='card',
-                            card_brand=card_data.get('brand') if card_data else None,
-                            card_last4=card_data.get('last4') if card_data else None,
-                            card_exp_month=card_data.get('exp_month') if card_data else None,
-                            card_exp_year=card_data.get('exp_year') if card_data else None,
-                            is_default=True
-                        )
-                        db.add(new_method)
-                
-                # 12. Логируем успех
+                # Логируем failed
+                details_data = {"error": charge_result.get('error')}
+                # Сериализуем в JSON для совместимости
                 audit_log = AuditLog(
                     user_id=user_id,
-                    action="deposit_completed",
-                    amount=Decimal(str(amount)),
+                    action="deposit_failed",
+                    amount=deposit_amount,
                     ip_address=ip_address,
-                    status="success"
+                    status="failed",
+                    details=json.dumps(details_data) if details_data else None
                 )
                 db.add(audit_log)
-                
+                db.flush()
+                event = operation_event(operation)
                 db.commit()
-                
-                logger.info(f"User {user_id} deposited ${amount} successfully")
+                publish_wallet_update(user_id, operation=event)
                 
                 return {
-                    "success": True,
-                    "message": "Balance replenished successfully",
-                    "new_balance": balance_after,
-                    "transaction_id": charge_result.get('charge_id'),
-                    "status": "completed"
+                    "success": False,
+                    "error": charge_result.get('error', 'Payment failed')
                 }
+            
+            # 7. Данные карты для сохранения (тоже до транзакции)
+            card_data = None
+            if save_method and not method_saved:
+                stripe_methods = StripeService.get_payment_methods(customer_id)
+                
+                if stripe_methods['success']:
+                    for m in stripe_methods['payment_methods']:
+                        if m['id'] == stripe_payment_method_id:
+                            card_data = m.get('card')
+                            break
+            
+            # 8. ТРАНЗАКЦИЯ 2: платёж успешен → операция, проводка, история.
+            # Повтор с тем же Idempotency-Key: Stripe вернул тот же платёж,
+            # пополнение по нему уже зачислено - отвечаем по записанной операции
+            intent_id = charge_result.get('intent_id')
+            existing = WalletService._operation_by_intent(db, intent_id)
+            if existing is not None:
+                return WalletService._replayed_deposit(db, existing)
+            
+            now = datetime.utcnow()
+            operation = WalletOperation(
+                user_id=user_id,
+                operation_type='deposit',
+                amount=deposit_amount,
+                status='completed',
+                payment_method=payment_method,
+                stripe_payment_intent_id=charge_result.get('intent_id'),
+                stripe_charge_id=charge_result.get('charge_id'),
+                stripe_payment_method_id=stripe_payment_method_id,
+                completed_at=now
+            )
+            db.add(operation)
+            db.flush()
+            
+            # 9. Проводка в журнал: баланс и total_deposited одной командой
+            entry = LedgerService.post(
+                db, user_id, deposit_amount, 'deposit', CONTRA_STRIPE,
+                reference_type='operation', reference_id=operation.operation_id,
+                now=now, totals={"total_deposited": deposit_amount}
+            )
+            balance_after = float(entry.balance_after)
+            
+            # 10. Записываем транзакцию
+            transaction = BalanceTransaction(
+                user_id=user_id,
+                transaction_type='deposit',
+                amount=deposit_amount,
+                balance_before=entry.balance_before,
+                balance_after=entry.balance_after,
+                status='completed',
+                stripe_payment_intent_id=charge_result.get('intent_id'),
+                stripe_charge_id=charge_result.get('charge_id'),
+                description=f"Card deposit via Stripe",
+                processed_at=now
+            )
+            db.add(transaction)
+            
+            # 11. Сохраняем способ оплаты если нужно (повторная проверка -
+            # карту мог сохранить параллельный запрос)
+            if save_method and not method_saved and db.query(PaymentMethod.method_id).filter(
+                PaymentMethod.stripe_payment_method_id == stripe_payment_method_id
+            ).first() is None:
+                new_method = PaymentMethod(
+                    user_id=user_id,
+                    stripe_payment_method_id=stripe_payment_method_id,
+                    payment_type='card',
+                    card_brand=card_data.get('brand') if card_data else None,
+                    card_last4=card_data.get('last4') if card_data else None,
+                    card_exp_month=card_data.get('exp_month') if card_data else None,
+                    card_exp_year=card_data.get('exp_year') if card_data else None,
+                    is_default=True
+                )
+                db.add(new_method)
+            
+            # 12. Логируем успех
+            audit_log = AuditLog(
+                user_id=user_id,
+                action="deposit_completed",
+                amount=deposit_amount,
+                ip_address=ip_address,
+                status="success"
+            )
+            db.add(audit_log)
+            
+            event = operation_event(operation)
+            db.commit()
+            publish_wallet_update(user_id, operation=event, balance=balance_after)
+            
+            logger.info("User {} deposited ${} successfully", user_id, amount)
+            
+            return {
+                "success": True,
+                "message": "Balance replenished successfully",
+                "new_balance": balance_after,
+                "transaction_id": charge_result.get('charge_id'),
+                "status": "completed"
+            }
         
+        except IntegrityError as e:
+            # Параллельный повтор с тем же Idempotency-Key успел записать операцию
+            # (stripe_payment_intent_id уникален)
+            db.rollback()
+            existing = WalletService._operation_by_intent(db, intent_id)
+            if existing is not None:
+                return WalletService._replayed_deposit(db, existing)
+            logger.error("Error in replenish_balance for user {}: {}", user_id, e)
+            return {
+                "success": False,
+                "error": "Unexpected error",
+                "details": str(e)
+            }
         except Exception as e:
             db.rollback()
-            logger.error(f"Error in replenish_balance for user {user_id}: {str(e)}")
+            logger.error("Error in replenish_balance for user {}: {}", user_id, e)
             return {
                 "success": False,
                 "error": "Unexpected error",
@@ -524,7 +637,8 @@ class WalletService:
         amount: float,
         withdrawal_method_id: int,
         reason: Optional[str] = None,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict:
         """
         Выводит деньги со счёта пользователя на банковский счёт/кошелёк.
@@ -539,6 +653,9 @@ class WalletService:
             withdrawal_method_id (int): ID способа вывода
             reason (str): Причина вывода (опционально)
             ip_address (str): IP адрес клиента
+            idempotency_key (str): Idempotency-Key запроса клиента; сохраняется
+                в операции, повтор с тем же ключом получает ответ по ней и не
+                списывает сумму второй раз
         
         Returns:
             dict: {
@@ -559,6 +676,9 @@ class WalletService:
             - Дневной лимит: 50000.00 USD
             - Способ вывода должен быть верифицирован
             - Деньги вычитаются СРАЗУ (статус pending)
+            - Вывести можно только доступное: balance - открытые ставки
+              (резерв place_bet); проверка повторяется под блокировкой
+              строки баланса, которую берёт проводка
         """
         try:
             # 1. Валидация параметров
@@ -571,6 +691,12 @@ class WalletService:
             if amount > 100000.00:
                 return {"success": False, "error": "Maximum withdrawal per transaction is 100000.00 USD"}
             
+            # Повтор с тем же Idempotency-Key (перехваченный резерв или
+            # несохранённый ответ): вывод уже записан
+            existing = WalletService._operation_by_key(db, user_id, idempotency_key)
+            if existing is not None:
+                return WalletService._replayed_withdrawal(db, existing)
+            
             # 2. Проверяем пользователя
             user = db.query(User).filter(User.id == user_id).first()
             
@@ -585,14 +711,14 @@ class WalletService:
             if not balance:
                 return {"success": False, "error": "Balance record not found"}
             
-            current_balance = float(balance.balance)
+            # 4. Проверяем достаточно ли денег (без открытых ставок)
+            available = Decimal(balance.balance) - WalletService._locked_in_bets(db, user_id)
             
-            # 4. Проверяем достаточно ли денег
-            if current_balance < amount:
+            if available < Decimal(str(amount)):
                 return {
                     "success": False,
                     "error": "Insufficient balance",
-                    "available_balance": current_balance,
+                    "available_balance": float(available),
                     "requested_amount": amount
                 }
             
@@ -615,12 +741,15 @@ class WalletService:
                 }
             
             # 6. Проверяем дневной лимит
-            today = datetime.utcnow().date()
+            # Диапазон вместо func.date(created_at): работает индекс
+            # (user_id, operation_type, created_at)
+            today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
             daily_sum = db.query(func.sum(WalletOperation.amount)).filter(
                 and_(
                     WalletOperation.user_id == user_id,
                     WalletOperation.operation_type == 'withdrawal',
-                    func.date(WalletOperation.created_at) == today,
+                    WalletOperation.created_at >= today_start,
+                    WalletOperation.created_at < today_start + timedelta(days=1),
                     WalletOperation.status.in_(['completed', 'pending'])
                 )
             ).scalar() or Decimal("0.00")
@@ -646,47 +775,66 @@ class WalletService:
             )
             db.add(audit_log)
             
-            # 8. ВЫЧИТАЕМ ДЕНЬГИ ИЗ БАЛАНСА (СРАЗУ)
-            balance_after = current_balance - amount
+            # 8. Записываем операцию
+            operation = WalletOperation(
+                user_id=user_id,
+                operation_type='withdrawal',
+                amount=Decimal(str(amount)),
+                status='pending',
+                payment_method='bank_transfer',
+                idempotency_key=idempotency_key
+            )
+            db.add(operation)
+            db.flush()
+            
+            # 9. ВЫЧИТАЕМ ДЕНЬГИ ИЗ БАЛАНСА (СРАЗУ) проводкой в журнал:
+            # баланс и total_withdrawn одной командой
+            entry = LedgerService.post(
+                db, user_id, Decimal(str(-amount)), 'withdrawal', CONTRA_WITHDRAWALS,
+                reference_type='operation', reference_id=operation.operation_id,
+                totals={"total_withdrawn": Decimal(str(amount))}
+            )
             
-            balance.balance = Decimal(str(balance_after))
-            balance.total_withdrawn = Decimal(str(float(balance.total_withdrawn or 0) + amount))
-            balance.last_transaction = datetime.utcnow()
+            # Проводка заблокировала строку баланса (как place_bet): открытые
+            # ставки читаются под блокировкой. Параллельный вывод или ставка
+            # могли уменьшить доступное после проверки в п.4
+            available = entry.balance_after - WalletService._locked_in_bets(db, user_id)
+            if available < 0:
+                db.rollback()
+                return {
+                    "success": False,
+                    "error": "Insufficient balance",
+                    "available_balance": float(available + Decimal(str(amount))),
+                    "requested_amount": amount
+                }
+            
+            balance_after = float(entry.balance_after)
             
-            # 9. Записываем транзакцию
+            # 10. Записываем транзакцию
             transaction = BalanceTransaction(
                 user_id=user_id,
                 transaction_type='withdrawal',
                 amount=Decimal(str(-amount)),  # Отрицательное значение
-                balance_before=Decimal(str(current_balance)),
-                balance_after=Decimal(str(balance_after)),
+                balance_before=entry.balance_before,
+                balance_after=entry.balance_after,
                 status='pending',
                 description=f"Withdrawal request - {reason or 'no reason provided'}"
             )
             db.add(transaction)
-            
-            # 10. Записываем операцию
-            operation = WalletOperation(
-                user_id=user_id,
-                operation_type='withdrawal',
-                amount=Decimal(str(amount)),
-                status='pending',
-                payment_method='bank_transfer'
-            )
-            db.add(operation)
+            event = operation_event(operation)
             db.commit()
-            db.refresh(operation)
+            publish_wallet_update(user_id, operation=event, balance=balance_after)
             
             # 11. Возвращаем результат
             estimated_completion = datetime.utcnow() + timedelta(days=2)
             
-            logger.info(f"User {user_id} requested withdrawal of ${amount}")
+            logger.info("User {} requested withdrawal of ${}", user_id, amount)
             
             return {
                 "success": True,
                 "message": "Withdrawal request created",
                 "withdrawal": {
-                    "operation_id": operation.operation_id,
+                    "operation_id": event["operation_id"],
                     "amount": amount,
                     "status": "pending",
                     "estimated_completion": estimated_completion.isoformat()
@@ -695,9 +843,21 @@ class WalletService:
                 "note": "Withdrawal usually takes 1-2 business days"
             }
         
+        except IntegrityError as e:
+            # Параллельный повтор с тем же Idempotency-Key успел записать вывод
+            db.rollback()
+            existing = WalletService._operation_by_key(db, user_id, idempotency_key)
+            if existing is not None:
+                return WalletService._replayed_withdrawal(db, existing)
+            logger.error("Error in withdraw_funds for user {}: {}", user_id, e)
+            return {
+                "success": False,
+                "error": "Unexpected error",
+                "details": str(e)
+            }
         except Exception as e:
             db.rollback()
-            logger.error(f"Error in withdraw_funds for user {user_id}: {str(e)}")
+            logger.error("Error in withdraw_funds for user {}: {}", user_id, e)
             return {
                 "success": False,
                 "error": "Unexpected error",
@@ -718,6 +878,9 @@ class WalletService:
         """
         Получает историю ставок и транзакций пользователя с фильтрацией и пагинацией.
         
+        Одновременные вызовы с теми же аргументами выполняются в БД один раз
+        (services/single_flight.py).
+        
         Args:
             db (Session): SQLAlchemy сессия
             user_id (str): ID пользователя
@@ -741,61 +904,81 @@ class WalletService:
                 "pagination": {...}
             }
         """
+        key = (
+            WalletService._read_source(db), limit, offset,
+            tuple(sorted((filters or {}).items()))
+        )
+        return WALLET_READS.do(
+            "history", user_id, key,
+            lambda: WalletService._get_bet_history(db, user_id, limit, offset, filters)
+        )
+
+    @staticmethod
+    def _get_bet_history(
+        db: Session,
+        user_id: str,
+        limit: int,
+        offset: int,
+        filters: Optional[Dict]
+    ) -> Dict:
+        """Вычисление get_bet_history() без объединения вызовов."""
         try:
             # 1. Валидация limit/offset
             limit = min(max(limit, 1), 100)
             offset = max(offset, 0)
             
             filters = filters or {}
+            bet_columns = Bet.__table__.c
+            trans_columns = BalanceTransaction.__table__.c
             
-            # 2. Строим запрос для ставок
-            bets_query = db.query(Bet).filter(Bet.user_id == user_id)
+            # 2. Условия для ставок
+            bet_conditions = [bet_columns.user_id == user_id]
             
             if filters.get('status'):
-                bets_query = bets_query.filter(Bet.status == filters['status'])
+                bet_conditions.append(bet_columns.status == filters['status'])
             
             if filters.get('result'):
-                bets_query = bets_query.filter(Bet.result == filters['result'])
+                bet_conditions.append(bet_columns.result == filters['result'])
             
             if filters.get('date_from'):
-                bets_query = bets_query.filter(
-                    Bet.placed_at >= datetime.fromisoformat(filters['date_from'])
-                )
+                bet_conditions.append(bet_columns.placed_at >= datetime.fromisoformat(filters['date_from']))
             
             if filters.get('date_to'):
-                bets_query = bets_query.filter(
-                    Bet.placed_at <= datetime.fromisoformat(filters['date_to'])
-                )
+                bet_conditions.append(bet_columns.placed_at <= datetime.fromisoformat(filters['date_to']))
             
             # Получаем общее количество для пагинации
-            total_bets = bets_query.count()
-            
-            # Получаем ставки с пагинацией
-            bets_rows = bets_query.order_by(desc(Bet.placed_at)).offset(offset).limit(limit).all()
-            
-            # 3. Строим запрос для транзакций
-            trans_query = db.query(BalanceTransaction).filter(
-                BalanceTransaction.user_id == user_id
-            )
+            total_bets = db.execute(
+                select(func.count()).select_from(Bet.__table__).where(*bet_conditions)
+            ).scalar()
+            
+            # Получаем ставки с пагинацией (только нужные колонки)
+            bets_rows = db.execute(
+                WalletService._row_select(Bet, BET_ROW_COLUMNS)
+                .where(*bet_conditions)
+                .order_by(desc(bet_columns.placed_at))
+                .offset(offset)
+                .limit(limit)
+            ).all()
+            
+            # 3. Условия для транзакций
+            trans_conditions = [trans_columns.user_id == user_id]
             
             if filters.get('transaction_type'):
-                trans_query = trans_query.filter(
-                    BalanceTransaction.transaction_type == filters['transaction_type']
-                )
+                trans_conditions.append(trans_columns.transaction_type == filters['transaction_type'])
             
             if filters.get('date_from'):
-                trans_query = trans_query.filter(
-                    BalanceTransaction.created_at >= datetime.fromisoformat(filters['date_from'])
-                )
+                trans_conditions.append(trans_columns.created_at >= datetime.fromisoformat(filters['date_from']))
             
             if filters.get('date_to'):
-                trans_query = trans_query.filter(
-                    BalanceTransaction.created_at <= datetime.fromisoformat(filters['date_to'])
-                )
+                trans_conditions.append(trans_columns.created_at <= datetime.fromisoformat(filters['date_to']))
             
-            trans_rows = trans_query.order_by(
-                desc(BalanceTransaction.created_at)
-            ).offset(offset).limit(limit).all()
+            trans_rows = db.execute(
+                WalletService._row_select(BalanceTransaction, TRANSACTION_ROW_COLUMNS)
+                .where(*trans_conditions)
+                .order_by(desc(trans_columns.created_at))
+                .offset(offset)
+                .limit(limit)
+            ).all()
             
             # 4. Рассчитываем статистику
             stats = db.query(
@@ -884,7 +1067,7 @@ class WalletService:
             }
         
         except Exception as e:
-            logger.error(f"Error in get_bet_history for user {user_id}: {str(e)}")
+            logger.error("Error in get_bet_history for user {}: {}", user_id, e)
             return {
                 "success": False,
                 "error": "Database error",
@@ -904,7 +1087,8 @@ class WalletService:
         include_bets: bool = True,
         include_transactions: bool = True,
         include_statistics: bool = True,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        include_archived: bool = False
     ) -> Dict:
         """
         Экспортирует отчёт в CSV или PDF.
@@ -919,6 +1103,7 @@ class WalletService:
             include_transactions (bool): Включить транзакции
             include_statistics (bool): Включить статистику
             ip_address (str): IP адрес клиента
+            include_archived (bool): Добавить строки из архива (services/archive_service.py)
         
         Returns:
             dict: {
@@ -934,6 +1119,8 @@ class WalletService:
                 }
             }
         """
+        started_at = time.perf_counter()
+        
         try:
             # 1. Валидация параметров
             if format not in ["csv", "pdf"]:
@@ -953,30 +1140,55 @@ class WalletService:
             report_data: Dict[str, Any] = {
                 "bets": [],
                 "transactions": [],
-                "statistics": {}
+                "statistics": {},
+                # Остатки на начало и конец периода (снимки журнала)
+                "opening_balance": WalletService._balance_or_none(db, user_id, date_from_dt),
+                "closing_balance": WalletService._balance_or_none(db, user_id, date_to_dt)
             }
             
-            # ПОЛУЧАЕМ СТАВКИ
+            # ПОЛУЧАЕМ СТАВКИ (кортежи Row с атрибутами колонок, как у архивных строк)
             if include_bets:
-                bets = db.query(Bet).filter(
-                    and_(
-                        Bet.user_id == user_id,
-                        Bet.placed_at >= date_from_dt,
-                        Bet.placed_at < date_to_dt
+                bet_columns = Bet.__table__.c
+                bets = db.execute(
+                    WalletService._row_select(Bet, BET_ROW_COLUMNS)
+                    .where(
+                        bet_columns.user_id == user_id,
+                        bet_columns.placed_at >= date_from_dt,
+                        bet_columns.placed_at < date_to_dt
+                    )
+                    .order_by(desc(bet_columns.placed_at))
+                ).all()
+                
+                if include_archived:
+                    bets = sorted(
+                        bets + ArchiveService.read_archived("bets", user_id, date_from_dt, date_to_dt),
+                        key=lambda bet: bet.placed_at,
+                        reverse=True
                     )
-                ).order_by(desc(Bet.placed_at)).all()
                 
                 report_data["bets"] = bets
             
             # ПОЛУЧАЕМ ТРАНЗАКЦИИ
             if include_transactions:
-                transactions = db.query(BalanceTransaction).filter(
-                    and_(
-                        BalanceTransaction.user_id == user_id,
-                        BalanceTransaction.created_at >= date_from_dt,
-                        BalanceTransaction.created_at < date_to_dt
+                trans_columns = BalanceTransaction.__table__.c
+                transactions = db.execute(
+                    WalletService._row_select(BalanceTransaction, TRANSACTION_ROW_COLUMNS)
+                    .where(
+                        trans_columns.user_id == user_id,
+                        trans_columns.created_at >= date_from_dt,
+                        trans_columns.created_at < date_to_dt
+                    )
+                    .order_by(desc(trans_columns.created_at))
+                ).all()
+                
+                if include_archived:
+                    transactions = sorted(
+                        transactions + ArchiveService.read_archived(
+                            "balance_transactions", user_id, date_from_dt, date_to_dt
+                        ),
+                        key=lambda trans: trans.created_at,
+                        reverse=True
                     )
-                ).order_by(desc(BalanceTransaction.created_at)).all()
                 
                 report_data["transactions"] = transactions
             
@@ -1006,6 +1218,11 @@ class WalletService:
                     )
                 ).first()
                 
+                if include_archived:
+                    stats = WalletService._add_archived_statistics(
+                        stats, ArchiveService.read_archived("bets", user_id, date_from_dt, date_to_dt)
+                    )
+                
                 report_data["statistics"] = stats
             
             # 3. Генерируем отчёт
@@ -1041,7 +1258,7 @@ class WalletService:
             db.add(audit_log)
             db.commit()
             
-            logger.info(f"Generated report {report_id} for user {user_id} in format {format}")
+            logger.info("Generated report {} for user {} in format {}", report_id, user_id, format)
             
             # 5. Возвращаем результат
             expires_at = (datetime.utcnow() + timedelta(days=7)).isoformat()
@@ -1056,23 +1273,127 @@ class WalletService:
                     "file_size": file_size,
                     "download_url": f"{settings.reports_base_url}/{report_id}",
                     "expires_at": expires_at,
-                    "created_at": datetime.utcnow().isoformat()
+                    "created_at": datetime.utcnow().isoformat(),
+                    "opening_balance": report_data["opening_balance"],
+                    "closing_balance": report_data["closing_balance"]
                 }
             }
             
             if format == "csv" and csv_content:
                 result["report"]["content"] = csv_content
             
+            EXPORT_REPORT_DURATION.observe(time.perf_counter() - started_at, format=format)
+            
             return result
         
         except Exception as e:
-            logger.error(f"Error in export_report for user {user_id}: {str(e)}")
+            logger.error("Error in export_report for user {}: {}", user_id, e)
             return {
                 "success": False,
                 "error": "Export error",
                 "details": str(e)
             }
 
+    @staticmethod
+    def _locked_in_bets(db: Session, user_id: str) -> Decimal:
+        """Сумма открытых ставок пользователя (idx_bets_user_open)."""
+        return Decimal(db.query(func.sum(Bet.bet_amount)).filter(
+            and_(Bet.user_id == user_id, Bet.status == 'open')
+        ).scalar() or 0)
+
+    @staticmethod
+    def _operation_by_intent(db: Session, intent_id: Optional[str]) -> Optional[Any]:
+        """Операция по PaymentIntent (повтор пополнения с тем же Idempotency-Key)."""
+        if not intent_id:
+            return None
+        return db.query(WalletOperation).filter(
+            WalletOperation.stripe_payment_intent_id == intent_id
+        ).first()
+
+    @staticmethod
+    def _operation_by_key(db: Session, user_id: str, idempotency_key: Optional[str]) -> Optional[Any]:
+        """Операция вывода, записанная запросом с этим Idempotency-Key."""
+        if not idempotency_key:
+            return None
+        return db.query(WalletOperation).filter(
+            WalletOperation.user_id == user_id,
+            WalletOperation.idempotency_key == idempotency_key
+        ).first()
+
+    @staticmethod
+    def _operation_balance(db: Session, operation: Any) -> Optional[float]:
+        """Баланс после проводки операции (None - проводки не было)."""
+        balance_after = db.execute(
+            select(LedgerEntry.balance_after).where(
+                LedgerEntry.user_id == operation.user_id,
+                LedgerEntry.reference_type == 'operation',
+                LedgerEntry.reference_id == operation.operation_id
+            )
+        ).scalar()
+        return float(balance_after) if balance_after is not None else None
+
+    @staticmethod
+    def _replayed_deposit(db: Session, operation: Any) -> Dict:
+        """Ответ replenish_balance() по уже записанному пополнению сохранённой картой."""
+        if operation.status == 'failed':
+            return {"success": False, "error": operation.error_message or "Payment failed"}
+        return {
+            "success": True,
+            "message": "Balance replenished successfully",
+            "new_balance": WalletService._operation_balance(db, operation),
+            "transaction_id": operation.stripe_charge_id,
+            "status": operation.status
+        }
+
+    @staticmethod
+    def _replayed_withdrawal(db: Session, operation: Any) -> Dict:
+        """Ответ withdraw_funds() по уже записанной операции вывода."""
+        return {
+            "success": True,
+            "message": "Withdrawal request created",
+            "withdrawal": {
+                "operation_id": operation.operation_id,
+                "amount": float(operation.amount),
+                "status": operation.status,
+                "estimated_completion": (operation.created_at + timedelta(days=2)).isoformat()
+            },
+            "new_balance": WalletService._operation_balance(db, operation),
+            "note": "Withdrawal usually takes 1-2 business days"
+        }
+
+    @staticmethod
+    def _read_source(db: Session) -> int:
+        """Engine, с которого читает сессия (реплика или primary) - часть ключа объединения."""
+        return id(getattr(db, "read_engine", None) or db.get_bind())
+
+    @staticmethod
+    def _row_select(model: Any, columns: tuple):
+        """SELECT колонок columns таблицы model (Core, без загрузки ORM-объектов)."""
+        table_columns = model.__table__.c
+        return select(*(table_columns[name] for name in columns))
+
+    @staticmethod
+    def _balance_or_none(db: Session, user_id: str, at: datetime) -> Optional[float]:
+        """Баланс на момент at для заголовков отчётов (None при ошибке)."""
+        result = WalletService.get_balance_at(db, user_id, at)
+        return result["balance"] if result["success"] else None
+
+    @staticmethod
+    def _add_archived_statistics(stats: Any, archived_bets: List[Any]) -> SimpleNamespace:
+        """Складывает статистику из БД со статистикой архивных ставок."""
+        resolved = [bet for bet in archived_bets if bet.status == 'resolved']
+        return SimpleNamespace(
+            total=(stats.total or 0) + len(resolved),
+            wins=(stats.wins or 0) + sum(1 for bet in resolved if bet.result == 'win'),
+            losses=(stats.losses or 0) + sum(1 for bet in resolved if bet.result == 'loss'),
+            total_bet=(stats.total_bet or Decimal("0")) + sum(
+                (bet.bet_amount for bet in resolved), Decimal("0")
+            ),
+            total_won=(stats.total_won or Decimal("0")) + sum(
+                (bet.actual_win or Decimal("0") for bet in resolved if bet.result == 'win'), Decimal("0")
+            )
+        )
+
     @staticmethod
     def _generate_csv_report(
         user_id: str,
@@ -1092,6 +1413,10 @@ class WalletService:
         writer.writerow([f"User ID: {user_id}"])
         writer.writerow([f"Export Date: {datetime.utcnow().isoformat()}"])
         writer.writerow([f"Period: {date_from} to {date_to}"])
+        if report_data.get("opening_balance") is not None:
+            writer.writerow([f"Opening Balance: {report_data['opening_balance']:.2f}"])
+        if report_data.get("closing_balance") is not None:
+            writer.writerow([f"Closing Balance: {report_data['closing_balance']:.2f}"])
         writer.writerow([])
         
         # СТАВКИ
@@ -1165,4 +1490,237 @@ class WalletService:
         
         return output.getvalue()
 
+    # =========================================================================
+    # МЕТОД 6: place_bet()
+    # =========================================================================
+    @staticmethod
+    def place_bet(
+        db: Session,
+        user_id: str,
+        event_id: int,
+        odds_id: int,
+        bet_amount: float,
+        coefficient: float,
+        bet_type: str = "single",
+        ip_address: Optional[str] = None
+    ) -> Dict:
+        """
+        Размещает ставку, резервируя сумму на балансе.
+        
+        Ставка остаётся в balance до расчёта события и резервируется через
+        открытые ставки: available = balance - SUM(открытые ставки). Всё
+        делается одной короткой транзакцией:
+        
+            1. UPDATE users_balance ... RETURNING balance - первая команда
+               транзакции берёт блокировку строки баланса пользователя
+            2. SELECT SUM(bet_amount) открытых ставок (idx_bets_user_open)
+            3. INSERT bets, balance_transactions (bet_placed), audit_log
+            4. COMMIT, затем publish_wallet_update (как пополнение и вывод)
+        
+        Параллельные ставки одного пользователя выстраиваются в очередь на
+        блокировке его строки (двойной резерв невозможен), ставки разных
+        пользователей не пересекаются. Транзакция блокирует ровно одну
+        строку баланса, поэтому взаимоблокировок не возникает.
+        
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            event_id (int): ID события
+            odds_id (int): ID исхода
+            bet_amount (float): Сумма ставки (1.00 - 100000.00)
+            coefficient (float): Коэффициент (> 1.0)
+            bet_type (str): Тип ставки (по умолчанию "single")
+            ip_address (str): IP адрес клиента
+        
+        Returns:
+            dict: {
+                "success": True,
+                "bet": {
+                    "bet_id": 123,
+                    "event_id": 10,
+                    "odds_id": 55,
+                    "bet_amount": 50.0,
+                    "coefficient": 2.5,
+                    "potential_win": 125.0,
+                    "status": "open",
+                    "placed_at": "2025-12-17T12:00:00"
+                },
+                "available_balance": 950.0
+            }
+        
+        Examples:
+            >>> WalletService.place_bet(db, "user_123", event_id=10, odds_id=55,
+            ...                         bet_amount=50.0, coefficient=2.5)
+        """
+        try:
+            # 1. Валидация параметров
+            if bet_amount < 1.00:
+                return {"success": False, "error": "Minimum bet is 1.00 USD"}
+            
+            if bet_amount > 100000.00:
+                return {"success": False, "error": "Maximum bet is 100000.00 USD"}
+            
+            if coefficient <= 1.0:
+                return {"success": False, "error": "Coefficient must be greater than 1.0"}
+            
+            stake = Decimal(str(bet_amount)).quantize(Decimal("0.01"))
+            odds = Decimal(str(coefficient)).quantize(Decimal("0.001"))
+            now = datetime.utcnow()
+            
+            # 2. Блокируем строку баланса: первая команда транзакции - запись,
+            # поэтому чтение суммы открытых ставок ниже идёт уже под блокировкой
+            reserved = db.execute(
+                update(UserBalance)
+                .where(UserBalance.user_id == user_id)
+                .values(
+                    total_bet=func.coalesce(UserBalance.total_bet, 0) + stake,
+                    last_transaction=now
+                )
+                .returning(UserBalance.balance)
+                .execution_options(synchronize_session=False)
+            ).first()
+            
+            if reserved is None:
+                db.rollback()
+                return {"success": False, "error": "Balance record not found"}
+            
+            # 3. Доступно = баланс - открытые ставки
+            current_balance = Decimal(reserved.balance)
+            available = current_balance - WalletService._locked_in_bets(db, user_id)
+            
+            if available < stake:
+                db.rollback()
+                return {
+                    "success": False,
+                    "error": "Insufficient balance",
+                    "available_balance": float(available),
+                    "requested_amount": bet_amount
+                }
+            
+            # 4. Записываем ставку и транзакцию резерва
+            bet = Bet(
+                user_id=user_id,
+                event_id=event_id,
+                odds_id=odds_id,
+                bet_type=bet_type,
+                bet_amount=stake,
+                coefficient=odds,
+                potential_win=(stake * odds).quantize(Decimal("0.01")),
+                status='open',
+                placed_at=now
+            )
+            db.add(bet)
+            db.flush()
+            
+            # Баланс не меняется: сумма зарезервирована открытой ставкой
+            # (_locked_in_bets), сама запись о резерве окончательна
+            db.add(BalanceTransaction(
+                user_id=user_id,
+                transaction_type='bet_placed',
+                amount=-stake,
+                balance_before=current_balance,
+                balance_after=current_balance,
+                status='completed',
+                description=f"Bet #{bet.bet_id} placed: stake reserved",
+                related_entity_type='bet',
+                related_entity_id=bet.bet_id,
+                created_at=now
+            ))
+            db.add(AuditLog(
+                user_id=user_id,
+                action="bet_placed",
+                amount=stake,
+                ip_address=ip_address,
+                status="success"
+            ))
+            db.commit()
+            # Баланс тот же, доступное уменьшилось - клиенты перечитывают его
+            publish_wallet_update(user_id, balance=current_balance)
+            
+            logger.info("User {} placed bet #{} of ${} on event {}", user_id, bet.bet_id, stake, event_id)
+            
+            return {
+                "success": True,
+                "bet": {
+                    "bet_id": bet.bet_id,
+                    "event_id": event_id,
+                    "odds_id": odds_id,
+                    "bet_type": bet_type,
+                    "bet_amount": float(stake),
+                    "coefficient": float(odds),
+                    "potential_win": float(bet.potential_win),
+                    "status": "open",
+                    "placed_at": now.isoformat()
+                },
+                "available_balance": float(available - stake)
+            }
+        
+        except Exception as e:
+            db.rollback()
+            logger.error("Error in place_bet for user {}: {}", user_id, e)
+            return {
+                "success": False,
+                "error": "Unexpected error",
+                "details": str(e)
+            }
+
+    # =========================================================================
+    # МЕТОД 7: get_balance_at()
+    # =========================================================================
+    @staticmethod
+    def get_balance_at(db: Session, user_id: str, at: datetime) -> Dict:
+        """
+        Получает баланс пользователя на момент времени.
+        
+        Итог берётся из журнала проводок (LedgerService.balance_at):
+        ближайший снимок до at и проводки между соседними снимками.
+        Для моментов раньше первой проводки пользователя (история до запуска
+        журнала) - balance_after последней транзакции до at.
+        
+        Args:
+            db (Session): SQLAlchemy сессия
+            user_id (str): ID пользователя
+            at (datetime): Момент времени (учитываются операции до at)
+        
+        Returns:
+            dict: {
+                "success": True,
+                "user_id": "user_123",
+                "at": "2026-10-01T00:00:00",
+                "balance": 1250.0,
+                "source": "ledger"  # ledger, transactions или none
+            }
+        
+        Examples:
+            >>> WalletService.get_balance_at(db, "user_123", datetime(2026, 10, 1))
+        """
+        try:
+            point = LedgerService.balance_at(db, user_id, at)
+            if point is not None:
+                balance, source = point.balance, "ledger"
+            else:
+                balance = db.query(BalanceTransaction.balance_after).filter(
+                    and_(
+                        BalanceTransaction.user_id == user_id,
+                        BalanceTransaction.created_at < at,
+                        BalanceTransaction.status.in_(['completed', 'pending'])
+                    )
+                ).order_by(desc(BalanceTransaction.created_at)).limit(1).scalar()
+                source = "transactions" if balance is not None else "none"
+            
+            return {
+                "success": True,
+                "user_id": user_id,
+                "at": at.isoformat(),
+                "balance": float(balance or 0),
+                "source": source
+            }
+        
+        except Exception as e:
+            logger.error("Error in get_balance_at for user {}: {}", user_id, e)
+            return {
+                "success": False,
+                "error": "Database error",
+                "details": str(e)
+            }
 
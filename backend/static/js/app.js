@@ -72,12 +72,10 @@ async function apiRequest(endpoint, options = {}) {
 // === INIT ===
 document.addEventListener('DOMContentLoaded', async () => {
     initStripe();
-    await loadBalance();
-    await loadHistory();
-    await loadPaymentMethods();
-    await loadWithdrawalMethods();
+    await loadDashboard();
     initChart();
     setDefaultDates();
+    subscribeWalletEvents();
     
     // Close dropdown on outside click
     document.addEventListener('click', (e) => {
@@ -111,30 +109,52 @@ function initStripe() {
 }
 
 // === LOAD DATA ===
-async function loadBalance() {
+// Первая загрузка страницы - один запрос /summary вместо четырёх
+async function loadDashboard() {
     try {
-        const data = await apiRequest('/balance');
-        
-        state.balance = parseFloat(data.balance?.total || 0);
-        state.availableBalance = parseFloat(data.balance?.available || 0);
-        state.lockedBalance = parseFloat(data.balance?.pending || 0);
-        
-        if (data.metrics) {
-            state.totalDeposited = parseFloat(data.metrics.total_deposited || 0);
-            state.totalWithdrawn = parseFloat(data.metrics.total_withdrawn || 0);
-            state.netProfit = parseFloat(data.metrics.net_profit || 0);
-            state.winRate = parseFloat(data.metrics.win_rate || 0);
-            state.roi = parseFloat(data.metrics.roi || 0);
-            state.totalBets = parseInt(data.metrics.total_bets || 0);
-        }
+        const data = await apiRequest(
+            `/summary?fields=balance,history,payment_methods,withdrawal_methods&history_limit=${state.historyPerPage}`
+        );
         
-        updateDisplays();
+        applyBalance(data.balance);
+        applyHistory({ history: data.history.transactions });
+        applyPaymentMethods({ payment_methods: data.payment_methods });
+        applyWithdrawalMethods({ methods: data.withdrawal_methods });
+    } catch (error) {
+        console.error('Error loading summary:', error);
+        await loadBalance();
+        await loadHistory();
+        await loadPaymentMethods();
+        await loadWithdrawalMethods();
+    }
+}
+
+async function loadBalance() {
+    try {
+        applyBalance(await apiRequest('/balance'));
     } catch (error) {
         console.error('Error loading balance:', error);
         showToast('Ошибка загрузки баланса', 'error');
     }
 }
 
+function applyBalance(data) {
+    state.balance = parseFloat(data.balance?.total || 0);
+    state.availableBalance = parseFloat(data.balance?.available || 0);
+    state.lockedBalance = parseFloat(data.balance?.pending || 0);
+    
+    if (data.metrics) {
+        state.totalDeposited = parseFloat(data.metrics.total_deposited || 0);
+        state.totalWithdrawn = parseFloat(data.metrics.total_withdrawn || 0);
+        state.netProfit = parseFloat(data.metrics.net_profit || 0);
+        state.winRate = parseFloat(data.metrics.win_rate || 0);
+        state.roi = parseFloat(data.metrics.roi || 0);
+        state.totalBets = parseInt(data.metrics.total_bets || 0);
+    }
+    
+    updateDisplays();
+}
+
 async function loadHistory() {
     try {
         const filter = document.getElementById('historyFilter')?.value || 'all';
@@ -142,61 +162,127 @@ async function loadHistory() {
             `/history?offset=${(state.historyPage - 1) * state.historyPerPage}&limit=${state.historyPerPage}` :
             `/history?type=${filter}&offset=${(state.historyPage - 1) * state.historyPerPage}&limit=${state.historyPerPage}`;
         
-        const data = await apiRequest(endpoint);
-        
-        if (data.history) {
-            state.transactions = data.history.map(item => ({
-                id: item.transaction_id || item.bet_id || Date.now(),
-                type: item.type || (item.amount >= 0 ? 'deposit' : 'withdrawal'),
-                amount: Math.abs(parseFloat(item.amount || 0)),
-                status: item.status || 'completed',
-                created_at: item.date || item.created_at || item.placed_at,
-                description: item.description || item.type || 'Операция'
-            }));
-        }
-        
-        renderHistory();
-        updateChart();
+        applyHistory(await apiRequest(endpoint));
     } catch (error) {
         console.error('Error loading history:', error);
         showToast('Ошибка загрузки истории', 'error');
     }
 }
 
+function applyHistory(data) {
+    if (data.history) {
+        state.transactions = data.history.map(item => ({
+            id: item.transaction_id || item.bet_id || Date.now(),
+            type: item.type || (item.amount >= 0 ? 'deposit' : 'withdrawal'),
+            amount: Math.abs(parseFloat(item.amount || 0)),
+            status: item.status || 'completed',
+            created_at: item.date || item.created_at || item.placed_at,
+            description: item.description || item.type || 'Операция'
+        }));
+    }
+    
+    renderHistory();
+    updateChart();
+}
+
 async function loadPaymentMethods() {
     try {
-        const data = await apiRequest('/payment-methods');
-        
-        if (data.payment_methods) {
-            state.paymentMethods = data.payment_methods.map(pm => ({
-                id: pm.method_id,
-                brand: pm.card_brand || 'Card',
-                last4: pm.last4,
-                is_default: pm.is_default || false
-            }));
-        }
-        
-        renderPaymentMethods();
+        applyPaymentMethods(await apiRequest('/payment-methods'));
     } catch (error) {
         console.error('Error loading payment methods:', error);
     }
 }
 
+function applyPaymentMethods(data) {
+    if (data.payment_methods) {
+        state.paymentMethods = data.payment_methods.map(pm => ({
+            id: pm.method_id,
+            brand: pm.card_brand || 'Card',
+            last4: pm.last4,
+            is_default: pm.is_default || false
+        }));
+    }
+    
+    renderPaymentMethods();
+}
+
 async function loadWithdrawalMethods() {
     try {
-        const data = await apiRequest('/withdrawal-methods');
-        
-        if (data.methods) {
-            state.withdrawalMethods = data.methods.map(m => ({
-                id: m.method_id,
-                name: m.bank_name || 'Bank',
-                last4: m.last4
-            }));
+        applyWithdrawalMethods(await apiRequest('/withdrawal-methods'));
+    } catch (error) {
+        console.error('Error loading withdrawal methods:', error);
+    }
+}
+
+function applyWithdrawalMethods(data) {
+    if (data.methods) {
+        state.withdrawalMethods = data.methods.map(m => ({
+            id: m.method_id,
+            name: m.bank_name || 'Bank',
+            last4: m.last4
+        }));
+    }
+    
+    renderPaymentMethods();
+}
+
+// === LIVE UPDATES ===
+// Поток /events (SSE) читается через fetch, а не EventSource: нужен заголовок X-User-ID
+const FINAL_OPERATION_STATUSES = ['completed', 'failed', 'cancelled', 'expired'];
+
+async function subscribeWalletEvents(retryDelay = 1000) {
+    try {
+        const response = await fetch(`${CONFIG.API_BASE}/events`, {
+            headers: { 'X-User-ID': CONFIG.USER_ID, 'Accept': 'text/event-stream' }
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`Event stream unavailable: ${response.status}`);
         }
         
-        renderPaymentMethods();
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        retryDelay = 1000;
+        
+        while (true) {
+            const {value, done} = await reader.read();
+            if (done) break;
+            buffer += value;
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                handleWalletEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+        }
     } catch (error) {
-        console.error('Error loading withdrawal methods:', error);
+        console.log('Wallet events disconnected', error);
+    }
+    
+    setTimeout(() => subscribeWalletEvents(Math.min(retryDelay * 2, 30000)), retryDelay);
+}
+
+function handleWalletEvent(raw) {
+    let event = 'message';
+    let data = '';
+    for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+    }
+    
+    if (event === 'ready' || event === 'resync') {
+        loadBalance();
+    } else if (event === 'balance') {
+        state.balance = parseFloat(JSON.parse(data).balance || 0);
+        updateDisplays();
+    } else if (event === 'operation') {
+        const operation = JSON.parse(data);
+        if (!FINAL_OPERATION_STATUSES.includes(operation.status)) return;
+        
+        if (operation.operation_type === 'deposit' && operation.status === 'completed') {
+            showToast(`Зачислено ${formatCurrency(operation.amount)}`, 'success');
+        }
+        loadBalance();
+        loadHistory();
     }
 }
 
@@ -2,10 +2,13 @@
 Test Configuration - Standalone models for testing
 Matches real ORM models structure
 """
+import importlib
+import pkgutil
 import pytest
 from datetime import datetime
+from functools import lru_cache
 from decimal import Decimal
-from sqlalchemy import create_engine, Column, Integer, String, Numeric, Boolean, DateTime, Text, ForeignKey, BigInteger
+from sqlalchemy import create_engine, Column, Integer, String, Numeric, Boolean, DateTime, Text, ForeignKey, BigInteger, UniqueConstraint
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import StaticPool
 
@@ -39,6 +42,7 @@ class UserBalance(TestBase):
     total_won = Column(Numeric(15, 2), default=Decimal("0.00"), nullable=False)
     total_lost = Column(Numeric(15, 2), default=Decimal("0.00"), nullable=False)
     currency = Column(String(3), default="USD", nullable=False)
+    ledger_seq = Column(Integer, default=0, nullable=False)
     last_transaction = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -81,6 +85,8 @@ class WalletOperation(TestBase):
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime)
     expires_at = Column(DateTime)
+    idempotency_key = Column(String(255))
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key"),)
 
 
 class PaymentMethod(TestBase):
@@ -96,6 +102,7 @@ class PaymentMethod(TestBase):
     is_default = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    last_used = Column(DateTime)
 
 
 class WithdrawalMethod(TestBase):
@@ -103,10 +110,14 @@ class WithdrawalMethod(TestBase):
     method_id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String(20), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     withdrawal_type = Column(String(30), nullable=False)
+    bank_account_number = Column(String(100))
     bank_name = Column(String(100))
     account_holder_name = Column(String(100))
+    iban = Column(String(100))
+    crypto_wallet_address = Column(String(200))
     is_verified = Column(Boolean, default=False)
     is_default = Column(Boolean, default=False)
+    verification_status = Column(String(20), default="pending")
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
@@ -142,6 +153,90 @@ class AuditLog(TestBase):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class MonthlyStatement(TestBase):
+    __tablename__ = "monthly_statements"
+    statement_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(20), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    opening_balance = Column(Numeric(15, 2))
+    closing_balance = Column(Numeric(15, 2))
+    total_deposits = Column(Numeric(15, 2), default=Decimal("0.00"))
+    total_withdrawals = Column(Numeric(15, 2), default=Decimal("0.00"))
+    total_bets = Column(Numeric(15, 2), default=Decimal("0.00"))
+    total_wins = Column(Numeric(15, 2), default=Decimal("0.00"))
+    total_losses = Column(Numeric(15, 2), default=Decimal("0.00"))
+    net_profit = Column(Numeric(15, 2))
+    roi_percent = Column(Numeric(10, 2))
+    transaction_count = Column(Integer, default=0)
+    win_rate_percent = Column(Numeric(10, 2))
+    generated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LedgerEntry(TestBase):
+    __tablename__ = "ledger_entries"
+    entry_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(20), ForeignKey("users.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    entry_type = Column(String(30), nullable=False)
+    amount = Column(Numeric(15, 2), nullable=False)
+    balance_after = Column(Numeric(15, 2), nullable=False)
+    contra_account = Column(String(30), nullable=False)
+    reference_type = Column(String(20))
+    reference_id = Column(Integer)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (UniqueConstraint("user_id", "seq"),)
+
+
+class BalanceSnapshot(TestBase):
+    __tablename__ = "balance_snapshots"
+    user_id = Column(String(20), ForeignKey("users.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    balance = Column(Numeric(15, 2), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class IdempotencyKey(TestBase):
+    __tablename__ = "idempotency_keys"
+    user_id = Column(String(20), primary_key=True)
+    idempotency_key = Column(String(255), primary_key=True)
+    endpoint = Column(String(50), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+
+# Тестовая модель по имени production-модели
+TEST_MODELS = {
+    model.__name__: model
+    for model in (
+        User, UserBalance, BalanceTransaction, WalletOperation, PaymentMethod, WithdrawalMethod,
+        Bet, AuditLog, MonthlyStatement, LedgerEntry, BalanceSnapshot, IdempotencyKey
+    )
+}
+
+# Пакеты, модули которых импортируют ORM-модели
+MODEL_USER_PACKAGES = ("services", "routes")
+
+
+@lru_cache(maxsize=None)
+def _model_user_modules():
+    """Все модули services/ и routes/ (импортируются заранее, порядок импорта в тестах не важен)."""
+    modules = []
+    for package_name in MODEL_USER_PACKAGES:
+        package = importlib.import_module(package_name)
+        for info in pkgutil.iter_modules(package.__path__):
+            modules.append(importlib.import_module(f"{package_name}.{info.name}"))
+    return tuple(modules)
+
+
+def pytest_sessionstart(session):
+    """Импортирует services/ и routes/ до сбора тестов: test_wallet*.py подменяют models в sys.modules."""
+    _model_user_modules()
+
+
 # Use SQLite for testing
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
@@ -189,3 +284,32 @@ def sample_balance_data():
         "total_bet": Decimal("2500.00"),
         "total_won": Decimal("3840.00")
     }
+
+@pytest.fixture(autouse=True)
+def test_models(monkeypatch):
+    """
+    Сервисы и роуты работают с тестовыми моделями вместо production ORM.
+
+    Модули services/ и routes/ импортируются один раз, после чего в каждом
+    из них классы моделей подменяются тестовыми по имени атрибута. Модули
+    orm_models здесь не трогаем: test_wallet*.py подменяют их в sys.modules.
+    """
+    for module in _model_user_modules():
+        for attr, value in list(vars(module).items()):
+            model = TEST_MODELS.get(attr)
+            if model is not None and isinstance(value, type) and value is not model:
+                monkeypatch.setattr(module, attr, model)
+    return TEST_MODELS
+
+@pytest.fixture
+def wallet_service():
+    """WalletService (модели подменяет test_models)"""
+    from services.wallet_service import WalletService
+    return WalletService
+
+@pytest.fixture
+def assert_max_queries(engine):
+    """Контекстный менеджер: падает если блок выполнил больше N SQL-запросов"""
+    from monitoring.query_stats import install_query_stats, assert_max_queries as _assert_max_queries
+    install_query_stats(engine)
+    return _assert_max_queries
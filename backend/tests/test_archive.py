@@ -0,0 +1,184 @@
+"""
+Тесты архивации истории (services/archive_service.py).
+
+Архив пишется во временный каталог; SQLite без партиций, поэтому месяцы
+удаляются из таблиц через DELETE.
+
+Запуск: pytest tests/test_archive.py -v
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from config.settings import settings
+from services import archive_service
+from services.archive_service import ArchiveService
+from tests.conftest import User, Bet, BalanceTransaction, AuditLog
+
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "archive_dir", str(tmp_path / "archive"))
+    monkeypatch.setattr(settings, "archive_format", "csv.gz")
+    monkeypatch.setattr(settings, "archive_after_months", 12)
+    return tmp_path / "archive"
+
+
+@pytest.fixture
+def history(db_session):
+    """Ставки и транзакции за старый (2025-01) и свежий (2026-10) месяцы."""
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(User(id="user_2", email="u2@example.com", name="U2", password_hash="x"))
+    for user_id, placed_at, result in [
+        ("user_1", datetime(2025, 1, 10, 12, 0), "win"),
+        ("user_2", datetime(2025, 1, 11, 12, 0), "loss"),
+        ("user_1", datetime(2026, 10, 1, 12, 0), "loss"),
+    ]:
+        db_session.add(Bet(
+            user_id=user_id, event_id=1, bet_amount=Decimal("10.00"),
+            coefficient=Decimal("2.500"), potential_win=Decimal("25.00"),
+            actual_win=Decimal("25.00") if result == "win" else None,
+            status="resolved", result=result, placed_at=placed_at
+        ))
+        db_session.add(BalanceTransaction(
+            user_id=user_id, transaction_type="bet_placed", amount=Decimal("-10.00"),
+            balance_before=Decimal("100.00"), balance_after=Decimal("90.00"),
+            created_at=placed_at
+        ))
+    db_session.add(AuditLog(user_id="user_1", action="login", created_at=datetime(2025, 1, 10)))
+    db_session.commit()
+    return db_session
+
+
+class TestArchiveMonths:
+    """Тесты выгрузки месяцев в архив."""
+
+    def test_candidate_months(self, history, archive_dir):
+        """Тест: Кандидаты - только месяцы старше срока."""
+        assert ArchiveService.candidate_months(history, "bets", today=TODAY) == [date(2025, 1, 1)]
+
+    def test_archive_moves_rows_to_files(self, history, archive_dir):
+        """Тест: Строки уходят из БД в файлы, манифест описывает каждый файл."""
+        result = ArchiveService.archive_closed_months(history, today=TODAY)
+
+        assert result["success"]
+        assert [(item["table"], item["rows"]) for item in result["archived"]] == [
+            ("bets", 2), ("balance_transactions", 2), ("audit_log", 1)
+        ]
+        assert history.query(Bet).count() == 1
+        assert history.query(BalanceTransaction).count() == 1
+        assert history.query(AuditLog).count() == 0
+
+        manifest = json.loads((archive_dir / "manifest.json").read_text(encoding="utf-8"))
+        assert manifest["entries"][0]["file"] == "bets/2025/bets_2025_01.csv.gz"
+        assert ArchiveService.verify()["success"]
+        assert ArchiveService.candidate_months(history, "bets", today=TODAY) == []
+
+    def test_unfinished_rows_stay_in_db(self, history, archive_dir):
+        """Тест: Открытые ставки и pending транзакции старого месяца не уходят в архив."""
+        placed_at = datetime(2025, 1, 20, 12, 0)
+        history.add(Bet(
+            user_id="user_1", event_id=2, bet_amount=Decimal("5.00"),
+            coefficient=Decimal("2.000"), potential_win=Decimal("10.00"),
+            status="open", placed_at=placed_at
+        ))
+        history.add(BalanceTransaction(
+            user_id="user_1", transaction_type="withdrawal", amount=Decimal("-50.00"),
+            balance_before=Decimal("90.00"), balance_after=Decimal("40.00"),
+            status="processing", created_at=placed_at
+        ))
+        history.commit()
+
+        result = ArchiveService.archive_closed_months(history, today=TODAY)
+
+        assert result["success"]
+        assert [(item["table"], item["rows"]) for item in result["archived"]] == [
+            ("bets", 2), ("balance_transactions", 2), ("audit_log", 1)
+        ]
+        assert history.query(Bet).filter_by(status="open").count() == 1
+        assert history.query(BalanceTransaction).filter_by(status="processing").count() == 1
+        archived = ArchiveService.read_archived(
+            "bets", "user_1", datetime(2025, 1, 1), datetime(2025, 2, 1)
+        )
+        assert [bet.status for bet in archived] == ["resolved"]
+
+    def test_bet_settled_during_export_goes_to_next_part(self, history, archive_dir, monkeypatch):
+        """Тест: Ставка, рассчитанная после выборки, не удаляется и уходит следующей частью месяца."""
+        history.add(Bet(
+            user_id="user_1", event_id=2, bet_amount=Decimal("5.00"),
+            coefficient=Decimal("2.000"), potential_win=Decimal("10.00"),
+            status="open", placed_at=datetime(2025, 1, 20, 12, 0)
+        ))
+        history.commit()
+        write_file = archive_service._write_file
+
+        def write_then_settle(path, fmt, kinds, rows):
+            count = write_file(path, fmt, kinds, rows)
+            history.query(Bet).filter_by(status="open").update({"status": "resolved", "result": "loss"})
+            return count
+
+        monkeypatch.setattr(archive_service, "_write_file", write_then_settle)
+        ArchiveService.archive_month(history, "bets", date(2025, 1, 1))
+        monkeypatch.setattr(archive_service, "_write_file", write_file)
+
+        assert history.query(Bet).filter(Bet.placed_at < datetime(2025, 2, 1)).count() == 1
+        assert ArchiveService.candidate_months(history, "bets", today=TODAY) == [date(2025, 1, 1)]
+
+        result = ArchiveService.archive_month(history, "bets", date(2025, 1, 1))
+
+        assert (result["part"], result["rows"], result["file"]) == (
+            2, 1, "bets/2025/bets_2025_01_part2.csv.gz"
+        )
+        rows = ArchiveService.read_archived(
+            "bets", "user_1", datetime(2025, 1, 1), datetime(2025, 2, 1)
+        )
+        assert sorted(bet.event_id for bet in rows) == [1, 2]
+        assert ArchiveService.verify()["success"]
+
+    def test_read_archived_restores_types(self, history, archive_dir):
+        """Тест: Архивные строки читаются с исходными типами и фильтром по пользователю."""
+        ArchiveService.archive_closed_months(history, today=TODAY)
+
+        rows = ArchiveService.read_archived(
+            "bets", "user_1", datetime(2025, 1, 1), datetime(2025, 2, 1)
+        )
+
+        assert len(rows) == 1
+        assert rows[0].bet_amount == Decimal("10.00")
+        assert rows[0].placed_at == datetime(2025, 1, 10, 12, 0)
+        assert isinstance(rows[0].bet_id, int)
+
+    def test_verify_detects_modified_file(self, history, archive_dir):
+        """Тест: Изменённый файл архива не проходит проверку."""
+        ArchiveService.archive_closed_months(history, today=TODAY)
+        (archive_dir / "audit_log" / "2025" / "audit_log_2025_01.csv.gz").write_bytes(b"broken")
+
+        result = ArchiveService.verify()
+
+        assert not result["success"]
+        assert result["problems"] == ["audit_log/2025/audit_log_2025_01.csv.gz: checksum mismatch"]
+
+
+class TestExportWithArchive:
+    """Тесты подмешивания архива в экспорт."""
+
+    def test_export_stitches_archived_months(self, history, archive_dir, wallet_service):
+        """Тест: include_archived добавляет архивные ставки, транзакции и статистику."""
+        ArchiveService.archive_closed_months(history, today=TODAY)
+        params = dict(user_id="user_1", date_from="2025-01-01", date_to="2026-10-19")
+
+        without = wallet_service.export_report(history, **params)
+        stitched = wallet_service.export_report(history, include_archived=True, **params)
+
+        assert without["success"] and stitched["success"]
+        content = stitched["report"]["content"]
+        assert "2025-01-10T12:00:00" in content
+        assert "2025-01-10T12:00:00" not in without["report"]["content"]
+        assert "Total Bets,2" in content
+        assert "Wins,1" in content
@@ -0,0 +1,137 @@
+"""
+Тесты баланса на момент времени и месячных выписок.
+
+- LedgerService.balance_at / WalletService.get_balance_at: ближайший
+  снимок и проводки между снимками, откат к balance_transactions для
+  истории до журнала
+- остатки в заголовке export_report и в monthly_statements
+
+Запуск: pytest tests/test_balance_at.py -v
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from tests.conftest import (
+    User, UserBalance, BalanceTransaction, Bet, LedgerEntry, MonthlyStatement
+)
+
+
+@pytest.fixture
+def ledger_service():
+    """LedgerService (модели подменяет test_models)"""
+    from services.ledger_service import LedgerService
+    return LedgerService
+
+
+@pytest.fixture
+def statement_service():
+    """StatementService (модели подменяет test_models)"""
+    from services.statement_service import StatementService
+    return StatementService
+
+
+@pytest.fixture
+def history(db_session, ledger_service):
+    """user_1: +100 (10.09), +50 (20.09), -30 (05.10); у каждой проводки снимок."""
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("0.00")))
+    db_session.commit()
+    for amount, day in (("100.00", datetime(2026, 9, 10)), ("50.00", datetime(2026, 9, 20)),
+                        ("-30.00", datetime(2026, 10, 5))):
+        entry_type = "deposit" if Decimal(amount) > 0 else "withdrawal"
+        ledger_service.post(db_session, "user_1", Decimal(amount), entry_type, "stripe", now=day)
+    db_session.commit()
+    return db_session
+
+
+class TestBalanceAt:
+    """Тесты баланса на момент времени."""
+
+    @pytest.mark.parametrize("at, expected", [
+        (datetime(2026, 9, 15), 100.0),
+        (datetime(2026, 10, 1), 150.0),
+        (datetime(2026, 10, 5), 150.0),
+        (datetime(2026, 11, 1), 120.0),
+    ])
+    def test_between_snapshots(self, history, ledger_service, wallet_service, at, expected):
+        """Тест: Баланс берётся из проводок между ближайшими снимками."""
+        ledger_service.take_snapshots(history, interval=2)
+
+        result = wallet_service.get_balance_at(history, "user_1", at)
+
+        assert (result["balance"], result["source"]) == (expected, "ledger")
+
+    def test_starts_from_period_snapshot(self, history, ledger_service):
+        """Тест: После снимка на границе месяца ранние проводки не читаются."""
+        assert ledger_service.take_period_snapshots(
+            history, at=datetime(2026, 10, 1), since=datetime(2026, 9, 1)
+        ) == 1
+        assert ledger_service.take_period_snapshots(
+            history, at=datetime(2026, 10, 1), since=datetime(2026, 9, 1)
+        ) == 0
+        # Проводки до снимка недоступны (например, вынесены в архив)
+        history.query(LedgerEntry).filter(LedgerEntry.seq < 2).delete()
+        history.commit()
+
+        assert ledger_service.balance_at(history, "user_1", datetime(2026, 10, 20)).balance == Decimal("120.00")
+        assert ledger_service.balance_at(history, "user_1", datetime(2026, 10, 2)).balance == Decimal("150.00")
+
+    def test_falls_back_to_transactions(self, history, wallet_service):
+        """Тест: До первой проводки баланс берётся из balance_transactions."""
+        history.add(BalanceTransaction(
+            user_id="user_1", transaction_type="deposit", amount=Decimal("70.00"),
+            balance_before=Decimal("0.00"), balance_after=Decimal("70.00"),
+            status="completed", created_at=datetime(2026, 8, 1)
+        ))
+        history.commit()
+
+        assert wallet_service.get_balance_at(history, "user_1", datetime(2026, 9, 1))["balance"] == 70.0
+        empty = wallet_service.get_balance_at(history, "user_1", datetime(2026, 7, 1))
+        assert (empty["balance"], empty["source"]) == (0.0, "none")
+
+    def test_export_report_header(self, history, wallet_service):
+        """Тест: В заголовке отчёта есть остатки на начало и конец периода."""
+        result = wallet_service.export_report(
+            history, "user_1", format="csv", date_from="2026-09-15", date_to="2026-10-31"
+        )
+
+        assert result["report"]["opening_balance"] == 100.0
+        assert result["report"]["closing_balance"] == 120.0
+        assert "Opening Balance: 100.00" in result["report"]["content"]
+        assert "Closing Balance: 120.00" in result["report"]["content"]
+
+
+class TestMonthlyStatements:
+    """Тесты месячных выписок."""
+
+    def test_generate_month(self, history, statement_service):
+        """Тест: Выписка за сентябрь с остатками и оборотами, повторный запуск пересчитывает."""
+        history.add(Bet(
+            user_id="user_1", event_id=1, odds_id=1, bet_amount=Decimal("20.00"),
+            coefficient=Decimal("2.000"), potential_win=Decimal("40.00"), status="resolved",
+            result="win", actual_win=Decimal("40.00"), resolved_at=datetime(2026, 9, 25)
+        ))
+        history.commit()
+
+        result = statement_service.generate_month(history, 2026, 9)
+        again = statement_service.generate_statement(history, "user_1", 2026, 9)
+
+        assert (result["generated"], result["snapshots"]) == (1, 1)
+        statement = again["statement"]
+        assert (statement["opening_balance"], statement["closing_balance"]) == (0.0, 150.0)
+        assert (statement["total_deposits"], statement["total_withdrawals"]) == (150.0, 0.0)
+        assert (statement["total_bets"], statement["total_wins"], statement["net_profit"]) == (20.0, 40.0, 20.0)
+        assert statement["transaction_count"] == 2
+        assert history.query(MonthlyStatement).count() == 1
+
+    def test_october_opening_from_snapshot(self, history, statement_service):
+        """Тест: Остаток на начало октября равен остатку на конец сентября."""
+        statement_service.generate_month(history, 2026, 9)
+
+        october = statement_service.generate_statement(history, "user_1", 2026, 10)["statement"]
+
+        assert (october["opening_balance"], october["closing_balance"]) == (150.0, 120.0)
+        assert october["total_withdrawals"] == 30.0
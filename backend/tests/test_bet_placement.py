@@ -0,0 +1,149 @@
+"""
+Тесты размещения ставок (WalletService.place_bet).
+
+- ставка резервирует сумму: available = balance - открытые ставки
+- вывод не забирает зарезервированную ставками сумму
+- ставка публикует обновление баланса (SSE, объединение чтений)
+- параллельные ставки одного пользователя не уводят доступный баланс в минус
+
+Запуск: pytest tests/test_bet_placement.py -v
+"""
+
+import threading
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from tests.conftest import User, UserBalance, BalanceTransaction, Bet, WithdrawalMethod
+
+
+def _add_user(db, user_id="user_1", balance="100.00"):
+    db.add(User(id=user_id, email=f"{user_id}@example.com", name=user_id, password_hash="x"))
+    db.add(UserBalance(user_id=user_id, balance=Decimal(balance)))
+    db.commit()
+
+
+class TestPlaceBet:
+    """Тесты размещения ставки."""
+
+    def test_bet_reserves_stake(self, db_session, wallet_service):
+        """Тест: Ставка создаётся открытой, баланс не меняется, доступное уменьшается."""
+        _add_user(db_session)
+
+        result = wallet_service.place_bet(db_session, "user_1", event_id=1, odds_id=10,
+                                          bet_amount=30.0, coefficient=2.5)
+
+        assert result["success"]
+        assert result["bet"]["potential_win"] == 75.0
+        assert result["available_balance"] == 70.0
+
+        db_session.expire_all()
+        balance = db_session.get(UserBalance, "user_1")
+        assert balance.balance == Decimal("100.00")
+        assert balance.total_bet == Decimal("30.00")
+        transaction = db_session.query(BalanceTransaction).one()
+        assert transaction.transaction_type == "bet_placed"
+        assert transaction.amount == Decimal("-30.00")
+        assert transaction.status == "completed"
+        assert transaction.related_entity_id == result["bet"]["bet_id"]
+        assert wallet_service.get_balance(db_session, "user_1")["available_balance"] == 70.0
+
+    def test_open_bets_limit_available(self, db_session, wallet_service):
+        """Тест: Ставка больше доступного остатка отклоняется без записей."""
+        _add_user(db_session)
+        wallet_service.place_bet(db_session, "user_1", 1, 10, bet_amount=80.0, coefficient=2.0)
+
+        result = wallet_service.place_bet(db_session, "user_1", 1, 10, bet_amount=30.0, coefficient=2.0)
+
+        assert not result["success"]
+        assert result["error"] == "Insufficient balance"
+        assert result["available_balance"] == 20.0
+        assert db_session.query(Bet).count() == 1
+        db_session.expire_all()
+        assert db_session.get(UserBalance, "user_1").total_bet == Decimal("80.00")
+
+    @pytest.mark.parametrize("amount, coefficient, error", [
+        (0.5, 2.0, "Minimum bet is 1.00 USD"),
+        (100000.01, 2.0, "Maximum bet is 100000.00 USD"),
+        (10.0, 1.0, "Coefficient must be greater than 1.0"),
+    ])
+    def test_validation(self, db_session, wallet_service, amount, coefficient, error):
+        """Тест: Некорректные сумма и коэффициент отклоняются."""
+        _add_user(db_session)
+
+        result = wallet_service.place_bet(db_session, "user_1", 1, 10, amount, coefficient)
+
+        assert result == {"success": False, "error": error}
+
+    def test_withdrawal_keeps_stakes(self, db_session, wallet_service):
+        """Тест: Вывести можно только balance - открытые ставки."""
+        _add_user(db_session)
+        db_session.add(WithdrawalMethod(method_id=1, user_id="user_1", withdrawal_type="bank_transfer",
+                                        is_verified=True))
+        db_session.commit()
+        wallet_service.place_bet(db_session, "user_1", 1, 10, bet_amount=80.0, coefficient=2.0)
+
+        rejected = wallet_service.withdraw_funds(db_session, "user_1", 50.0, withdrawal_method_id=1)
+        accepted = wallet_service.withdraw_funds(db_session, "user_1", 20.0, withdrawal_method_id=1)
+
+        assert (rejected["error"], rejected["available_balance"]) == ("Insufficient balance", 20.0)
+        assert accepted["success"] and accepted["new_balance"] == 80.0
+        assert wallet_service.get_balance(db_session, "user_1")["available_balance"] == 0.0
+
+    def test_bet_publishes_balance(self, db_session, wallet_service, monkeypatch):
+        """Тест: После commit ставки публикуется баланс - как после пополнения и вывода."""
+        import services.wallet_service as module
+        published = []
+        monkeypatch.setattr(module, "publish_wallet_update",
+                            lambda user_id, **kwargs: published.append((user_id, kwargs)))
+        _add_user(db_session)
+
+        wallet_service.place_bet(db_session, "user_1", 1, 10, bet_amount=30.0, coefficient=2.0)
+
+        assert published == [("user_1", {"balance": Decimal("100.00")})]
+
+    def test_missing_balance(self, db_session, wallet_service):
+        """Тест: Без записи баланса ставка не создаётся."""
+        result = wallet_service.place_bet(db_session, "ghost", 1, 10, bet_amount=10.0, coefficient=2.0)
+
+        assert result["error"] == "Balance record not found"
+
+
+class TestConcurrentBets:
+    """Тест параллельных ставок одного пользователя."""
+
+    def test_one_user_spamming_bets(self, tmp_path, wallet_service):
+        """Тест: 100 параллельных ставок по 10.00 при балансе 100.00 - проходят ровно 10."""
+        engine = create_engine(f"sqlite:///{tmp_path}/bets.db", connect_args={"timeout": 30})
+        Bet.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            _add_user(db)
+
+        results = []
+        barrier = threading.Barrier(20)
+
+        def spam():
+            barrier.wait()
+            with Session() as db:
+                for _ in range(5):
+                    results.append(wallet_service.place_bet(db, "user_1", 1, 10, 10.0, 2.0))
+
+        threads = [threading.Thread(target=spam) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 100
+        assert sum(result["success"] for result in results) == 10
+        assert {result["error"] for result in results if not result["success"]} == {"Insufficient balance"}
+
+        with Session() as db:
+            locked = db.query(func.sum(Bet.bet_amount)).filter(Bet.status == "open").scalar()
+            assert locked == Decimal("100.00")
+            assert db.query(BalanceTransaction).count() == 10
+            assert db.get(UserBalance, "user_1").total_bet == Decimal("100.00")
+        engine.dispose()
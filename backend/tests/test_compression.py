@@ -0,0 +1,204 @@
+"""
+Тесты сжатия ответов и статики (routes/compression.py, routes/static_files.py).
+
+- большие текстовые ответы сжимаются по Accept-Encoding, мелкие, SSE,
+  304 и уже сжатые - нет
+- потоковый ответ сжимается по частям: каждая часть декодируется сразу
+- статика отдаётся предварительно сжатой, immutable для ссылок с ?v=
+
+Запуск: pytest tests/test_compression.py -v
+"""
+
+import gzip
+import json
+import os
+import zlib
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from routes.compression import CompressionMiddleware, choose_encoding
+from routes.static_files import PrecompressedStaticFiles, precompress_static, static_url
+
+
+ROWS = [{"transaction_id": n, "type": "bet_won", "amount": 46.25, "description": f"Bet #{n}"} for n in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, gzip_level=6)
+
+    @app.get("/history")
+    async def history():
+        return JSONResponse({"transactions": ROWS}, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"success": True}
+
+    @app.get("/events")
+    async def events():
+        return StreamingResponse(iter([b"event: ready\ndata: {}\n\n" * 100]), media_type="text/event-stream")
+
+    @app.get("/not-modified")
+    async def not_modified():
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    return TestClient(app)
+
+
+class TestChooseEncoding:
+    """Тесты выбора кодировки."""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("gzip, deflate, br", "br"),
+        ("gzip, br;q=0", "gzip"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("*", "br"),
+        ("identity", None),
+        ("", None),
+    ])
+    def test_negotiation(self, header, expected):
+        """Тест: Предпочтение br, учёт q и "*"."""
+        assert choose_encoding(header, ("br", "gzip")) == expected
+
+    def test_without_brotli(self):
+        """Тест: Без пакета brotli клиент с br получает gzip."""
+        assert choose_encoding("br, gzip", ("gzip",)) == "gzip"
+
+
+class TestCompressionMiddleware:
+    """Тесты middleware."""
+
+    def test_large_json_compressed(self, client):
+        """Тест: Большой JSON - gzip, Vary, слабый ETag, то же содержимое."""
+        response = client.get("/history", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["ETag"] == 'W/"v1"'
+        assert int(response.headers["Content-Length"]) < len(json.dumps({"transactions": ROWS})) / 4
+        assert response.json() == {"transactions": ROWS}
+
+    def test_client_without_gzip(self, client):
+        """Тест: Без Accept-Encoding - без сжатия, но с Vary."""
+        response = client.get("/history", headers={"Accept-Encoding": "identity"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["ETag"] == '"v1"'
+
+    @pytest.mark.parametrize("path", ["/small", "/events", "/not-modified"])
+    def test_not_compressed(self, client, path):
+        """Тест: Мелкий ответ, поток SSE и 304 не сжимаются."""
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_streaming_chunks_flushed(self):
+        """Тест: Каждая часть потокового ответа сжата и декодируется до конца потока."""
+        chunks = [("row,%d\n" % n).encode() * 300 for n in range(3)]
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/csv")]})
+            for n, chunk in enumerate(chunks):
+                await send({"type": "http.response.body", "body": chunk, "more_body": n < len(chunks) - 1})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip")]}
+        await CompressionMiddleware(app, minimum_size=1024)(scope, None, send)
+
+        start, bodies = sent[0], sent[1:]
+        headers = dict(start["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        decoder = zlib.decompressobj(31)
+        for chunk, message in zip(chunks, bodies):
+            assert decoder.decompress(message["body"]) == chunk
+        assert [message["more_body"] for message in bodies] == [True, True, False]
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    import routes.static_files as module
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text("body { color: #333; }\n" * 200)
+    (tmp_path / "css" / "tiny.css").write_text("a {}\n")
+    monkeypatch.setattr(module, "STATIC_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def static_client(static_dir):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
+    return TestClient(app)
+
+
+class TestStaticFiles:
+    """Тесты статики."""
+
+    def test_precompress_writes_once(self, static_dir):
+        """Тест: .gz пишется для больших файлов и не перезаписывается, пока актуален."""
+        assert precompress_static(static_dir, minimum_size=1024) >= 1
+        assert precompress_static(static_dir, minimum_size=1024) == 0
+
+        assert gzip.decompress((static_dir / "css" / "style.css.gz").read_bytes()) == \
+            (static_dir / "css" / "style.css").read_bytes()
+        assert not (static_dir / "css" / "tiny.css.gz").exists()
+
+    def test_serves_precompressed_with_immutable(self, static_dir, static_client):
+        """Тест: Ссылка с ?v= - сжатый файл с типом исходника и immutable."""
+        precompress_static(static_dir, minimum_size=1024)
+        url = static_url("css/style.css")
+
+        response = static_client.get(url, headers={"Accept-Encoding": "gzip"})
+
+        assert url.startswith("/static/css/style.css?v=")
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Content-Type"].startswith("text/css")
+        assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert int(response.headers["Content-Length"]) == (static_dir / "css" / "style.css.gz").stat().st_size
+        assert response.text == (static_dir / "css" / "style.css").read_text()
+
+    def test_unversioned_revalidates(self, static_dir, static_client):
+        """Тест: Без ?v= - no-cache; повтор с ETag сжатого варианта - 304."""
+        precompress_static(static_dir, minimum_size=1024)
+        first = static_client.get("/static/css/style.css", headers={"Accept-Encoding": "gzip"})
+        second = static_client.get("/static/css/style.css", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]
+        })
+
+        assert first.headers["Cache-Control"] == "no-cache"
+        assert second.status_code == 304
+
+    def test_stale_variant_ignored(self, static_dir, static_client):
+        """Тест: .gz старше исходника не отдаётся - ответ сжимается на лету из нового файла."""
+        precompress_static(static_dir, minimum_size=1024)
+        source = static_dir / "css" / "style.css"
+        source.write_text("main { margin: 0; }\n" * 200)
+        stale = os.stat(source).st_mtime - 60
+        os.utime(static_dir / "css" / "style.css.gz", (stale, stale))
+
+        response = static_client.get("/static/css/style.css", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.text.startswith("main")
+
+    def test_index_uses_versioned_links(self):
+        """Тест: Главная страница ссылается на статику с ?v=."""
+        from main import app
+        html = TestClient(app).get("/").text
+
+        assert "/static/css/style.css?v=" in html
+        assert "/static/js/app.js?v=" in html
@@ -0,0 +1,130 @@
+"""
+Тесты фонового создания Stripe Customer (services/customer_provisioning_service.py).
+
+- Customer создаётся новым и активным пользователям, неактивные пропускаются
+- найденный по metadata.user_id Customer переиспользуется
+- ID, сохранённый депозитом, не перезаписывается; ошибки Stripe считаются
+- RateLimiter равномерно распределяет вызовы
+
+Запуск: pytest tests/test_customer_provisioning.py -v
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.conftest import User, AuditLog
+
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+@pytest.fixture
+def fake_stripe(monkeypatch):
+    """Заглушка Stripe: найденные по metadata Customer, сбойные user_id, созданные."""
+    from services.stripe_service import StripeService
+    stripe = {"existing": {"user_old_customer": "cus_found"}, "fail": set(), "created": []}
+
+    def find(user_id):
+        if user_id in stripe["fail"]:
+            return {"success": False, "error": "Stripe unavailable"}
+        return {"success": True, "stripe_customer_id": stripe["existing"].get(user_id)}
+
+    def create(user_id, email, name):
+        stripe["created"].append(user_id)
+        return {"success": True, "stripe_customer_id": f"cus_{user_id}"}
+
+    monkeypatch.setattr(StripeService, "find_customer_by_user_id", staticmethod(find))
+    monkeypatch.setattr(StripeService, "create_stripe_customer", staticmethod(create))
+    return stripe
+
+
+@pytest.fixture
+def provisioning_service(fake_stripe):
+    """CustomerProvisioningService с заглушкой Stripe (модели подменяет test_models)"""
+    from services.customer_provisioning_service import CustomerProvisioningService
+    return CustomerProvisioningService
+
+
+@pytest.fixture
+def users(db_session):
+    """new_*: зарегистрированы неделю назад; active: активен вчера; idle: давно неактивен."""
+    for user_id, created_at in (
+        ("user_new_1", NOW - timedelta(days=7)),
+        ("user_new_2", NOW - timedelta(days=7)),
+        ("user_old_customer", NOW - timedelta(days=3)),
+        ("user_active", NOW - timedelta(days=400)),
+        ("user_idle", NOW - timedelta(days=400)),
+    ):
+        db_session.add(User(id=user_id, email=f"{user_id}@example.com", name=user_id,
+                            password_hash="x", created_at=created_at))
+    db_session.add(User(id="user_has", email="has@example.com", name="has", password_hash="x",
+                        stripe_customer_id="cus_has", created_at=NOW))
+    db_session.flush()
+    db_session.add(AuditLog(user_id="user_active", action="login", created_at=NOW - timedelta(days=1)))
+    db_session.commit()
+    return db_session
+
+
+def _customers(db_session):
+    db_session.expire_all()
+    return {user.id: user.stripe_customer_id for user in db_session.query(User)}
+
+
+class TestProvision:
+    """Тесты фонового создания Customer."""
+
+    def test_provisions_recent_users(self, users, provisioning_service, fake_stripe):
+        """Тест: Новые и активные получают Customer, найденный переиспользуется."""
+        result = provisioning_service.provision(
+            users, batch_size=2, concurrency=2, rate_per_second=0, now=NOW
+        )
+
+        assert (result["scanned"], result["created"], result["existing"], result["failed"]) == (4, 3, 1, 0)
+        assert _customers(users) == {
+            "user_new_1": "cus_user_new_1", "user_new_2": "cus_user_new_2",
+            "user_old_customer": "cus_found", "user_active": "cus_user_active",
+            "user_idle": None, "user_has": "cus_has",
+        }
+        assert sorted(fake_stripe["created"]) == ["user_active", "user_new_1", "user_new_2"]
+        assert provisioning_service.provision(users, rate_per_second=0, now=NOW)["scanned"] == 0
+
+    def test_keeps_id_saved_by_deposit(self, users, provisioning_service, monkeypatch):
+        """Тест: ID, сохранённый депозитом во время прохода, не перезаписывается."""
+        from services.stripe_service import StripeService
+
+        def create(user_id, email, name):
+            if user_id == "user_new_1":
+                users.query(User).filter(User.id == user_id).update({"stripe_customer_id": "cus_inline"})
+                users.commit()
+            return {"success": True, "stripe_customer_id": f"cus_{user_id}"}
+
+        monkeypatch.setattr(StripeService, "create_stripe_customer", staticmethod(create))
+        provisioning_service.provision(users, concurrency=1, rate_per_second=0, now=NOW)
+
+        assert _customers(users)["user_new_1"] == "cus_inline"
+
+    def test_failures_counted(self, users, provisioning_service, fake_stripe):
+        """Тест: Ошибка Stripe оставляет пользователя для следующего запуска."""
+        fake_stripe["fail"].add("user_new_2")
+
+        result = provisioning_service.provision(users, rate_per_second=0, now=NOW)
+
+        assert (result["success"], result["failed"]) == (False, 1)
+        assert _customers(users)["user_new_2"] is None
+
+
+class TestRateLimiter:
+    """Тесты ограничителя частоты."""
+
+    def test_spaces_calls(self):
+        """Тест: 5 вызовов при 100/с занимают не меньше 40 мс."""
+        from services.customer_provisioning_service import RateLimiter
+        limiter = RateLimiter(100)
+
+        started_at = time.perf_counter()
+        for _ in range(5):
+            limiter.wait()
+
+        assert time.perf_counter() - started_at >= 0.04
@@ -0,0 +1,95 @@
+"""
+Тесты настройки пула соединений (models/database.py).
+
+Запуск: pytest tests/test_database_pool.py -v
+"""
+
+import pytest
+from sqlalchemy import text
+
+from config.settings import Settings
+from models.database import create_db_engine, resolve_pool_size
+from monitoring.metrics import (
+    DB_POOL_CHECKOUTS,
+    DB_POOL_INVALIDATIONS,
+    DB_POOL_OVERFLOW_CHECKOUTS,
+    instrument_engine_pool
+)
+
+
+class TestPoolSizing:
+    """Тесты расчёта размера пула."""
+
+    def test_explicit_size(self):
+        """Тест: Без авторазмера используются DB_POOL_SIZE/DB_MAX_OVERFLOW."""
+        config = Settings(db_pool_size=5, db_max_overflow=3, db_pool_auto_size=False)
+
+        assert resolve_pool_size(config) == (5, 3)
+
+    def test_auto_size_splits_budget_between_workers(self):
+        """Тест: Авторазмер делит бюджет соединений между воркерами."""
+        config = Settings(db_pool_auto_size=True, db_max_connections=90, web_concurrency=4)
+
+        pool_size, max_overflow = resolve_pool_size(config)
+
+        assert (pool_size, max_overflow) == (11, 11)
+        assert (pool_size + max_overflow) * 4 <= 90
+
+    def test_auto_size_minimum(self):
+        """Тест: Воркеров больше, чем соединений - минимум одно соединение."""
+        config = Settings(db_pool_auto_size=True, db_max_connections=2, web_concurrency=8)
+
+        assert resolve_pool_size(config) == (1, 0)
+
+
+class TestEngineFromSettings:
+    """Тесты создания engine."""
+
+    def test_pool_settings_applied(self, tmp_path):
+        """Тест: Размер, timeout и recycle пула берутся из настроек."""
+        config = Settings(db_pool_size=3, db_max_overflow=1, db_pool_timeout=5, db_pool_recycle=600)
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", config)
+
+        assert engine.pool.size() == 3
+        assert engine.pool._max_overflow == 1
+        assert engine.pool._timeout == 5
+        assert engine.pool._recycle == 600
+        engine.dispose()
+
+    def test_unknown_pre_ping_strategy(self, tmp_path):
+        """Тест: Неизвестная стратегия pre-ping - ошибка конфигурации."""
+        config = Settings(db_pool_pre_ping="sometimes")
+
+        with pytest.raises(ValueError):
+            create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", config)
+
+    def test_idle_pre_ping_replaces_dead_connection(self, tmp_path):
+        """Тест: Мёртвое соединение после простоя заменяется при checkout."""
+        config = Settings(db_pool_size=1, db_max_overflow=0, db_pool_pre_ping="idle",
+                          db_pool_pre_ping_idle_seconds=0)
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", config)
+        instrument_engine_pool(engine, name="pre_ping_test")
+
+        with engine.connect() as conn:
+            conn.connection.dbapi_connection.close()
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+
+        assert DB_POOL_INVALIDATIONS.get(engine="pre_ping_test", kind="hard") == 1
+        engine.dispose()
+
+    def test_pool_event_metrics(self, tmp_path):
+        """Тест: Checkout и overflow учитываются счётчиками."""
+        config = Settings(db_pool_size=1, db_max_overflow=1)
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", config)
+        instrument_engine_pool(engine, name="events_test")
+
+        first = engine.connect()
+        second = engine.connect()
+        first.close()
+        second.close()
+
+        assert DB_POOL_CHECKOUTS.get(engine="events_test") == 2
+        assert DB_POOL_OVERFLOW_CHECKOUTS.get(engine="events_test") == 1
+        engine.dispose()
@@ -0,0 +1,86 @@
+"""
+Тесты транзакций пополнения (WalletService.replenish_balance).
+
+- Stripe вызывается без открытой транзакции
+- две транзакции на пополнение: учёт до Stripe и расчёт после
+- total_deposited обновляется той же командой, что и баланс
+
+Запуск: pytest tests/test_deposit_transactions.py -v
+"""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from tests.conftest import User, UserBalance, PaymentMethod, AuditLog
+
+
+@pytest.fixture
+def stripe_calls(db_session, monkeypatch):
+    """Заглушки Stripe: (метод, была ли открыта транзакция) на каждый вызов."""
+    from services.stripe_service import StripeService
+    calls = []
+
+    def stub(name, result):
+        def call(*args, **kwargs):
+            calls.append((name, db_session.in_transaction()))
+            return result
+        monkeypatch.setattr(StripeService, name, staticmethod(call))
+
+    stub("create_stripe_customer", {"success": True, "stripe_customer_id": "cus_new"})
+    stub("create_payment_intent", {"success": True, "client_secret": "pi_1_secret", "intent_id": "pi_1"})
+    stub("charge_customer", {"success": True, "charge_id": "ch_1", "intent_id": "pi_2"})
+    stub("get_payment_methods", {"success": True, "payment_methods": [
+        {"id": "pm_1", "card": {"brand": "visa", "last4": "4242", "exp_month": 12, "exp_year": 2030}}
+    ]})
+    return calls
+
+
+@pytest.fixture
+def commits(engine):
+    counter = []
+    listener = lambda conn: counter.append(1)
+    event.listen(engine, "commit", listener)
+    yield counter
+    event.remove(engine, "commit", listener)
+
+
+@pytest.fixture
+def new_user(db_session):
+    """Пользователь без Stripe Customer и без записи баланса."""
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.commit()
+    return "user_1"
+
+
+class TestDepositTransactions:
+    """Тесты границ транзакций пополнения."""
+
+    def test_first_saved_card_deposit(self, db_session, new_user, wallet_service, stripe_calls, commits):
+        """Тест: Первое пополнение - customer, баланс, карта; Stripe вне транзакций, два commit'а."""
+        result = wallet_service.replenish_balance(
+            db_session, new_user, 100.0, stripe_payment_method_id="pm_1", save_method=True
+        )
+
+        assert result["success"] and result["new_balance"] == 100.0
+        assert stripe_calls == [
+            ("create_stripe_customer", False), ("charge_customer", False), ("get_payment_methods", False)
+        ]
+        assert len(commits) == 2
+        db_session.expire_all()
+        assert db_session.get(User, new_user).stripe_customer_id == "cus_new"
+        balance = db_session.get(UserBalance, new_user)
+        assert (balance.balance, balance.total_deposited) == (Decimal("100.00"), Decimal("100.00"))
+        assert db_session.query(PaymentMethod).one().card_last4 == "4242"
+        assert [row.action for row in db_session.query(AuditLog).order_by(AuditLog.log_id)] == [
+            "deposit_initiated", "deposit_completed"
+        ]
+
+    def test_new_card_deposit(self, db_session, new_user, wallet_service, stripe_calls, commits):
+        """Тест: Новая карта - Payment Intent вне транзакции, операция pending."""
+        result = wallet_service.replenish_balance(db_session, new_user, 50.0)
+
+        assert result["intent_id"] == "pi_1"
+        assert all(not in_transaction for _, in_transaction in stripe_calls)
+        assert len(commits) == 2
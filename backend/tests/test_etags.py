@@ -0,0 +1,169 @@
+"""
+Тесты ETag / If-None-Match (services/etag_service.py, routes/responses.py).
+
+- совпавший If-None-Match - 304 без тела, одним запросом к БД
+- ETag меняется с балансом, pending-операциями, параметрами истории и
+  способами вывода
+- 304 для /payment-methods не обращается к Stripe
+- слабое сравнение, списки и "*" в If-None-Match
+
+Запуск: pytest tests/test_etags.py -v
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from models.database import get_db
+from routes.wallet import get_user_read_db
+from tests.conftest import User, UserBalance, WalletOperation, PaymentMethod, WithdrawalMethod
+
+
+HEADERS = {"X-User-ID": "user_1"}
+
+
+@pytest.fixture
+def client(db_session):
+    """Клиент с тестовой сессией (модели подменяет test_models)."""
+    for dependency in (get_db, get_user_read_db):
+        app.dependency_overrides[dependency] = lambda: db_session
+    yield TestClient(app)
+    for dependency in (get_db, get_user_read_db):
+        app.dependency_overrides.pop(dependency, None)
+
+
+@pytest.fixture
+def user(db_session):
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x",
+                        stripe_customer_id="cus_1"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("100.00"), ledger_seq=1))
+    db_session.commit()
+    return "user_1"
+
+
+def _get(client, path, etag=None):
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(path, headers=headers)
+
+
+class TestBalanceETag:
+    """Тесты ETag баланса."""
+
+    def test_not_modified_with_one_query(self, client, user, assert_max_queries):
+        """Тест: Повторный опрос без изменений - 304 без тела за один SELECT."""
+        first = _get(client, "/api/wallet/balance")
+        etag = first.headers["ETag"]
+
+        with assert_max_queries(1):
+            second = _get(client, "/api/wallet/balance", etag)
+
+        assert etag.startswith('W/"')
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    def test_balance_change_invalidates(self, client, user, db_session):
+        """Тест: Проводка (ledger_seq) - новый ETag и полный ответ."""
+        etag = _get(client, "/api/wallet/balance").headers["ETag"]
+
+        db_session.query(UserBalance).update({"balance": Decimal("150.00"), "ledger_seq": 2})
+        db_session.commit()
+        response = _get(client, "/api/wallet/balance", etag)
+
+        assert response.status_code == 200
+        assert response.json()["balance"]["current_balance"] == 150.0
+        assert response.headers["ETag"] != etag
+
+    def test_pending_operations_invalidate(self, client, user, db_session):
+        """Тест: Создание и истечение pending-операции меняют ETag без изменения баланса."""
+        etags = [_get(client, "/api/wallet/balance").headers["ETag"]]
+
+        db_session.add(WalletOperation(user_id="user_1", operation_type="deposit", amount=Decimal("25.00"),
+                                       status="pending", created_at=datetime(2026, 10, 19, 12, 0)))
+        db_session.commit()
+        etags.append(_get(client, "/api/wallet/balance").headers["ETag"])
+
+        db_session.query(WalletOperation).update({"status": "expired"})
+        db_session.commit()
+        etags.append(_get(client, "/api/wallet/balance").headers["ETag"])
+
+        assert len(set(etags)) == 3
+
+    def test_unknown_user(self, client):
+        """Тест: Нет пользователя - 404 без ETag."""
+        response = _get(client, "/api/wallet/balance", '"anything"')
+
+        assert response.status_code == 404
+        assert "ETag" not in response.headers
+
+
+class TestHistoryETag:
+    """Тесты ETag истории."""
+
+    def test_etag_depends_on_query(self, client, user):
+        """Тест: Другая страница - другой ETag; та же - 304."""
+        etag = _get(client, "/api/wallet/history?limit=10").headers["ETag"]
+
+        assert _get(client, "/api/wallet/history?limit=10", etag).status_code == 304
+        assert _get(client, "/api/wallet/history?limit=10&offset=10", etag).status_code == 200
+
+
+class TestMethodsETag:
+    """Тесты ETag способов оплаты и вывода."""
+
+    def test_withdrawal_method_changes(self, client, user, db_session):
+        """Тест: Новый способ и смена статуса верификации меняют ETag."""
+        db_session.add(WithdrawalMethod(user_id="user_1", withdrawal_type="bank_transfer", bank_name="Bank",
+                                        bank_account_number="DE000123456789"))
+        db_session.commit()
+        etag = _get(client, "/api/wallet/withdrawal-methods").headers["ETag"]
+        assert _get(client, "/api/wallet/withdrawal-methods", etag).status_code == 304
+
+        db_session.query(WithdrawalMethod).update({"verification_status": "verified", "is_verified": True})
+        db_session.commit()
+        response = _get(client, "/api/wallet/withdrawal-methods", etag)
+
+        assert response.status_code == 200
+        assert response.json()["withdrawal_methods"][0]["verification_status"] == "verified"
+
+    def test_payment_methods_skip_stripe(self, client, user, db_session, monkeypatch):
+        """Тест: 304 для /payment-methods - без запроса к Stripe."""
+        from services.stripe_service import StripeService
+        calls = []
+
+        def get_payment_methods(customer_id):
+            calls.append(customer_id)
+            return {"success": True, "payment_methods": [
+                {"id": "pm_1", "type": "card",
+                 "card": {"brand": "visa", "last4": "4242", "exp_month": 12, "exp_year": 2030}}
+            ]}
+
+        monkeypatch.setattr(StripeService, "get_payment_methods", staticmethod(get_payment_methods))
+        db_session.add(PaymentMethod(user_id="user_1", stripe_payment_method_id="pm_1", payment_type="card",
+                                     is_default=True))
+        db_session.commit()
+
+        first = _get(client, "/api/wallet/payment-methods")
+        second = _get(client, "/api/wallet/payment-methods", first.headers["ETag"])
+
+        assert first.json()["payment_methods"][0]["is_default"] is True
+        assert second.status_code == 304
+        assert calls == ["cus_1"]
+
+
+class TestIfNoneMatch:
+    """Тесты разбора If-None-Match."""
+
+    @pytest.mark.parametrize("header", ["*", '"other", {etag}', "{strong}"])
+    def test_matching_forms(self, client, user, header):
+        """Тест: "*", список и сильная форма того же тега - 304."""
+        etag = _get(client, "/api/wallet/balance").headers["ETag"]
+        value = header.format(etag=etag, strong=etag[2:])
+
+        assert _get(client, "/api/wallet/balance", value).status_code == 304
@@ -0,0 +1,115 @@
+"""
+Тесты истечения просроченных pending-операций (services/expiry_service.py).
+
+- просроченные pending-операции становятся expired пачками
+- будущие, завершённые и операции без expires_at не трогаются
+- операции с PaymentIntent остаются сверке: успешный в Stripe платёж
+  зачисляется после sweep
+- pending_deposits в get_balance уменьшается, метрики пишутся
+
+Запуск: pytest tests/test_expiry.py -v
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from tests.conftest import User, UserBalance, WalletOperation
+
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+@pytest.fixture
+def expiry_service():
+    """ExpiryService (модели подменяет test_models)"""
+    from services.expiry_service import ExpiryService
+    return ExpiryService
+
+
+@pytest.fixture
+def operations(db_session):
+    """5 просроченных пополнений по 10.00 и 3 операции, которые не истекают."""
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("0.00")))
+    for hours in range(1, 6):
+        db_session.add(WalletOperation(
+            user_id="user_1", operation_type="deposit", amount=Decimal("10.00"), status="pending",
+            expires_at=NOW - timedelta(hours=hours)
+        ))
+    db_session.add_all([
+        WalletOperation(user_id="user_1", operation_type="deposit", amount=Decimal("20.00"),
+                        status="pending", expires_at=NOW + timedelta(hours=1)),
+        WalletOperation(user_id="user_1", operation_type="deposit", amount=Decimal("30.00"),
+                        status="completed", expires_at=NOW - timedelta(hours=1)),
+        WalletOperation(user_id="user_1", operation_type="withdrawal", amount=Decimal("40.00"),
+                        status="pending"),
+    ])
+    db_session.commit()
+    return db_session
+
+
+def _count(db_session, status):
+    db_session.expire_all()
+    return db_session.query(WalletOperation).filter(WalletOperation.status == status).count()
+
+
+class TestExpirySweep:
+    """Тесты истечения операций."""
+
+    def test_expires_overdue_in_chunks(self, operations, expiry_service):
+        """Тест: Просроченные pending-операции истекают пачками."""
+        from monitoring.metrics import EXPIRY_SWEEP_ROWS
+        runs = EXPIRY_SWEEP_ROWS.get_count()
+
+        result = expiry_service.sweep(operations, chunk_size=2, now=NOW)
+
+        assert (result["success"], result["expired"], result["chunks"]) == (True, 5, 3)
+        assert (_count(operations, "expired"), _count(operations, "pending")) == (5, 2)
+        assert EXPIRY_SWEEP_ROWS.get_count() == runs + 1
+        assert expiry_service.sweep(operations, chunk_size=2, now=NOW)["expired"] == 0
+
+    def test_max_rows(self, operations, expiry_service):
+        """Тест: За запуск истекает не больше max_rows операций, самые старые первыми."""
+        result = expiry_service.sweep(operations, chunk_size=2, max_rows=3, now=NOW)
+
+        assert result["expired"] == 3
+        oldest = operations.query(WalletOperation).filter(WalletOperation.status == "expired").all()
+        assert max(operation.expires_at for operation in oldest) == NOW - timedelta(hours=3)
+
+    def test_pending_deposits_drop(self, operations, expiry_service, wallet_service):
+        """Тест: Истёкшие операции не входят в pending_deposits."""
+        before = wallet_service.get_balance(operations, "user_1")["pending_deposits"]
+
+        expiry_service.sweep(operations, now=NOW)
+
+        assert before == 70.0
+        assert wallet_service.get_balance(operations, "user_1")["pending_deposits"] == 20.0
+
+    def test_stripe_deposit_left_to_reconciliation(self, operations, expiry_service):
+        """Тест: Просроченное пополнение с PaymentIntent не истекает; сверка зачисляет succeeded."""
+        import services.reconciliation_service as reconciliation
+        operation = WalletOperation(
+            user_id="user_1", operation_type="deposit", amount=Decimal("100.00"), status="pending",
+            stripe_payment_intent_id="pi_late", created_at=NOW - timedelta(days=2),
+            expires_at=NOW - timedelta(days=1)
+        )
+        operations.add(operation)
+        operations.commit()
+
+        assert expiry_service.sweep(operations, now=NOW)["expired"] == 5
+        assert operations.get(WalletOperation, operation.operation_id).status == "pending"
+
+        result = reconciliation.ReconciliationService.reconcile(
+            operations, grace_minutes=30, now=NOW,
+            fetch_intent=lambda intent_id: {
+                "success": True, "status": "succeeded", "amount": 100.0, "currency": "usd",
+                "charge_id": "ch_late", "metadata": {"user_id": "user_1"}
+            }
+        )
+
+        operations.expire_all()
+        assert result["settled"] == 1
+        assert operations.get(WalletOperation, operation.operation_id).status == "completed"
+        assert operations.query(UserBalance).filter_by(user_id="user_1").one().balance == Decimal("100.00")
@@ -0,0 +1,246 @@
+"""
+Тесты health-проверок (monitoring/health.py, routes/health.py).
+
+Запуск: pytest tests/test_health.py -v
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from monitoring.circuit_breaker import CircuitBreaker, STRIPE_BREAKER
+from monitoring.health import ProbeCache, check_database, check_readiness, readiness_cache
+from routes.health import router as health_router
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Сбрасывает кэш readiness и breaker Stripe между тестами."""
+    readiness_cache.clear()
+    STRIPE_BREAKER.record_success()
+    yield
+    readiness_cache.clear()
+    STRIPE_BREAKER.record_success()
+
+
+class TestCircuitBreaker:
+    """Тесты состояний breaker'а."""
+
+    def test_opens_after_threshold(self):
+        """Тест: После N ошибок подряд breaker открывается."""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() is False
+
+    def test_success_resets_counter(self):
+        """Тест: Успешный вызов сбрасывает счётчик ошибок."""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_after_timeout(self):
+        """Тест: После reset_timeout breaker пропускает пробный вызов."""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+
+        time.sleep(0.02)
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request() is True
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_stripe_failures_feed_breaker(self, mock_retrieve):
+        """Тест: Ошибки StripeService учитываются breaker'ом Stripe."""
+        import stripe
+        from services.stripe_service import StripeService
+        mock_retrieve.side_effect = stripe.error.APIConnectionError("Network down")
+
+        for _ in range(STRIPE_BREAKER.failure_threshold):
+            StripeService.confirm_payment("pi_test")
+
+        assert STRIPE_BREAKER.state == CircuitBreaker.OPEN
+
+
+class TestProbeCache:
+    """Тесты кэширования probe."""
+
+    def test_probe_runs_once_within_ttl(self):
+        """Тест: В пределах TTL probe не выполняется повторно."""
+        cache = ProbeCache(ttl=60)
+        calls = []
+
+        def probe():
+            calls.append(1)
+            return {"ready": True}
+
+        first = cache.get_or_compute(probe)
+        second = cache.get_or_compute(probe)
+
+        assert len(calls) == 1
+        assert first["cached"] is False
+        assert second["cached"] is True
+
+    def test_probe_reruns_after_ttl(self):
+        """Тест: После истечения TTL probe выполняется снова."""
+        cache = ProbeCache(ttl=0.01)
+        calls = []
+
+        cache.get_or_compute(lambda: calls.append(1) or {"ready": True})
+        time.sleep(0.02)
+        cache.get_or_compute(lambda: calls.append(1) or {"ready": True})
+
+        assert len(calls) == 2
+
+    def test_stale_result_while_refreshing(self):
+        """Тест: Пока probe обновляется, остальные запросы сразу получают прошлый результат."""
+        cache = ProbeCache(ttl=0.01)
+        cache.get_or_compute(lambda: {"ready": True})
+        time.sleep(0.02)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_probe():
+            started.set()
+            release.wait(5)
+            return {"ready": False}
+
+        leader = threading.Thread(target=cache.get_or_compute, args=(slow_probe,))
+        leader.start()
+        started.wait(5)
+        try:
+            result = cache.get_or_compute(lambda: pytest.fail("probe must not run twice"))
+        finally:
+            release.set()
+            leader.join(5)
+
+        assert result == {"ready": True, "cached": True, "stale": True}
+        assert cache.get_or_compute(lambda: {"ready": True})["ready"] is False
+
+
+class TestReadiness:
+    """Тесты проверки готовности."""
+
+    def test_database_ok(self, engine):
+        """Тест: Доступная БД - ready."""
+        result = check_readiness(engine)
+
+        assert result["ready"] is True
+        assert result["status"] == "ready"
+        assert result["checks"]["database"]["ok"] is True
+
+    def test_database_unavailable(self, tmp_path):
+        """Тест: Недоступная БД - not_ready."""
+        broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'db.sqlite'}")
+
+        result = check_readiness(broken)
+
+        assert result["ready"] is False
+        assert result["status"] == "not_ready"
+        assert result["checks"]["database"]["error"] == "Database unavailable"
+
+    def test_pool_saturation(self, tmp_path):
+        """Тест: Насыщенный пул - not_ready без попытки checkout."""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0
+        )
+        held = engine.connect()
+        try:
+            result = check_database(engine)
+        finally:
+            held.close()
+            engine.dispose()
+
+        assert result["ok"] is False
+        assert result["pool_utilization"] == 1.0
+        assert result["error"] == "Connection pool saturated"
+
+    def test_hung_database_times_out(self, engine, monkeypatch):
+        """Тест: Зависшая БД - not_ready через HEALTH_DB_TIMEOUT_SECONDS, без второй проверки."""
+        import monitoring.health as health
+        from config.settings import settings
+        monkeypatch.setattr(settings, "health_db_timeout_seconds", 0.05)
+        release = threading.Event()
+        calls = []
+
+        def hung(engine):
+            calls.append(1)
+            release.wait(5)
+            return 1.0
+
+        monkeypatch.setattr(health, "_select_one", hung)
+        try:
+            first = check_database(engine)
+            second = check_database(engine)
+        finally:
+            release.set()
+
+        assert first["error"] == second["error"] == "Database check timed out"
+        assert len(calls) == 1
+
+    def test_stripe_breaker_open_is_degraded(self, engine):
+        """Тест: Открытый breaker Stripe - degraded, но ready."""
+        for _ in range(STRIPE_BREAKER.failure_threshold):
+            STRIPE_BREAKER.record_failure()
+
+        result = check_readiness(engine)
+
+        assert result["status"] == "degraded"
+        assert result["ready"] is True
+
+
+class TestHealthEndpoints:
+    """Тесты endpoints."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(health_router)
+        return TestClient(app)
+
+    def test_liveness(self, client):
+        """Тест: Liveness отвечает без обращения к БД."""
+        with patch('routes.health.check_readiness') as mock_check:
+            response = client.get("/health/live")
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+        mock_check.assert_not_called()
+
+    def test_readiness_cached(self, client):
+        """Тест: Повторная проверка в пределах TTL берётся из кэша."""
+        ready = {"status": "ready", "ready": True, "checks": {}, "checked_at": "now"}
+        with patch('routes.health.check_readiness', return_value=ready) as mock_check:
+            first = client.get("/health/ready")
+            second = client.get("/health/ready")
+
+        assert first.status_code == 200
+        assert second.json()["cached"] is True
+        assert mock_check.call_count == 1
+
+    def test_readiness_not_ready_returns_503(self, client):
+        """Тест: Неготовый воркер отвечает 503."""
+        not_ready = {"status": "not_ready", "ready": False, "checks": {}, "checked_at": "now"}
+        with patch('routes.health.check_readiness', return_value=not_ready):
+            response = client.get("/health/ready")
+
+        assert response.status_code == 503
@@ -0,0 +1,90 @@
+"""
+Тесты чтения строк истории и отчётов без ORM-объектов (WalletService).
+
+- get_bet_history и export_report читают колонки запросом Core: в сессии
+  не остаётся объектов Bet/BalanceTransaction
+- содержимое истории и CSV не изменилось, JSONB metadata не читается
+
+Запуск: pytest tests/test_history_rows.py -v
+"""
+
+import re
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from tests.conftest import User, UserBalance, BalanceTransaction, Bet
+
+
+@pytest.fixture
+def history(db_session):
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("90.00")))
+    db_session.add(Bet(user_id="user_1", event_id=7, odds_id=3, bet_amount=Decimal("10.00"),
+                       coefficient=Decimal("1.850"), potential_win=Decimal("18.50"), status="resolved",
+                       result="win", actual_win=Decimal("18.50"), placed_at=datetime(2026, 10, 18, 20, 0),
+                       resolved_at=datetime(2026, 10, 18, 22, 0)))
+    db_session.add(BalanceTransaction(user_id="user_1", transaction_type="bet_placed", amount=Decimal("10.00"),
+                                      balance_before=Decimal("100.00"), balance_after=Decimal("90.00"),
+                                      description="Bet #1", created_at=datetime(2026, 10, 18, 20, 0)))
+    db_session.commit()
+    db_session.expunge_all()
+    return "user_1"
+
+
+@pytest.fixture
+def row_selects(engine):
+    """SELECT'ы строк ставок и транзакций за тест."""
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        if re.search(r"FROM (bets|balance_transactions)\b", statement) and "count(" not in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(engine, "before_cursor_execute", listener)
+
+
+@pytest.fixture
+def orm_loads():
+    """Объекты Bet/BalanceTransaction, загруженные из БД за тест."""
+    loaded = []
+
+    def listener(target, context):
+        loaded.append(target)
+
+    for model in (Bet, BalanceTransaction):
+        event.listen(model, "load", listener)
+    yield loaded
+    for model in (Bet, BalanceTransaction):
+        event.remove(model, "load", listener)
+
+
+class TestHistoryRows:
+    """Тесты строк истории."""
+
+    def test_history_without_orm_objects(self, db_session, wallet_service, history, row_selects, orm_loads):
+        """Тест: История собирается из кортежей, объекты ORM не создаются."""
+        result = wallet_service.get_bet_history(db_session, history, limit=10)
+
+        assert result["bets"] == [{
+            "bet_id": 1, "event_id": 7, "odds_id": 3, "bet_type": "single", "bet_amount": 10.0,
+            "coefficient": 1.85, "potential_win": 18.5, "status": "resolved", "result": "win",
+            "actual_win": 18.5, "placed_at": "2026-10-18T20:00:00", "resolved_at": "2026-10-18T22:00:00"
+        }]
+        assert result["transactions"][0]["type"] == "bet_placed"
+        assert result["pagination"]["total_items"] == 1
+        assert orm_loads == []
+        assert row_selects and not any("settled_at" in statement for statement in row_selects)
+
+    def test_export_without_orm_objects(self, db_session, wallet_service, history, orm_loads):
+        """Тест: CSV отчёта из кортежей - те же строки, объекты ORM не создаются."""
+        result = wallet_service.export_report(db_session, history, date_from="2026-10-01", date_to="2026-10-19")
+
+        content = result["report"]["content"]
+        assert "1,7,10.0,1.85,18.5,resolved,win,18.5,2026-10-18T20:00:00,2026-10-18T22:00:00" in content
+        assert "bet_placed,10.0,100.0,90.0,completed,Bet #1,2026-10-18T20:00:00" in content
+        assert orm_loads == []
@@ -0,0 +1,310 @@
+"""
+Тесты Idempotency-Key для POST /api/wallet/deposit и /withdraw
+(services/idempotency_service.py, routes/wallet.py).
+
+- повтор с тем же ключом получает сохранённый ответ, операция не повторяется
+- повтор обслуживается из LRU процесса без запросов к БД, после сброса
+  LRU - одним SELECT
+- другой запрос с тем же ключом - 422, незавершённый - 409
+- ошибки 4xx сохраняются, неожиданные исключения снимают резерв
+- ключ передаётся в Stripe
+- повтор после несохранённого ответа выполняется заново, но пополнение
+  и вывод не проводятся второй раз
+
+Запуск: pytest tests/test_idempotency.py -v
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from models.database import get_db
+from tests.conftest import User, UserBalance, WalletOperation, WithdrawalMethod, LedgerEntry, IdempotencyKey
+
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+@pytest.fixture
+def idempotency():
+    """Модуль IdempotencyService с пустым LRU (модели подменяет test_models)."""
+    import services.idempotency_service as module
+    module.RESPONSE_CACHE.clear()
+    yield module
+    module.RESPONSE_CACHE.clear()
+
+
+@pytest.fixture
+def wallet_calls(monkeypatch):
+    """Заглушки WalletService в роутах: список вызовов (метод, idempotency_key)."""
+    from routes import wallet as routes
+    calls = []
+
+    def replenish_balance(**kwargs):
+        calls.append(("deposit", kwargs["idempotency_key"]))
+        if kwargs["amount"] > 5000:
+            return {"success": False, "error": "Card declined"}
+        return {"success": True, "message": "Balance replenished successfully",
+                "new_balance": 100.0 * len(calls), "status": "completed"}
+
+    def withdraw_funds(**kwargs):
+        calls.append(("withdraw", None))
+        return {"success": True, "message": "Withdrawal request created", "new_balance": 0.0}
+
+    monkeypatch.setattr(routes.WalletService, "replenish_balance", staticmethod(replenish_balance))
+    monkeypatch.setattr(routes.WalletService, "withdraw_funds", staticmethod(withdraw_funds))
+    return calls
+
+
+@pytest.fixture
+def client(db_session, idempotency):
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _deposit(client, key, amount=100.0):
+    headers = {"X-User-ID": "user_1"}
+    if key:
+        headers["Idempotency-Key"] = key
+    return client.post("/api/wallet/deposit", json={"amount": amount}, headers=headers)
+
+
+class TestIdempotentEndpoints:
+    """Тесты повторов запросов с Idempotency-Key."""
+
+    def test_replay_returns_stored_response(self, client, wallet_calls, assert_max_queries):
+        """Тест: Повтор отдаёт тот же ответ из LRU без запросов к БД и без второго пополнения."""
+        first = _deposit(client, "key-1")
+        with assert_max_queries(0):
+            second = _deposit(client, "key-1")
+
+        assert first.status_code == second.status_code == 200
+        assert second.json() == first.json()
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert wallet_calls == [("deposit", "key-1")]
+
+    def test_replay_from_db_after_cache_miss(self, client, wallet_calls, idempotency, assert_max_queries):
+        """Тест: Без LRU (другой процесс) повтор отвечает одним SELECT по ключу."""
+        first = _deposit(client, "key-1")
+        idempotency.RESPONSE_CACHE.clear()
+
+        with assert_max_queries(1):
+            second = _deposit(client, "key-1")
+
+        assert second.json() == first.json()
+        assert len(wallet_calls) == 1
+
+    def test_without_key_not_deduplicated(self, client, wallet_calls, db_session):
+        """Тест: Без заголовка каждый запрос выполняется и ничего не сохраняется."""
+        _deposit(client, None)
+        _deposit(client, None)
+
+        assert wallet_calls == [("deposit", None), ("deposit", None)]
+        assert db_session.query(IdempotencyKey).count() == 0
+
+    def test_different_request_same_key(self, client, wallet_calls):
+        """Тест: Тот же ключ с другой суммой или на другом эндпоинте - 422."""
+        _deposit(client, "key-1", 100.0)
+
+        assert _deposit(client, "key-1", 200.0).status_code == 422
+        withdraw = client.post(
+            "/api/wallet/withdraw", json={"amount": 100.0, "withdrawal_method_id": 1},
+            headers={"X-User-ID": "user_1", "Idempotency-Key": "key-1"}
+        )
+        assert withdraw.status_code == 422
+        assert len(wallet_calls) == 1
+
+    def test_keys_scoped_per_user(self, client, wallet_calls):
+        """Тест: Одинаковый ключ у разных пользователей не пересекается."""
+        _deposit(client, "key-1")
+        client.post("/api/wallet/deposit", json={"amount": 100.0},
+                    headers={"X-User-ID": "user_2", "Idempotency-Key": "key-1"})
+
+        assert len(wallet_calls) == 2
+
+    def test_error_response_replayed(self, client, wallet_calls):
+        """Тест: Отказ (4xx) сохраняется и повторяется с тем же кодом."""
+        first = _deposit(client, "key-1", 6000.0)
+        second = _deposit(client, "key-1", 6000.0)
+
+        assert first.status_code == second.status_code == 400
+        assert second.json() == {"detail": "Card declined"}
+        assert len(wallet_calls) == 1
+
+    def test_in_flight_key_conflicts(self, client, wallet_calls, db_session, idempotency):
+        """Тест: Пока запрос с ключом выполняется - 409; брошенный резерв перехватывается."""
+        from schemas.wallet_schemas import DepositRequest
+        payload = DepositRequest(amount=100.0).model_dump()
+        assert idempotency.IdempotencyService.begin(db_session, "user_1", "key-1", "deposit", payload) == {
+            "state": "new"
+        }
+
+        assert _deposit(client, "key-1").status_code == 409
+
+        db_session.query(IdempotencyKey).update({"created_at": datetime.utcnow() - timedelta(minutes=5)})
+        db_session.commit()
+        assert _deposit(client, "key-1").status_code == 200
+        assert len(wallet_calls) == 1
+
+    def test_unexpected_error_releases_key(self, client, db_session, monkeypatch):
+        """Тест: Исключение в обработчике снимает резерв - повтор выполнится заново."""
+        from routes import wallet as routes
+
+        def fail(**kwargs):
+            raise RuntimeError("connection reset")
+
+        monkeypatch.setattr(routes.WalletService, "replenish_balance", staticmethod(fail))
+        with pytest.raises(RuntimeError):
+            _deposit(client, "key-1")
+
+        assert db_session.query(IdempotencyKey).count() == 0
+
+    def test_handlers_run_off_event_loop(self, client, monkeypatch):
+        """Тест: Пополнение и вывод (Stripe, FOR UPDATE) выполняются в пуле потоков, не в event loop."""
+        import asyncio
+        from routes import wallet as routes
+        loops = []
+
+        def record(**kwargs):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return {"success": True, "message": "ok", "new_balance": 0.0, "status": "completed"}
+
+        monkeypatch.setattr(routes.WalletService, "replenish_balance", staticmethod(record))
+        monkeypatch.setattr(routes.WalletService, "withdraw_funds", staticmethod(record))
+        _deposit(client, "key-1")
+        client.post(
+            "/api/wallet/withdraw", json={"amount": 100.0, "withdrawal_method_id": 1},
+            headers={"X-User-ID": "user_1", "Idempotency-Key": "key-2"}
+        )
+
+        assert loops == [None, None]
+
+    def test_key_too_long(self, client, wallet_calls):
+        """Тест: Ключ длиннее 255 символов - 400."""
+        assert _deposit(client, "k" * 256).status_code == 400
+        assert wallet_calls == []
+
+
+class TestStripePropagation:
+    """Тесты передачи ключа в Stripe."""
+
+    def test_charge_uses_request_key(self, db_session, wallet_service, monkeypatch):
+        """Тест: Списание с сохранённой карты получает Idempotency-Key запроса."""
+        from services.stripe_service import StripeService
+        keys = []
+
+        def charge(*args, idempotency_key=None):
+            keys.append(idempotency_key)
+            return {"success": True, "charge_id": "ch_1", "intent_id": "pi_1"}
+
+        monkeypatch.setattr(StripeService, "charge_customer", staticmethod(charge))
+        db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x",
+                            stripe_customer_id="cus_1"))
+        db_session.commit()
+
+        wallet_service.replenish_balance(db_session, "user_1", 10.0, stripe_payment_method_id="pm_1",
+                                         idempotency_key="key-1")
+        wallet_service.replenish_balance(db_session, "user_1", 10.0, stripe_payment_method_id="pm_1")
+
+        assert keys == ["deposit-user_1-key-1", None]
+
+
+class TestRetryAfterLostResponse:
+    """Тесты повтора, когда complete() не сохранил ответ."""
+
+    @pytest.fixture
+    def lost_response(self, client, db_session, idempotency, wallet_service, monkeypatch):
+        """Первый complete() падает на UPDATE; возвращает функцию "резерв брошен"."""
+        from services.stripe_service import StripeService
+        monkeypatch.setattr(StripeService, "charge_customer", staticmethod(
+            lambda *args, **kwargs: {"success": True, "charge_id": "ch_1", "intent_id": "pi_1"}
+        ))
+        db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x",
+                            stripe_customer_id="cus_1"))
+        db_session.add(UserBalance(user_id="user_1", balance=Decimal("500.00")))
+        db_session.add(WithdrawalMethod(method_id=1, user_id="user_1", withdrawal_type="bank_transfer",
+                                        is_verified=True))
+        db_session.commit()
+
+        failures = []
+        update = idempotency.update
+
+        def flaky_update(*args):
+            if not failures:
+                failures.append(1)
+                raise RuntimeError("connection lost")
+            return update(*args)
+
+        monkeypatch.setattr(idempotency, "update", flaky_update)
+
+        def abandon():
+            assert failures and db_session.query(IdempotencyKey).one().status_code is None
+            db_session.query(IdempotencyKey).update({"created_at": datetime.utcnow() - timedelta(minutes=5)})
+            db_session.commit()
+
+        return abandon
+
+    def _balance(self, db_session):
+        db_session.expire_all()
+        return db_session.get(UserBalance, "user_1").balance
+
+    def test_deposit_not_credited_twice(self, client, db_session, lost_response):
+        """Тест: Повтор пополнения сохранённой картой отвечает по записанной операции."""
+        body = {"amount": 100.0, "stripe_payment_method_id": "pm_1"}
+        headers = {"X-User-ID": "user_1", "Idempotency-Key": "key-1"}
+
+        first = client.post("/api/wallet/deposit", json=body, headers=headers)
+        lost_response()
+        second = client.post("/api/wallet/deposit", json=body, headers=headers)
+
+        assert first.status_code == second.status_code == 200
+        assert first.json()["new_balance"] == second.json()["new_balance"] == 600.0
+        assert self._balance(db_session) == Decimal("600.00")
+        assert db_session.query(WalletOperation).count() == 1
+        assert db_session.query(LedgerEntry).count() == 1
+
+    def test_withdrawal_not_debited_twice(self, client, db_session, lost_response):
+        """Тест: Повтор вывода находит операцию по ключу и не списывает снова."""
+        body = {"amount": 100.0, "withdrawal_method_id": 1}
+        headers = {"X-User-ID": "user_1", "Idempotency-Key": "key-1"}
+
+        first = client.post("/api/wallet/withdraw", json=body, headers=headers)
+        lost_response()
+        second = client.post("/api/wallet/withdraw", json=body, headers=headers)
+
+        assert first.status_code == second.status_code == 200
+        assert first.json()["withdrawal"]["operation_id"] == second.json()["withdrawal"]["operation_id"]
+        assert second.json()["new_balance"] == 400.0
+        assert self._balance(db_session) == Decimal("400.00")
+        assert db_session.query(WalletOperation).one().idempotency_key == "key-1"
+
+
+class TestPurge:
+    """Тесты удаления истёкших ключей."""
+
+    def test_purges_expired_in_chunks(self, db_session, idempotency):
+        """Тест: Истёкшие ключи удаляются, действующие остаются."""
+        for n in range(5):
+            db_session.add(IdempotencyKey(
+                user_id="user_1", idempotency_key=f"old-{n}", endpoint="deposit", request_hash="x",
+                status_code=200, response_body="{}", created_at=NOW - timedelta(days=2),
+                expires_at=NOW - timedelta(hours=n + 1)
+            ))
+        db_session.add(IdempotencyKey(
+            user_id="user_1", idempotency_key="fresh", endpoint="deposit", request_hash="x",
+            created_at=NOW, expires_at=NOW + timedelta(hours=1)
+        ))
+        db_session.commit()
+
+        result = idempotency.IdempotencyService.purge_expired(db_session, chunk_size=2, now=NOW)
+
+        assert (result["success"], result["deleted"]) == (True, 5)
+        assert [row.idempotency_key for row in db_session.query(IdempotencyKey)] == ["fresh"]
@@ -0,0 +1,86 @@
+"""
+Тесты индексов под запросы WalletService.
+
+- миграция 20261019_000002 и models/tables.sql описывают один набор индексов
+- дневной лимит вывода считается по диапазону created_at (индексируемый
+  предикат вместо func.date)
+
+Запуск: pytest tests/test_indexes.py -v
+"""
+
+import importlib.util
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from tests.conftest import User, UserBalance, WalletOperation, WithdrawalMethod
+
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+def _load_migration():
+    path = BACKEND_DIR / "alembic" / "versions" / "20261019_000002_wallet_query_indexes.py"
+    spec = importlib.util.spec_from_file_location("wallet_query_indexes", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestIndexDefinitions:
+    """Тесты согласованности описаний индексов."""
+
+    def test_tables_sql_matches_migration(self):
+        """Тест: Новые индексы есть в tables.sql, удалённые - нет."""
+        migration = _load_migration()
+        sql = (BACKEND_DIR / "models" / "tables.sql").read_text(encoding="utf-8")
+        declared = set(re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", sql))
+
+        assert {name for name, *_ in migration.NEW_INDEXES} <= declared
+        assert not {name for name, *_ in migration.DROPPED_INDEXES} & declared
+
+
+@pytest.fixture
+def withdrawal_user(db_session):
+    """Пользователь с балансом и верифицированным способом вывода."""
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("100000.00")))
+    method = WithdrawalMethod(user_id="user_1", withdrawal_type="bank_transfer", is_verified=True)
+    db_session.add(method)
+    db_session.commit()
+    return method.method_id
+
+
+def _add_withdrawal(db_session, amount, created_at):
+    db_session.add(WalletOperation(
+        user_id="user_1", operation_type="withdrawal", amount=Decimal(amount),
+        status="completed", created_at=created_at
+    ))
+    db_session.commit()
+
+
+class TestDailyWithdrawalLimit:
+    """Тесты дневного лимита вывода."""
+
+    def test_today_counts_towards_limit(self, db_session, withdrawal_user, wallet_service):
+        """Тест: Выводы за сегодня учитываются в лимите."""
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        _add_withdrawal(db_session, "49995.00", today + timedelta(seconds=1))
+
+        result = wallet_service.withdraw_funds(db_session, "user_1", 10.0, withdrawal_user)
+
+        assert not result["success"]
+        assert result["error"] == "Daily withdrawal limit exceeded"
+        assert result["used_today"] == 49995.0
+
+    def test_yesterday_not_counted(self, db_session, withdrawal_user, wallet_service):
+        """Тест: Выводы за вчера (в том числе в последнюю секунду) не учитываются."""
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        _add_withdrawal(db_session, "49995.00", today - timedelta(seconds=1))
+
+        result = wallet_service.withdraw_funds(db_session, "user_1", 10.0, withdrawal_user)
+
+        assert result["success"]
@@ -0,0 +1,170 @@
+"""
+Тесты журнала проводок (services/ledger_service.py).
+
+- проводки получают seq подряд, users_balance - кэш последней проводки
+- вывод и расчёт ставок пишут проводки
+- total_withdrawn/total_deposited меняются той же командой, что и баланс
+- проверка начинается с последнего снимка и находит расхождения
+
+Запуск: pytest tests/test_ledger.py -v
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from sqlalchemy import event
+
+from tests.conftest import (
+    User, UserBalance, BalanceTransaction, Bet, LedgerEntry, BalanceSnapshot, WithdrawalMethod,
+    WalletOperation
+)
+
+
+@pytest.fixture
+def ledger_service():
+    """LedgerService (модели подменяет test_models)"""
+    from services.ledger_service import LedgerService
+    return LedgerService
+
+
+@pytest.fixture
+def user(db_session):
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("0.00")))
+    db_session.commit()
+    return "user_1"
+
+
+def _deposit(ledger_service, db_session, user_id, amount):
+    entry = ledger_service.post(db_session, user_id, Decimal(amount), "deposit", "stripe")
+    db_session.commit()
+    return entry
+
+
+class TestPost:
+    """Тесты добавления проводок."""
+
+    def test_sequence_and_cached_balance(self, db_session, user, ledger_service):
+        """Тест: seq идут подряд, итог и кэш users_balance совпадают."""
+        entries = [_deposit(ledger_service, db_session, user, amount) for amount in ("100.00", "50.00", "-30.00")]
+
+        assert [entry.seq for entry in entries] == [1, 2, 3]
+        assert entries[-1].balance_before == Decimal("150.00")
+        assert entries[-1].balance_after == Decimal("120.00")
+
+        db_session.expire_all()
+        balance = db_session.get(UserBalance, user)
+        assert (balance.balance, balance.ledger_seq) == (Decimal("120.00"), 3)
+        assert ledger_service.verify(db_session, user)["valid"]
+
+    def test_missing_balance_raises(self, db_session, ledger_service):
+        """Тест: Проводка без записи users_balance не создаётся."""
+        with pytest.raises(ValueError):
+            ledger_service.post(db_session, "ghost", Decimal("1.00"), "deposit", "stripe")
+
+    def test_withdrawal_posts_entry(self, db_session, user, ledger_service, wallet_service):
+        """Тест: Вывод списывает баланс проводкой со ссылкой на операцию."""
+        _deposit(ledger_service, db_session, user, "500.00")
+        method = WithdrawalMethod(user_id=user, withdrawal_type="bank_transfer", is_verified=True)
+        db_session.add(method)
+        db_session.commit()
+
+        result = wallet_service.withdraw_funds(db_session, user, 200.0, method.method_id)
+
+        assert result["new_balance"] == 300.0
+        entry = db_session.query(LedgerEntry).filter(LedgerEntry.seq == 2).one()
+        assert (entry.amount, entry.contra_account) == (Decimal("-200.00"), "withdrawals")
+        assert entry.reference_id == result["withdrawal"]["operation_id"]
+        transaction = db_session.query(BalanceTransaction).one()
+        assert (transaction.balance_before, transaction.balance_after) == (Decimal("500.00"), Decimal("300.00"))
+        assert ledger_service.verify(db_session, user, full=True)["valid"]
+
+    def test_totals_in_balance_update(self, db_session, engine, user, ledger_service, wallet_service):
+        """Тест: Вывод и webhook пополнения меняют счётчики одним UPDATE users_balance, без float."""
+        import routes.webhooks as webhooks
+        _deposit(ledger_service, db_session, user, "500.00")
+        method = WithdrawalMethod(user_id=user, withdrawal_type="bank_transfer", is_verified=True)
+        db_session.add_all([method, WalletOperation(user_id=user, operation_type="deposit", amount=Decimal("19.99"),
+                                                    status="pending", stripe_payment_intent_id="pi_1")])
+        db_session.commit()
+        updates = []
+        listener = lambda conn, cursor, statement, *args: updates.append(statement) \
+            if statement.lstrip().upper().startswith("UPDATE USERS_BALANCE") else None
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            wallet_service.withdraw_funds(db_session, user, 200.1, method.method_id)
+            webhooks._handle_payment_succeeded(db_session, {
+                "id": "pi_1", "amount": 1999, "metadata": {"user_id": user}, "latest_charge": "ch_1"
+            })
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(updates) == 2
+        db_session.expire_all()
+        balance = db_session.get(UserBalance, user)
+        assert (balance.balance, balance.total_withdrawn) == (Decimal("319.89"), Decimal("200.10"))
+        assert balance.total_deposited == Decimal("19.99")
+        assert ledger_service.verify(db_session, user, full=True)["valid"]
+
+    def test_settlement_continues_sequence(self, db_session, user, ledger_service):
+        """Тест: Расчёт ставок продолжает seq пользователя."""
+        import services.settlement_service as settlement
+        _deposit(ledger_service, db_session, user, "100.00")
+        for odds_id in (1, 2):
+            db_session.add(Bet(user_id=user, event_id=7, odds_id=odds_id, bet_amount=Decimal("10.00"),
+                               coefficient=Decimal("3.000"), potential_win=Decimal("30.00"), status="open"))
+        db_session.commit()
+
+        settlement.SettlementService.settle_event(db_session, event_id=7, winning_odds_ids=[1])
+
+        rows = db_session.query(LedgerEntry).order_by(LedgerEntry.seq).all()
+        assert [(row.seq, row.entry_type, row.amount) for row in rows[1:]] == [
+            (2, "bet_won", Decimal("20.00")), (3, "bet_lost", Decimal("-10.00"))
+        ]
+        assert ledger_service.verify(db_session, user, full=True)["valid"]
+
+
+class TestSnapshotsAndVerify:
+    """Тесты снимков и проверки журнала."""
+
+    def test_verify_starts_at_snapshot(self, db_session, user, ledger_service):
+        """Тест: После снимка проверяются только новые проводки."""
+        for _ in range(4):
+            _deposit(ledger_service, db_session, user, "10.00")
+        assert ledger_service.take_snapshots(db_session, interval=3) == 1
+        assert ledger_service.take_snapshots(db_session, interval=3) == 0
+        _deposit(ledger_service, db_session, user, "5.00")
+
+        result = ledger_service.verify(db_session, user)
+
+        assert result["valid"]
+        assert (result["from_seq"], result["to_seq"], result["checked_entries"]) == (4, 5, 1)
+        assert db_session.get(BalanceSnapshot, (user, 4)).balance == Decimal("40.00")
+
+    def test_detects_broken_chain_and_cache(self, db_session, user, ledger_service):
+        """Тест: Неверный нарастающий итог и рассинхронизация кэша находятся."""
+        for _ in range(3):
+            _deposit(ledger_service, db_session, user, "10.00")
+        db_session.query(LedgerEntry).filter(LedgerEntry.seq == 2).update({"balance_after": Decimal("25.00")})
+        db_session.query(UserBalance).update({"balance": Decimal("99.00")})
+        db_session.commit()
+
+        result = ledger_service.verify(db_session, user, full=True)
+
+        assert not result["valid"]
+        assert len(result["errors"]) == 2
+        assert result["errors"][0].startswith("seq 2")
+        assert result["errors"][1].startswith("users_balance.balance")
+
+    def test_trial_balance(self, db_session, user, ledger_service):
+        """Тест: Кошельки по журналу равны кэшу и противоположны contra-счетам."""
+        _deposit(ledger_service, db_session, user, "100.00")
+        ledger_service.post(db_session, user, Decimal("-40.00"), "withdrawal", "withdrawals")
+        db_session.commit()
+
+        result = ledger_service.trial_balance(db_session)
+
+        assert result["balanced"]
+        assert result["wallets"] == 60.0
+        assert result["accounts"] == {"stripe": -100.0, "withdrawals": 40.0}
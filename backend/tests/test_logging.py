@@ -0,0 +1,150 @@
+"""
+Тесты логирования (config/logging_config.py, monitoring/request_context.py).
+
+Запуск: pytest tests/test_logging.py -v
+"""
+
+import json
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+
+from config.logging_config import (
+    BackgroundSink,
+    json_format,
+    sampled_logger,
+    _sampling_filter
+)
+from monitoring.request_context import RequestContextMiddleware
+
+
+@pytest.fixture
+def captured():
+    """Перехватывает записи loguru в список (JSON-формат)."""
+    lines = []
+    handler_id = logger.add(lines.append, format=json_format, level="DEBUG", filter=_sampling_filter)
+    yield lines
+    logger.remove(handler_id)
+
+
+class TestJsonFormat:
+    """Тесты JSON-вывода."""
+
+    def test_record_is_single_json_line(self, captured):
+        """Тест: Запись - одна JSON-строка с уровнем, сообщением и extra."""
+        logger.bind(user_id="user_123").info("User {} deposited ${}", "user_123", 100.0)
+
+        assert len(captured) == 1
+        assert captured[0].endswith("\n")
+        payload = json.loads(captured[0])
+        assert payload["level"] == "INFO"
+        assert payload["message"] == "User user_123 deposited $100.0"
+        assert payload["user_id"] == "user_123"
+        assert "sampled" not in payload
+
+    def test_exception_included(self, captured):
+        """Тест: Traceback попадает в поле exception."""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed")
+
+        payload = json.loads(captured[0])
+        assert "ValueError: boom" in payload["exception"]
+
+
+class TestSampling:
+    """Тесты sampling частых сообщений."""
+
+    def test_info_sampled(self, captured, monkeypatch):
+        """Тест: При rate=0 info-записи sampled_logger отбрасываются."""
+        monkeypatch.setattr("config.logging_config.settings.log_sample_rate", 0.0)
+
+        for _ in range(10):
+            sampled_logger.info("Received Stripe webhook: {}", "payment_intent.succeeded")
+
+        assert captured == []
+
+    def test_kept_records_carry_rate(self, captured, monkeypatch):
+        """Тест: Сохранённые записи содержат sample_rate для пересчёта."""
+        monkeypatch.setattr("config.logging_config.settings.log_sample_rate", 1.0)
+
+        sampled_logger.info("Received Stripe webhook: {}", "charge.refunded")
+
+        assert json.loads(captured[0])["sample_rate"] == 1.0
+
+    def test_warnings_not_sampled(self, captured, monkeypatch):
+        """Тест: Записи уровня WARNING и выше пишутся всегда."""
+        monkeypatch.setattr("config.logging_config.settings.log_sample_rate", 0.0)
+
+        sampled_logger.warning("Unhandled Stripe event type: {}", "unknown")
+
+        assert len(captured) == 1
+
+
+class TestBackgroundSink:
+    """Тесты фоновой записи."""
+
+    def test_writes_in_background_thread(self):
+        """Тест: Запись выполняется не в потоке вызывающего."""
+        written = []
+        sink = BackgroundSink(lambda message: written.append((message, threading.current_thread())))
+        try:
+            sink.write("line\n")
+            sink.join()
+        finally:
+            sink.stop()
+
+        assert written[0][0] == "line\n"
+        assert written[0][1] is not threading.current_thread()
+
+    def test_overflow_dropped(self):
+        """Тест: При переполненной очереди записи отбрасываются без блокировки."""
+        release = threading.Event()
+        sink = BackgroundSink(lambda message: release.wait(), max_queue=1)
+        try:
+            for _ in range(5):
+                sink.write("line\n")
+            assert sink.dropped >= 3
+        finally:
+            release.set()
+            sink.stop()
+
+
+class TestRequestContext:
+    """Тесты X-Request-ID."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware)
+
+        @app.get("/ping")
+        def ping():
+            logger.info("ping")
+            return {"ok": True}
+
+        return TestClient(app)
+
+    def test_generated_id_in_header_and_logs(self, client, captured):
+        """Тест: Сгенерированный id возвращается клиенту и есть в логах запроса."""
+        response = client.get("/ping")
+
+        request_id = response.headers["x-request-id"]
+        assert len(request_id) == 32
+        assert json.loads(captured[-1])["request_id"] == request_id
+
+    def test_incoming_id_propagated(self, client):
+        """Тест: Корректный входящий X-Request-ID сохраняется."""
+        response = client.get("/ping", headers={"X-Request-ID": "lb-abc-123"})
+
+        assert response.headers["x-request-id"] == "lb-abc-123"
+
+    def test_invalid_incoming_id_replaced(self, client):
+        """Тест: Некорректный входящий id заменяется сгенерированным."""
+        response = client.get("/ping", headers={"X-Request-ID": "bad id with spaces"})
+
+        assert response.headers["x-request-id"] != "bad id with spaces"
@@ -0,0 +1,227 @@
+"""
+Тесты метрик Prometheus (monitoring/metrics.py, GET /metrics).
+
+Запуск: pytest tests/test_metrics.py -v
+"""
+
+import json
+import os
+import time
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from monitoring.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    MetricsMiddleware,
+    REGISTRY,
+    STRIPE_CALL_DURATION,
+    STRIPE_CALL_ERRORS,
+    STRIPE_WEBHOOK_LAG,
+    instrument_engine_pool,
+    observe_webhook_lag,
+    write_job_metrics
+)
+from routes.metrics import router as metrics_router
+
+
+class TestRegistry:
+    """Тесты формата экспорта."""
+
+    def test_counter_render(self):
+        """Тест: Счётчик с метками рендерится в text format."""
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("jobs_total", "Jobs", ("kind",)))
+        counter.inc(kind="export")
+        counter.inc(2, kind="export")
+
+        output = registry.render()
+
+        assert "# TYPE jobs_total counter" in output
+        assert 'jobs_total{kind="export"} 3.0' in output
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Тест: Бакеты гистограммы кумулятивны, есть _sum и _count."""
+        registry = MetricsRegistry()
+        hist = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+        hist.observe(0.05)
+        hist.observe(0.5)
+        hist.observe(5.0)
+
+        output = registry.render()
+
+        assert 'latency_seconds_bucket{le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{le="1.0"} 2' in output
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in output
+        assert "latency_seconds_count 3" in output
+        assert "latency_seconds_sum 5.55" in output
+
+    def test_label_values_escaped(self):
+        """Тест: Кавычки в значениях меток экранируются."""
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("errors_total", "Errors", ("message",)))
+        counter.inc(message='bad "value"')
+
+        assert 'errors_total{message="bad \\"value\\""} 1.0' in registry.render()
+
+
+class TestMultiprocess:
+    """Тесты объединения метрик воркеров (PROMETHEUS_MULTIPROC_DIR)."""
+
+    @staticmethod
+    def _worker_registry(directory):
+        registry = MetricsRegistry(multiproc_dir=str(directory))
+        counter = registry.register(Counter("jobs_total", "Jobs", ("kind",)))
+        hist = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+        gauge = registry.register(Gauge("streams", "Open streams"))
+        return registry, counter, hist, gauge
+
+    def test_counters_and_histograms_summed(self, tmp_path):
+        """Тест: Counter'ы и гистограммы всех воркеров складываются, gauge - по воркерам."""
+        other, counter, hist, gauge = self._worker_registry(tmp_path)
+        counter.inc(2, kind="export")
+        hist.observe(0.05)
+        gauge.set(3)
+        snapshot = json.dumps(other.snapshot())
+        (tmp_path / "metrics_99999.json").write_text(snapshot, encoding="utf-8")
+
+        registry, counter, hist, gauge = self._worker_registry(tmp_path)
+        counter.inc(kind="export")
+        hist.observe(0.5)
+        gauge.set(1)
+        output = registry.render()
+
+        assert 'jobs_total{kind="export"} 3.0' in output
+        assert 'latency_seconds_bucket{le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{le="1.0"} 2' in output
+        assert "latency_seconds_count 2" in output
+        assert 'streams{worker="99999"} 3.0' in output
+        assert f'streams{{worker="{os.getpid()}"}} 1.0' in output
+
+    def test_stopped_worker_keeps_counters_only(self, tmp_path):
+        """Тест: У остановленного воркера counter'ы учитываются, gauge'и пропадают."""
+        other, counter, _, gauge = self._worker_registry(tmp_path)
+        counter.inc(5, kind="export")
+        gauge.set(3)
+        path = tmp_path / "metrics_99999.json"
+        path.write_text(json.dumps(other.snapshot()), encoding="utf-8")
+        stale = time.time() - 60
+        os.utime(path, (stale, stale))
+
+        registry, _, _, _ = self._worker_registry(tmp_path)
+        output = registry.render()
+
+        assert 'jobs_total{kind="export"} 5.0' in output
+        assert 'worker="99999"' not in output
+
+
+class TestJobMetrics:
+    """Тесты публикации метрик задач по расписанию (textfile collector)."""
+
+    def test_runs_accumulate_in_textfile(self, tmp_path, monkeypatch):
+        """Тест: Counter'ы и гистограммы копятся между запусками, gauge'и - последний запуск."""
+        from config.settings import settings
+        monkeypatch.setattr(settings, "metrics_textfile_dir", str(tmp_path))
+
+        for rows, success in ((10, True), (5, False)):
+            rows_metric = Histogram("job_rows", "Rows per run", buckets=(100,))
+            processed = Counter("job_processed_total", "Processed rows")
+            rows_metric.observe(rows)
+            processed.inc(rows)
+            path = write_job_metrics("expire_operations", [rows_metric, processed], success)
+
+        output = path.read_text(encoding="utf-8")
+        assert path == tmp_path / "expire_operations.prom"
+        assert "job_rows_count 2" in output
+        assert "job_rows_sum 15.0" in output
+        assert "job_processed_total 15.0" in output
+        assert 'job_last_run_success{job="expire_operations"} 0.0' in output
+        assert 'job_last_run_timestamp_seconds{job="expire_operations"}' in output
+
+    def test_disabled_without_directory(self, monkeypatch):
+        """Тест: Без METRICS_TEXTFILE_DIR метрики задачи не пишутся."""
+        from config.settings import settings
+        monkeypatch.setattr(settings, "metrics_textfile_dir", "")
+
+        assert write_job_metrics("settle_event", [], True) is None
+
+
+class TestStripeMetrics:
+    """Тесты метрик StripeService."""
+
+    @patch('stripe.Customer.create')
+    def test_error_result_counted(self, mock_create):
+        """Тест: success=False от StripeService увеличивает счётчик ошибок."""
+        import stripe
+        from services.stripe_service import StripeService
+        mock_create.side_effect = stripe.error.InvalidRequestError("Invalid email", None)
+        errors_before = STRIPE_CALL_ERRORS.get(method="create_stripe_customer")
+        calls_before = STRIPE_CALL_DURATION.get_count(method="create_stripe_customer")
+
+        result = StripeService.create_stripe_customer("user_123", "bad", "Test")
+
+        assert result['success'] is False
+        assert STRIPE_CALL_ERRORS.get(method="create_stripe_customer") == errors_before + 1
+        assert STRIPE_CALL_DURATION.get_count(method="create_stripe_customer") == calls_before + 1
+
+    def test_webhook_lag_observed(self):
+        """Тест: Задержка webhook'а считается от event.created."""
+        before = STRIPE_WEBHOOK_LAG.get_count(event_type="payment_intent.succeeded")
+
+        observe_webhook_lag("payment_intent.succeeded", int(time.time()) - 30)
+
+        assert STRIPE_WEBHOOK_LAG.get_count(event_type="payment_intent.succeeded") == before + 1
+
+
+class TestPoolMetrics:
+    """Тесты метрик пула соединений."""
+
+    def test_pool_gauges_and_checkout_wait(self, tmp_path):
+        """Тест: Gauges пула и ожидание checkout попадают в /metrics."""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=QueuePool,
+            pool_size=2,
+            max_overflow=1
+        )
+        instrument_engine_pool(engine, name="test_pool")
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            output = REGISTRY.render()
+
+        assert 'db_pool_size{engine="test_pool"} 2.0' in output
+        assert 'db_pool_checked_out{engine="test_pool"} 1.0' in output
+        assert 'db_pool_checkout_wait_seconds_count{engine="test_pool"}' in output
+        engine.dispose()
+
+
+class TestMetricsEndpoint:
+    """Тесты endpoint /metrics и middleware."""
+
+    def test_request_latency_exported(self):
+        """Тест: Латентность запроса экспортируется по шаблону роута."""
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics_router)
+
+        @app.get("/api/things/{thing_id}")
+        async def read_thing(thing_id: int):
+            return {"thing_id": thing_id}
+
+        client = TestClient(app)
+        client.get("/api/things/42")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert (
+            'http_request_duration_seconds_count{method="GET",route="/api/things/{thing_id}",status="200"} 1'
+            in response.text
+        )
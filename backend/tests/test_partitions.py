@@ -0,0 +1,72 @@
+"""
+Тесты планирования месячных партиций (services/partition_service.py).
+
+DDL партиций выполняется только на PostgreSQL, поэтому здесь проверяются
+расчёты месяцев и имён, по которым сервис решает, что создать и что
+отсоединить.
+
+Запуск: pytest tests/test_partitions.py -v
+"""
+
+from datetime import date
+
+from config.settings import settings
+from services.partition_service import (
+    add_months,
+    expired_months,
+    missing_months,
+    parse_partition_month,
+    partition_name,
+    retention_for
+)
+
+
+class TestPartitionNames:
+    """Тесты имён партиций."""
+
+    def test_name_round_trip(self):
+        """Тест: Имя партиции разбирается обратно в месяц."""
+        name = partition_name("balance_transactions", date(2026, 3, 1))
+
+        assert name == "balance_transactions_p2026_03"
+        assert parse_partition_month("balance_transactions", name) == date(2026, 3, 1)
+
+    def test_foreign_names_ignored(self):
+        """Тест: DEFAULT-партиция и партиции других таблиц не разбираются."""
+        assert parse_partition_month("bets", "bets_default") is None
+        assert parse_partition_month("bets", "audit_log_p2026_03") is None
+
+    def test_add_months_across_year(self):
+        """Тест: Сдвиг месяца через границу года в обе стороны."""
+        assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+        assert add_months(date(2026, 2, 1), -3) == date(2025, 11, 1)
+
+
+class TestPartitionPlanning:
+    """Тесты выбора партиций для создания и отсоединения."""
+
+    def test_missing_months(self):
+        """Тест: Недостающие партиции от текущего месяца на N вперёд."""
+        existing = [date(2026, 10, 1), date(2026, 11, 1)]
+
+        missing = missing_months(existing, date(2026, 10, 19), months_ahead=3)
+
+        assert missing == [date(2026, 12, 1), date(2027, 1, 1)]
+
+    def test_expired_months(self):
+        """Тест: Отсоединяются только месяцы старше срока хранения."""
+        existing = [date(2025, 9, 1), date(2025, 10, 1), date(2026, 10, 1)]
+
+        assert expired_months(existing, date(2026, 10, 19), 12) == [date(2025, 9, 1)]
+
+    def test_zero_retention_keeps_everything(self):
+        """Тест: Срок хранения 0 - ничего не отсоединяется."""
+        assert expired_months([date(2000, 1, 1)], date(2026, 10, 19), 0) == []
+
+    def test_retention_per_table(self, monkeypatch):
+        """Тест: audit_log хранится по своему сроку, история - по общему."""
+        monkeypatch.setattr(settings, "audit_log_retention_months", 12)
+        monkeypatch.setattr(settings, "history_retention_months", 36)
+
+        assert retention_for("audit_log") == 12
+        assert retention_for("bets") == 36
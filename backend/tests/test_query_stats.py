@@ -0,0 +1,153 @@
+"""
+Тесты учёта SQL-запросов (monitoring/query_stats.py).
+
+Запуск: pytest tests/test_query_stats.py -v
+"""
+
+import pytest
+from decimal import Decimal
+
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from monitoring.query_stats import (
+    QueryStats,
+    QueryStatsMiddleware,
+    install_query_stats,
+    track_queries,
+    get_route_query_totals
+)
+from tests.conftest import User, UserBalance
+
+
+@pytest.fixture
+def test_user(db_session):
+    """Пользователь с балансом."""
+    db_session.add(User(
+        id="user_123",
+        email="test@example.com",
+        name="Test User",
+        password_hash="hashed_password"
+    ))
+    db_session.add(UserBalance(user_id="user_123", balance=Decimal("100.00")))
+    db_session.commit()
+
+
+class TestTrackQueries:
+    """Тесты подсчёта запросов."""
+
+    def test_counts_statements(self, engine):
+        """Тест: Считаются все выполненные statement'ы."""
+        install_query_stats(engine)
+
+        with engine.connect() as conn:
+            with track_queries() as stats:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+        assert stats.count == 2
+        assert stats.total_time >= stats.slowest_time > 0
+        assert stats.slowest_statement in ("SELECT 1", "SELECT 2")
+
+    def test_install_is_idempotent(self, engine):
+        """Тест: Повторная установка не удваивает счётчик."""
+        install_query_stats(engine)
+        install_query_stats(engine)
+
+        with engine.connect() as conn:
+            with track_queries() as stats:
+                conn.execute(text("SELECT 1"))
+
+        assert stats.count == 1
+
+    def test_failed_statement_does_not_break_timing(self, engine):
+        """Тест: Ошибка SQL не ломает учёт следующих запросов."""
+        install_query_stats(engine)
+
+        with engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM no_such_table"))
+            with track_queries() as stats:
+                conn.execute(text("SELECT 1"))
+
+        assert stats.count == 1
+
+    def test_concurrent_records_not_lost(self):
+        """Тест: Запись из нескольких потоков (общий контекст запроса) не теряет statement'ы."""
+        from concurrent.futures import ThreadPoolExecutor
+        stats = QueryStats()
+
+        def record_many():
+            for _ in range(5000):
+                stats.record("SELECT 1", 0.001)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for _ in range(8):
+                pool.submit(record_many)
+
+        assert stats.totals()[0] == 40000
+        assert stats.as_dict()["db_time_ms"] == pytest.approx(40000.0)
+
+
+class TestAssertMaxQueries:
+    """Тесты помощника assert_max_queries."""
+
+    def test_fails_when_limit_exceeded(self, engine, assert_max_queries):
+        """Тест: Превышение лимита - AssertionError."""
+        with engine.connect() as conn:
+            with pytest.raises(AssertionError, match="at most 1 queries, got 2"):
+                with assert_max_queries(1):
+                    conn.execute(text("SELECT 1"))
+                    conn.execute(text("SELECT 2"))
+
+    def test_get_balance_query_budget(self, db_session, test_user, wallet_service, assert_max_queries):
+        """Тест: get_balance укладывается в бюджет запросов (защита от N+1)."""
+        # 7 SELECT + INSERT audit_log + 2 refresh истёкших после commit объектов
+        with assert_max_queries(10):
+            result = wallet_service.get_balance(db_session, "user_123")
+
+        assert result['success'] is True
+
+
+class TestQueryStatsMiddleware:
+    """Тесты middleware."""
+
+    def _make_app(self, engine, expose_headers):
+        install_query_stats(engine)
+        app = FastAPI()
+        app.add_middleware(QueryStatsMiddleware, expose_headers=expose_headers)
+
+        def get_conn():
+            with engine.connect() as conn:
+                yield conn
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int, conn=Depends(get_conn)):
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+            return {"item_id": item_id}
+
+        return app
+
+    def test_debug_headers(self, engine):
+        """Тест: В debug-режиме ответ содержит X-DB-* заголовки."""
+        client = TestClient(self._make_app(engine, expose_headers=True))
+
+        response = client.get("/items/1")
+
+        assert response.status_code == 200
+        assert response.headers["X-DB-Query-Count"] == "2"
+        assert float(response.headers["X-DB-Time-Ms"]) >= float(response.headers["X-DB-Slowest-Ms"])
+
+    def test_no_headers_in_production(self, engine):
+        """Тест: Без debug заголовки не добавляются, но агрегаты по роуту копятся."""
+        client = TestClient(self._make_app(engine, expose_headers=False))
+        before = get_route_query_totals().get("/items/{item_id}", {"requests": 0, "queries": 0})
+
+        response = client.get("/items/1")
+
+        assert "X-DB-Query-Count" not in response.headers
+        after = get_route_query_totals()["/items/{item_id}"]
+        assert after["requests"] == before["requests"] + 1
+        assert after["queries"] == before["queries"] + 2
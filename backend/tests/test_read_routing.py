@@ -0,0 +1,123 @@
+"""
+Тесты маршрутизации чтения на реплики (models/routing.py).
+
+Primary и реплика - два отдельных файла SQLite; репликация не
+выполняется, поэтому по содержимому видно, откуда прочитаны данные.
+
+Запуск: pytest tests/test_read_routing.py -v
+"""
+
+import pytest
+from sqlalchemy import create_engine
+
+from models.routing import ReplicaRouter, RoutingSession
+from tests.conftest import TestBase, User, AuditLog
+
+
+def _make_engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    TestBase.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def primary(tmp_path):
+    engine = _make_engine(tmp_path / "primary.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    engines = [_make_engine(tmp_path / f"replica_{i}.db") for i in range(2)]
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def lags():
+    """Отставание реплик, которое возвращает тестовый probe."""
+    return {}
+
+
+@pytest.fixture
+def router(primary, replicas, lags):
+    return ReplicaRouter(
+        primary,
+        replicas,
+        max_lag_seconds=5.0,
+        lag_check_interval=0,
+        sticky_seconds=60,
+        lag_probe=lambda engine: lags.get(engine, 0.0)
+    )
+
+
+def _add_user(engine, user_id, name):
+    session = RoutingSession(bind=engine)
+    session.add(User(id=user_id, email=f"{user_id}@example.com", name=name, password_hash="x"))
+    session.commit()
+    session.close()
+
+
+class TestReplicaRouter:
+    """Тесты выбора engine."""
+
+    def test_reads_go_to_replicas_round_robin(self, router, replicas):
+        """Тест: Чтения распределяются по репликам."""
+        chosen = {router.engine_for_read("user_1") for _ in range(4)}
+
+        assert chosen == set(replicas)
+
+    def test_read_your_writes(self, router, primary):
+        """Тест: После записи пользователь читает с primary, другие - с реплики."""
+        router.mark_write("user_1")
+
+        assert router.engine_for_read("user_1") is primary
+        assert router.engine_for_read("user_2") is not primary
+
+    def test_lagging_replica_skipped(self, router, replicas, lags):
+        """Тест: Реплика с отставанием больше порога не используется."""
+        lags[replicas[0]] = 30.0
+
+        chosen = {router.engine_for_read() for _ in range(4)}
+
+        assert chosen == {replicas[1]}
+
+    def test_all_replicas_unavailable(self, router, primary, replicas, lags):
+        """Тест: Нет доступных реплик - чтение с primary."""
+        lags[replicas[0]] = None
+        lags[replicas[1]] = 30.0
+
+        assert router.engine_for_read() is primary
+
+    def test_no_replicas_configured(self, primary):
+        """Тест: Без реплик всё читается с primary."""
+        router = ReplicaRouter(primary, [])
+        router.mark_write("user_1")
+
+        assert router.engine_for_read("user_2") is primary
+
+
+class TestRoutingSession:
+    """Тесты разделения чтения и записи в сессии."""
+
+    def test_select_from_replica_write_to_primary(self, primary, replicas):
+        """Тест: SELECT читается с реплики, flush пишет в primary."""
+        replica = replicas[0]
+        _add_user(primary, "user_1", "Primary copy")
+        _add_user(replica, "user_1", "Replica copy")
+
+        session = RoutingSession(bind=primary, read_engine=replica)
+        name = session.query(User).filter(User.id == "user_1").first().name
+        session.add(AuditLog(user_id="user_1", action="export_report"))
+        session.commit()
+        session.close()
+
+        assert name == "Replica copy"
+        check = RoutingSession(bind=primary)
+        assert check.query(AuditLog).count() == 1
+        check.close()
+        check = RoutingSession(bind=replica)
+        assert check.query(AuditLog).count() == 0
+        check.close()
@@ -0,0 +1,159 @@
+"""
+Тесты сверки wallet_operations со Stripe (services/reconciliation_service.py).
+
+- succeeded зачисляется проводкой, canceled отменяется, просроченные
+  операции помечаются expired, processing не трогается
+- расхождения попадают в отчёт, операции не меняются
+- свежие операции и уже закрытые не сверяются, повторный запуск ничего
+  не зачисляет
+
+Запуск: pytest tests/test_reconciliation.py -v
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from tests.conftest import (
+    User, UserBalance, BalanceTransaction, WalletOperation, AuditLog, LedgerEntry
+)
+
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+@pytest.fixture
+def reconciliation_service():
+    """ReconciliationService (модели подменяет test_models)"""
+    from services.reconciliation_service import ReconciliationService
+    return ReconciliationService
+
+
+class FakeStripe:
+    """Ответы в формате StripeService.confirm_payment по intent_id."""
+
+    def __init__(self, intents):
+        self.intents = intents
+        self.calls = []
+
+    def __call__(self, intent_id):
+        self.calls.append(intent_id)
+        intent = self.intents.get(intent_id)
+        if intent is None:
+            return {"success": False, "error": "Payment intent not found"}
+        status, amount, user_id = intent
+        return {"success": True, "status": status, "amount": amount, "currency": "usd",
+                "charge_id": "ch_" + intent_id, "metadata": {"user_id": user_id}}
+
+
+@pytest.fixture
+def operations(db_session):
+    """Пополнения user_1 по 100.00: intent_id -> operation_id."""
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("0.00")))
+    ids = {}
+    for intent_id, age, expires_in, status in (
+        ("pi_ok", 60, 60, "pending"),
+        ("pi_canceled", 60, 60, "pending"),
+        ("pi_open", 120, -60, "pending"),
+        ("pi_processing", 120, -60, "pending"),
+        ("pi_waiting", 60, 60, "pending"),
+        ("pi_amount", 60, 60, "pending"),
+        ("pi_missing", 60, 60, "pending"),
+        ("pi_fresh", 5, 60, "pending"),
+        ("pi_done", 60, 60, "completed"),
+    ):
+        operation = WalletOperation(
+            user_id="user_1", operation_type="deposit", amount=Decimal("100.00"), status=status,
+            stripe_payment_intent_id=intent_id, created_at=NOW - timedelta(minutes=age),
+            expires_at=NOW + timedelta(minutes=expires_in)
+        )
+        db_session.add(operation)
+        db_session.flush()
+        ids[intent_id] = operation.operation_id
+    db_session.commit()
+    return ids
+
+
+@pytest.fixture
+def stripe():
+    return FakeStripe({
+        "pi_ok": ("succeeded", 100.0, "user_1"),
+        "pi_canceled": ("canceled", 100.0, "user_1"),
+        "pi_open": ("requires_payment_method", 100.0, "user_1"),
+        "pi_processing": ("processing", 100.0, "user_1"),
+        "pi_waiting": ("requires_action", 100.0, "user_1"),
+        "pi_amount": ("succeeded", 10.0, "user_1"),
+        "pi_fresh": ("succeeded", 100.0, "user_1"),
+        "pi_done": ("succeeded", 100.0, "user_1"),
+    })
+
+
+def _statuses(db_session, ids):
+    db_session.expire_all()
+    return {intent_id: db_session.get(WalletOperation, operation_id).status
+            for intent_id, operation_id in ids.items()}
+
+
+class TestReconcile:
+    """Тесты сверки со Stripe."""
+
+    def test_outcomes(self, db_session, operations, stripe, reconciliation_service):
+        """Тест: Каждая операция получает статус по ответу Stripe."""
+        result = reconciliation_service.reconcile(
+            db_session, batch_size=3, concurrency=4, grace_minutes=30, fetch_intent=stripe, now=NOW
+        )
+
+        assert result["success"] and result["aborted"] is None
+        assert (result["scanned"], result["settled"], result["cancelled"], result["expired"],
+                result["pending"], result["errors"]) == (7, 1, 1, 1, 2, 0)
+        assert _statuses(db_session, operations) == {
+            "pi_ok": "completed", "pi_canceled": "cancelled", "pi_open": "expired",
+            "pi_processing": "pending", "pi_waiting": "pending", "pi_amount": "pending",
+            "pi_missing": "pending", "pi_fresh": "pending", "pi_done": "completed",
+        }
+        assert sorted(stripe.calls) == sorted(set(operations) - {"pi_fresh", "pi_done"})
+
+    def test_settled_deposit_is_posted(self, db_session, operations, stripe, reconciliation_service):
+        """Тест: Зачисление идёт проводкой журнала со ссылкой на операцию."""
+        reconciliation_service.reconcile(db_session, grace_minutes=30, fetch_intent=stripe, now=NOW)
+
+        db_session.expire_all()
+        assert db_session.get(UserBalance, "user_1").balance == Decimal("100.00")
+        entry = db_session.query(LedgerEntry).one()
+        assert (entry.amount, entry.reference_id) == (Decimal("100.00"), operations["pi_ok"])
+        transaction = db_session.query(BalanceTransaction).one()
+        assert (transaction.stripe_charge_id, transaction.balance_after) == ("ch_pi_ok", Decimal("100.00"))
+        assert db_session.query(AuditLog).filter(AuditLog.action == "deposit_reconciled").count() == 1
+
+    def test_mismatches_reported(self, db_session, operations, stripe, reconciliation_service):
+        """Тест: Другая сумма и ненайденный intent попадают в отчёт."""
+        result = reconciliation_service.reconcile(db_session, grace_minutes=30, fetch_intent=stripe, now=NOW)
+
+        assert result["mismatch_count"] == 2
+        assert {(m["intent_id"], m["reason"]) for m in result["mismatches"]} == {
+            ("pi_amount", "amount_mismatch"), ("pi_missing", "intent_not_found")
+        }
+
+    def test_rerun_does_not_credit_twice(self, db_session, operations, stripe, reconciliation_service):
+        """Тест: Повторный запуск не зачисляет уже закрытые операции."""
+        reconciliation_service.reconcile(db_session, grace_minutes=30, fetch_intent=stripe, now=NOW)
+
+        again = reconciliation_service.reconcile(db_session, grace_minutes=30, fetch_intent=stripe, now=NOW)
+
+        assert (again["scanned"], again["settled"]) == (4, 0)
+        db_session.expire_all()
+        assert db_session.get(UserBalance, "user_1").balance == Decimal("100.00")
+
+    def test_stripe_errors_leave_operations_pending(self, db_session, operations, reconciliation_service):
+        """Тест: Сбой запроса к Stripe считается ошибкой, операция не меняется."""
+        def failing(intent_id):
+            raise ConnectionError("stripe unavailable")
+
+        result = reconciliation_service.reconcile(
+            db_session, grace_minutes=30, limit=2, fetch_intent=failing, now=NOW
+        )
+
+        assert (result["scanned"], result["errors"]) == (2, 2)
+        assert _statuses(db_session, operations)["pi_ok"] == "pending"
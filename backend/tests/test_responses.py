@@ -0,0 +1,106 @@
+"""
+Тесты быстрого пути JSON-ответов (routes/responses.py).
+
+- /balance и /history отдают без повторной проверки то же тело, что
+  вернула бы проверка по response_model
+- FastJSONResponse сериализует Decimal, datetime и модели pydantic
+
+Запуск: pytest tests/test_responses.py -v
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from models.database import get_db
+from routes.responses import FastJSONResponse, trusted_response
+from routes.wallet import get_user_read_db
+from schemas.wallet_schemas import BalanceResponse, HistoryResponse, DepositRequest
+from tests.conftest import User, UserBalance, BalanceTransaction, Bet, WalletOperation
+
+
+@pytest.fixture
+def client(db_session, wallet_service):
+    for dependency in (get_db, get_user_read_db):
+        app.dependency_overrides[dependency] = lambda: db_session
+    yield TestClient(app)
+    for dependency in (get_db, get_user_read_db):
+        app.dependency_overrides.pop(dependency, None)
+
+
+@pytest.fixture
+def user(db_session):
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("120.50"), total_deposited=Decimal("200.00"),
+                               total_bet=Decimal("79.50")))
+    db_session.add(BalanceTransaction(user_id="user_1", transaction_type="deposit", amount=Decimal("200.00"),
+                                      balance_before=Decimal("0.00"), balance_after=Decimal("200.00")))
+    db_session.add(Bet(user_id="user_1", event_id=7, bet_amount=Decimal("79.50"), coefficient=Decimal("1.850"),
+                       potential_win=Decimal("147.08"), status="resolved", result="loss",
+                       resolved_at=datetime(2026, 10, 18, 21, 0)))
+    db_session.add(Bet(user_id="user_1", event_id=8, odds_id=3, bet_amount=Decimal("10.00"),
+                       coefficient=Decimal("2.000"), potential_win=Decimal("20.00")))
+    db_session.add(WalletOperation(user_id="user_1", operation_type="deposit", amount=Decimal("15.00"),
+                                   status="pending"))
+    db_session.commit()
+    return "user_1"
+
+
+def _validated(model, result):
+    return model.model_validate(result).model_dump(mode="json")
+
+
+class TestTrustedResponses:
+    """Тесты совпадения быстрого пути с проверкой по response_model."""
+
+    def test_balance_matches_schema(self, client, user, db_session, wallet_service):
+        """Тест: /balance без проверки - то же тело, что после BalanceResponse."""
+        response = client.get("/api/wallet/balance", headers={"X-User-ID": user})
+
+        assert response.status_code == 200
+        assert response.json() == _validated(BalanceResponse, wallet_service.get_balance(db_session, user))
+        assert response.json()["error"] is None
+
+    def test_history_matches_schema(self, client, user, db_session, wallet_service):
+        """Тест: /history без проверки - то же тело, что после HistoryResponse."""
+        response = client.get("/api/wallet/history?limit=10", headers={"X-User-ID": user})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data == _validated(HistoryResponse, wallet_service.get_bet_history(db_session, user, limit=10))
+        assert len(data["bets"]) == 2 and len(data["transactions"]) == 1
+
+    def test_status_code_and_defaults(self):
+        """Тест: Недостающие необязательные поля верхнего уровня - значения по умолчанию."""
+        response = trusted_response(HistoryResponse, {"success": False, "error": "x"}, status_code=500)
+
+        assert response.status_code == 500
+        assert orjson.loads(response.body) == _validated(HistoryResponse, {"success": False, "error": "x"})
+
+
+class TestFastJSONResponse:
+    """Тесты сериализации orjson."""
+
+    def test_serializes_non_json_types(self):
+        """Тест: Decimal - число, datetime - ISO строка, модель - dict."""
+        response = FastJSONResponse({
+            "amount": Decimal("10.50"),
+            "at": datetime(2026, 10, 19, 12, 0),
+            "request": DepositRequest(amount=5.0),
+            1: "int key"
+        })
+
+        data = orjson.loads(response.body)
+        assert data["amount"] == 10.5
+        assert data["at"] == "2026-10-19T12:00:00"
+        assert data["request"]["amount"] == 5.0
+        assert data["1"] == "int key"
+
+    def test_unknown_type_raises(self):
+        """Тест: Неизвестный тип - TypeError, а не молча строка."""
+        with pytest.raises(TypeError):
+            FastJSONResponse({"value": object()})
@@ -0,0 +1,122 @@
+"""
+Тесты массового расчёта ставок (services/settlement_service.py).
+
+Запуск: pytest tests/test_settlement.py -v
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from tests.conftest import User, UserBalance, BalanceTransaction, Bet
+
+
+@pytest.fixture
+def settlement_service():
+    """SettlementService (модели подменяет test_models)"""
+    from services.settlement_service import SettlementService
+    return SettlementService
+
+
+def _add_bet(db_session, user_id, odds_id, amount="10.00", coefficient="2.500", event_id=1):
+    amount = Decimal(amount)
+    db_session.add(Bet(
+        user_id=user_id, event_id=event_id, odds_id=odds_id, bet_amount=amount,
+        coefficient=Decimal(coefficient), potential_win=amount * Decimal(coefficient),
+        status="open"
+    ))
+
+
+@pytest.fixture
+def event_bets(db_session):
+    """Событие 1: user_1 ставит на исход 100 дважды и на 200, user_2 - на 200."""
+    for user_id in ("user_1", "user_2"):
+        db_session.add(User(id=user_id, email=f"{user_id}@example.com", name=user_id, password_hash="x"))
+        db_session.add(UserBalance(user_id=user_id, balance=Decimal("100.00")))
+    _add_bet(db_session, "user_1", 100)
+    _add_bet(db_session, "user_1", 100, amount="20.00")
+    _add_bet(db_session, "user_1", 200)
+    _add_bet(db_session, "user_2", 200, amount="30.00")
+    _add_bet(db_session, "user_2", 100, event_id=2)
+    db_session.commit()
+    return db_session
+
+
+class TestSettleEvent:
+    """Тесты расчёта события."""
+
+    def test_results_and_balances(self, event_bets, settlement_service):
+        """Тест: Выигрыши и проигрыши меняют баланс и итоги пользователя."""
+        result = settlement_service.settle_event(event_bets, event_id=1, winning_odds_ids=[100], chunk_size=2)
+
+        assert result["success"]
+        assert (result["settled"], result["won"], result["lost"], result["chunks"]) == (4, 2, 2, 2)
+        assert result["payout"] == 75.0
+
+        event_bets.expire_all()
+        user_1 = event_bets.get(UserBalance, "user_1")
+        # +15 +30 -10
+        assert user_1.balance == Decimal("135.00")
+        assert user_1.total_won == Decimal("75.00")
+        assert user_1.total_lost == Decimal("10.00")
+        assert event_bets.get(UserBalance, "user_2").balance == Decimal("70.00")
+
+    def test_transactions_chain_balances(self, event_bets, settlement_service):
+        """Тест: Транзакции bet_won/bet_lost образуют непрерывную цепочку баланса."""
+        settlement_service.settle_event(event_bets, event_id=1, winning_odds_ids=[100], chunk_size=2)
+
+        rows = event_bets.query(BalanceTransaction).filter(
+            BalanceTransaction.user_id == "user_1"
+        ).order_by(BalanceTransaction.related_entity_id).all()
+
+        assert [row.transaction_type for row in rows] == ["bet_won", "bet_won", "bet_lost"]
+        assert rows[0].balance_before == Decimal("100.00")
+        for previous, current in zip(rows, rows[1:]):
+            assert current.balance_before == previous.balance_after
+        assert rows[-1].balance_after == Decimal("135.00")
+
+    def test_other_events_untouched_and_rerun_is_noop(self, event_bets, settlement_service):
+        """Тест: Ставки других событий не трогаются, повторный расчёт ничего не меняет."""
+        settlement_service.settle_event(event_bets, event_id=1, winning_odds_ids=[100])
+        again = settlement_service.settle_event(event_bets, event_id=1, winning_odds_ids=[200])
+
+        assert again["settled"] == 0
+        assert event_bets.query(Bet).filter(Bet.status == "open").count() == 1
+        assert event_bets.query(BalanceTransaction).count() == 4
+
+    def test_locked_bets_settled_by_second_pass(self, event_bets, settlement_service, monkeypatch):
+        """Тест: Ставки, пропущенные SKIP LOCKED, рассчитываются проходом с ожиданием блокировок."""
+        settle_chunk = settlement_service._settle_chunk
+
+        def locked_by_other(db, event_id, winning_odds_ids, chunk_size, now, skip_locked=True):
+            if skip_locked:
+                return {"settled": 0, "won": 0, "payout": Decimal("0.00")}
+            return settle_chunk(db, event_id, winning_odds_ids, chunk_size, now, skip_locked=skip_locked)
+
+        monkeypatch.setattr(settlement_service, "_settle_chunk", staticmethod(locked_by_other))
+        result = settlement_service.settle_event(event_bets, event_id=1, winning_odds_ids=[100], chunk_size=2)
+
+        assert result["success"]
+        assert (result["settled"], result["remaining"]) == (4, 0)
+        assert event_bets.query(Bet).filter_by(event_id=1, status="open").count() == 0
+
+    def test_open_bets_left_reported(self, event_bets, settlement_service, monkeypatch):
+        """Тест: Оставшиеся открытые ставки возвращаются в remaining, расчёт не считается завершённым."""
+        monkeypatch.setattr(settlement_service, "_settle_chunk", staticmethod(
+            lambda *args, **kwargs: {"settled": 0, "won": 0, "payout": Decimal("0.00")}
+        ))
+
+        result = settlement_service.settle_event(event_bets, event_id=1, winning_odds_ids=[100])
+
+        assert not result["success"]
+        assert result["error"] == "Open bets remain"
+        assert result["remaining"] == 4
+
+    def test_bets_resolved_in_sql(self, event_bets, settlement_service):
+        """Тест: Проигравшие ставки получают actual_win = 0 и resolved_at."""
+        settlement_service.settle_event(event_bets, event_id=1, winning_odds_ids=[])
+
+        bets = event_bets.query(Bet).filter(Bet.event_id == 1).all()
+
+        assert {bet.result for bet in bets} == {"loss"}
+        assert all(bet.actual_win == Decimal("0.00") and bet.resolved_at for bet in bets)
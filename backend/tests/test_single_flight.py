@@ -0,0 +1,147 @@
+"""
+Тесты объединения одновременных чтений (services/single_flight.py).
+
+- одинаковые одновременные вызовы выполняются один раз, каждый получает
+  свою копию результата; разные ключи не объединяются
+- исключение leader'а получают все ожидающие
+- после forget() (commit изменений пользователя) новые запросы не
+  присоединяются к начатому чтению
+- WalletService.get_balance: один набор запросов и одна audit-запись
+
+Запуск: pytest tests/test_single_flight.py -v
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+
+from monitoring.metrics import WALLET_READS_COALESCED, WALLET_READ_EXECUTIONS
+from services.single_flight import SingleFlight
+from tests.conftest import User, UserBalance, AuditLog
+
+
+def _slow(result, calls, seconds=0.2):
+    def fn():
+        calls.append(threading.current_thread().name)
+        time.sleep(seconds)
+        return result
+    return fn
+
+
+def _run_together(count, target):
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(target) for _ in range(count)]
+        return [future.result() for future in futures]
+
+
+class TestSingleFlight:
+    """Тесты SingleFlight."""
+
+    def test_concurrent_calls_share_execution(self):
+        """Тест: 5 одновременных вызовов - одно выполнение, результаты - отдельные копии."""
+        flight, calls = SingleFlight(), []
+        executions = WALLET_READ_EXECUTIONS.get(operation="test")
+        coalesced = WALLET_READS_COALESCED.get(operation="test")
+        fn = _slow({"balance": {"current_balance": 10.0}}, calls)
+
+        results = _run_together(5, lambda: flight.do("test", "user_1", ("primary",), fn))
+
+        assert len(calls) == 1
+        assert all(result == {"balance": {"current_balance": 10.0}} for result in results)
+        assert len({id(result) for result in results}) == 5
+        assert WALLET_READ_EXECUTIONS.get(operation="test") - executions == 1
+        assert WALLET_READS_COALESCED.get(operation="test") - coalesced == 4
+        assert flight.calls == {}
+
+    def test_different_keys_not_coalesced(self):
+        """Тест: Другой пользователь или другие аргументы - отдельное выполнение."""
+        flight, calls = SingleFlight(), []
+        fn = _slow({}, calls, seconds=0.1)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            for user_id, key in (("user_1", (1,)), ("user_1", (2,)), ("user_2", (1,))):
+                pool.submit(flight.do, "test", user_id, key, fn)
+
+        assert len(calls) == 3
+
+    def test_error_reaches_waiters(self):
+        """Тест: Исключение leader'а получают все вызовы, следующий вызов выполняется заново."""
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise RuntimeError("database is down")
+
+        def call():
+            try:
+                flight.do("test", "user_1", (), failing)
+            except RuntimeError as e:
+                return str(e)
+
+        assert _run_together(3, call) == ["database is down"] * 3
+        assert flight.do("test", "user_1", (), lambda: "ok") == "ok"
+
+    def test_forget_starts_new_execution(self):
+        """Тест: После forget() запрос не ждёт чтения, начатого до изменения."""
+        flight, calls = SingleFlight(), []
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            before = pool.submit(flight.do, "test", "user_1", (), _slow("old", calls))
+            time.sleep(0.05)
+            flight.forget("user_1")
+            after = pool.submit(flight.do, "test", "user_1", (), _slow("new", calls, seconds=0))
+
+            assert (before.result(), after.result()) == ("old", "new")
+        assert len(calls) == 2
+        assert flight.calls == {}
+
+    def test_disabled(self):
+        """Тест: enabled=False - каждый вызов выполняется."""
+        flight, calls = SingleFlight(enabled=False), []
+
+        _run_together(3, lambda: flight.do("test", "user_1", (), _slow(None, calls, seconds=0.05)))
+
+        assert len(calls) == 3
+
+
+class TestWalletServiceCoalescing:
+    """Тесты объединения в WalletService."""
+
+    @pytest.fixture
+    def user(self, db_session):
+        db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+        db_session.add(UserBalance(user_id="user_1", balance=Decimal("75.00")))
+        db_session.commit()
+        return "user_1"
+
+    def test_concurrent_balance_reads(self, db_session, wallet_service, user, monkeypatch):
+        """Тест: Одновременные get_balance - одно выполнение и одна запись balance_checked."""
+        compute = wallet_service._get_balance
+        calls = []
+
+        def slow_compute(db, user_id, user=None):
+            calls.append(user_id)
+            time.sleep(0.2)
+            return compute(db, user_id, user)
+
+        monkeypatch.setattr(wallet_service, "_get_balance", staticmethod(slow_compute))
+
+        results = _run_together(4, lambda: wallet_service.get_balance(db_session, user))
+
+        assert calls == ["user_1"]
+        assert [result["balance"]["current_balance"] for result in results] == [75.0] * 4
+        assert db_session.query(AuditLog).filter(AuditLog.action == "balance_checked").count() == 1
+
+    def test_history_key_includes_arguments(self, db_session, wallet_service, user, monkeypatch):
+        """Тест: Ключ истории различает страницу и фильтры."""
+        from services.single_flight import WALLET_READS
+        source = wallet_service._read_source(db_session)
+        seen = []
+        monkeypatch.setattr(WALLET_READS, "do", lambda operation, user_id, key, fn: seen.append((operation, key)) or fn())
+
+        wallet_service.get_bet_history(db_session, user, limit=10, filters={"status": "open"})
+
+        assert seen == [("history", (source, 10, 0, (("status", "open"),)))]
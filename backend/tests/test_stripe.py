@@ -148,6 +148,30 @@ class TestCreateStripeCustomer:
         )
         
         assert result['success'] is False
+    
+    @patch('services.stripe_service.stripe.Customer.create')
+    def test_create_customer_idempotency_key(self, mock_create):
+        """Тест: Повторное создание для пользователя идёт с тем же Idempotency-Key."""
+        mock_create.return_value = MagicMock(id="cus_test123")
+        
+        StripeService.create_stripe_customer("user_123", "test@example.com", "Test User")
+        
+        kwargs = mock_create.call_args.kwargs
+        assert kwargs['idempotency_key'] == "customer-user_123"
+        assert kwargs['metadata'] == {"user_id": "user_123"}
+    
+    @patch('services.stripe_service.stripe.Customer.search')
+    def test_find_customer_by_user_id(self, mock_search):
+        """Тест: Поиск Customer по metadata.user_id."""
+        mock_search.return_value = MagicMock(data=[MagicMock(id="cus_found")])
+        
+        result = StripeService.find_customer_by_user_id("user_123")
+        
+        assert result == {"success": True, "stripe_customer_id": "cus_found"}
+        assert mock_search.call_args.kwargs['query'] == "metadata['user_id']:'user_123'"
+        
+        mock_search.return_value = MagicMock(data=[])
+        assert StripeService.find_customer_by_user_id("user_456")["stripe_customer_id"] is None
 
 
 # ============================================================================
@@ -0,0 +1,139 @@
+"""
+Тесты сводки главной страницы (GET /api/wallet/summary).
+
+- все разделы одним запросом, пользователь загружается один раз
+- fields ограничивает и ответ, и выполняемые запросы
+- запрос способов оплаты к Stripe идёт параллельно с чтением БД
+- неизвестный раздел - 400, неизвестный пользователь - 404
+
+Запуск: pytest tests/test_summary.py -v
+"""
+
+import re
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from main import app
+from models.database import get_db
+from tests.conftest import User, UserBalance, BalanceTransaction, PaymentMethod, WithdrawalMethod
+
+
+@pytest.fixture
+def client(db_session):
+    """Клиент с тестовой сессией (модели подменяет test_models)."""
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def stripe_methods(monkeypatch):
+    """Заглушка Stripe с задержкой 200 мс; записывает поток вызова."""
+    from services.stripe_service import StripeService
+    calls = []
+
+    def get_payment_methods(customer_id):
+        calls.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return {"success": True, "payment_methods": [
+            {"id": "pm_1", "type": "card",
+             "card": {"brand": "visa", "last4": "4242", "exp_month": 12, "exp_year": 2030}}
+        ]}
+
+    monkeypatch.setattr(StripeService, "get_payment_methods", staticmethod(get_payment_methods))
+    return calls
+
+
+@pytest.fixture
+def user(db_session):
+    db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x",
+                        stripe_customer_id="cus_1"))
+    db_session.add(UserBalance(user_id="user_1", balance=Decimal("150.00"), total_deposited=Decimal("150.00")))
+    db_session.add(BalanceTransaction(user_id="user_1", transaction_type="deposit", amount=Decimal("150.00"),
+                                      balance_before=Decimal("0.00"), balance_after=Decimal("150.00")))
+    db_session.add(PaymentMethod(user_id="user_1", stripe_payment_method_id="pm_1", payment_type="card",
+                                 is_default=True))
+    db_session.add(WithdrawalMethod(user_id="user_1", withdrawal_type="bank_transfer", bank_name="Bank",
+                                    bank_account_number="DE000123456789"))
+    db_session.commit()
+    return "user_1"
+
+
+@pytest.fixture
+def user_selects(engine):
+    """SELECT'ы к таблице users за тест."""
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and re.search(r"FROM users\b", statement):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(engine, "before_cursor_execute", listener)
+
+
+def _summary(client, query=""):
+    return client.get(f"/api/wallet/summary{query}", headers={"X-User-ID": "user_1"})
+
+
+class TestSummary:
+    """Тесты сводки."""
+
+    def test_all_sections(self, client, user, stripe_methods, user_selects):
+        """Тест: Без fields - все разделы; пользователь читается один раз."""
+        response = _summary(client, "?history_limit=5")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"success", "balance", "history", "statistics", "payment_methods", "withdrawal_methods"}
+        assert data["balance"]["balance"]["current_balance"] == 150.0
+        assert [t["amount"] for t in data["history"]["transactions"]] == [150.0]
+        assert data["history"]["pagination"]["items_per_page"] == 5
+        assert data["statistics"]["total_bets"] == 0
+        assert [(m["stripe_payment_method_id"], m["is_default"]) for m in data["payment_methods"]] == [("pm_1", True)]
+        assert data["withdrawal_methods"][0]["bank_account_last4"] == "6789"
+        assert len(user_selects) == 1
+
+    def test_field_selection(self, client, user, stripe_methods, assert_max_queries):
+        """Тест: Только запрошенные разделы - ни Stripe, ни лишних запросов к БД."""
+        with assert_max_queries(2):
+            response = _summary(client, "?fields=withdrawal_methods")
+
+        assert set(response.json()) == {"success", "withdrawal_methods"}
+        assert stripe_methods == []
+
+    def test_stripe_runs_alongside_database(self, client, user, stripe_methods, monkeypatch):
+        """Тест: Ожидание Stripe не складывается с чтением БД."""
+        from services.wallet_service import WalletService
+        get_bet_history = WalletService.get_bet_history
+
+        def slow_history(*args, **kwargs):
+            time.sleep(0.2)
+            return get_bet_history(*args, **kwargs)
+
+        monkeypatch.setattr(WalletService, "get_bet_history", staticmethod(slow_history))
+
+        started_at = time.perf_counter()
+        response = _summary(client, "?fields=history,payment_methods")
+        elapsed = time.perf_counter() - started_at
+
+        assert response.status_code == 200
+        assert len(stripe_methods) == 1
+        assert elapsed < 0.35
+
+    def test_unknown_field(self, client, user):
+        """Тест: Неизвестный раздел - 400."""
+        response = _summary(client, "?fields=balance,bonuses")
+
+        assert response.status_code == 400
+        assert "bonuses" in response.json()["detail"]
+
+    def test_unknown_user(self, client):
+        """Тест: Нет пользователя - 404."""
+        assert _summary(client).status_code == 404
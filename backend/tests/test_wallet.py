@@ -42,14 +42,18 @@ class MockORMModelsModule:
     Bet = Bet
     AuditLog = None  # Будет импортирован при необходимости
     MonthlyStatement = None
+    LedgerEntry = None
+    BalanceSnapshot = None
 
 # Подменяем модули
 sys.modules['models.orm_models'] = MockORMModelsModule()
 
 # Импортируем недостающие модели
-from tests.conftest import PaymentMethod, AuditLog
+from tests.conftest import PaymentMethod, AuditLog, LedgerEntry, BalanceSnapshot
 MockORMModelsModule.PaymentMethod = PaymentMethod
 MockORMModelsModule.AuditLog = AuditLog
+MockORMModelsModule.LedgerEntry = LedgerEntry
+MockORMModelsModule.BalanceSnapshot = BalanceSnapshot
 
 # Импортируем WalletService
 import services.wallet_service as ws_module
@@ -74,6 +74,8 @@ class MockORMModelsModule:
     Bet = Bet
     AuditLog = AuditLog
     MonthlyStatement = MonthlyStatement
+    LedgerEntry = conftest.LedgerEntry
+    BalanceSnapshot = conftest.BalanceSnapshot
 
 # Создаем мок-модуль для models
 class MockModelsModule:
@@ -86,6 +88,8 @@ class MockModelsModule:
     Bet = Bet
     AuditLog = AuditLog
     MonthlyStatement = MonthlyStatement
+    LedgerEntry = conftest.LedgerEntry
+    BalanceSnapshot = conftest.BalanceSnapshot
 
 # Подменяем модули
 sys.modules['models.orm_models'] = MockORMModelsModule()
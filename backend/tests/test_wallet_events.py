@@ -0,0 +1,161 @@
+"""
+Тесты потока событий кошелька (services/wallet_events.py, GET /api/wallet/events).
+
+- событие получают только подключения этого пользователя, в том числе
+  при публикации из другого потока
+- переполненная очередь заменяется одним resync, лимит подключений - 503
+- поток отдаёт ready, события и heartbeat, при закрытии отписывается
+- WalletService и webhook'и публикуют изменения после commit
+
+Запуск: pytest tests/test_wallet_events.py -v
+"""
+
+import asyncio
+import json
+import threading
+from decimal import Decimal
+
+import pytest
+
+from tests.conftest import User, UserBalance, WalletOperation
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    """Отдельная шина на тест вместо общей WALLET_EVENTS."""
+    import services.wallet_events as module
+    test_bus = module.WalletEventBus(queue_size=4, max_connections=3)
+    monkeypatch.setattr(module, "WALLET_EVENTS", test_bus)
+    return test_bus
+
+
+def _parse(message: bytes):
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n") if ": " in line)
+    return fields.get("event"), json.loads(fields["data"]) if "data" in fields else None
+
+
+async def _next(subscription):
+    return _parse(await asyncio.wait_for(subscription.queue.get(), 1))
+
+
+class TestWalletEventBus:
+    """Тесты шины событий."""
+
+    @pytest.mark.asyncio
+    async def test_publish_to_user_subscriptions(self, bus):
+        """Тест: Событие получают все подключения пользователя и только они."""
+        first, second, other = bus.subscribe("user_1"), bus.subscribe("user_1"), bus.subscribe("user_2")
+
+        assert bus.publish("user_1", "balance", {"balance": 10.0}) == 2
+        await asyncio.sleep(0)
+
+        assert await _next(first) == await _next(second) == ("balance", {"balance": 10.0})
+        assert other.queue.empty()
+        assert bus.publish("user_3", "balance", {"balance": 1.0}) == 0
+
+    @pytest.mark.asyncio
+    async def test_publish_from_worker_thread(self, bus):
+        """Тест: Публикация из пула потоков доходит до event loop подписчика."""
+        subscription = bus.subscribe("user_1")
+
+        thread = threading.Thread(target=bus.publish, args=("user_1", "operation", {"status": "completed"}))
+        thread.start()
+        thread.join()
+
+        assert await _next(subscription) == ("operation", {"status": "completed"})
+
+    @pytest.mark.asyncio
+    async def test_overflow_becomes_resync(self, bus):
+        """Тест: Клиент, не читающий поток, получает один resync вместо потерянных событий."""
+        subscription = bus.subscribe("user_1")
+
+        for n in range(5):
+            bus.publish("user_1", "balance", {"balance": n})
+        await asyncio.sleep(0)
+
+        assert await _next(subscription) == ("resync", {})
+        assert subscription.queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_connection_limit(self, bus):
+        """Тест: Сверх max_connections подписка не создаётся, отписка освобождает место."""
+        subscriptions = [bus.subscribe("user_1") for _ in range(3)]
+
+        assert bus.subscribe("user_2") is None
+        bus.unsubscribe(subscriptions[0])
+        bus.unsubscribe(subscriptions[0])
+        assert bus.connections == 2
+        assert bus.subscribe("user_2") is not None
+
+
+class TestEventStream:
+    """Тесты тела ответа SSE."""
+
+    @pytest.mark.asyncio
+    async def test_stream_messages_and_unsubscribe(self, bus):
+        """Тест: ready, событие, heartbeat; закрытие потока отписывает клиента."""
+        from services.wallet_events import event_stream
+        subscription = bus.subscribe("user_1")
+        stream = event_stream(subscription, heartbeat_seconds=0.01)
+
+        assert _parse(await stream.__anext__()) == ("ready", {})
+        bus.publish("user_1", "balance", {"balance": 5.0})
+        assert _parse(await stream.__anext__()) == ("balance", {"balance": 5.0})
+        assert await stream.__anext__() == b": ping\n\n"
+
+        await stream.aclose()
+        assert bus.connections == 0
+
+    def test_endpoint_rejects_over_limit(self, monkeypatch):
+        """Тест: При исчерпанном лимите /events отвечает 503."""
+        from fastapi.testclient import TestClient
+        from main import app
+        import routes.wallet as routes
+        full = type("FullBus", (), {"subscribe": staticmethod(lambda user_id: None)})
+        monkeypatch.setattr(routes, "WALLET_EVENTS", full)
+
+        response = TestClient(app).get("/api/wallet/events", headers={"X-User-ID": "user_1"})
+
+        assert response.status_code == 503
+
+
+class TestPublishers:
+    """Тесты публикации из WalletService и webhook'ов."""
+
+    @pytest.mark.asyncio
+    async def test_saved_card_deposit_publishes(self, bus, db_session, wallet_service, monkeypatch):
+        """Тест: Пополнение сохранённой картой публикует операцию и новый баланс."""
+        from services.stripe_service import StripeService
+        monkeypatch.setattr(StripeService, "charge_customer", staticmethod(
+            lambda *args, **kwargs: {"success": True, "charge_id": "ch_1", "intent_id": "pi_1"}
+        ))
+        db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x",
+                            stripe_customer_id="cus_1"))
+        db_session.add(UserBalance(user_id="user_1", balance=Decimal("50.00")))
+        db_session.commit()
+        subscription = bus.subscribe("user_1")
+
+        wallet_service.replenish_balance(db_session, "user_1", 25.0, stripe_payment_method_id="pm_1")
+
+        event, operation = await _next(subscription)
+        assert (event, operation["operation_type"], operation["status"], operation["amount"]) == (
+            "operation", "deposit", "completed", 25.0
+        )
+        assert await _next(subscription) == ("balance", {"balance": 75.0})
+
+    @pytest.mark.asyncio
+    async def test_failed_payment_webhook_publishes(self, bus, db_session):
+        """Тест: Webhook payment_failed публикует статус failed."""
+        import routes.webhooks as webhooks
+        db_session.add(User(id="user_1", email="u1@example.com", name="U1", password_hash="x"))
+        db_session.add(WalletOperation(user_id="user_1", operation_type="deposit", amount=Decimal("10.00"),
+                                       status="pending", stripe_payment_intent_id="pi_1"))
+        db_session.commit()
+        subscription = bus.subscribe("user_1")
+
+        webhooks._handle_payment_failed(db_session, {
+            "id": "pi_1", "metadata": {"user_id": "user_1"}, "last_payment_error": {"message": "Declined"}
+        })
+
+        event, operation = await _next(subscription)
+        assert (event, operation["status"]) == ("operation", "failed")
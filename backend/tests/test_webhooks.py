@@ -116,6 +116,33 @@ class TestStripeWebhook:
         assert response.status_code == 200
         assert response.json()['status'] == 'success'
     
+    @patch('routes.webhooks.StripeService.construct_webhook_event')
+    def test_handler_runs_off_event_loop(self, mock_construct):
+        """Тест: Обработчик (sync Session, FOR UPDATE) выполняется в пуле потоков, не в event loop."""
+        import asyncio
+        loops = []
+        
+        def handler(db, payment_intent):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+        
+        mock_construct.return_value = {
+            'success': True,
+            'event': {'type': 'payment_intent.succeeded', 'data': {'object': {'id': 'pi_test123'}}}
+        }
+        
+        with patch('routes.webhooks._handle_payment_succeeded', handler):
+            response = client.post(
+                "/api/webhook/stripe",
+                content=b'{"type": "payment_intent.succeeded"}',
+                headers={"Content-Type": "application/json", "Stripe-Signature": "valid_sig"}
+            )
+        
+        assert response.status_code == 200
+        assert loops == [None]
+    
     @patch('routes.webhooks.StripeService.construct_webhook_event')
     def test_webhook_unhandled_event(self, mock_construct):
         """Тест: Неизвестное событие."""
@@ -143,8 +170,7 @@ class TestStripeWebhook:
 class TestWebhookHandlers:
     """Тесты вспомогательных функций обработки webhook."""
     
-    @pytest.mark.asyncio
-    async def test_handle_payment_succeeded_updates_operation(self, db_session):
+    def test_handle_payment_succeeded_updates_operation(self, db_session):
         """Тест: Успешный платёж обновляет операцию."""
         from routes.webhooks import _handle_payment_succeeded
         
@@ -172,15 +198,14 @@ class TestWebhookHandlers:
         }
         
         # Вызываем handler
-        await _handle_payment_succeeded(db_session, payment_intent)
+        _handle_payment_succeeded(db_session, payment_intent)
         
         # Проверяем что операция обновлена
         db_session.refresh(operation)
         assert operation.status == 'completed'
         assert operation.stripe_charge_id == 'ch_test123'
     
-    @pytest.mark.asyncio
-    async def test_handle_payment_failed_updates_operation(self, db_session):
+    def test_handle_payment_failed_updates_operation(self, db_session):
         """Тест: Неудачный платёж обновляет операцию."""
         from routes.webhooks import _handle_payment_failed
         
@@ -207,7 +232,7 @@ class TestWebhookHandlers:
         }
         
         # Вызываем handler
-        await _handle_payment_failed(db_session, payment_intent)
+        _handle_payment_failed(db_session, payment_intent)
         
         # Проверяем что операция обновлена
         db_session.refresh(operation)